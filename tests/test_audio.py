@@ -0,0 +1,176 @@
+"""
+音频编解码测试
+"""
+import io
+import wave
+import asyncio
+import numpy as np
+from pathlib import Path
+
+# 添加项目路径
+import sys
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+
+def read_wav(data):
+    """用标准库读取 WAV，返回 (采样率, 声道数, int16 采样)"""
+    with wave.open(io.BytesIO(bytes(data))) as wav:
+        assert wav.getsampwidth() == 2
+        frames = wav.readframes(wav.getnframes())
+        return wav.getframerate(), wav.getnchannels(), np.frombuffer(frames, dtype="<i2")
+
+
+class TestEncode:
+    """测试 WAV / PCM 编码"""
+
+    def test_float_wav(self):
+        """测试浮点输入截断到 [-1, 1] 后编码，结果可被标准库读取"""
+        from src.common.audio import encode_wav
+
+        data = encode_wav(np.array([0.0, 0.5, -0.5, 1.5, -1.5], dtype=np.float32), 22050)
+
+        assert isinstance(data, memoryview)
+        rate, channels, pcm = read_wav(data)
+        assert (rate, channels) == (22050, 1)
+        assert pcm.tolist() == [0, 16383, -16383, 32767, -32767]
+
+    def test_int16_stereo_wav(self):
+        """测试 int16 二维输入按 (帧数, 声道数) 交错编码"""
+        from src.common.audio import encode_wav
+
+        samples = np.array([[1, -1], [2, -2], [3, -3]], dtype=np.int16)
+        rate, channels, pcm = read_wav(encode_wav(samples, 16000))
+
+        assert (rate, channels) == (16000, 2)
+        assert pcm.tolist() == [1, -1, 2, -2, 3, -3]
+
+    def test_float64_list(self):
+        """测试 Python 列表（float64）输入"""
+        from src.common.audio import encode_wav
+
+        _, _, pcm = read_wav(encode_wav([0.25, -0.25], 24000))
+        assert pcm.tolist() == [8191, -8191]
+
+    def test_pcm_zero_copy(self):
+        """测试 int16 输入的裸 PCM 直接引用输入内存"""
+        from src.common.audio import encode_pcm
+
+        samples = np.array([1, 2, 3], dtype=np.int16)
+        view = encode_pcm(samples)
+        samples[0] = 256
+
+        assert bytes(view) == b"\x00\x01\x02\x00\x03\x00"
+        assert bytes(encode_pcm(np.array([1.0, -1.0]))) == b"\xff\x7f\x01\x80"
+
+    def test_stream_header(self):
+        """测试流式 WAV 头长度字段为 0xFFFFFFFF"""
+        import struct
+        from src.common.audio import wav_header, WAV_HEADER_SIZE
+
+        header = wav_header(24000)
+        assert len(header) == WAV_HEADER_SIZE
+        assert header[:4] == b"RIFF"
+        assert struct.unpack("<I", header[4:8])[0] == 0xFFFFFFFF
+        assert struct.unpack("<I", header[24:28])[0] == 24000
+        assert struct.unpack("<I", header[40:44])[0] == 0xFFFFFFFF
+
+    def test_wav_duration(self):
+        """测试按文件头计算 WAV 时长，流式头按实际数据长度计算"""
+        from src.common.audio import encode_wav, wav_header, wav_duration
+
+        assert wav_duration(encode_wav(np.zeros(12000), 24000)) == 0.5
+        assert wav_duration(wav_header(16000) + b"\x00" * 3200) == 0.1
+        assert wav_duration(b"RIFF") == 0.0
+        assert wav_duration(b"\x00" * 100) == 0.0
+
+    def test_decode_roundtrip(self):
+        """测试解码为 float32"""
+        from src.common.audio import decode_pcm16, encode_pcm
+
+        samples = np.linspace(-1, 1, 11, dtype=np.float32)
+        decoded = decode_pcm16(encode_pcm(samples))
+        assert decoded.dtype == np.float32
+        assert np.allclose(decoded, samples, atol=1 / 32767)
+
+
+class TestSignal:
+    """测试重采样与响度归一化"""
+
+    def test_resample_preserves_tone(self):
+        """测试重采样后长度按比例变化，正弦频率不变"""
+        from src.common.audio import resample
+
+        rate = 44100
+        t = np.arange(rate) / rate
+        tone = np.sin(2 * np.pi * 440 * t).astype(np.float32)
+
+        out = resample(tone, rate, 22050)
+        assert out.dtype == np.float32
+        assert len(out) == 22050
+        spectrum = np.abs(np.fft.rfft(out))
+        assert np.argmax(spectrum) == 440
+
+    def test_resample_removes_aliasing(self):
+        """测试降采样滤除新奈奎斯特频率以上的分量"""
+        from src.common.audio import resample
+
+        rate = 48000
+        t = np.arange(rate) / rate
+        high = np.sin(2 * np.pi * 15000 * t)
+
+        out = resample(high, rate, 16000)
+        assert np.max(np.abs(out)) < 1e-3
+
+    def test_resample_identity(self):
+        """测试采样率相同时只做类型转换"""
+        from src.common.audio import resample
+
+        out = resample(np.array([16384, -16384], dtype=np.int16), 16000, 16000)
+        assert out.dtype == np.float32
+        assert np.allclose(out, [0.5, -0.5], atol=1e-4)
+
+    def test_normalize_loudness(self):
+        """测试归一化到目标 RMS，且峰值受限"""
+        from src.common.audio import normalize_loudness
+
+        t = np.arange(16000) / 16000
+        quiet = 0.01 * np.sin(2 * np.pi * 200 * t)
+        out = normalize_loudness(quiet, target_dbfs=-20.0)
+        rms_db = 20 * np.log10(np.sqrt(np.mean(out.astype(np.float64) ** 2)))
+        assert abs(rms_db + 20.0) < 0.01
+
+        # 稀疏脉冲按 RMS 需要很大增益，被峰值限制
+        impulse = np.zeros(16000, dtype=np.float32)
+        impulse[100] = 0.1
+        assert np.isclose(np.max(np.abs(normalize_loudness(impulse))), 0.99)
+
+        silence = np.zeros(10, dtype=np.float32)
+        assert np.array_equal(normalize_loudness(silence), silence)
+
+
+class TestWorkerResponse:
+    """测试工作节点直接返回编码缓冲区"""
+
+    def test_memoryview_response(self):
+        """测试合成结果为 memoryview 时按原样返回"""
+        import httpx
+        from src.common.audio import encode_wav
+        from tests.test_base_worker import make_worker
+
+        worker = make_worker()
+        audio = encode_wav(np.zeros(100, dtype=np.float32), 24000)
+
+        async def synthesize(text, voice_id, language="zh", **kw):
+            return audio
+
+        worker.synthesize = synthesize
+
+        async def run():
+            transport = httpx.ASGITransport(app=worker.app)
+            async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+                return await client.post("/synthesize", json={"text": "hi", "voice_id": "v"})
+
+        resp = asyncio.run(run())
+        assert resp.status_code == 200
+        assert resp.headers["content-length"] == str(len(audio))
+        assert resp.content == bytes(audio)
@@ -0,0 +1,220 @@
+"""
+自动扩缩测试
+"""
+import asyncio
+import pytest
+from pathlib import Path
+
+# 添加项目路径
+import sys
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+
+def make_registry(*nodes):
+    """创建注册中心并注册节点，nodes 为 (node_id, status, host, 额外字段) 元组"""
+    from src.common.models import NodeInfo, EngineType, WorkerStatus
+    from src.gateway.registry import ServiceRegistry
+
+    registry = ServiceRegistry()
+    for node_id, status, host, *extra in nodes:
+        fields = extra[0] if extra else {}
+        registry.register(NodeInfo(
+            node_id=node_id,
+            engine_type=fields.pop("engine", EngineType.XTTS),
+            host=host,
+            port=8001,
+            status=status,
+            model_loaded=status == WorkerStatus.READY,
+            **fields,
+        ))
+    return registry
+
+
+def make_autoscaler(registry, **overrides):
+    from src.common.models import SystemConfig
+    from src.gateway.autoscaler import Autoscaler
+
+    options = dict(
+        autoscale_min_ready=1,
+        autoscale_scale_up_load=2.0,
+        autoscale_scale_down_load=0.5,
+        autoscale_scale_up_cooldown=60,
+        autoscale_scale_down_cooldown=300,
+        autoscale_scale_down_delay=120,
+    )
+    options.update(overrides)
+    return Autoscaler(registry, SystemConfig(**options))
+
+
+class TestScaleUp:
+    """测试激活决策"""
+
+    def test_min_warm_pool(self):
+        """测试就绪节点少于最小保温数时激活一个待机节点"""
+        from src.common.models import WorkerStatus
+
+        registry = make_registry(("a", WorkerStatus.STANDBY, "h1"), ("b", WorkerStatus.STANDBY, "h1"))
+        decisions = make_autoscaler(registry).evaluate(now=0)
+
+        assert [(d.action, d.node_id) for d in decisions] == [("activate", "a")]
+        assert "min_ready" in decisions[0].reason
+
+    def test_load_and_cooldown(self):
+        """测试平均负载超过阈值时激活，冷却期内不再激活"""
+        from src.common.models import WorkerStatus
+
+        registry = make_registry(
+            ("a", WorkerStatus.READY, "h1", {"current_concurrent": 2, "queue_size": 3}),
+            ("b", WorkerStatus.STANDBY, "h1"),
+            ("c", WorkerStatus.STANDBY, "h2"),
+        )
+        autoscaler = make_autoscaler(registry)
+
+        first = autoscaler.evaluate(now=0)
+        assert [d.action for d in first] == ["activate"]
+        assert "load 5.00 > 2.0" in first[0].reason
+        assert autoscaler.evaluate(now=30) == []
+        assert [d.action for d in autoscaler.evaluate(now=61)] == ["activate"]
+
+    def test_latency_threshold(self):
+        """测试 p95 超过目标时激活"""
+        from src.common.models import WorkerStatus
+
+        registry = make_registry(
+            ("a", WorkerStatus.READY, "h1", {"p95_response_time": 4000.0}),
+            ("b", WorkerStatus.STANDBY, "h1"),
+        )
+        decisions = make_autoscaler(registry, autoscale_latency_p95_ms=3000).evaluate(now=0)
+        assert decisions[0].node_id == "b"
+        assert "p95 4000ms" in decisions[0].reason
+
+    def test_wait_for_pending(self):
+        """测试已有节点在加载时不再激活"""
+        from src.common.models import WorkerStatus
+
+        registry = make_registry(
+            ("a", WorkerStatus.READY, "h1", {"current_concurrent": 5}),
+            ("b", WorkerStatus.LOADING, "h1"),
+            ("c", WorkerStatus.STANDBY, "h1"),
+        )
+        assert make_autoscaler(registry).evaluate(now=0) == []
+
+    def test_demand_without_ready_node(self):
+        """测试没有就绪节点但有请求时激活（最小保温数为 0）"""
+        from src.common.models import EngineType, WorkerStatus
+        from src.common.exceptions import NoAvailableNodeError
+
+        registry = make_registry(("a", WorkerStatus.STANDBY, "h1"))
+        autoscaler = make_autoscaler(registry, autoscale_min_ready=0)
+        assert autoscaler.evaluate(now=0) == []
+
+        for _ in range(4):
+            with pytest.raises(NoAvailableNodeError):
+                registry.select_node(EngineType.XTTS)
+        decisions = autoscaler.evaluate(now=10)
+        assert decisions[0].node_id == "a"
+        assert "demand 0.40 req/s" in decisions[0].reason
+
+
+class TestScaleDown:
+    """测试待机决策"""
+
+    def test_hysteresis(self):
+        """测试低负载持续 scale_down_delay 后才待机负载最低的节点，且不低于最小保温数"""
+        from src.common.models import WorkerStatus
+
+        registry = make_registry(
+            ("a", WorkerStatus.READY, "h1", {"current_concurrent": 1}),
+            ("b", WorkerStatus.READY, "h1"),
+            ("c", WorkerStatus.READY, "h1", {"current_concurrent": 1}),
+        )
+        autoscaler = make_autoscaler(registry, autoscale_scale_down_load=1.0)
+
+        assert autoscaler.evaluate(now=0) == []
+        assert autoscaler.evaluate(now=100) == []
+        decisions = autoscaler.evaluate(now=130)
+        assert [(d.action, d.node_id) for d in decisions] == [("standby", "b")]
+
+        # 冷却期内不再待机
+        registry.update_status("b", WorkerStatus.STANDBY)
+        registry.get_node("b").model_loaded = False
+        assert autoscaler.evaluate(now=300) == []
+
+    def test_load_spike_resets_timer(self):
+        """测试负载回升时重新计时"""
+        from src.common.models import WorkerStatus
+
+        registry = make_registry(("a", WorkerStatus.READY, "h1"), ("b", WorkerStatus.READY, "h1"))
+        autoscaler = make_autoscaler(registry)
+
+        autoscaler.evaluate(now=0)
+        registry.get_node("a").current_concurrent = 2
+        autoscaler.evaluate(now=100)
+        registry.get_node("a").current_concurrent = 0
+        assert autoscaler.evaluate(now=150) == []
+        assert [d.action for d in autoscaler.evaluate(now=271)] == ["standby"]
+
+
+class TestMemoryBudget:
+    """测试主机内存预算"""
+
+    def test_prefers_host_with_room(self):
+        """测试按已加载节点的 RSS 计算主机剩余内存，选择放得下的主机"""
+        from src.common.models import WorkerStatus
+
+        registry = make_registry(
+            ("a", WorkerStatus.READY, "h1", {"current_concurrent": 9, "process_rss_mb": 3000.0}),
+            ("b", WorkerStatus.STANDBY, "h1"),
+            ("c", WorkerStatus.STANDBY, "h2"),
+        )
+        decisions = make_autoscaler(registry, autoscale_host_memory_mb=5000).evaluate(now=0)
+        assert decisions[0].node_id == "c"
+
+    def test_blocked_logged_once(self):
+        """测试预算不足时记录一次 blocked 决策，原因不变时不重复"""
+        from src.common.models import EngineType, WorkerStatus
+
+        registry = make_registry(
+            ("a", WorkerStatus.READY, "h1", {"current_concurrent": 9, "process_rss_mb": 3000.0}),
+            ("b", WorkerStatus.STANDBY, "h1"),
+            ("g", WorkerStatus.READY, "h1", {"engine": EngineType.GPT_SOVITS}),
+        )
+        autoscaler = make_autoscaler(registry, autoscale_host_memory_mb=5000)
+
+        decisions = autoscaler.evaluate(now=0)
+        assert [(d.engine, d.action) for d in decisions] == [("xtts", "blocked")]
+        assert "memory budget" in decisions[0].reason
+        assert autoscaler.evaluate(now=100) == []
+        assert len(autoscaler.stats()["decisions"]) == 1
+
+
+class TestDispatch:
+    """测试命令下发"""
+
+    def test_activate_command(self):
+        """测试激活决策将节点标记为加载中并在后台发出 activate 命令"""
+        from src.common.models import WorkerStatus
+
+        registry = make_registry(("a", WorkerStatus.STANDBY, "h1"))
+        sent = []
+
+        async def send_command(node_id, command):
+            sent.append((node_id, command.command))
+            return True
+
+        registry.send_command = send_command
+        autoscaler = make_autoscaler(registry)
+
+        async def run():
+            autoscaler.tick(now=0)
+            status = registry.get_node("a").status
+            pending = autoscaler.stats()["pending_commands"]
+            await asyncio.sleep(0)
+            await asyncio.sleep(0)
+            return status, pending
+
+        status, pending = asyncio.run(run())
+        assert status == WorkerStatus.LOADING
+        assert pending == ["a"]
+        assert sent == [("a", "activate")]
+        assert autoscaler.stats()["pending_commands"] == []
@@ -0,0 +1,762 @@
+"""
+工作节点基类测试
+"""
+import asyncio
+import threading
+import pytest
+from pathlib import Path
+
+# 添加项目路径
+import sys
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+
+def make_worker(**kwargs):
+    """创建一个不加载真实模型的测试节点"""
+    from src.common.models import EngineType
+    from src.workers.base_worker import BaseWorker
+
+    class DummyWorker(BaseWorker):
+        async def load_model(self):
+            return True
+
+        async def unload_model(self):
+            return True
+
+        async def synthesize(self, text, voice_id, language="zh", **kw):
+            return await self._schedule_synthesis(lambda: b"RIFF" + text.encode())
+
+        async def extract_voice(self, audio_data, voice_id, voice_name="", **kw):
+            raise NotImplementedError
+
+    worker = DummyWorker(EngineType.XTTS, **kwargs)
+    worker._model_loaded = True
+    return worker
+
+
+class TestRunInference:
+    """测试推理线程池与排队深度"""
+
+    def test_queue_depth(self):
+        """测试推理线程占满时统计排队的请求数"""
+        worker = make_worker(inference_threads=1)
+        release = threading.Event()
+
+        async def run():
+            tasks = [
+                asyncio.create_task(worker._run_inference(release.wait, 5))
+                for _ in range(3)
+            ]
+            # 等待第一个任务进入推理线程
+            for _ in range(100):
+                await asyncio.sleep(0.01)
+                if worker._queued == 2:
+                    break
+            queued = worker._get_metrics().queue_size
+
+            release.set()
+            await asyncio.gather(*tasks)
+            return queued
+
+        assert asyncio.run(run()) == 2
+        assert worker._queued == 0
+
+    def test_cancelled_while_queued(self):
+        """测试排队中被取消的请求不会残留在计数中"""
+        worker = make_worker(inference_threads=1)
+        release = threading.Event()
+
+        async def run():
+            running = asyncio.create_task(worker._run_inference(release.wait, 5))
+            queued = asyncio.create_task(worker._run_inference(release.wait, 5))
+            await asyncio.sleep(0.05)
+            queued.cancel()
+            with pytest.raises(asyncio.CancelledError):
+                await queued
+            release.set()
+            await running
+
+        asyncio.run(run())
+        assert worker._queued == 0
+
+
+class TestLatencyTelemetry:
+    """测试响应时间分位数上报"""
+
+    def test_percentiles_in_metrics(self):
+        """测试合成请求的响应时间进入心跳指标"""
+        import httpx
+
+        worker = make_worker()
+
+        async def run():
+            transport = httpx.ASGITransport(app=worker.app)
+            async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+                for _ in range(5):
+                    resp = await client.post("/synthesize", json={"text": "hi", "voice_id": "v"})
+                    assert resp.status_code == 200
+
+        asyncio.run(run())
+        metrics = worker._get_metrics()
+        assert metrics.p50_response_time_ms > 0
+        assert metrics.p50_response_time_ms <= metrics.p95_response_time_ms <= metrics.p99_response_time_ms
+
+    def test_registry_stores_percentiles(self):
+        """测试注册中心从心跳中保存分位数和排队深度"""
+        from src.common.models import NodeInfo, NodeMetrics, EngineType
+        from src.gateway.registry import ServiceRegistry
+
+        registry = ServiceRegistry()
+        registry.register(NodeInfo(node_id="n1", engine_type=EngineType.XTTS, host="h", port=1))
+        registry.heartbeat("n1", NodeMetrics(
+            node_id="n1", queue_size=3, p50_response_time_ms=120.0, p95_response_time_ms=900.0,
+        ))
+
+        node = registry.get_node("n1")
+        assert node.queue_size == 3
+        assert node.p50_response_time == 120.0
+        assert node.p95_response_time == 900.0
+
+
+class TestTelemetrySampler:
+    """测试资源遥测采样"""
+
+    def test_collect_without_gpu(self):
+        """测试没有 GPU 时仍能采集 CPU 和内存，GPU 指标为 0"""
+        from src.workers.telemetry import TelemetrySampler
+
+        sampler = TelemetrySampler(gpu_index=99)
+        sample = sampler.collect()
+        assert sample.process_rss_mb > 0
+        assert sample.memory_percent > 0
+        assert sampler.latest() is sample
+        # 不存在的设备: NVML 标记为不可用，之后不再重复初始化
+        assert sampler._nvml is False
+        assert sample.gpu_percent == 0.0
+        assert sampler.collect().gpu_memory_used_mb == 0.0
+
+    def test_background_sampling_ring_buffer(self):
+        """测试后台按周期采样并限制历史长度"""
+        from src.workers.telemetry import TelemetrySampler
+
+        sampler = TelemetrySampler(interval=0.01, history=3)
+
+        async def run():
+            sampler.start()
+            sampler.start()  # 重复启动无副作用
+            await asyncio.sleep(0.2)
+            await sampler.stop()
+
+        asyncio.run(run())
+        history = sampler.history()
+        assert len(history) == 3
+        assert history[0].timestamp <= history[-1].timestamp
+        assert all(sample.loop_lag_ms >= 0 for sample in history)
+
+    def test_metrics_read_latest_sample(self):
+        """测试心跳指标直接读取最新样本"""
+        worker = make_worker()
+        sample = worker._telemetry.collect(loop_lag_ms=12.5)
+        sample.cpu_percent = 42.0
+
+        metrics = worker._get_metrics()
+        assert metrics.cpu_percent == 42.0
+        assert metrics.loop_lag_ms == 12.5
+        assert metrics.process_rss_mb == sample.process_rss_mb
+
+    def test_gateway_client_reused(self):
+        """测试同一事件循环内复用网关客户端"""
+        worker = make_worker()
+
+        async def run():
+            first = worker._get_http_client()
+            second = worker._get_http_client()
+            await worker._close_http_client()
+            return first is second
+
+        assert asyncio.run(run())
+
+
+class TestLoopMonitorOption:
+    """测试事件循环监控开关"""
+
+    def test_disabled_by_default(self):
+        """测试默认不创建监控"""
+        worker = make_worker()
+        assert worker._loop_monitor is None
+        assert worker._get_metrics().loop_blocked_count == 0
+
+    def test_enabled_reports_blocks(self):
+        """测试启用后阻塞次数进入心跳指标"""
+        worker = make_worker(loop_block_threshold_ms=100)
+        assert worker._loop_monitor.block_threshold == 0.1
+
+        worker._loop_monitor.blocked_count = 2
+        assert worker._get_metrics().loop_blocked_count == 2
+
+
+class TestSynthesisScheduling:
+    """测试合成调度"""
+
+    def test_queue_full_returns_429(self):
+        """测试队列满时返回 429、Retry-After 和 X-Queue-Full，供网关换节点重试"""
+        import httpx
+        from src.common.exceptions import QueueFullError
+
+        worker = make_worker()
+
+        async def full(*args, **kwargs):
+            raise QueueFullError(64, retry_after=2.4)
+
+        worker.synthesize = full
+
+        async def run():
+            transport = httpx.ASGITransport(app=worker.app)
+            async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+                return await client.post("/synthesize", json={"text": "hi", "voice_id": "v"})
+
+        resp = asyncio.run(run())
+        assert resp.status_code == 429
+        assert resp.headers["X-Queue-Full"] == "1"
+        assert resp.headers["Retry-After"] == "3"
+        assert worker._error_count == 0
+
+    def test_memoryview_audio_response(self, monkeypatch):
+        """测试引擎返回 memoryview 时按 bytes 响应（旧版 Starlette 的 Response 只接受 bytes / str）"""
+        import httpx
+        import numpy as np
+        from starlette.responses import Response
+        from src.common.audio import encode_wav
+
+        def strict_render(self, content):
+            if content is None:
+                return b""
+            if isinstance(content, bytes):
+                return content
+            return content.encode(self.charset)
+
+        monkeypatch.setattr(Response, "render", strict_render)
+        worker = make_worker()
+        audio = encode_wav(np.zeros(160), 16000)
+
+        async def synthesize(*args, **kwargs):
+            return audio
+
+        worker.synthesize = synthesize
+
+        async def run():
+            transport = httpx.ASGITransport(app=worker.app)
+            async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+                return await client.post("/synthesize", json={"text": "hi", "voice_id": "v"})
+
+        resp = asyncio.run(run())
+        assert resp.status_code == 200
+        assert resp.content == bytes(audio)
+
+    def test_admission_limit(self):
+        """测试受理数达到推理线程数 + 队列容量时直接拒绝"""
+        import httpx
+
+        worker = make_worker(inference_threads=1, max_queue_size=1)
+        worker._scheduler.service_time = 2.0
+        worker._current_concurrent = 2
+
+        async def run():
+            transport = httpx.ASGITransport(app=worker.app)
+            async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+                return await client.post("/synthesize", json={"text": "hi", "voice_id": "v"})
+
+        resp = asyncio.run(run())
+        assert resp.status_code == 429
+        assert resp.headers["Retry-After"] == "2"
+        assert worker._current_concurrent == 2
+        assert worker._scheduler.rejected_count == 1
+
+    def test_batch_hook_only_when_supported(self):
+        """测试引擎声明支持批量时才启用批量推理"""
+        worker = make_worker(max_batch_size=8)
+        assert worker._scheduler.run_batch is None
+        assert not worker._scheduler.stats()["batching"]
+
+
+def make_streaming_worker(chunks=3, produced=None, **kwargs):
+    """创建支持流式合成的测试节点，每块为 4 个采样的 PCM"""
+    import time
+    import numpy as np
+    from src.common.audio import encode_pcm
+    from src.common.models import EngineType
+    from src.workers.base_worker import BaseWorker
+
+    class StreamingWorker(BaseWorker):
+        supports_streaming = True
+        stream_sample_rate = 16000
+
+        async def load_model(self):
+            return True
+
+        async def unload_model(self):
+            return True
+
+        async def synthesize(self, text, voice_id, language="zh", **kw):
+            raise NotImplementedError
+
+        async def synthesize_stream(self, text, voice_id, language="zh", chunk_size=20, **kw):
+            if voice_id == "missing":
+                raise ValueError("Voice not found: missing")
+            async for chunk in self._stream_inference(self._generate, chunks):
+                yield chunk
+
+        def _generate(self, count):
+            for i in range(count):
+                time.sleep(0.01)
+                if produced is not None:
+                    produced.append(i)
+                yield encode_pcm(np.full(4, i, dtype=np.int16))
+
+        async def extract_voice(self, audio_data, voice_id, voice_name="", **kw):
+            raise NotImplementedError
+
+    worker = StreamingWorker(EngineType.XTTS, **kwargs)
+    worker._model_loaded = True
+    return worker
+
+
+class TestStreamingSynthesis:
+    """测试流式合成"""
+
+    def _post(self, worker, **payload):
+        import httpx
+
+        async def run():
+            transport = httpx.ASGITransport(app=worker.app)
+            async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+                return await client.post("/synthesize_stream", json={"text": "hi", "voice_id": "v", **payload})
+
+        return asyncio.run(run())
+
+    def test_wav_stream(self):
+        """测试 WAV 流以流式文件头开头，随后是各块 PCM，并记录首块耗时"""
+        import struct
+
+        worker = make_streaming_worker(chunks=3)
+        resp = self._post(worker)
+
+        assert resp.status_code == 200
+        assert resp.headers["content-type"] == "audio/wav"
+        assert resp.headers["X-Sample-Rate"] == "16000"
+        assert float(resp.headers["X-First-Chunk-Time"].rstrip("ms")) > 0
+        assert resp.content[:4] == b"RIFF"
+        assert struct.unpack("<I", resp.content[24:28])[0] == 16000
+        assert resp.content[44:] == b"".join(bytes([i, 0]) * 4 for i in range(3))
+
+        metrics = worker._get_metrics()
+        assert metrics.p50_first_chunk_ms > 0
+        assert metrics.request_count == 1
+        assert worker._current_concurrent == 0
+
+    def test_pcm_stream(self):
+        """测试 PCM 格式不带文件头"""
+        worker = make_streaming_worker(chunks=2)
+        resp = self._post(worker, output_format="pcm", chunk_size=5)
+
+        assert resp.status_code == 200
+        assert resp.headers["content-type"].startswith("audio/L16")
+        assert resp.content == bytes([0, 0]) * 4 + bytes([1, 0]) * 4
+
+    def test_error_before_first_chunk(self):
+        """测试首块之前的错误仍以错误状态码返回"""
+        worker = make_streaming_worker()
+        resp = self._post(worker, voice_id="missing")
+
+        assert resp.status_code == 500
+        assert worker._error_count == 1
+        assert worker._current_concurrent == 0
+
+    def test_unsupported_engine(self):
+        """测试不支持流式的引擎返回 501"""
+        resp = self._post(make_worker())
+        assert resp.status_code == 501
+
+    def test_early_close_stops_producer(self):
+        """测试提前关闭迭代时推理线程停止生成"""
+        produced = []
+        worker = make_streaming_worker(chunks=50, produced=produced)
+
+        async def run():
+            chunks = worker.synthesize_stream("hi", "v")
+            first = await chunks.__anext__()
+            await chunks.aclose()
+            await asyncio.sleep(0.1)
+            return first
+
+        assert asyncio.run(run()) == bytes([0, 0]) * 4
+        assert len(produced) < 50
+        assert worker._scheduler.queue_size == 0
+
+
+class TestOpenVoicePipeline:
+    """测试 OpenVoice 内存合成管线的编排（不加载模型）"""
+
+    def _worker(self, tmp_path, in_memory):
+        import numpy as np
+        from types import SimpleNamespace
+        from src.workers.openvoice_worker import OpenVoiceWorker
+
+        calls = []
+
+        class FakeTTS:
+            hps = SimpleNamespace(data=SimpleNamespace(spk2id={"ZH": 1}, sampling_rate=44100))
+
+            def tts_to_file(self, text, speaker_id, output_path=None, speed=1.0):
+                calls.append(output_path)
+                return np.full(8, 0.25, dtype=np.float32)
+
+        worker = OpenVoiceWorker(voices_dir=str(tmp_path), device="cpu", auto_register=False)
+        worker._base_speaker_tts = FakeTTS()
+        worker._in_memory = in_memory
+        worker._convert_waveform = lambda audio, rate, se: (audio[:4] * 2, rate // 2)
+        return worker, calls
+
+    def test_in_memory_path(self, tmp_path):
+        """测试波形直接传给音色转换，不写临时文件"""
+        import io
+        import wave
+
+        worker, calls = self._worker(tmp_path, in_memory=True)
+        data = worker._synthesize_sync("hi", object(), "zh", 1.0)
+
+        assert calls == [None]
+        with wave.open(io.BytesIO(data)) as wav:
+            assert wav.getframerate() == 22050
+            assert wav.getnframes() == 4
+
+    def test_file_fallback(self, tmp_path):
+        """测试转换器不支持时走临时文件路径"""
+        worker, calls = self._worker(tmp_path, in_memory=False)
+        worker._synthesize_file_sync = lambda *args: b"file"
+
+        assert worker._synthesize_sync("hi", object(), "zh", 1.0) == b"file"
+        assert calls == []
+
+
+class TestWarmup:
+    """测试激活时的模型预热"""
+
+    def _worker(self, tmp_path, voices=("b", "a"), **kwargs):
+        worker = make_worker(**kwargs)
+        worker._model_loaded = False
+        worker.voices_dir = tmp_path
+        for voice_id in voices:
+            (tmp_path / voice_id).mkdir()
+            (tmp_path / voice_id / "voice.json").write_text("{}")
+        calls = []
+
+        async def synthesize(text, voice_id, language="zh", **kw):
+            calls.append((voice_id, language, worker._status))
+            await asyncio.sleep(0.01)
+            return b"RIFF"
+
+        worker.synthesize = synthesize
+        return worker, calls
+
+    def test_warmup_before_ready(self, tmp_path):
+        """测试预热按语言和轮数执行，每轮并发数等于推理线程数，期间状态为 WARMING"""
+        from src.common.models import WorkerStatus
+
+        worker, calls = self._worker(
+            tmp_path, inference_threads=2, warmup_languages=["zh", "en"], warmup_runs=2
+        )
+
+        assert asyncio.run(worker.activate())
+        assert worker._status == WorkerStatus.READY
+        assert len(calls) == 8
+        assert {call[0] for call in calls} == {"a"}
+        assert [call[1] for call in calls] == ["zh"] * 4 + ["en"] * 4
+        assert {call[2] for call in calls} == {WorkerStatus.WARMING}
+
+        assert worker._get_metrics().warmup_seconds >= 0.02
+        health = asyncio.run(worker._handle_health())
+        assert health["components"]["warmup"]["status"] == "done"
+
+    def test_warmup_voice_option(self, tmp_path):
+        """测试指定预热音色"""
+        worker, calls = self._worker(tmp_path, warmup_languages=["ja"], warmup_voice="b")
+        asyncio.run(worker.activate())
+        assert calls[0][:2] == ("b", "ja")
+
+    def test_warmup_without_voice(self, tmp_path):
+        """测试没有可用音色时跳过预热，仍然就绪"""
+        from src.common.models import WorkerStatus
+
+        worker, calls = self._worker(tmp_path, voices=(), warmup_languages=["zh"])
+        assert asyncio.run(worker.activate())
+        assert calls == []
+        assert worker._status == WorkerStatus.READY
+        assert worker._warmup_state == "skipped"
+
+    def test_warmup_failure(self, tmp_path):
+        """测试预热合成失败只记录警告，不影响激活"""
+        from src.common.models import WorkerStatus
+
+        worker, _ = self._worker(tmp_path, warmup_languages=["zh"])
+
+        async def synthesize(text, voice_id, language="zh", **kw):
+            raise RuntimeError("boom")
+
+        worker.synthesize = synthesize
+        assert asyncio.run(worker.activate())
+        assert worker._status == WorkerStatus.READY
+        assert worker._warmup_state == "failed"
+
+    def test_warmup_disabled(self, tmp_path):
+        """测试未配置预热语言时不预热"""
+        worker, calls = self._worker(tmp_path)
+        asyncio.run(worker.activate())
+        assert calls == []
+        assert worker._get_metrics().warmup_seconds == 0.0
+
+
+class TestActivationTiming:
+    """测试激活耗时与阶段统计"""
+
+    def test_activation_phases(self):
+        """测试激活的总耗时和阶段耗时（含引擎子阶段）通过指标、健康检查和命令返回"""
+        from src.common.models import NodeCommand
+
+        worker = make_worker()
+        worker._model_loaded = False
+
+        async def load_model():
+            with worker._load_phase("checkpoint"):
+                await asyncio.sleep(0.02)
+            return True
+
+        worker.load_model = load_model
+
+        result = asyncio.run(worker._handle_command(NodeCommand(command="activate")))
+        assert result["success"] is True
+        assert set(result["phases"]) == {"load_model", "checkpoint", "process_pool"}
+        assert result["phases"]["load_model"] >= result["phases"]["checkpoint"] >= 0.02
+        assert result["activation_seconds"] >= result["phases"]["load_model"]
+
+        assert worker._get_metrics().activation_seconds == pytest.approx(result["activation_seconds"], abs=1e-3)
+        health = asyncio.run(worker._handle_health())
+        assert health["components"]["activation"]["phases"] == result["phases"]
+
+
+def make_reload_worker(**kwargs):
+    """创建一个支持不停服重新加载的测试节点（合成结果为当前模型名）"""
+    from src.common.models import EngineType
+    from src.workers.base_worker import BaseWorker
+
+    class ReloadWorker(BaseWorker):
+        model_attributes = ("_model",)
+        reload_options = ("model_path",)
+
+        def __init__(self, **kw):
+            super().__init__(EngineType.XTTS, auto_register=False, **kw)
+            self.model_path = "v1"
+            self._model = None
+            self.unloaded = []
+
+        async def load_model(self):
+            if self.model_path == "broken":
+                return False
+            await asyncio.sleep(0.05)
+            self._model = f"model-{self.model_path}"
+            return True
+
+        async def unload_model(self):
+            self.unloaded.append(self._model)
+            self._model = None
+            return True
+
+        async def synthesize(self, text, voice_id, language="zh", **kw):
+            return await self._schedule_synthesis(self._synthesize_sync, text)
+
+        async def extract_voice(self, audio_data, voice_id, voice_name="", **kw):
+            raise NotImplementedError
+
+        def _synthesize_sync(self, text):
+            return self._model.encode()
+
+    return ReloadWorker(**kwargs)
+
+
+class TestDrain:
+    """测试排空协议"""
+
+    def test_drain_waits_for_requests(self):
+        """测试排空时状态为 DRAINING，进行中的请求结束后立即返回"""
+        from src.common.models import WorkerStatus
+
+        worker = make_worker()
+
+        async def run():
+            loop = asyncio.get_running_loop()
+            worker._request_started()
+            worker._request_started()
+            loop.call_later(0.05, worker._request_finished)
+            loop.call_later(0.1, worker._request_finished)
+            start = loop.time()
+            drained = await worker.drain(timeout=5)
+            return drained, loop.time() - start
+
+        drained, elapsed = asyncio.run(run())
+        assert drained is True
+        assert 0.1 <= elapsed < 1.0
+        assert worker._status == WorkerStatus.DRAINING
+        assert worker._idle_waiters == []
+
+    def test_drain_timeout(self):
+        """测试超时后返回 False，不残留等待者"""
+        worker = make_worker()
+        worker._request_started()
+
+        assert asyncio.run(worker.drain(timeout=0.05)) is False
+        assert worker._idle_waiters == []
+        worker._request_finished()
+
+    def test_gateway_notified(self):
+        """测试排空、恢复时立即向网关发送心跳"""
+        import json
+        import httpx
+        from src.common.models import NodeCommand
+
+        statuses = []
+
+        def handler(request):
+            statuses.append(json.loads(request.content)["status"])
+            return httpx.Response(200, json={"success": True})
+
+        worker = make_worker(gateway_url="http://gateway", auto_register=False)
+
+        async def run():
+            worker._http_client = httpx.AsyncClient(transport=httpx.MockTransport(handler))
+            worker._http_client_loop = asyncio.get_running_loop()
+            await worker.activate()
+            drained = await worker._handle_command(NodeCommand(command="drain", params={"timeout": 1}))
+            await worker.activate()
+            await worker._close_http_client()
+            return drained
+
+        assert asyncio.run(run())["status"] == "draining"
+        assert statuses == ["ready", "draining", "ready"]
+
+    def test_standby_waits_for_requests(self):
+        """测试待机在进行中的请求结束后才卸载模型"""
+        from src.common.models import WorkerStatus
+
+        worker = make_worker()
+        unloaded_with = []
+
+        async def unload_model():
+            unloaded_with.append(worker._current_concurrent)
+            return True
+
+        worker.unload_model = unload_model
+
+        async def run():
+            worker._request_started()
+            asyncio.get_running_loop().call_later(0.05, worker._request_finished)
+            return await worker.standby()
+
+        assert asyncio.run(run()) is True
+        assert unloaded_with == [0]
+        assert worker._status == WorkerStatus.STANDBY
+
+    def test_registry_marks_draining(self):
+        """测试网关发送排空类命令时立即停止向该节点路由"""
+        from src.common.models import NodeInfo, NodeCommand, EngineType, WorkerStatus
+        from src.common.exceptions import NoAvailableNodeError
+        from src.gateway.registry import ServiceRegistry
+
+        registry = ServiceRegistry()
+        registry.register(NodeInfo(
+            node_id="n1", engine_type=EngineType.XTTS, host="127.0.0.1", port=1,
+            status=WorkerStatus.READY, model_loaded=True,
+        ))
+        assert registry.select_node(EngineType.XTTS).node_id == "n1"
+
+        asyncio.run(registry.send_command("n1", NodeCommand(command="standby")))
+        assert registry.get_node("n1").status == WorkerStatus.DRAINING
+        with pytest.raises(NoAvailableNodeError):
+            registry.select_node(EngineType.XTTS)
+
+
+class TestReload:
+    """测试不停服重新加载"""
+
+    def test_reload_swaps_model(self):
+        """测试新模型加载期间旧模型照常服务，完成后切换并释放旧模型"""
+        from src.common.models import NodeCommand, WorkerStatus
+
+        worker = make_reload_worker()
+
+        async def run():
+            await worker.activate()
+            reload = asyncio.create_task(worker._handle_command(
+                NodeCommand(command="reload", params={"model_path": "v2"})
+            ))
+            await asyncio.sleep(0.01)
+            during = (await worker.synthesize("hi", "v"), worker._status)
+            result = await reload
+            after = await worker.synthesize("hi", "v")
+            return during, result, after
+
+        (audio, status), result, after = asyncio.run(run())
+        assert audio == b"model-v1"
+        assert status == WorkerStatus.READY
+        assert result["success"] is True and result["status"] == "ready"
+        assert "load_model" in result["phases"]
+        assert after == b"model-v2"
+        assert worker.model_path == "v2"
+        assert worker.unloaded == ["model-v1"]
+
+    def test_reload_failure_keeps_model(self):
+        """测试新模型加载失败时保留旧模型和选项"""
+        from src.common.models import WorkerStatus
+
+        worker = make_reload_worker()
+
+        async def run():
+            await worker.activate()
+            success = await worker.reload({"model_path": "broken"})
+            return success, await worker.synthesize("hi", "v")
+
+        success, audio = asyncio.run(run())
+        assert success is False
+        assert audio == b"model-v1"
+        assert worker.model_path == "v1"
+        assert worker._status == WorkerStatus.READY
+
+    def test_unknown_option(self):
+        """测试不支持的选项被拒绝"""
+        from src.common.models import NodeCommand
+
+        worker = make_reload_worker()
+        result = asyncio.run(worker._handle_command(NodeCommand(command="reload", params={"device": "cpu"})))
+        assert result["success"] is False
+        assert "device" in result["error"]
+
+    def test_fallback_unload_then_load(self):
+        """测试未声明模型属性的引擎先卸载再加载"""
+        from src.common.models import WorkerStatus
+
+        worker = make_worker()
+        calls = []
+
+        async def load_model():
+            calls.append("load")
+            return True
+
+        async def unload_model():
+            calls.append("unload")
+            return True
+
+        worker.load_model = load_model
+        worker.unload_model = unload_model
+
+        assert asyncio.run(worker.reload()) is True
+        assert calls == ["unload", "load"]
+        assert worker._status == WorkerStatus.READY
@@ -0,0 +1,180 @@
+"""
+节点容量估计测试
+"""
+import asyncio
+from collections import Counter
+from pathlib import Path
+
+# 添加项目路径
+import sys
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from tests.test_base_worker import make_worker
+
+
+class TestEstimator:
+    """测试速度估计"""
+
+    def test_calibrate_and_observe(self):
+        """测试校准结果作为初值，线上请求按平滑系数修正"""
+        from src.workers.capacity import CapacityEstimator
+
+        estimator = CapacityEstimator(alpha=0.5)
+        estimator.calibrate("zh", chars=30, seconds=1.0, audio_seconds=4.0)
+        assert estimator.snapshot() == {"zh": {"chars_per_second": 30.0, "rtf": 0.25}}
+
+        estimator.observe("zh", chars=10, seconds=1.0, audio_seconds=2.0)
+        entry = estimator.get("zh")
+        assert entry.chars_per_second == 20.0
+        assert entry.rtf == 0.375
+        assert entry.source == "live"
+        assert entry.samples == 2
+
+    def test_live_only_language(self):
+        """测试校准未覆盖的语言由首个请求建立估计，节点平均值覆盖全部语言"""
+        from src.workers.capacity import CapacityEstimator
+
+        estimator = CapacityEstimator()
+        estimator.calibrate("zh", chars=30, seconds=1.0)
+        estimator.observe("en", chars=50, seconds=0.5)
+
+        assert estimator.get("en").chars_per_second == 100.0
+        assert estimator.get("zh").rtf == 0.0
+        assert estimator.chars_per_second() == 65.0
+
+    def test_ignores_tiny_samples(self):
+        """测试耗时过短或空文本的样本不计入"""
+        from src.workers.capacity import CapacityEstimator
+
+        estimator = CapacityEstimator()
+        estimator.observe("zh", chars=30, seconds=0.001)
+        estimator.observe("zh", chars=0, seconds=1.0)
+        assert estimator.snapshot() == {}
+        assert estimator.chars_per_second() == 0.0
+
+
+class TestWorker:
+    """测试节点校准和上报"""
+
+    def _worker(self, tmp_path, **kwargs):
+        from src.common.audio import encode_wav
+        import numpy as np
+
+        worker = make_worker(**kwargs)
+        worker._model_loaded = False
+        worker.voices_dir = tmp_path
+        (tmp_path / "a").mkdir()
+        (tmp_path / "a" / "voice.json").write_text("{}")
+        calls = []
+
+        async def synthesize(text, voice_id, language="zh", **kw):
+            calls.append((language, worker._status))
+            await asyncio.sleep(0.05)
+            # 1 秒音频
+            return encode_wav(np.zeros(16000), 16000)
+
+        worker.synthesize = synthesize
+        return worker, calls
+
+    def test_calibrate_on_activate(self, tmp_path):
+        """测试激活时逐语言校准（状态为 WARMING），结果随心跳上报并乘以推理并发数"""
+        from src.common.models import WorkerStatus
+
+        worker, calls = self._worker(tmp_path, inference_threads=2, calibration_languages=["zh", "en"])
+
+        assert asyncio.run(worker.activate())
+        assert worker._status == WorkerStatus.READY
+        assert calls == [("zh", WorkerStatus.WARMING), ("en", WorkerStatus.WARMING)]
+        assert "calibration" in worker._activation_phases
+
+        metrics = worker._get_metrics()
+        assert set(metrics.capacity) == {"en", "zh"}
+        assert 0.04 < metrics.capacity["zh"]["rtf"] < 0.5
+        per_stream = worker._capacity.chars_per_second()
+        assert metrics.capacity_chars_per_second == round(per_stream * 2, 2)
+        assert worker._get_node_info().capacity_chars_per_second == metrics.capacity_chars_per_second
+
+        health = asyncio.run(worker._handle_health())
+        assert health["components"]["capacity"]["concurrency"] == 2
+
+    def test_disabled_by_default(self, tmp_path):
+        """测试未配置校准语言时不校准"""
+        worker, calls = self._worker(tmp_path)
+        assert asyncio.run(worker.activate())
+        assert calls == []
+        assert worker._get_metrics().capacity == {}
+
+    def test_live_requests(self, tmp_path):
+        """测试合成请求修正对应语言的估计"""
+        from fastapi.testclient import TestClient
+
+        worker, _ = self._worker(tmp_path)
+        worker._model_loaded = True
+        client = TestClient(worker.app)
+
+        resp = client.post("/synthesize", json={"text": "你好世界", "voice_id": "a", "language": "ja"})
+        assert resp.status_code == 200
+        entry = worker._capacity.get("ja")
+        assert entry.source == "live"
+        assert 0 < entry.chars_per_second < 80
+        assert 0.04 < entry.rtf < 0.5
+
+
+class TestRouting:
+    """测试网关按容量分配请求"""
+
+    def _registry(self, **options):
+        from src.common.models import NodeInfo, EngineType, WorkerStatus
+        from src.gateway.registry import ServiceRegistry
+
+        registry = ServiceRegistry(capacity_routing=True, **options)
+        for node_id, capacity in (("fast", 300.0), ("slow", 100.0), ("new", 0.0)):
+            registry.register(NodeInfo(
+                node_id=node_id,
+                engine_type=EngineType.XTTS,
+                host="127.0.0.1",
+                port=8001,
+                status=WorkerStatus.READY,
+                model_loaded=True,
+                capacity_chars_per_second=capacity,
+            ))
+        return registry
+
+    def test_weights(self):
+        """测试权重为相对最大容量的比例，未上报容量的节点按 1 计算"""
+        weights = {n.node_id: n.weight for n in self._registry().get_nodes()}
+        assert weights["fast"] == 1.0
+        assert abs(weights["slow"] - 1 / 3) < 1e-9
+        assert weights["new"] == 1.0
+
+    def test_weighted_round_robin(self):
+        """测试轮询按容量比例分配"""
+        from src.common.models import EngineType
+
+        registry = self._registry()
+        registry.unregister("new")
+        picks = Counter(registry.select_node(EngineType.XTTS).node_id for _ in range(40))
+        assert picks == {"fast": 30, "slow": 10}
+
+    def test_heartbeat_updates_capacity(self):
+        """测试心跳同步容量并体现在权重中"""
+        from src.common.models import NodeMetrics, WorkerStatus
+
+        registry = self._registry()
+        registry.heartbeat("slow", NodeMetrics(
+            node_id="slow",
+            status=WorkerStatus.READY,
+            model_loaded=True,
+            capacity={"zh": {"chars_per_second": 300.0, "rtf": 0.1}},
+            capacity_chars_per_second=600.0,
+        ))
+        weights = {n.node_id: n.weight for n in registry.get_nodes()}
+        assert weights["slow"] == 1.0
+        assert weights["fast"] == 0.5
+        assert registry.get_node("slow").capacity["zh"]["rtf"] == 0.1
+
+    def test_combined_with_slow_start(self):
+        """测试容量权重与慢启动权重相乘"""
+        registry = self._registry(slow_start_seconds=60, slow_start_min_weight=0.5)
+        weights = {n.node_id: n.weight for n in registry.get_nodes()}
+        assert abs(weights["slow"] - 0.5 / 3) < 0.01
@@ -0,0 +1,36 @@
+"""
+配置文件读取测试
+"""
+import pytest
+from pathlib import Path
+
+# 添加项目路径
+import sys
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+CONFIG_PATH = Path(__file__).parent.parent / "voice-clone-tts" / "config.yaml"
+
+
+class TestConfigLoader:
+    """测试配置读取"""
+
+    def test_load_repo_config(self):
+        """测试读取仓库自带的 config.yaml"""
+        from src.common.config import load_config, get_config_value
+
+        config = load_config(str(CONFIG_PATH))
+        assert get_config_value(config, "performance.batch_size") == 1
+        assert get_config_value(config, "performance.max_queue_size") == 64
+        assert get_config_value(config, "performance.missing", 7) == 7
+        assert get_config_value(config, "gateway.port.nested", "x") == "x"
+
+    def test_missing_file(self, tmp_path, monkeypatch):
+        """测试默认配置文件不存在时返回空字典，显式指定时报错"""
+        from src.common.config import load_config
+        from src.common.exceptions import ConfigurationError
+
+        monkeypatch.chdir(tmp_path)
+        monkeypatch.delenv("TTS_CONFIG", raising=False)
+        assert load_config() == {}
+        with pytest.raises(ConfigurationError):
+            load_config(str(tmp_path / "missing.yaml"))
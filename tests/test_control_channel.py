@@ -0,0 +1,462 @@
+"""
+网关控制通道测试
+"""
+import json
+import asyncio
+from pathlib import Path
+
+# 添加项目路径
+import sys
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from tests.test_base_worker import make_worker
+
+
+class Pipe:
+    """内存中的双向连接: worker 端模拟 websockets 客户端，gateway 端模拟 Starlette WebSocket"""
+
+    def __init__(self):
+        self.to_gateway: asyncio.Queue = asyncio.Queue()
+        self.to_worker: asyncio.Queue = asyncio.Queue()
+        self.closed = False
+        self.worker = WorkerSocket(self)
+        self.gateway = GatewaySocket(self)
+
+    def close(self):
+        if not self.closed:
+            self.closed = True
+            self.to_gateway.put_nowait(None)
+            self.to_worker.put_nowait(None)
+
+
+class WorkerSocket:
+    def __init__(self, pipe):
+        self.pipe = pipe
+
+    async def send(self, text):
+        if self.pipe.closed:
+            raise ConnectionError("closed")
+        self.pipe.to_gateway.put_nowait(text)
+
+    async def recv(self):
+        text = await self.pipe.to_worker.get()
+        if text is None:
+            raise ConnectionError("closed")
+        return text
+
+    async def close(self):
+        self.pipe.close()
+
+
+class GatewaySocket:
+    def __init__(self, pipe):
+        self.pipe = pipe
+
+    async def accept(self):
+        pass
+
+    async def receive_text(self):
+        from fastapi import WebSocketDisconnect
+
+        text = await self.pipe.to_gateway.get()
+        if text is None:
+            raise WebSocketDisconnect()
+        return text
+
+    async def send_text(self, text):
+        if self.pipe.closed:
+            raise RuntimeError("closed")
+        self.pipe.to_worker.put_nowait(text)
+
+    async def close(self, code=1000):
+        self.pipe.close()
+
+
+def make_pair(worker, **options):
+    """创建网关注册中心和连接到它的节点控制通道"""
+    from src.gateway.registry import ServiceRegistry
+    from src.gateway.control import ControlChannelManager
+    from src.workers.control_channel import ControlChannel
+
+    registry = ServiceRegistry()
+    manager = ControlChannelManager(registry)
+    registry.control = manager
+    pipes = []
+
+    async def connect(url):
+        pipe = Pipe()
+        pipes.append(pipe)
+        asyncio.ensure_future(manager.handle(pipe.gateway, worker.node_id))
+        return pipe.worker
+
+    channel = ControlChannel(
+        f"ws://gateway/api/nodes/{worker.node_id}/control",
+        hello=lambda: worker._get_node_info().model_dump(mode="json"),
+        metrics=lambda: worker._get_metrics().model_dump(mode="json"),
+        on_command=worker._handle_channel_command,
+        connect=connect,
+        **options,
+    )
+    worker._control = channel
+    worker.gateway_url = "http://gateway"
+    return registry, manager, channel, pipes
+
+
+def no_http(*args, **kwargs):
+    """替换 httpx.AsyncClient: 命令不应再经 HTTP 发送"""
+    raise AssertionError("command resent over HTTP")
+
+
+async def wait_for(condition, timeout=2.0):
+    for _ in range(int(timeout / 0.01)):
+        if condition():
+            return
+        await asyncio.sleep(0.01)
+    raise AssertionError("condition not met")
+
+
+class TestProtocol:
+    """测试协议工具"""
+
+    def test_control_url(self):
+        from src.common.control import control_url
+
+        assert control_url("http://gw:8080/", "n1") == "ws://gw:8080/api/nodes/n1/control"
+        assert control_url("https://gw", "n1") == "wss://gw/api/nodes/n1/control"
+
+    def test_diff_metrics(self):
+        """测试只保留变化的字段，不发送 node_id 和 timestamp"""
+        from src.common.control import diff_metrics
+
+        current = {"node_id": "n1", "timestamp": 2.0, "status": "ready", "queue_size": 3}
+        assert diff_metrics(current, {}) == {"status": "ready", "queue_size": 3}
+        assert diff_metrics(current, {"status": "ready", "queue_size": 1}) == {"queue_size": 3}
+
+
+class TestWorkerChannel:
+    """测试节点侧的帧编码和重连"""
+
+    def test_delta_frames(self):
+        """测试心跳帧只带变化的字段，每 full_every 帧发送完整指标"""
+        from src.workers.control_channel import ControlChannel
+
+        sent = []
+        metrics = {"node_id": "n1", "status": "ready", "queue_size": 0, "cpu_percent": 10.0}
+
+        class Socket:
+            async def send(self, text):
+                sent.append(json.loads(text))
+
+        channel = ControlChannel("ws://gw", hello=dict, metrics=lambda: dict(metrics), on_command=None, full_every=3)
+
+        async def run():
+            channel._ws = Socket()
+            await channel.send_metrics()
+            await channel.send_metrics()
+            metrics["queue_size"] = 2
+            await channel.send_metrics()
+            await channel.send_metrics()
+
+        asyncio.run(run())
+        assert sent[0] == {"type": "hb", "m": {"status": "ready", "queue_size": 0, "cpu_percent": 10.0}, "full": True}
+        assert sent[1] == {"type": "hb", "m": {}}
+        assert sent[2] == {"type": "hb", "m": {"queue_size": 2}}
+        assert sent[3]["full"] is True
+        assert channel.bytes_sent == sum(len(json.dumps(f, separators=(",", ":"))) for f in sent)
+
+    def test_reconnect_with_backoff(self):
+        """测试连接失败后按退避重试，连接成功后先发送 hello 和完整指标"""
+        from src.workers.control_channel import ControlChannel
+
+        attempts = []
+        pipe = Pipe()
+
+        async def connect(url):
+            attempts.append(asyncio.get_running_loop().time())
+            if len(attempts) < 3:
+                raise OSError("refused")
+            return pipe.worker
+
+        channel = ControlChannel(
+            "ws://gw", hello=lambda: {"node_id": "n1"}, metrics=lambda: {"status": "ready"},
+            on_command=None, connect=connect, backoff_initial=0.02, backoff_max=1.0,
+        )
+
+        async def run():
+            channel.start()
+            await wait_for(lambda: channel.connected)
+            frames = [json.loads(await pipe.to_gateway.get()) for _ in range(2)]
+            await channel.stop()
+            return frames
+
+        frames = asyncio.run(run())
+        assert channel.failures == 2
+        assert channel.connects == 1
+        # 第二次等待约为第一次的两倍
+        assert attempts[2] - attempts[1] > attempts[1] - attempts[0]
+        assert [f["type"] for f in frames] == ["hello", "hb"]
+        assert frames[1]["full"] is True
+
+
+class TestGatewayChannel:
+    """测试经控制通道注册、心跳和下发命令"""
+
+    def test_register_heartbeat_and_command(self):
+        """测试 hello 注册节点，命令经通道执行，状态变更立即同步到注册中心"""
+        from src.common.models import NodeCommand, WorkerStatus
+
+        worker = make_worker()
+        worker._status = WorkerStatus.READY
+        registry, manager, channel, _ = make_pair(worker, interval=60)
+
+        async def run():
+            channel.start()
+            await wait_for(lambda: manager.is_connected(worker.node_id)
+                           and registry.get_node(worker.node_id).model_loaded)
+            node = registry.get_node(worker.node_id)
+            ready = node.is_available
+
+            # 命令结果之前节点已发出状态变更帧: hb(完整) + hb(draining) + result
+            success = await registry.send_command(worker.node_id, NodeCommand(command="drain", params={"timeout": 1}))
+            frames = manager.frames_received
+            status = registry.get_node(worker.node_id).status
+
+            result = await registry.execute_command(worker.node_id, NodeCommand(command="activate"), timeout=5)
+            # 心跳周期为 60 秒，状态只能来自 activate 立即发送的帧
+            await wait_for(lambda: registry.get_node(worker.node_id).status == WorkerStatus.READY)
+            await channel.stop()
+            return ready, success, (frames, status), result
+
+        ready, success, status, result = asyncio.run(run())
+        assert ready
+        assert success
+        assert status == (3, WorkerStatus.DRAINING)
+        assert worker._status == WorkerStatus.READY
+        assert result["status"] == "ready"
+        assert manager.commands_sent == 2
+        assert channel.commands_handled == 2
+
+    def test_disconnect_after_send_fails_without_resend(self, monkeypatch):
+        """测试命令发出后连接断开: 以失败结束，不经 HTTP 重发；节点未连接时才改用 HTTP"""
+        import httpx
+        import pytest
+        from src.common.models import NodeCommand
+
+        worker = make_worker()
+        registry, manager, channel, pipes = make_pair(worker, backoff_initial=60)
+        monkeypatch.setattr("src.gateway.registry.httpx.AsyncClient", no_http)
+
+        async def slow_command(command, params):
+            await asyncio.sleep(10)
+
+        channel._on_command = slow_command
+
+        async def run():
+            channel.start()
+            await wait_for(lambda: manager.is_connected(worker.node_id))
+            request = asyncio.ensure_future(
+                registry.execute_command(worker.node_id, NodeCommand(command="activate"), timeout=5)
+            )
+            await asyncio.sleep(0.05)
+            pipes[0].close()
+            with pytest.raises(httpx.ReadError):
+                await request
+            await wait_for(lambda: not manager.is_connected(worker.node_id))
+            via_channel = await registry._command_via_channel(worker.node_id, NodeCommand(command="activate"), 1)
+            await channel.stop()
+            return via_channel
+
+        assert asyncio.run(run()) is None
+        assert manager.commands_sent == 1
+        assert not channel.connected
+
+    def test_send_failure_is_not_sent(self):
+        """测试命令帧发送失败时以 CommandNotSentError 结束（调用方可以改用 HTTP）"""
+        import pytest
+        from src.common.control import CommandNotSentError
+        from src.common.models import NodeCommand
+
+        worker = make_worker()
+        registry, manager, channel, pipes = make_pair(worker, backoff_initial=60)
+
+        async def run():
+            channel.start()
+            await wait_for(lambda: manager.is_connected(worker.node_id))
+            pipes[0].closed = True
+            with pytest.raises(CommandNotSentError):
+                await manager.request(worker.node_id, NodeCommand(command="activate"), timeout=1)
+            await channel.stop()
+
+        asyncio.run(run())
+        assert manager.commands_sent == 0
+        assert manager.stats()["pending_commands"] == 0
+
+    def test_stop_through_channel(self, monkeypatch):
+        """测试经通道下发 stop: 节点先回复结果再断开连接，网关不经 HTTP 重发"""
+        from src.common.models import NodeCommand, WorkerStatus
+
+        worker = make_worker()
+        worker._status = WorkerStatus.READY
+        registry, manager, channel, _ = make_pair(worker, interval=60, backoff_initial=60)
+        monkeypatch.setattr("src.gateway.registry.httpx.AsyncClient", no_http)
+
+        async def unregister():
+            pass
+
+        worker._unregister_from_gateway = unregister
+
+        async def run():
+            channel.start()
+            await wait_for(lambda: manager.is_connected(worker.node_id))
+            success = await registry.send_command(worker.node_id, NodeCommand(command="stop"))
+            await worker._stop_task
+            await wait_for(lambda: not manager.is_connected(worker.node_id))
+            return success
+
+        assert asyncio.run(run())
+        assert worker._status == WorkerStatus.OFFLINE
+        assert worker._control is None
+        assert manager.commands_sent == 1
+        assert channel.commands_handled == 1
+
+    def test_resync_after_unregister(self):
+        """测试节点被注销后，下一帧心跳触发 resync，节点重新注册"""
+        worker = make_worker()
+        registry, manager, channel, _ = make_pair(worker, interval=60)
+
+        async def run():
+            channel.start()
+            await wait_for(lambda: manager.is_connected(worker.node_id) and manager.frames_received >= 1)
+            registry.unregister(worker.node_id)
+            await worker._send_heartbeat()
+            await wait_for(lambda: worker.node_id in registry._nodes)
+            await channel.stop()
+
+        asyncio.run(run())
+        assert channel.frames_sent >= 5
+
+    def _hello(self, pipe, node_id="n1", token=""):
+        """从 pipe 的节点端发送 hello（token 不为空时签名）"""
+        import time
+        from src.common.control import sign_hello
+
+        frame = {"type": "hello", "node": {"node_id": node_id, "engine_type": "xtts", "host": "h", "port": 1}}
+        if token:
+            frame["ts"] = time.time()
+            frame["sig"] = sign_hello(token, node_id, frame["ts"])
+        pipe.to_gateway.put_nowait(json.dumps(frame))
+
+    def test_node_token_required(self):
+        """测试配置节点令牌后只接受签名正确的 hello"""
+        from src.gateway.registry import ServiceRegistry
+        from src.gateway.control import ControlChannelManager
+
+        registry = ServiceRegistry()
+        manager = ControlChannelManager(registry, node_token="secret")
+
+        async def run():
+            results = []
+            for token in ("", "wrong", "secret"):
+                pipe = Pipe()
+                self._hello(pipe, token=token)
+                asyncio.ensure_future(manager.handle(pipe.gateway, "n1"))
+                await asyncio.sleep(0.02)
+                results.append((manager.is_connected("n1"), pipe.closed))
+            return results
+
+        assert asyncio.run(run()) == [(False, True), (False, True), (True, False)]
+        assert manager.rejected == 2
+        assert registry.get_node("n1") is not None
+
+    def test_unsigned_hello_cannot_take_over(self):
+        """测试未配置令牌时，未签名的 hello 不能接管活动中的连接，旧连接继续接收命令"""
+        from src.common.models import NodeCommand
+        from src.gateway.registry import ServiceRegistry
+        from src.gateway.control import ControlChannelManager
+
+        manager = ControlChannelManager(ServiceRegistry(), takeover_after=60)
+        owner, rogue, replacement = Pipe(), Pipe(), Pipe()
+
+        async def run():
+            self._hello(owner)
+            asyncio.ensure_future(manager.handle(owner.gateway, "n1"))
+            await wait_for(lambda: manager.is_connected("n1"))
+            self._hello(rogue)
+            await manager.handle(rogue.gateway, "n1")
+
+            request = asyncio.ensure_future(manager.request("n1", NodeCommand(command="activate"), timeout=1))
+            frame = json.loads(await owner.to_worker.get())
+            owner.to_gateway.put_nowait(json.dumps({"type": "result", "id": frame["id"], "result": {"ok": True}}))
+            result = await request
+            rejected = (rogue.closed, owner.closed, manager.rejected)
+
+            # 旧连接长时间没有帧（半开连接）时允许接管
+            manager.takeover_after = 0
+            self._hello(replacement)
+            asyncio.ensure_future(manager.handle(replacement.gateway, "n1"))
+            await wait_for(lambda: owner.closed)
+            return result, rejected, manager._connections["n1"] is replacement.gateway
+
+        result, rejected, replaced = asyncio.run(run())
+        assert result["result"] == {"ok": True}
+        assert rejected == (True, False, 1)
+        assert replaced
+
+    def test_rehello_cannot_register_other_node(self):
+        """测试连接上的 hello 帧不能注册其他节点"""
+        from src.gateway.registry import ServiceRegistry
+        from src.gateway.control import ControlChannelManager
+
+        registry = ServiceRegistry()
+        manager = ControlChannelManager(registry)
+        pipe = Pipe()
+
+        async def run():
+            self._hello(pipe)
+            self._hello(pipe, node_id="n2")
+            asyncio.ensure_future(manager.handle(pipe.gateway, "n1"))
+            await wait_for(lambda: manager.frames_received == 1)
+
+        asyncio.run(run())
+        assert registry.get_node("n1") is not None
+        assert "n2" not in registry._nodes
+
+    def test_signed_handshake(self):
+        """测试节点配置令牌时 hello 带签名，网关校验通过"""
+        from src.common.control import verify_hello
+
+        worker = make_worker()
+        registry, manager, channel, pipes = make_pair(worker, interval=60, token="secret")
+        manager.node_token = "secret"
+
+        async def run():
+            channel.start()
+            await wait_for(lambda: manager.is_connected(worker.node_id))
+            await channel.stop()
+
+        asyncio.run(run())
+        assert manager.rejected == 0
+        assert not verify_hello("secret", {"ts": 0, "sig": "x"}, worker.node_id)
+
+    def test_websocket_route(self):
+        """测试网关的控制通道路由"""
+        from fastapi.testclient import TestClient
+        from src.common.models import SystemConfig, EngineType
+        from src.gateway.app import GatewayApp
+
+        gateway = GatewayApp(config=SystemConfig())
+        client = TestClient(gateway.app)
+        node = {"node_id": "n1", "engine_type": "xtts", "host": "127.0.0.1", "port": 8001}
+
+        with client.websocket_connect("/api/nodes/n1/control") as ws:
+            ws.send_text(json.dumps({"type": "hello", "node": node}))
+            ws.send_text(json.dumps({"type": "hb", "m": {"status": "ready", "model_loaded": True}, "full": True}))
+            ws.send_text(json.dumps({"type": "hb", "m": {"queue_size": 4}}))
+            stats = client.get("/api/control").json()
+
+        node = gateway.registry.get_node("n1")
+        assert node.engine_type == EngineType.XTTS
+        assert node.is_available
+        assert node.queue_size == 4
+        assert stats["connected_nodes"] == ["n1"]
+        assert "tts_gateway_control_channels 0" in client.get("/metrics").text
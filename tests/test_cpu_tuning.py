@@ -0,0 +1,53 @@
+"""
+CPU 性能模式测试
+"""
+import os
+import pytest
+from pathlib import Path
+
+# 添加项目路径
+import sys
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+
+class TestCPUProfile:
+    """测试 CPU 性能模式参数"""
+
+    def test_resolve_threads(self):
+        """测试自动线程数按推理线程数均分 CPU 核心"""
+        from src.workers.cpu_tuning import resolve_threads
+
+        cores = os.cpu_count() or 1
+        assert resolve_threads(6) == 6
+        assert resolve_threads(0) == cores
+        assert resolve_threads(0, 2) == max(1, cores // 2)
+        assert resolve_threads(0, cores * 4) == 1
+
+    def test_validate(self):
+        """测试无效线程数和矩阵乘法精度被拒绝"""
+        from src.common.exceptions import ConfigurationError
+        from src.workers.cpu_tuning import CPUProfile
+
+        CPUProfile(num_threads=4, matmul_precision="medium").validate()
+        with pytest.raises(ConfigurationError):
+            CPUProfile(num_threads=-1).validate()
+        with pytest.raises(ConfigurationError):
+            CPUProfile(matmul_precision="low").validate()
+
+    def test_xtts_worker_profile(self, tmp_path):
+        """测试 XTTS 节点由 compute_type 决定是否量化，且拒绝未知精度"""
+        from src.common.exceptions import ConfigurationError
+        from src.workers.xtts_worker import XTTSWorker
+
+        worker = XTTSWorker(
+            device="cpu", voices_dir=str(tmp_path), compute_type="int8",
+            num_threads=2, auto_register=False,
+        )
+        assert worker.cpu_profile.to_dict() == {
+            "num_threads": 2, "interop_threads": 0, "quantize": True, "matmul_precision": "highest",
+        }
+
+        with pytest.raises(ConfigurationError):
+            XTTSWorker(device="cpu", voices_dir=str(tmp_path), compute_type="int4", auto_register=False)
+        with pytest.raises(ConfigurationError):
+            XTTSWorker(device="cpu", voices_dir=str(tmp_path), matmul_precision="fast", auto_register=False)
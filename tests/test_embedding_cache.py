@@ -0,0 +1,211 @@
+"""
+音色嵌入缓存测试
+"""
+import os
+import time
+import asyncio
+import threading
+from pathlib import Path
+
+# 添加项目路径
+import sys
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+
+class FakeTensor:
+    """模拟张量: 只提供缓存统计大小所需的接口"""
+
+    class _Device:
+        def __init__(self, type):
+            self.type = type
+
+    def __init__(self, nelement: int, device: str = "cuda"):
+        self._nelement = nelement
+        self.device = self._Device(device)
+
+    def element_size(self) -> int:
+        return 4
+
+    def nelement(self) -> int:
+        return self._nelement
+
+
+def write_voice(tmp_path, voice_id: str, content: bytes = b"x") -> Path:
+    path = tmp_path / voice_id / "embedding.pt"
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_bytes(content)
+    return path
+
+
+class CountingLoader:
+    """记录加载次数的加载函数"""
+
+    def __init__(self, delay: float = 0.0, nelement: int = 256):
+        self.calls = []
+        self.delay = delay
+        self.nelement = nelement
+        self._lock = threading.Lock()
+
+    def __call__(self, path: Path):
+        time.sleep(self.delay)
+        with self._lock:
+            self.calls.append(path)
+        return {
+            "gpt_cond_latent": FakeTensor(self.nelement),
+            "speaker_embedding": FakeTensor(16, device="cpu"),
+        }
+
+
+class TestEmbeddingCache:
+    """测试嵌入缓存"""
+
+    def test_hit_reuses_loaded_value(self, tmp_path):
+        """测试命中时返回同一对象且不再加载"""
+        from src.workers.embedding_cache import EmbeddingCache
+
+        cache = EmbeddingCache()
+        loader = CountingLoader()
+        path = write_voice(tmp_path, "v1")
+
+        async def run():
+            first = await cache.get("v1", path, loader)
+            second = await cache.get("v1", path, loader)
+            return first, second
+
+        first, second = asyncio.run(run())
+        assert first is second
+        assert len(loader.calls) == 1
+        stats = cache.stats()
+        assert (stats["hits"], stats["misses"]) == (1, 1)
+        assert stats["bytes_by_device"] == {"cuda": 1024, "cpu": 64}
+
+    def test_missing_file(self, tmp_path):
+        """测试文件不存在时返回 None"""
+        from src.workers.embedding_cache import EmbeddingCache
+
+        cache = EmbeddingCache()
+        assert asyncio.run(cache.get("none", tmp_path / "none" / "embedding.pt", CountingLoader())) is None
+
+    def test_file_change_reloads(self, tmp_path):
+        """测试文件被重写或删除后失效"""
+        from src.workers.embedding_cache import EmbeddingCache
+
+        cache = EmbeddingCache()
+        loader = CountingLoader()
+        path = write_voice(tmp_path, "v1")
+
+        async def run():
+            first = await cache.get("v1", path, loader)
+            stat = os.stat(path)
+            os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000))
+            second = await cache.get("v1", path, loader)
+            path.unlink()
+            third = await cache.get("v1", path, loader)
+            return first, second, third
+
+        first, second, third = asyncio.run(run())
+        assert first is not second
+        assert third is None
+        assert len(loader.calls) == 2
+        assert len(cache) == 0
+
+    def test_concurrent_misses_load_once(self, tmp_path):
+        """测试同一音色并发未命中只加载一次"""
+        from src.workers.embedding_cache import EmbeddingCache
+
+        cache = EmbeddingCache()
+        loader = CountingLoader(delay=0.05)
+        path = write_voice(tmp_path, "v1")
+
+        async def run():
+            return await asyncio.gather(*(cache.get("v1", path, loader) for _ in range(5)))
+
+        results = asyncio.run(run())
+        assert len(loader.calls) == 1
+        assert all(result is results[0] for result in results)
+        assert cache.misses == 1
+        assert cache.coalesced == 4
+
+    def test_lru_eviction(self, tmp_path):
+        """测试按条目数和字节数淘汰最久未使用的音色"""
+        from src.workers.embedding_cache import EmbeddingCache
+
+        paths = {voice_id: write_voice(tmp_path, voice_id) for voice_id in ("a", "b", "c")}
+
+        by_count = EmbeddingCache(max_entries=2)
+        loader = CountingLoader()
+
+        async def run(cache):
+            await cache.get("a", paths["a"], loader)
+            await cache.get("b", paths["b"], loader)
+            await cache.get("a", paths["a"], loader)
+            await cache.get("c", paths["c"], loader)
+
+        asyncio.run(run(by_count))
+        assert list(by_count._entries) == ["a", "c"]
+        assert by_count.evictions == 1
+
+        # 每个音色 1088 字节，上限只够放两个
+        by_bytes = EmbeddingCache(max_entries=10, max_bytes=2500)
+        asyncio.run(run(by_bytes))
+        assert list(by_bytes._entries) == ["a", "c"]
+        assert by_bytes.stats()["bytes"] == 2176
+
+    def test_invalidate_during_load(self, tmp_path):
+        """测试加载期间失效的结果不进入缓存"""
+        from src.workers.embedding_cache import EmbeddingCache
+
+        cache = EmbeddingCache()
+        loader = CountingLoader(delay=0.05)
+        path = write_voice(tmp_path, "v1")
+
+        async def run():
+            task = asyncio.create_task(cache.get("v1", path, loader))
+            await asyncio.sleep(0.01)
+            cache.invalidate("v1")
+            return await task
+
+        assert asyncio.run(run()) is not None
+        assert len(cache) == 0
+
+    def test_disabled(self, tmp_path):
+        """测试容量为 0 时每次都加载"""
+        from src.workers.embedding_cache import EmbeddingCache
+
+        cache = EmbeddingCache(max_entries=0)
+        loader = CountingLoader()
+        path = write_voice(tmp_path, "v1")
+
+        async def run():
+            await cache.get("v1", path, loader)
+            await cache.get("v1", path, loader)
+
+        asyncio.run(run())
+        assert len(loader.calls) == 2
+        assert len(cache) == 0
+
+
+class TestWorkerEmbeddingCache:
+    """测试工作节点上报缓存统计"""
+
+    def test_metrics_and_health(self, tmp_path):
+        """测试命中/未命中计数进入节点指标和健康检查"""
+        from tests.test_base_worker import make_worker
+
+        worker = make_worker(embedding_cache_size=4, embedding_cache_mb=1)
+        path = write_voice(tmp_path, "v1")
+        loader = CountingLoader()
+
+        async def run():
+            for _ in range(3):
+                await worker._embedding_cache.get("v1", path, loader)
+            return await worker._handle_health()
+
+        health = asyncio.run(run())
+        metrics = worker._get_metrics()
+        assert (metrics.embedding_cache_hits, metrics.embedding_cache_misses) == (2, 1)
+        assert metrics.embedding_cache_entries == 1
+        assert health["components"]["embedding_cache"]["max_bytes"] == 1024 * 1024
+
+        asyncio.run(worker.standby())
+        assert len(worker._embedding_cache) == 0
@@ -0,0 +1,301 @@
+"""
+限流器测试
+"""
+import asyncio
+import pytest
+from pathlib import Path
+
+# 添加项目路径
+import sys
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+
+class TestEstimateAudioSeconds:
+    """测试音频时长估算"""
+
+    def test_chinese_slower_than_english(self):
+        """测试中文每字符对应的音频更长"""
+        from src.gateway.limiter import estimate_audio_seconds
+
+        assert estimate_audio_seconds(100, "zh") > estimate_audio_seconds(100, "en")
+
+    def test_speed_shortens_audio(self):
+        """测试语速越快音频越短"""
+        from src.gateway.limiter import estimate_audio_seconds
+
+        assert estimate_audio_seconds(100, "zh", speed=2.0) == pytest.approx(
+            estimate_audio_seconds(100, "zh") / 2
+        )
+
+
+class TestCostQuota:
+    """测试成本配额"""
+
+    def test_chars_quota_debits_text_length(self):
+        """测试按字符数扣减并返回剩余配额"""
+        from src.gateway.limiter import RateLimiter
+
+        limiter = RateLimiter(ip_chars_per_minute=1000)
+        remaining = (limiter.consume_cost("1.2.3.4", 300, 10.0))
+
+        assert remaining["chars"] == pytest.approx(700, abs=1)
+        assert "audio_seconds" not in remaining
+
+    def test_quota_exceeded_rolls_back(self):
+        """测试任一维度不足时回滚已扣减的配额"""
+        from src.gateway.limiter import RateLimiter
+        from src.common.exceptions import RateLimitExceededError
+
+        limiter = RateLimiter(ip_chars_per_minute=1000, ip_audio_seconds_per_minute=10)
+
+        with pytest.raises(RateLimitExceededError):
+            (limiter.consume_cost("1.2.3.4", 100, 20.0))
+
+        bucket = limiter._get_cost_bucket("ip", "1.2.3.4", "chars")
+        assert bucket.tokens == pytest.approx(1000, abs=1)
+
+    def test_api_key_quota_is_separate(self):
+        """测试 API Key 配额独立计算，剩余取最小值"""
+        from src.gateway.limiter import RateLimiter
+
+        limiter = RateLimiter(ip_chars_per_minute=1000, key_chars_per_minute=500, api_keys=["k1"])
+        remaining = (limiter.consume_cost("1.2.3.4", 100, 1.0, api_key="k1"))
+
+        assert remaining["chars"] == pytest.approx(400, abs=1)
+
+    def test_unknown_api_key_ignored(self):
+        """测试不在允许列表中的 Key 只按 IP 计算，不创建 Key 令牌桶"""
+        from src.gateway.limiter import RateLimiter
+
+        limiter = RateLimiter(ip_chars_per_minute=1000, key_chars_per_minute=500, api_keys=["k1"])
+        for i in range(10):
+            remaining = limiter.consume_cost("1.2.3.4", 10, 1.0, api_key=f"forged-{i}")
+
+        assert remaining["chars"] == pytest.approx(900, abs=1)
+        assert {scope for scope, _, _ in limiter._cost_buckets} == {"ip"}
+
+    def test_cleanup_drops_refilled_buckets(self):
+        """测试清理任务丢弃已回满的令牌桶，保留仍在恢复中的令牌桶"""
+        from src.gateway.limiter import RateLimiter
+
+        limiter = RateLimiter(ip_chars_per_minute=600)
+        limiter.consume_cost("1.2.3.4", 0, 0.0)
+        limiter.consume_cost("5.6.7.8", 300, 0.0)
+
+        async def run():
+            await limiter.start_cleanup(interval=0.01)
+            await asyncio.sleep(0.05)
+            await limiter.stop_cleanup()
+
+        asyncio.run(run())
+        assert [ident for _, ident, _ in limiter._cost_buckets] == ["5.6.7.8"]
+
+    def test_retry_after_reported(self):
+        """测试超限时给出重试等待时间"""
+        from src.gateway.limiter import RateLimiter
+        from src.common.exceptions import RateLimitExceededError
+
+        limiter = RateLimiter(ip_chars_per_minute=600)
+
+        limiter.consume_cost("1.2.3.4", 600, 1.0)
+        with pytest.raises(RateLimitExceededError) as exc_info:
+            limiter.consume_cost("1.2.3.4", 60, 1.0)
+        assert 0 < exc_info.value.retry_after <= 6.1
+
+    def test_refund_restores_quota(self):
+        """测试退还后所有级别、维度的配额恢复到扣减前"""
+        from src.gateway.limiter import RateLimiter
+
+        limiter = RateLimiter(ip_chars_per_minute=1000, ip_audio_seconds_per_minute=60,
+                              key_chars_per_minute=500, api_keys=["k1"])
+        limiter.consume_cost("1.2.3.4", 300, 20.0, api_key="k1")
+        remaining = limiter.refund_cost("1.2.3.4", 300, 20.0, api_key="k1")
+
+        assert remaining["chars"] == pytest.approx(500, abs=1)
+        assert remaining["audio_seconds"] == pytest.approx(60, abs=0.1)
+        assert limiter._get_cost_bucket("ip", "1.2.3.4", "chars").tokens == pytest.approx(1000, abs=1)
+
+
+class TestGatewayCostRefund:
+    """测试网关在没有产出音频时退还成本配额"""
+
+    def _gateway(self):
+        from src.common.models import SystemConfig
+        from src.gateway.app import GatewayApp
+
+        return GatewayApp(config=SystemConfig(ip_chars_per_minute=1000))
+
+    def _post(self, gateway, path, body):
+        import httpx
+
+        async def run():
+            transport = httpx.ASGITransport(app=gateway.app)
+            async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+                return await client.post(path, json=body)
+
+        return asyncio.run(run())
+
+    def _chars_left(self, gateway):
+        return gateway.limiter._get_cost_bucket("ip", "127.0.0.1", "chars").tokens
+
+    def test_node_busy_refunds(self):
+        """测试节点繁忙（429 + X-Queue-Full）时退还已扣减的配额"""
+        import httpx
+
+        gateway = self._gateway()
+
+        class _Node:
+            node_id = "n1"
+
+        async def busy(client, engine, node, path, **kwargs):
+            return node, httpx.Response(429, headers={"X-Queue-Full": "1", "Retry-After": "4"})
+
+        gateway._post_to_node = busy
+        gateway.registry.select_node = lambda engine, *args, **kwargs: _Node()
+
+        resp = self._post(gateway, "/api/synthesize", {"text": "x" * 400, "voice_id": "v"})
+        assert resp.status_code == 429
+        assert self._chars_left(gateway) == pytest.approx(1000, abs=1)
+
+    def test_batch_without_node_refunds(self):
+        """测试批量合成没有可用节点时整批退还，剩余配额响应头反映退还后的值"""
+        from src.common.exceptions import NoAvailableNodeError
+
+        gateway = self._gateway()
+
+        def no_node(engine, *args, **kwargs):
+            raise NoAvailableNodeError("xtts")
+
+        gateway.registry.select_node = no_node
+
+        resp = self._post(gateway, "/api/batch_synthesize", {"texts": ["x" * 300, "y" * 300], "voice_id": "v"})
+        assert resp.json()["failed"] == 2
+        assert self._chars_left(gateway) == pytest.approx(1000, abs=1)
+        assert int(resp.headers["X-RateLimit-Remaining-Chars"]) >= 999
+
+
+class TestAdmission:
+    """测试单次准入检查"""
+
+    def test_admit_and_release(self):
+        """测试准入占用并发槽位，释放后归还"""
+        from src.gateway.limiter import RateLimiter
+
+        limiter = RateLimiter(concurrent_limit=2)
+        limiter.admit("1.2.3.4", "/api/synthesize")
+        assert limiter.get_stats()["current_concurrent"] == 1
+
+        limiter.release()
+        assert limiter.get_stats()["current_concurrent"] == 0
+
+    def test_rejection_rolls_back_partial_debits(self):
+        """测试 IP 超限时回滚已扣减的全局计数"""
+        from src.gateway.limiter import RateLimiter
+        from src.common.exceptions import RateLimitExceededError
+
+        limiter = RateLimiter(global_rpm=10, ip_rpm=1)
+        limiter.admit("1.2.3.4")
+        limiter.release()
+
+        for _ in range(5):
+            with pytest.raises(RateLimitExceededError):
+                limiter.admit("1.2.3.4")
+
+        remaining = asyncio.run(limiter.get_remaining("1.2.3.4"))
+        assert remaining["global_remaining"] == 9
+        assert remaining["ip_remaining"] == 0
+
+    def test_concurrent_limit_does_not_debit(self):
+        """测试并发超限时不扣减请求计数"""
+        from src.gateway.limiter import RateLimiter
+        from src.common.exceptions import RateLimitExceededError
+
+        limiter = RateLimiter(global_rpm=10, concurrent_limit=1)
+        limiter.admit("1.2.3.4")
+
+        with pytest.raises(RateLimitExceededError):
+            limiter.admit("5.6.7.8")
+
+        remaining = asyncio.run(limiter.get_remaining("5.6.7.8"))
+        assert remaining["global_remaining"] == 9
+
+
+class TestSharedCounter:
+    """测试跨进程共享计数"""
+
+    def test_replicas_share_one_budget(self, tmp_path):
+        """测试多个副本共享同一个全局配额"""
+        from src.gateway.shared_counter import SharedCounterStore
+        from src.gateway.limiter import RateLimiter
+        from src.common.exceptions import RateLimitExceededError
+
+        path = str(tmp_path / "ratelimit.bin")
+        replicas = [
+            RateLimiter(global_rpm=100, ip_rpm=1000, shared_store=SharedCounterStore(path))
+            for _ in range(3)
+        ]
+
+        allowed = 0
+        for i in range(200):
+            try:
+                replicas[i % 3].admit(f"10.0.0.{i % 50}")
+                replicas[i % 3].release()
+                allowed += 1
+            except RateLimitExceededError:
+                pass
+        assert 90 <= allowed <= 100
+
+    def test_claim_grants_at_most_limit(self, tmp_path):
+        """测试租借数量不超过窗口配额"""
+        from src.gateway.shared_counter import SharedCounterStore
+
+        store = SharedCounterStore(str(tmp_path / "ratelimit.bin"), slot_count=16)
+
+        assert store.claim("ip:1.2.3.4", 60, 10, 8, now=600.0) == 8
+        assert store.claim("ip:1.2.3.4", 60, 10, 8, now=601.0) == 2
+        assert store.claim("ip:1.2.3.4", 60, 10, 8, now=602.0) == 0
+
+    def test_colliding_keys_get_separate_slots(self, tmp_path):
+        """测试首选槽位相同的键探测到不同槽位，各自计数"""
+        from src.gateway.shared_counter import SharedCounterStore
+
+        store = SharedCounterStore(str(tmp_path / "ratelimit.bin"), slot_count=16)
+        store.slot_for = lambda key: 1
+
+        assert store.claim("ip:a", 60, 10, 10, now=600.0) == 10
+        assert store.claim("ip:b", 60, 10, 10, now=600.0) == 10
+        assert store.claim("ip:a", 60, 10, 1, now=601.0) == 0
+        assert store._slots == {"ip:a": 1, "ip:b": 2}
+        # 另一个进程打开同一文件，按指纹找到已有槽位
+        other = SharedCounterStore(store.path)
+        other.slot_for = lambda key: 1
+        assert other.used("ip:b", 60, now=601.0) == 10
+        assert other.claim("ip:b", 60, 10, 1, now=601.0) == 0
+
+    def test_full_probe_range_falls_back_to_local(self, tmp_path):
+        """测试槽位被其他键占满时退回本进程计数，过期槽位可被接管"""
+        from src.gateway.shared_counter import SharedCounterStore, SharedWindowCounter
+
+        store = SharedCounterStore(str(tmp_path / "ratelimit.bin"), slot_count=1)
+        assert store.claim("ip:a", 60, 10, 1, now=600.0) == 1
+        assert store.claim("ip:b", 60, 10, 1, now=600.0) is None
+        # 两个窗口后 ip:a 的槽位过期
+        assert store.claim("ip:b", 60, 10, 1, now=720.0) == 1
+
+        store.claim("ip:c", 60, 100, 1)
+        counter = SharedWindowCounter(store, "ip:d", limit=2)
+        assert counter.try_acquire() and counter.try_acquire()
+        assert not counter.try_acquire()
+        assert counter.remaining() == 0
+
+    def test_existing_file_keeps_layout(self, tmp_path):
+        """测试重新打开已有文件时沿用文件内的槽位数"""
+        from src.gateway.shared_counter import SharedCounterStore
+
+        path = str(tmp_path / "ratelimit.bin")
+        SharedCounterStore(path, slot_count=16).close()
+        assert SharedCounterStore(path, slot_count=4096).slot_count == 16
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
@@ -0,0 +1,57 @@
+"""
+事件循环阻塞检测测试
+"""
+import time
+import asyncio
+from pathlib import Path
+
+# 添加项目路径
+import sys
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+
+class TestLoopMonitor:
+    """测试事件循环监控"""
+
+    def test_detects_blocking_call(self):
+        """测试同步阻塞调用被计数并记录调用栈"""
+        from src.common.loop_monitor import LoopMonitor
+        from src.common.metrics import MetricsRegistry
+
+        registry = MetricsRegistry()
+        monitor = LoopMonitor(block_threshold=0.1, interval=0.02, registry=registry)
+
+        def blocking_helper():
+            time.sleep(0.3)
+
+        async def run():
+            monitor.start()
+            await asyncio.sleep(0.05)
+            blocking_helper()
+            await asyncio.sleep(0.05)
+            await monitor.stop()
+
+        asyncio.run(run())
+        stats = monitor.stats()
+        assert stats["blocked_count"] >= 1
+        assert stats["max_lag_ms"] >= 100
+        assert "blocking_helper" in stats["last_block"]["stack"]
+
+        text = registry.render()
+        assert "tts_event_loop_blocked_total 1" in text
+        assert "tts_event_loop_lag_seconds_count" in text
+
+    def test_no_block_when_idle(self):
+        """测试空闲事件循环不会误报"""
+        from src.common.loop_monitor import LoopMonitor
+
+        monitor = LoopMonitor(block_threshold=0.2, interval=0.01)
+
+        async def run():
+            monitor.start()
+            await asyncio.sleep(0.1)
+            await monitor.stop()
+
+        asyncio.run(run())
+        assert monitor.blocked_count == 0
+        assert monitor.last_block is None
@@ -0,0 +1,271 @@
+"""
+Prometheus 指标测试
+"""
+import asyncio
+import pytest
+from pathlib import Path
+
+# 添加项目路径
+import sys
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+
+class TestMetricPrimitives:
+    """测试指标类型与文本输出"""
+
+    def test_histogram_buckets_are_cumulative(self):
+        """测试直方图输出累计桶、总和与计数"""
+        from src.common.metrics import MetricsRegistry
+
+        registry = MetricsRegistry()
+        hist = registry.histogram("latency_seconds", "Latency", ("route",), buckets=(0.1, 1.0))
+        child = hist.labels("/api/synthesize")
+        for value in (0.05, 0.5, 0.5, 3.0):
+            child.observe(value)
+
+        text = registry.render()
+        assert 'latency_seconds_bucket{route="/api/synthesize",le="0.1"} 1' in text
+        assert 'latency_seconds_bucket{route="/api/synthesize",le="1"} 3' in text
+        assert 'latency_seconds_bucket{route="/api/synthesize",le="+Inf"} 4' in text
+        assert 'latency_seconds_count{route="/api/synthesize"} 4' in text
+        assert 'latency_seconds_sum{route="/api/synthesize"} 4.05' in text
+
+    def test_labels_reuse_child(self):
+        """测试相同标签值返回同一个子指标"""
+        from src.common.metrics import MetricsRegistry
+
+        registry = MetricsRegistry()
+        counter = registry.counter("rejections_total", "Rejections", ("reason",))
+        assert counter.labels("quota") is counter.labels("quota")
+
+        counter.labels("quota").inc()
+        counter.labels("quota").inc()
+        assert 'rejections_total{reason="quota"} 2' in registry.render()
+
+    def test_wrong_label_count(self):
+        """测试标签数量不匹配时报错"""
+        from src.common.metrics import MetricsRegistry
+
+        counter = MetricsRegistry().counter("c_total", "C", ("a", "b"))
+        with pytest.raises(ValueError):
+            counter.labels("x")
+
+    def test_gauge_collect_callback(self):
+        """测试瞬时值在输出时通过回调取值"""
+        from src.common.metrics import MetricsRegistry
+
+        registry = MetricsRegistry()
+        registry.gauge("nodes", "Nodes", ("status",), collect=lambda: {("ready",): 3})
+        assert 'nodes{status="ready"} 3' in registry.render()
+
+
+class TestGatewayMetrics:
+    """测试网关指标"""
+
+    def _gateway(self):
+        from src.common.models import SystemConfig
+        from src.gateway.app import GatewayApp
+
+        return GatewayApp(config=SystemConfig())
+
+    def test_metrics_endpoint(self):
+        """测试 /metrics 输出按路由模板记录的请求延迟"""
+        import httpx
+
+        gateway = self._gateway()
+
+        async def run():
+            transport = httpx.ASGITransport(app=gateway.app)
+            async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+                await client.get("/api/nodes/missing-node")
+                return await client.get("/metrics")
+
+        resp = asyncio.run(run())
+        assert resp.status_code == 200
+        assert resp.headers["content-type"].startswith("text/plain")
+        assert (
+            'tts_gateway_request_duration_seconds_count{route="/api/nodes/{node_id}",engine="",node=""} 1'
+            in resp.text
+        )
+        assert 'tts_gateway_responses_total{route="/api/nodes/{node_id}",status="404"} 1' in resp.text
+        assert "tts_gateway_limiter_wait_seconds_count 1" in resp.text
+
+    def test_embedding_cache_counters(self):
+        """测试心跳上报的音色嵌入缓存命中数按节点输出"""
+        from src.common.models import NodeInfo, NodeMetrics, EngineType, WorkerStatus
+
+        gateway = self._gateway()
+        gateway.registry.register(NodeInfo(node_id="n1", engine_type=EngineType.XTTS, host="127.0.0.1", port=8001))
+        gateway.registry.heartbeat("n1", NodeMetrics(
+            node_id="n1", status=WorkerStatus.READY, embedding_cache_hits=7, embedding_cache_misses=2,
+        ))
+
+        text = gateway.metrics.render()
+        assert "# TYPE tts_gateway_node_embedding_cache_hits_total counter" in text
+        assert 'tts_gateway_node_embedding_cache_hits_total{engine="xtts",node="n1"} 7' in text
+        assert 'tts_gateway_node_embedding_cache_misses_total{engine="xtts",node="n1"} 2' in text
+
+    def test_connect_error_retries_other_node(self):
+        """测试连接失败时换节点重试一次并计数"""
+        import httpx
+        from src.common.models import NodeInfo, EngineType, WorkerStatus
+
+        gateway = self._gateway()
+        for node_id, port in (("dead", 1), ("alive", 2)):
+            gateway.registry.register(NodeInfo(
+                node_id=node_id,
+                engine_type=EngineType.XTTS,
+                host="127.0.0.1",
+                port=port,
+                status=WorkerStatus.READY,
+                model_loaded=True,
+            ))
+
+        def handler(request: httpx.Request) -> httpx.Response:
+            if request.url.port == 1:
+                raise httpx.ConnectError("refused", request=request)
+            return httpx.Response(200, content=b"RIFF", headers={"Server-Timing": "queue;dur=5"})
+
+        async def run():
+            async with httpx.AsyncClient(transport=httpx.MockTransport(handler)) as client:
+                dead = gateway.registry.get_node("dead")
+                return await gateway._post_to_node(client, EngineType.XTTS, dead, "/synthesize", json={})
+
+        node, resp = asyncio.run(run())
+        assert node.node_id == "alive"
+        assert resp.status_code == 200
+
+        text = gateway.metrics.render()
+        assert 'tts_gateway_retries_total{engine="xtts",reason="connect_error"} 1' in text
+        assert 'tts_gateway_queue_wait_seconds_count{engine="xtts"} 1' in text
+
+    def test_queue_full_retries_other_node(self):
+        """测试节点队列满（429 + X-Queue-Full）时换节点重试"""
+        import httpx
+        from src.common.models import NodeInfo, EngineType, WorkerStatus
+
+        gateway = self._gateway()
+        for node_id, port in (("busy", 1), ("idle", 2)):
+            gateway.registry.register(NodeInfo(
+                node_id=node_id,
+                engine_type=EngineType.XTTS,
+                host="127.0.0.1",
+                port=port,
+                status=WorkerStatus.READY,
+                model_loaded=True,
+            ))
+
+        def handler(request: httpx.Request) -> httpx.Response:
+            if request.url.port == 1:
+                return httpx.Response(429, headers={"X-Queue-Full": "1", "Retry-After": "3"})
+            return httpx.Response(200, content=b"RIFF")
+
+        async def run():
+            async with httpx.AsyncClient(transport=httpx.MockTransport(handler)) as client:
+                busy = gateway.registry.get_node("busy")
+                return await gateway._post_to_node(client, EngineType.XTTS, busy, "/synthesize", json={})
+
+        node, resp = asyncio.run(run())
+        assert node.node_id == "idle"
+        assert resp.status_code == 200
+        assert 'tts_gateway_retries_total{engine="xtts",reason="queue_full"} 1' in gateway.metrics.render()
+
+    def test_all_nodes_busy_returns_429(self):
+        """测试无法换节点时向客户端返回 429 并透传 Retry-After"""
+        import httpx
+
+        gateway = self._gateway()
+
+        async def busy(client, engine, node, path, **kwargs):
+            return node, httpx.Response(429, headers={"X-Queue-Full": "1", "Retry-After": "4"})
+
+        gateway._post_to_node = busy
+
+        class _Node:
+            node_id = "n1"
+
+        gateway.registry.select_node = lambda engine, *args, **kwargs: _Node()
+
+        async def run():
+            transport = httpx.ASGITransport(app=gateway.app)
+            async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+                return await client.post("/api/synthesize", json={"text": "hi", "voice_id": "v"})
+
+        resp = asyncio.run(run())
+        assert resp.status_code == 429
+        assert resp.headers["Retry-After"] == "4"
+        assert resp.json()["code"] == "QUEUE_FULL"
+        assert 'tts_gateway_rejections_total{reason="node_busy"} 1' in gateway.metrics.render()
+
+    def test_stream_relay(self):
+        """测试流式合成按块转发并记录首块延迟"""
+        import httpx
+
+        gateway = self._gateway()
+
+        class _Node:
+            node_id = "n1"
+
+        async def body():
+            for chunk in (b"RIFF", b"\x01\x00", b"\x02\x00"):
+                yield chunk
+
+        async def stream(client, engine, node, path, **kwargs):
+            assert path == "/synthesize_stream" and kwargs["stream"]
+            return node, httpx.Response(
+                200,
+                content=body(),
+                headers={"content-type": "audio/wav", "X-Sample-Rate": "24000", "X-First-Chunk-Time": "12.0ms"},
+            )
+
+        gateway._post_to_node = stream
+        gateway.registry.select_node = lambda engine, *args, **kwargs: _Node()
+
+        async def run():
+            transport = httpx.ASGITransport(app=gateway.app)
+            async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+                return await client.post("/api/synthesize_stream", json={"text": "hi", "voice_id": "v"})
+
+        resp = asyncio.run(run())
+        assert resp.status_code == 200
+        assert resp.content == b"RIFF\x01\x00\x02\x00"
+        assert resp.headers["X-Sample-Rate"] == "24000"
+        assert resp.headers["X-First-Chunk-Time"] == "12.0ms"
+        assert 'tts_gateway_stream_first_chunk_seconds_count{engine="xtts",node="n1"} 1' in gateway.metrics.render()
+
+
+class TestRollingHistogram:
+    """测试滚动窗口直方图"""
+
+    def test_quantiles_within_bucket_error(self):
+        """测试分位数误差在桶精度范围内"""
+        from src.common.metrics import RollingHistogram
+
+        hist = RollingHistogram(window_seconds=300, slot_seconds=60)
+        for value in range(1, 1001):
+            hist.observe(float(value), now=1000.0)
+
+        count, (p50, p95, p99) = hist.quantiles((0.5, 0.95, 0.99), now=1000.0)
+        assert count == 1000
+        assert p50 == pytest.approx(500, rel=0.06)
+        assert p95 == pytest.approx(950, rel=0.06)
+        assert p99 == pytest.approx(990, rel=0.06)
+
+    def test_old_slots_expire(self):
+        """测试超出窗口的时间槽不再计入"""
+        from src.common.metrics import RollingHistogram
+
+        hist = RollingHistogram(window_seconds=120, slot_seconds=60)
+        hist.observe(5000.0, now=0.0)
+        hist.observe(10.0, now=60.0)
+
+        assert hist.quantiles((0.99,), now=60.0)[0] == 2
+        count, (p99,) = hist.quantiles((0.99,), now=130.0)
+        assert count == 1
+        assert p99 == pytest.approx(10.0, rel=0.06)
+
+    def test_empty(self):
+        """测试无数据时返回 0"""
+        from src.common.metrics import RollingHistogram
+
+        assert RollingHistogram().quantiles((0.5, 0.95)) == (0, [0.0, 0.0])
@@ -0,0 +1,230 @@
+"""
+推理子进程池测试
+"""
+import os
+import asyncio
+import signal
+import pytest
+from pathlib import Path
+
+# 添加项目路径
+import sys
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+pytestmark = pytest.mark.skipif(not hasattr(os, "fork"), reason="requires fork")
+
+
+def make_process_worker(**kwargs):
+    """创建一个推理方法在子进程中执行的测试节点（结果中带执行进程的 pid）"""
+    from src.common.audio import encode_pcm
+    from src.common.models import EngineType
+    from src.common.tracing import trace_stage
+    from src.workers.base_worker import BaseWorker
+    import numpy as np
+
+    class ProcessWorker(BaseWorker):
+        supports_inference_processes = True
+        supports_streaming = True
+        model_attributes = ("scale",)
+        reload_options = ("factor",)
+        factor = 3
+
+        async def load_model(self):
+            self.scale = self.factor
+            return True
+
+        async def unload_model(self):
+            return True
+
+        async def synthesize(self, text, voice_id, language="zh", **kw):
+            return await self._schedule_synthesis(self._synthesize_sync, text)
+
+        async def extract_voice(self, audio_data, voice_id, voice_name="", **kw):
+            return await self._run_inference(self._extract_voice_sync, audio_data)
+
+        async def synthesize_stream(self, text, voice_id, language="zh", chunk_size=20, **kw):
+            async for chunk in self._stream_inference(self._stream_sync, chunk_size):
+                yield chunk
+
+        def _synthesize_sync(self, text):
+            with trace_stage("inference"):
+                if text == "fail":
+                    raise ValueError("bad text")
+                return encode_pcm(np.array([os.getpid() % 32768, self.scale, len(text)], dtype=np.int16))
+
+        def _extract_voice_sync(self, data):
+            return {"pid": os.getpid(), "cpus": sorted(os.sched_getaffinity(0)), "size": len(data)}
+
+        def _stream_sync(self, count):
+            for i in range(count):
+                yield encode_pcm(np.full(2, i, dtype=np.int16))
+
+    kwargs.setdefault("inference_processes", 2)
+    return ProcessWorker(EngineType.XTTS, auto_register=False, **kwargs)
+
+
+def decode(data):
+    import numpy as np
+    return np.frombuffer(bytes(data), dtype="<i2").tolist()
+
+
+class TestPartition:
+    """测试 CPU 切分"""
+
+    def test_partition(self):
+        """测试按编号连续切分，余数分给前面的组"""
+        from src.workers.process_pool import partition_cpus
+
+        assert partition_cpus(list(range(8)), 2) == [[0, 1, 2, 3], [4, 5, 6, 7]]
+        assert partition_cpus(list(range(7)), 3) == [[0, 1, 2], [3, 4], [5, 6]]
+        assert partition_cpus([0, 1], 3) == [[0], [1], [0]]
+        assert partition_cpus([], 2) == [[], []]
+
+
+class TestProcessPool:
+    """测试推理经子进程执行"""
+
+    def test_synthesize_in_child(self):
+        """测试合成在子进程中执行，结果和阶段耗时传回节点进程"""
+        from src.common.tracing import start_trace
+
+        worker = make_process_worker()
+
+        async def run():
+            assert await worker.activate()
+            try:
+                trace = start_trace("req")
+                audio = await worker.synthesize("hello", "v")
+                info = await worker.extract_voice(b"abc", "v")
+                health = await worker._handle_health()
+                return audio, trace.stages, info, health
+            finally:
+                await worker.standby()
+
+        audio, stages, info, health = asyncio.run(run())
+        pid, scale, length = decode(audio)
+        assert pid != os.getpid() % 32768
+        assert (scale, length) == (3, 5)
+        assert "inference" in stages and "queue" in stages
+        assert info["pid"] != os.getpid() and info["size"] == 3
+
+        pool = health["components"]["process_pool"]
+        assert pool["processes"] == 2
+        assert all(replica["alive"] for replica in pool["replicas"])
+        assert worker._process_pool is None
+
+    def test_cpu_affinity(self):
+        """测试各子进程绑定到不相交的 CPU 组"""
+        if len(os.sched_getaffinity(0)) < 2:
+            pytest.skip("requires 2 CPUs")
+        worker = make_process_worker()
+
+        async def run():
+            await worker.activate()
+            try:
+                return await asyncio.gather(
+                    worker.extract_voice(b"", "a"), worker.extract_voice(b"", "b")
+                )
+            finally:
+                await worker.standby()
+
+        first, second = asyncio.run(run())
+        if first["pid"] == second["pid"]:
+            pytest.skip("both requests served by one replica")
+        assert set(first["cpus"]).isdisjoint(second["cpus"])
+
+    def test_error_propagates(self):
+        """测试子进程中的异常在节点进程中原样抛出，子进程可继续使用"""
+        worker = make_process_worker(inference_processes=1)
+
+        async def run():
+            await worker.activate()
+            try:
+                with pytest.raises(ValueError, match="bad text"):
+                    await worker.synthesize("fail", "v")
+                return await worker.synthesize("ok", "v")
+            finally:
+                await worker.standby()
+
+        assert decode(asyncio.run(run()))[2] == 2
+
+    def test_stream_early_close(self):
+        """测试提前关闭流后子进程回到空闲，可处理下一个请求"""
+        worker = make_process_worker(inference_processes=1)
+
+        async def run():
+            await worker.activate()
+            try:
+                received = []
+                stream = worker.synthesize_stream("hi", "v", chunk_size=1000)
+                async for chunk in stream:
+                    received.append(decode(chunk))
+                    if len(received) == 3:
+                        break
+                await stream.aclose()
+
+                full = [decode(chunk) async for chunk in worker.synthesize_stream("hi", "v", chunk_size=3)]
+                return received, full
+            finally:
+                await worker.standby()
+
+        received, full = asyncio.run(run())
+        assert received == [[0, 0], [1, 1], [2, 2]]
+        assert full == [[0, 0], [1, 1], [2, 2]]
+
+    def test_restart_dead_replica(self):
+        """测试子进程退出后下一个请求前自动重启"""
+        worker = make_process_worker(inference_processes=1)
+
+        async def run():
+            await worker.activate()
+            try:
+                replica = worker._process_pool._replicas[0]
+                first = replica.pid
+                os.kill(first, signal.SIGKILL)
+                replica.process.join(5)
+
+                audio = await worker.synthesize("again", "v")
+                return first, decode(audio)[0], worker._process_pool.stats()
+            finally:
+                await worker.standby()
+
+        first, pid, stats = asyncio.run(run())
+        assert pid != first % 32768
+        assert stats["replicas"][0]["restarts"] == 1
+
+    def test_unsupported_engine(self):
+        """测试不支持子进程的引擎退回推理线程"""
+        from tests.test_base_worker import make_worker
+
+        worker = make_worker(inference_processes=4, inference_threads=1)
+        assert worker.inference_processes == 0
+        assert worker._scheduler.concurrency == 1
+
+        async def run():
+            await worker.activate()
+            return await worker.synthesize("x", "v")
+
+        worker._model_loaded = False
+        assert asyncio.run(run()) == b"RIFFx"
+        assert worker._process_pool is None
+
+    def test_reload_replaces_replicas(self):
+        """测试重新加载后由新 fork 的子进程执行，旧子进程退出"""
+        worker = make_process_worker(inference_processes=1)
+
+        async def run():
+            await worker.activate()
+            try:
+                old = worker._process_pool._replicas[0].process
+                before = decode(await worker.synthesize("a", "v"))
+                assert await worker.reload({"factor": 5})
+                after = decode(await worker.synthesize("a", "v"))
+                return old, before, after
+            finally:
+                await worker.standby()
+
+        old, before, after = asyncio.run(run())
+        assert before[1] == 3 and after[1] == 5
+        assert after[0] != before[0]
+        assert not old.is_alive()
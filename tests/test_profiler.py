@@ -0,0 +1,201 @@
+"""
+按需采样分析测试
+"""
+import time
+import asyncio
+import threading
+import pytest
+from pathlib import Path
+
+# 添加项目路径
+import sys
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+
+def busy_loop(stop: threading.Event):
+    """占用 CPU 的线程"""
+    while not stop.is_set():
+        sum(range(1000))
+
+
+def idle_wait(stop: threading.Event):
+    """只等待不占 CPU 的线程"""
+    stop.wait()
+
+
+def profile_threads(duration: float = 0.3):
+    """在一个忙线程和一个空闲线程运行时采样"""
+    from src.common.profiler import SamplingProfiler
+
+    stop = threading.Event()
+    threads = [
+        threading.Thread(target=busy_loop, args=(stop,), name="busy"),
+        threading.Thread(target=idle_wait, args=(stop,), name="idle"),
+    ]
+    for thread in threads:
+        thread.start()
+
+    profiler = SamplingProfiler(interval=0.005)
+    profiler.start()
+    time.sleep(duration)
+    profiler.stop()
+
+    stop.set()
+    for thread in threads:
+        thread.join()
+    return profiler
+
+
+class TestSamplingProfiler:
+    """测试采样分析器"""
+
+    def test_wall_and_cpu_collapsed(self):
+        """测试墙钟包含所有线程，CPU 只包含占用 CPU 的线程"""
+        profiler = profile_threads()
+        assert profiler.sample_count > 10
+
+        wall = profiler.collapsed("wall")
+        assert any(line.startswith("busy;") and "busy_loop" in line for line in wall.splitlines())
+        assert any(line.startswith("idle;") and "idle_wait" in line for line in wall.splitlines())
+
+        cpu_lines = profiler.collapsed("cpu").splitlines()
+        busy_us = sum(int(line.rsplit(" ", 1)[1]) for line in cpu_lines if line.startswith("busy;"))
+        idle_us = sum(int(line.rsplit(" ", 1)[1]) for line in cpu_lines if line.startswith("idle;"))
+        assert busy_us > 10 * idle_us
+
+    def test_pstats_loadable(self, tmp_path):
+        """测试 pstats 输出可被标准库加载"""
+        import pstats
+
+        profiler = profile_threads()
+        path = tmp_path / "profile.pstats"
+        path.write_bytes(profiler.pstats("wall"))
+
+        stats = pstats.Stats(str(path))
+        names = {func[2] for func in stats.stats}
+        assert "busy_loop" in names
+        assert stats.total_tt > 0
+
+
+class TestRunProfile:
+    """测试分析会话"""
+
+    def test_single_session(self):
+        """测试同时只允许一个会话"""
+        from src.common.exceptions import ProfilerBusyError
+        from src.common.profiler import run_profile
+
+        async def run():
+            first = asyncio.create_task(run_profile(duration=0.2))
+            await asyncio.sleep(0.05)
+            with pytest.raises(ProfilerBusyError):
+                await run_profile(duration=0.1)
+            return await first
+
+        result = asyncio.run(run())
+        assert result.format == "collapsed"
+        assert result.samples > 0
+        assert result.overhead < 0.5
+
+    def test_invalid_params(self):
+        """测试无效参数"""
+        from src.common.exceptions import InvalidRequestError
+        from src.common.profiler import run_profile, MAX_DURATION
+
+        with pytest.raises(InvalidRequestError):
+            asyncio.run(run_profile(duration=1, mode="memory"))
+        with pytest.raises(InvalidRequestError):
+            asyncio.run(run_profile(duration=MAX_DURATION + 1))
+
+    def test_result_roundtrip(self):
+        """测试结果经 JSON 传输后还原"""
+        from src.common.profiler import ProfileResult
+
+        result = ProfileResult("cpu", "pstats", b"\x00\xffdata", 1.0, 0.01, 100, 0.002)
+        assert ProfileResult.from_dict(result.to_dict()) == result
+
+
+class TestProfileEndpoints:
+    """测试管理接口"""
+
+    def test_gateway_requires_token(self):
+        """测试网关分析接口需要管理令牌"""
+        import httpx
+        from src.common.models import SystemConfig
+        from src.gateway.app import GatewayApp
+
+        async def call(gateway, **headers):
+            transport = httpx.ASGITransport(app=gateway.app)
+            async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+                return await client.post("/api/admin/profile?duration=0.1", headers=headers)
+
+        disabled = GatewayApp(config=SystemConfig())
+        assert asyncio.run(call(disabled)).status_code == 403
+
+        gateway = GatewayApp(config=SystemConfig(admin_token="secret"))
+        assert asyncio.run(call(gateway, **{"X-Admin-Token": "wrong"})).status_code == 403
+
+        resp = asyncio.run(call(gateway, **{"X-Admin-Token": "secret"}))
+        assert resp.status_code == 200
+        assert resp.headers["content-type"].startswith("text/plain")
+        assert int(resp.headers["X-Profile-Samples"]) > 0
+
+    def test_gateway_does_not_forward_token(self):
+        """测试网关向节点下发签名而不是管理令牌"""
+        import httpx
+        from src.common.models import SystemConfig, NodeInfo, EngineType
+        from src.common.profiler import verify_command_signature
+        from src.gateway.app import GatewayApp
+
+        gateway = GatewayApp(config=SystemConfig(admin_token="secret"))
+        gateway.registry.register(NodeInfo(node_id="n1", engine_type=EngineType.XTTS, host="127.0.0.1", port=8001))
+        sent = []
+
+        async def execute_command(node_id, command, timeout):
+            sent.append(command.params)
+            return {"success": False, "error": "stub"}
+
+        gateway.registry.execute_command = execute_command
+
+        async def run():
+            transport = httpx.ASGITransport(app=gateway.app)
+            async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+                await client.post("/api/admin/nodes/n1/profile?duration=0.1", headers={"X-Admin-Token": "secret"})
+
+        asyncio.run(run())
+        params = sent[0]
+        assert "token" not in params
+        assert "secret" not in str(params)
+        assert verify_command_signature("secret", "n1", "profile", params["timestamp"], params["signature"])
+
+    def test_worker_profile_command(self):
+        """测试工作节点 profile 命令校验签名并返回结果"""
+        import time
+        from src.common.models import NodeCommand
+        from src.common.profiler import ProfileResult, sign_command
+        from tests.test_base_worker import make_worker
+
+        worker = make_worker(admin_token="secret")
+        now = time.time()
+
+        def profile(**params):
+            return asyncio.run(worker._handle_command(NodeCommand(command="profile", params=params)))
+
+        denied = {"success": False, "error": "Invalid or missing admin token", "code": "AUTH_ERROR"}
+        # 原始令牌不被接受
+        assert profile(token="secret", duration=0.1) == denied
+        # 令牌错误、签给其他节点、已过期
+        assert profile(timestamp=now, signature=sign_command("wrong", worker.node_id, "profile", now)) == denied
+        assert profile(timestamp=now, signature=sign_command("secret", "other", "profile", now)) == denied
+        old = now - 120
+        assert profile(timestamp=old, signature=sign_command("secret", worker.node_id, "profile", old)) == denied
+
+        resp = profile(
+            timestamp=now,
+            signature=sign_command("secret", worker.node_id, "profile", now),
+            duration=0.1, format="pstats", mode="cpu",
+        )
+        assert resp["success"]
+        result = ProfileResult.from_dict(resp["profile"])
+        assert result.format == "pstats"
+        assert result.mode == "cpu"
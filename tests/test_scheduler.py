@@ -0,0 +1,192 @@
+"""
+推理调度器测试
+"""
+import time
+import asyncio
+import threading
+import pytest
+from pathlib import Path
+from concurrent.futures import ThreadPoolExecutor
+
+# 添加项目路径
+import sys
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+
+def make_scheduler(batch_sizes=None, **kwargs):
+    """创建调度器，批量推理函数记录每批大小"""
+    from src.workers.scheduler import InferenceScheduler
+
+    def run_batch(batch):
+        batch_sizes.append(len(batch))
+        return [f"batch:{args[0]}" for args in batch]
+
+    return InferenceScheduler(
+        executor=ThreadPoolExecutor(max_workers=1),
+        run_batch=run_batch if batch_sizes is not None else None,
+        **kwargs,
+    )
+
+
+def single(text):
+    return f"single:{text}"
+
+
+class TestInferenceScheduler:
+    """测试调度器"""
+
+    def test_batches_queued_requests(self):
+        """测试同时到达的请求合并为批，结果按请求对应"""
+        sizes = []
+        scheduler = make_scheduler(sizes, max_batch_size=4, max_batch_delay=0.05)
+
+        async def run():
+            return await asyncio.gather(*(scheduler.submit(single, str(i)) for i in range(5)))
+
+        results = asyncio.run(run())
+        assert results == ["batch:0", "batch:1", "batch:2", "batch:3", "single:4"]
+        assert sizes == [4]
+        assert scheduler.stats()["avg_batch_size"] == 2.5
+
+    def test_batch_key_separates_batches(self):
+        """测试不同 batch_key 的请求不会合并，且保持先到先服务"""
+        sizes = []
+        scheduler = make_scheduler(sizes, max_batch_size=8, max_batch_delay=0.05)
+        keys = ["zh", "zh", "en", "zh"]
+
+        async def run():
+            return await asyncio.gather(*(
+                scheduler.submit(single, str(i), batch_key=key) for i, key in enumerate(keys)
+            ))
+
+        results = asyncio.run(run())
+        assert results == ["batch:0", "batch:1", "single:2", "single:3"]
+        assert sizes == [2]
+        assert scheduler.batch_count == 3
+
+    def test_deferred_request_wakes_idle_dispatcher(self):
+        """测试凑批时留下的不同 batch_key 请求由空闲调度协程立即处理，不等当前批完成"""
+        from src.workers.scheduler import InferenceScheduler
+
+        started = {}
+
+        def run_batch(batch):
+            return [slow(*args) for args in batch]
+
+        def slow(text):
+            started[text] = time.perf_counter()
+            time.sleep(0.3)
+            return text
+
+        scheduler = InferenceScheduler(
+            executor=ThreadPoolExecutor(max_workers=2),
+            concurrency=2,
+            run_batch=run_batch,
+            max_batch_size=4,
+            max_batch_delay=0.05,
+        )
+
+        async def run():
+            # 两个调度协程都阻塞在队列上之后，同时到达两个不同 batch_key 的请求:
+            # 先被唤醒的协程在凑批时取走两者并留下 en，另一个协程再次阻塞
+            await scheduler.submit(slow, "warmup")
+            results = await asyncio.gather(
+                scheduler.submit(slow, "zh", batch_key="zh"),
+                scheduler.submit(slow, "en", batch_key="en"),
+            )
+            await scheduler.stop()
+            return results
+
+        assert asyncio.run(run()) == ["zh", "en"]
+        assert abs(started["en"] - started["zh"]) < 0.2
+        assert scheduler.queue_size == 0
+
+    def test_single_item_fallback(self):
+        """测试不支持批量时逐条执行"""
+        scheduler = make_scheduler(max_batch_size=4)
+        assert not scheduler.batching
+
+        async def run():
+            return await asyncio.gather(*(scheduler.submit(single, str(i)) for i in range(3)))
+
+        assert asyncio.run(run()) == ["single:0", "single:1", "single:2"]
+        assert scheduler.batch_count == 3
+
+    def test_queue_full(self):
+        """测试队列满时立即拒绝"""
+        from src.common.exceptions import QueueFullError
+
+        scheduler = make_scheduler(max_queue_size=2)
+        release = threading.Event()
+
+        async def run():
+            running = asyncio.create_task(scheduler.submit(release.wait, 5))
+            await asyncio.sleep(0.05)
+            queued = [asyncio.create_task(scheduler.submit(single, str(i))) for i in range(2)]
+            await asyncio.sleep(0.01)
+            depth = scheduler.queue_size
+            with pytest.raises(QueueFullError):
+                await scheduler.submit(single, "overflow")
+            release.set()
+            await asyncio.gather(running, *queued)
+            return depth
+
+        assert asyncio.run(run()) == 2
+        assert scheduler.rejected_count == 1
+        assert scheduler.queue_size == 0
+
+    def test_retry_after_estimate(self):
+        """测试按单请求处理耗时和队列长度估算等待时间"""
+        scheduler = make_scheduler()
+        assert scheduler.estimate_wait() == 1.0
+
+        async def run():
+            await asyncio.gather(*(scheduler.submit(time.sleep, 0.02) for _ in range(3)))
+
+        asyncio.run(run())
+        assert 0.015 < scheduler.service_time < 0.2
+
+        scheduler.service_time = 1.5
+        assert scheduler.estimate_wait() == 2
+        assert scheduler.estimate_wait(extra=4) == 6
+
+    def test_batch_error_fails_all(self):
+        """测试批量推理失败时批内请求都收到异常"""
+        from src.workers.scheduler import InferenceScheduler
+
+        def run_batch(batch):
+            raise RuntimeError("device error")
+
+        scheduler = InferenceScheduler(
+            executor=ThreadPoolExecutor(max_workers=1),
+            run_batch=run_batch,
+            max_batch_size=4,
+            max_batch_delay=0.05,
+        )
+
+        async def run():
+            return await asyncio.gather(
+                *(scheduler.submit(single, str(i)) for i in range(2)), return_exceptions=True
+            )
+
+        results = asyncio.run(run())
+        assert all(isinstance(r, RuntimeError) for r in results)
+
+    def test_cancelled_request_skipped(self):
+        """测试排队中取消的请求不会被执行"""
+        scheduler = make_scheduler()
+        release = threading.Event()
+        executed = []
+
+        async def run():
+            running = asyncio.create_task(scheduler.submit(release.wait, 5))
+            await asyncio.sleep(0.05)
+            queued = asyncio.create_task(scheduler.submit(executed.append, "x"))
+            await asyncio.sleep(0.01)
+            queued.cancel()
+            release.set()
+            await running
+            await asyncio.sleep(0.05)
+
+        asyncio.run(run())
+        assert executed == []
@@ -0,0 +1,133 @@
+"""
+慢启动测试
+"""
+from collections import Counter
+from pathlib import Path
+
+# 添加项目路径
+import sys
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+
+def make_node(node_id, status=None):
+    from src.common.models import NodeInfo, EngineType, WorkerStatus
+
+    status = status or WorkerStatus.READY
+    return NodeInfo(
+        node_id=node_id,
+        engine_type=EngineType.XTTS,
+        host="127.0.0.1",
+        port=8001,
+        status=status,
+        model_loaded=status == WorkerStatus.READY,
+    )
+
+
+def make_registry(**options):
+    from src.gateway.registry import ServiceRegistry
+
+    return ServiceRegistry(**options)
+
+
+class TestWeight:
+    """测试权重爬升"""
+
+    def test_disabled_by_default(self):
+        """测试未配置时权重恒为 1，轮询行为不变"""
+        from src.common.models import EngineType
+
+        registry = make_registry()
+        registry.register(make_node("a"))
+        registry.register(make_node("b"))
+
+        assert [n.weight for n in registry.get_nodes()] == [1.0, 1.0]
+        picks = [registry.select_node(EngineType.XTTS).node_id for _ in range(4)]
+        assert picks == ["a", "b", "a", "b"]
+
+    def test_time_ramp(self):
+        """测试权重按时间从最小权重线性升到 1"""
+        registry = make_registry(slow_start_seconds=100, slow_start_min_weight=0.2)
+        registry.register(make_node("a"))
+        node = registry.get_node("a")
+
+        assert node.weight == 0.2
+        assert abs(registry._slow_start_weight(node, node.ready_since + 50) - 0.6) < 1e-9
+        assert registry._slow_start_weight(node, node.ready_since + 200) == 1.0
+
+    def test_request_ramp(self):
+        """测试权重按被选中次数爬升，两项都配置时取较慢者"""
+        from src.common.models import EngineType
+
+        registry = make_registry(slow_start_requests=10, slow_start_min_weight=0.0)
+        registry.register(make_node("a"))
+        for _ in range(5):
+            registry.select_node(EngineType.XTTS)
+        assert abs(registry.get_nodes()[0].weight - 0.5) < 0.02
+
+        registry.slow_start_seconds = 1000
+        assert registry.get_nodes()[0].weight < 0.02
+
+    def test_visible_in_nodes(self):
+        """测试权重随节点信息返回"""
+        registry = make_registry(slow_start_seconds=60)
+        registry.register(make_node("a"))
+        assert registry.get_nodes()[0].model_dump()["weight"] < 1.0
+
+
+class TestRouting:
+    """测试按权重路由"""
+
+    def test_weighted_round_robin(self):
+        """测试慢启动节点按权重分到较少请求"""
+        from src.common.models import EngineType
+
+        registry = make_registry(slow_start_requests=1000, slow_start_min_weight=0.25)
+        registry.register(make_node("old"))
+        registry.get_node("old").ready_requests = 1000
+        registry.register(make_node("new"))
+
+        picks = Counter(registry.select_node(EngineType.XTTS).node_id for _ in range(50))
+        assert picks["old"] == 40
+        assert picks["new"] == 10
+
+    def test_least_load_scales_concurrency(self):
+        """测试最小负载策略下慢启动节点的并发按权重放大"""
+        from src.common.models import EngineType
+
+        registry = make_registry(slow_start_seconds=600, slow_start_min_weight=0.1)
+        registry.register(make_node("old"))
+        old = registry.get_node("old")
+        old.ready_since -= 600
+        old.current_concurrent = 3
+        registry.register(make_node("new"))
+
+        assert registry.select_node(EngineType.XTTS, strategy="least_load").node_id == "old"
+
+
+class TestReady:
+    """测试重新就绪时重新开始爬升"""
+
+    def test_heartbeat_ready_again(self):
+        """测试心跳把节点从待机变为就绪时重新开始慢启动，并同步模型加载状态"""
+        from src.common.models import NodeMetrics, WorkerStatus
+
+        registry = make_registry(slow_start_seconds=60)
+        registry.register(make_node("a", WorkerStatus.STANDBY))
+        node = registry.get_node("a")
+        node.ready_since = 0.0
+
+        registry.heartbeat("a", NodeMetrics(node_id="a", status=WorkerStatus.READY, model_loaded=True))
+
+        assert node.model_loaded is True
+        assert node.is_available
+        assert node.ready_since > 0
+        assert node.weight < 1.0
+
+    def test_reregister_keeps_progress(self):
+        """测试已就绪节点重新注册时保持慢启动进度"""
+        registry = make_registry(slow_start_seconds=60)
+        registry.register(make_node("a"))
+        registry.get_node("a").ready_since -= 60
+
+        registry.register(make_node("a"))
+        assert registry.get_nodes()[0].weight == 1.0
@@ -0,0 +1,121 @@
+"""
+链路追踪测试
+"""
+import asyncio
+import json
+import pytest
+from pathlib import Path
+
+# 添加项目路径
+import sys
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+
+class TestServerTiming:
+    """测试 Server-Timing 生成与解析"""
+
+    def test_round_trip(self):
+        """测试生成的响应头可以被解析回阶段耗时"""
+        from src.common.tracing import RequestTrace, parse_server_timing
+
+        trace = RequestTrace("req-1")
+        trace.add("embedding", 12.5)
+        trace.add("inference", 800.0)
+        trace.add("inference", 20.0)
+
+        stages = parse_server_timing(trace.server_timing())
+        assert stages["embedding"] == pytest.approx(12.5)
+        assert stages["inference"] == pytest.approx(820.0)
+        assert "total" in stages
+
+    def test_parse_ignores_metrics_without_duration(self):
+        """测试忽略没有 dur 参数的指标"""
+        from src.common.tracing import parse_server_timing
+
+        stages = parse_server_timing('cache;desc="hit", db;dur=53, app;dur=47.2')
+        assert stages == {"db": 53.0, "app": 47.2}
+
+    def test_stage_without_trace_is_noop(self):
+        """测试没有追踪上下文时 trace_stage 不报错"""
+        from src.common.tracing import trace_stage, current_trace
+
+        assert current_trace() is None
+        with trace_stage("inference"):
+            pass
+
+
+class TestTraceContext:
+    """测试追踪上下文传递"""
+
+    def test_executor_keeps_trace(self):
+        """测试线程池中记录的阶段写入当前请求的追踪记录"""
+        from src.common.tracing import start_trace, trace_stage, run_in_executor
+
+        def work():
+            with trace_stage("inference"):
+                return 42
+
+        async def run():
+            trace = start_trace("req-2")
+            result = await run_in_executor(work)
+            return trace, result
+
+        trace, result = asyncio.run(run())
+        assert result == 42
+        assert "inference" in trace.stages
+
+    def test_middleware_headers(self):
+        """测试中间件沿用请求 ID 并返回 Server-Timing"""
+        import httpx
+        from fastapi import FastAPI
+        from src.common.logging import RequestLogMiddleware
+        from src.common.tracing import trace_stage
+
+        app = FastAPI()
+        app.add_middleware(RequestLogMiddleware)
+
+        @app.get("/work")
+        async def work():
+            with trace_stage("inference"):
+                await asyncio.sleep(0)
+            return {"ok": True}
+
+        async def run():
+            transport = httpx.ASGITransport(app=app)
+            async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+                return await client.get("/work", headers={"X-Request-ID": "abc123"})
+
+        resp = asyncio.run(run())
+        assert resp.headers["x-request-id"] == "abc123"
+        assert "inference;dur=" in resp.headers["server-timing"]
+        assert "total;dur=" in resp.headers["server-timing"]
+
+
+class TestSpanWriter:
+    """测试链路采样输出"""
+
+    def test_writes_sampled_spans(self, tmp_path):
+        """测试采样的链路写入 JSONL 文件"""
+        from src.common.tracing import RequestTrace, SpanWriter
+
+        path = tmp_path / "spans.jsonl"
+        writer = SpanWriter(str(path), sample_rate=1.0)
+        assert writer.should_sample(200)
+
+        writer.submit({"request_id": "a", "stages": {"inference": 1.0}})
+        writer.submit({"request_id": "b", "stages": {}})
+        writer.close()
+
+        lines = [json.loads(line) for line in path.read_text(encoding="utf-8").splitlines()]
+        assert [span["request_id"] for span in lines] == ["a", "b"]
+
+    def test_errors_always_sampled(self, tmp_path):
+        """测试 5xx 请求不受采样率影响"""
+        from src.common.tracing import SpanWriter
+
+        writer = SpanWriter(str(tmp_path / "spans.jsonl"), sample_rate=0.0)
+        try:
+            assert not writer.should_sample(200)
+            assert writer.should_sample(503)
+        finally:
+            writer.close()
@@ -0,0 +1,52 @@
+"""
+模型权重缓存测试
+"""
+import os
+import pytest
+from pathlib import Path
+
+# 添加项目路径
+import sys
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+torch = pytest.importorskip("torch")
+pytest.importorskip("safetensors")
+
+
+class TestWeightCache:
+    """测试 safetensors 权重缓存"""
+
+    def test_roundtrip(self, tmp_path):
+        """测试写入后读回相同的张量，共享存储的张量各自保存，非张量项被忽略"""
+        from src.workers.weight_cache import weight_cache_path, load_weight_cache, save_weight_cache
+
+        checkpoint = tmp_path / "model.pth"
+        checkpoint.write_bytes(b"x")
+        weight = torch.randn(4, 3)
+        state = {"a.weight": weight, "b.weight": weight, "a.bias": torch.arange(3.0), "step": 10}
+
+        path = weight_cache_path(checkpoint, "xtts")
+        assert path.parent.name == ".weight_cache"
+        assert save_weight_cache(state, path)
+
+        loaded = load_weight_cache(path)
+        assert set(loaded) == {"a.weight", "b.weight", "a.bias"}
+        assert torch.equal(loaded["b.weight"], weight)
+        assert torch.equal(loaded["a.bias"], torch.arange(3.0))
+
+    def test_invalidated_by_checkpoint_change(self, tmp_path):
+        """测试检查点变化后使用新的缓存文件，旧缓存被清理"""
+        from src.workers.weight_cache import weight_cache_path, save_weight_cache
+
+        checkpoint = tmp_path / "model.pth"
+        checkpoint.write_bytes(b"x")
+        old = weight_cache_path(checkpoint, "xtts")
+        save_weight_cache({"w": torch.ones(2)}, old)
+
+        checkpoint.write_bytes(b"xy")
+        os.utime(checkpoint, ns=(1, 1))
+        new = weight_cache_path(checkpoint, "xtts")
+        assert new != old
+
+        save_weight_cache({"w": torch.ones(2)}, new)
+        assert new.exists() and not old.exists()
@@ -0,0 +1,108 @@
+"""
+激活耗时基准
+
+测量 activate（加载模型）到 READY 的耗时及各阶段耗时:
+- 默认: 加载指定引擎，重复「激活 -> 待机」若干轮，逐轮输出总耗时和阶段耗时
+  （第一轮包含冷启动的磁盘读取；--weight-cache 时第一轮写缓存，之后的轮次读缓存）
+- --synthetic-mb: 不需要模型，生成指定大小的随机 state dict，对比 torch.load(.pth)
+  与 safetensors mmap 读取（权重缓存格式）的耗时
+
+用法:
+    cd voice-clone-tts
+    python -m benchmarks.bench_activation --engine xtts --device cpu [--cycles 3] [--weight-cache]
+    python -m benchmarks.bench_activation --synthetic-mb 1800
+"""
+
+import time
+import asyncio
+import argparse
+import tempfile
+from pathlib import Path
+from typing import Callable
+
+
+def _create_worker(args):
+    options = dict(device=args.device, voices_dir=args.voices_dir, auto_register=False,
+                   weight_cache=args.weight_cache)
+    if args.engine == "xtts":
+        from src.workers.xtts_worker import XTTSWorker
+        return XTTSWorker(model_path=args.model_path or None, **options)
+    from src.workers.openvoice_worker import OpenVoiceWorker
+    return OpenVoiceWorker(checkpoint_path=args.model_path or None, **options)
+
+
+def bench_activation(args):
+    worker = _create_worker(args)
+    print(f"engine={args.engine} device={args.device} weight_cache={args.weight_cache} cycles={args.cycles}")
+
+    async def run():
+        for cycle in range(args.cycles):
+            start = time.perf_counter()
+            if not await worker.activate():
+                raise SystemExit("Activation failed")
+            elapsed = time.perf_counter() - start
+            phases = "  ".join(f"{name}={seconds:.2f}s" for name, seconds in worker._activation_phases.items())
+            print(f"  cycle {cycle + 1}: activate->READY {elapsed:7.2f}s  {phases}")
+            await worker.standby()
+
+    asyncio.run(run())
+
+
+def _timeit(func: Callable, repeat: int) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def bench_synthetic(size_mb: float, repeat: int):
+    import torch
+    from safetensors.torch import load_file, save_file
+
+    # 24 个 1024 宽的层，凑够指定大小
+    rows = max(1, int(size_mb * 1024 * 1024 / 4 / 1024 / 24))
+    state = {f"layers.{i}.weight": torch.randn(rows, 1024) for i in range(24)}
+
+    with tempfile.TemporaryDirectory(prefix="bench-activation-") as tmp:
+        pth = Path(tmp) / "model.pth"
+        cache = Path(tmp) / "model.safetensors"
+        torch.save({"model": state}, pth)
+        save_file(state, str(cache))
+
+        print(f"state dict: {size_mb:.0f}MB, best of {repeat} (warm page cache)")
+        baseline = _timeit(lambda: torch.load(pth, map_location="cpu")["model"], repeat)
+        print(f"  torch.load(.pth)          {baseline * 1000:9.1f} ms")
+        mmap = _timeit(lambda: load_file(str(cache), device="cpu"), repeat)
+        print(f"  safetensors load_file     {mmap * 1000:9.1f} ms  ({baseline / mmap:.1f}x)")
+
+        model = {name: torch.empty_like(tensor) for name, tensor in state.items()}
+
+        def copy_into_model():
+            for name, tensor in load_file(str(cache), device="cpu").items():
+                model[name].copy_(tensor)
+
+        print(f"  safetensors + copy_       {_timeit(copy_into_model, repeat) * 1000:9.1f} ms")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Worker activation benchmark")
+    parser.add_argument("--engine", default="xtts", choices=["xtts", "openvoice"], help="引擎")
+    parser.add_argument("--device", default="cpu", help="设备 (cuda/cpu)")
+    parser.add_argument("--model-path", default="", help="模型目录（默认使用内置路径）")
+    parser.add_argument("--voices-dir", default="./voices", help="音色存储目录")
+    parser.add_argument("--cycles", type=int, default=3, help="激活 -> 待机的轮数")
+    parser.add_argument("--weight-cache", action="store_true", help="启用 safetensors 权重缓存")
+    parser.add_argument("--synthetic-mb", type=float, default=0, help="只对比检查点读取方式（随机权重大小，MB）")
+    parser.add_argument("--repeat", type=int, default=3, help="--synthetic-mb 时每项重复次数")
+    args = parser.parse_args()
+
+    if args.synthetic_mb > 0:
+        bench_synthetic(args.synthetic_mb, args.repeat)
+    else:
+        bench_activation(args)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,130 @@
+"""
+音频编解码微基准
+
+测量 src.common.audio 各操作的单次耗时（ms/op），并与常见写法对比:
+- wav:       BytesIO + wave 模块 + read()（与 torchaudio.save 到 BytesIO 后读出同样多一次拷贝）、
+             文件头拼接 astype().tobytes()、encode_wav（预分配缓冲区，memoryview 输出）；
+             安装了 torchaudio 时另测 torchaudio.save
+- pcm:       float -> astype().tobytes() 与 encode_pcm；int16 输入的 encode_pcm（零拷贝）
+- resample:  44.1kHz -> 22.05kHz；安装了 librosa 时另测 librosa.resample
+- normalize: RMS 响度归一化
+
+用法:
+    cd voice-clone-tts
+    python -m benchmarks.bench_audio [--seconds 10] [--repeat 50]
+"""
+
+import io
+import time
+import wave
+import argparse
+from typing import Callable, Optional
+
+import numpy as np
+
+from src.common.audio import encode_pcm, encode_wav, normalize_loudness, resample, wav_header
+
+SAMPLE_RATE = 24000
+
+
+def _timeit(func: Callable, repeat: int) -> float:
+    func()  # 预热
+    start = time.perf_counter()
+    for _ in range(repeat):
+        func()
+    return (time.perf_counter() - start) / repeat * 1000
+
+
+def _report(name: str, ms: float, baseline: Optional[float] = None):
+    line = f"  {name:<28} {ms:9.3f} ms"
+    if baseline is not None:
+        line += f"  ({baseline / ms:.1f}x)"
+    print(line)
+
+
+def _wave_bytesio(samples: np.ndarray) -> bytes:
+    buffer = io.BytesIO()
+    with wave.open(buffer, "wb") as wav:
+        wav.setnchannels(1)
+        wav.setsampwidth(2)
+        wav.setframerate(SAMPLE_RATE)
+        wav.writeframes((np.clip(samples, -1.0, 1.0) * 32767).astype("<i2").tobytes())
+    buffer.seek(0)
+    return buffer.read()
+
+
+def _concat(samples: np.ndarray) -> bytes:
+    pcm = (np.clip(samples, -1.0, 1.0) * 32767).astype("<i2").tobytes()
+    return wav_header(SAMPLE_RATE, data_size=len(pcm)) + pcm
+
+
+def bench_wav(samples: np.ndarray, repeat: int):
+    print("wav (float32 -> 16-bit WAV)")
+    baseline = _timeit(lambda: _wave_bytesio(samples), repeat)
+    _report("BytesIO + wave + read()", baseline)
+    _report("header + astype().tobytes()", _timeit(lambda: _concat(samples), repeat), baseline)
+    _report("encode_wav", _timeit(lambda: encode_wav(samples, SAMPLE_RATE), repeat), baseline)
+
+    try:
+        import torch
+        import torchaudio
+    except ImportError:
+        return
+
+    def torchaudio_save():
+        buffer = io.BytesIO()
+        torchaudio.save(buffer, torch.tensor(samples).unsqueeze(0), SAMPLE_RATE, format="wav")
+        buffer.seek(0)
+        return buffer.read()
+
+    _report("torchaudio.save + read()", _timeit(torchaudio_save, repeat), baseline)
+
+
+def bench_pcm(samples: np.ndarray, repeat: int):
+    print("pcm (raw 16-bit)")
+    baseline = _timeit(lambda: (np.clip(samples, -1.0, 1.0) * 32767).astype("<i2").tobytes(), repeat)
+    _report("float astype().tobytes()", baseline)
+    _report("float encode_pcm", _timeit(lambda: encode_pcm(samples), repeat), baseline)
+    int16 = (samples * 32767).astype(np.int16)
+    _report("int16 encode_pcm (zero-copy)", _timeit(lambda: encode_pcm(int16), repeat), baseline)
+
+
+def bench_resample(seconds: float, repeat: int):
+    print("resample (44.1kHz -> 22.05kHz)")
+    rng = np.random.default_rng(0)
+    samples = rng.uniform(-0.5, 0.5, int(44100 * seconds)).astype(np.float32)
+    ours = _timeit(lambda: resample(samples, 44100, 22050), repeat)
+    _report("resample (rfft)", ours)
+
+    try:
+        import librosa
+    except ImportError:
+        return
+    _report("librosa.resample", _timeit(
+        lambda: librosa.resample(samples, orig_sr=44100, target_sr=22050), repeat
+    ))
+
+
+def bench_normalize(samples: np.ndarray, repeat: int):
+    print("normalize")
+    _report("normalize_loudness", _timeit(lambda: normalize_loudness(samples), repeat))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Audio codec micro-benchmark")
+    parser.add_argument("--seconds", type=float, default=10.0, help="音频时长（秒）")
+    parser.add_argument("--repeat", type=int, default=50, help="每项重复次数")
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(0)
+    samples = rng.uniform(-0.9, 0.9, int(SAMPLE_RATE * args.seconds)).astype(np.float32)
+
+    print(f"audio={args.seconds}s @ {SAMPLE_RATE}Hz repeat={args.repeat}")
+    bench_wav(samples, args.repeat)
+    bench_pcm(samples, args.repeat)
+    bench_resample(args.seconds, args.repeat)
+    bench_normalize(samples, args.repeat)
+
+
+if __name__ == "__main__":
+    main()
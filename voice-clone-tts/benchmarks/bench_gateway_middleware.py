@@ -0,0 +1,132 @@
+"""
+网关中间件吞吐基准
+
+对比同一组路由在两种中间件实现下的吞吐（requests/s）:
+- http:  @app.middleware("http")，即 BaseHTTPMiddleware（旧实现）
+- asgi:  RequestLogMiddleware + RateLimitMiddleware 原生 ASGI（新实现）
+
+分别测量普通 JSON 响应和 64 块的流式响应，另外测量完整网关的 /api/status。
+请求通过 httpx.ASGITransport 直接在进程内调用应用，不经过网络栈。
+
+用法:
+    cd voice-clone-tts
+    python -m benchmarks.bench_gateway_middleware [--requests 3000]
+"""
+
+import argparse
+import asyncio
+import time
+
+import httpx
+from fastapi import FastAPI, Request
+from fastapi.responses import StreamingResponse
+
+from src.common.exceptions import RateLimitExceededError
+from src.common.logging import RequestLogMiddleware
+from src.common.models import SystemConfig
+from src.gateway.app import GatewayApp
+from src.gateway.limiter import RateLimiter
+from src.gateway.middleware import RateLimitMiddleware, rate_limit_response
+
+
+def _new_limiter() -> RateLimiter:
+    return RateLimiter(global_rpm=10_000_000, ip_rpm=10_000_000, concurrent_limit=1000)
+
+
+def _add_routes(app: FastAPI):
+    @app.get("/api/echo")
+    async def echo():
+        return {"ok": True}
+
+    @app.get("/api/stream")
+    async def stream():
+        async def chunks():
+            for _ in range(64):
+                yield b"\0" * 4096
+        return StreamingResponse(chunks(), media_type="application/octet-stream")
+
+
+def build_http_middleware_app() -> FastAPI:
+    """旧实现: BaseHTTPMiddleware"""
+    app = FastAPI()
+    limiter = _new_limiter()
+
+    @app.middleware("http")
+    async def rate_limit_middleware(request: Request, call_next):
+        if request.url.path.startswith(("/static", "/status", "/admin", "/playground")):
+            return await call_next(request)
+        if request.url.path in ("/health", "/", "/api/health"):
+            return await call_next(request)
+
+        client_ip = request.client.host if request.client else "unknown"
+        try:
+            await limiter.check(client_ip, request.url.path)
+            await limiter.acquire_concurrent()
+            try:
+                return await call_next(request)
+            finally:
+                await limiter.release_concurrent()
+        except RateLimitExceededError as e:
+            return rate_limit_response(e)
+
+    _add_routes(app)
+    return app
+
+
+def build_asgi_middleware_app() -> FastAPI:
+    """新实现: 原生 ASGI 中间件"""
+    app = FastAPI()
+    app.add_middleware(RateLimitMiddleware, limiter=_new_limiter())
+    app.add_middleware(RequestLogMiddleware)
+    _add_routes(app)
+    return app
+
+
+async def measure(app, path: str, requests: int, concurrency: int = 16) -> float:
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        # 预热
+        for _ in range(50):
+            await client.get(path)
+
+        remaining = requests
+
+        async def run():
+            nonlocal remaining
+            while remaining > 0:
+                remaining -= 1
+                resp = await client.get(path)
+                await resp.aread()
+
+        start = time.perf_counter()
+        await asyncio.gather(*(run() for _ in range(concurrency)))
+        return requests / (time.perf_counter() - start)
+
+
+async def main_async(requests: int):
+    http_app = build_http_middleware_app()
+    asgi_app = build_asgi_middleware_app()
+
+    for path in ("/api/echo", "/api/stream"):
+        before = await measure(http_app, path, requests)
+        after = await measure(asgi_app, path, requests)
+        print(
+            f"{path:12s} http: {before:8.0f} req/s   asgi: {after:8.0f} req/s   "
+            f"({after / before:.2f}x)"
+        )
+
+    config = SystemConfig(global_rpm=10_000_000, ip_rpm=10_000_000, concurrent_limit=1000)
+    gateway = GatewayApp(host="127.0.0.1", port=8080, config=config)
+    status = await measure(gateway.app, "/api/status", requests)
+    print(f"gateway /api/status (asgi stack): {status:8.0f} req/s")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Gateway middleware throughput benchmark")
+    parser.add_argument("--requests", type=int, default=3000, help="每项测量的请求数")
+    args = parser.parse_args()
+    asyncio.run(main_async(args.requests))
+
+
+if __name__ == "__main__":
+    main()
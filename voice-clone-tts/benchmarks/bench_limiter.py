@@ -0,0 +1,65 @@
+"""
+限流器微基准
+
+测量网关请求路径上每个请求的限流开销:
+- legacy: check() + acquire_concurrent() + release_concurrent()
+- admit:  admit() + release()（单次检查，不让出事件循环）
+
+用法:
+    cd voice-clone-tts
+    python -m benchmarks.bench_limiter [--requests 20000] [--ips 100]
+"""
+
+import argparse
+import asyncio
+import time
+
+from src.gateway.limiter import RateLimiter
+
+
+def _new_limiter() -> RateLimiter:
+    # 配额足够大，保证基准过程中不会触发拒绝
+    return RateLimiter(
+        global_rpm=10_000_000,
+        ip_rpm=10_000_000,
+        endpoint_rpm={"/api/synthesize": 10_000_000},
+        concurrent_limit=1000,
+    )
+
+
+async def bench_legacy(requests: int, ips: int) -> float:
+    limiter = _new_limiter()
+    start = time.perf_counter()
+    for i in range(requests):
+        await limiter.check(f"10.0.{i % ips // 256}.{i % 256}", "/api/synthesize")
+        await limiter.acquire_concurrent()
+        await limiter.release_concurrent()
+    return (time.perf_counter() - start) / requests * 1e6
+
+
+async def bench_admit(requests: int, ips: int) -> float:
+    limiter = _new_limiter()
+    start = time.perf_counter()
+    for i in range(requests):
+        limiter.admit(f"10.0.{i % ips // 256}.{i % 256}", "/api/synthesize")
+        limiter.release()
+    return (time.perf_counter() - start) / requests * 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser(description="RateLimiter micro-benchmark")
+    parser.add_argument("--requests", type=int, default=20000, help="每轮请求数")
+    parser.add_argument("--ips", type=int, default=100, help="客户端 IP 数量")
+    args = parser.parse_args()
+
+    print(f"requests={args.requests} ips={args.ips}")
+    legacy = asyncio.run(bench_legacy(args.requests, args.ips))
+    print(f"legacy check+acquire+release: {legacy:8.2f} us/request")
+
+    if hasattr(RateLimiter, "admit"):
+        admit = asyncio.run(bench_admit(args.requests, args.ips))
+        print(f"admit+release:                {admit:8.2f} us/request  ({legacy / admit:.1f}x)")
+
+
+if __name__ == "__main__":
+    main()
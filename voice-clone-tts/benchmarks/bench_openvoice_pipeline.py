@@ -0,0 +1,132 @@
+"""
+OpenVoice 合成管线基准
+
+对比两种在基础 TTS 和音色转换之间传递音频的方式（ms/request）:
+- file:   基础 TTS 写临时 WAV，转换器读回后再写一个临时 WAV，最后读出结果（旧实现）
+- memory: 波形数组直接传给转换器，结果在内存中编码一次 WAV（新实现）
+
+默认只测量管线中的音频搬运部分: 用合成波形（44.1kHz 基础 TTS 输出、22.05kHz 转换输出）
+模拟两次写文件、两次读文件，与一次内存编码对比，不需要安装模型。
+--model 时加载 OpenVoice 模型，端到端对比 _synthesize_file_sync 与 _synthesize_sync。
+
+用法:
+    cd voice-clone-tts
+    python -m benchmarks.bench_openvoice_pipeline [--requests 200] [--seconds 5]
+    python -m benchmarks.bench_openvoice_pipeline --model --voice-id abc12345 [--device cuda]
+"""
+
+import os
+import time
+import asyncio
+import argparse
+import tempfile
+import statistics
+from typing import Callable, List
+
+import numpy as np
+
+from src.common.audio import WAV_HEADER_SIZE, decode_pcm16, encode_wav
+
+TTS_RATE = 44100
+CONVERTER_RATE = 22050
+
+
+def _file_pipeline(source: np.ndarray, converted: np.ndarray) -> bytes:
+    with tempfile.NamedTemporaryFile(suffix=".wav", delete=False) as src_file:
+        src_path = src_file.name
+    with tempfile.NamedTemporaryFile(suffix=".wav", delete=False) as out_file:
+        out_path = out_file.name
+    try:
+        # 基础 TTS 写文件，转换器读回
+        with open(src_path, "wb") as f:
+            f.write(encode_wav(source, TTS_RATE))
+        with open(src_path, "rb") as f:
+            decode_pcm16(f.read()[WAV_HEADER_SIZE:])
+        # 转换器写文件，节点读回
+        with open(out_path, "wb") as f:
+            f.write(encode_wav(converted, CONVERTER_RATE))
+        with open(out_path, "rb") as f:
+            return f.read()
+    finally:
+        os.unlink(src_path)
+        os.unlink(out_path)
+
+
+def _memory_pipeline(source: np.ndarray, converted: np.ndarray) -> bytes:
+    return encode_wav(converted, CONVERTER_RATE)
+
+
+def _measure(func: Callable[[], bytes], requests: int) -> List[float]:
+    func()  # 预热
+    samples = []
+    for _ in range(requests):
+        start = time.perf_counter()
+        func()
+        samples.append((time.perf_counter() - start) * 1000)
+    return samples
+
+
+def _report(name: str, samples: List[float], baseline: List[float] = None):
+    mean = statistics.mean(samples)
+    p95 = sorted(samples)[int(len(samples) * 0.95) - 1]
+    line = f"{name:<8} mean {mean:8.3f} ms  p95 {p95:8.3f} ms"
+    if baseline is not None:
+        line += f"  ({statistics.mean(baseline) / mean:.1f}x)"
+    print(line)
+
+
+def bench_io(requests: int, seconds: float):
+    rng = np.random.default_rng(0)
+    source = rng.uniform(-0.5, 0.5, int(TTS_RATE * seconds)).astype(np.float32)
+    converted = rng.uniform(-0.5, 0.5, int(CONVERTER_RATE * seconds)).astype(np.float32)
+
+    print(f"audio transfer only: requests={requests} audio={seconds}s")
+    file = _measure(lambda: _file_pipeline(source, converted), requests)
+    memory = _measure(lambda: _memory_pipeline(source, converted), requests)
+    _report("file", file)
+    _report("memory", memory, file)
+
+
+def bench_model(requests: int, voice_id: str, voices_dir: str, device: str, text: str):
+    from src.workers.openvoice_worker import OpenVoiceWorker
+
+    worker = OpenVoiceWorker(device=device, voices_dir=voices_dir, auto_register=False)
+
+    async def prepare():
+        if not await worker.load_model():
+            raise SystemExit("Failed to load OpenVoice model")
+        target_se = await worker._load_voice_embedding(voice_id)
+        if target_se is None:
+            raise SystemExit(f"Voice not found: {voice_id}")
+        return target_se
+
+    target_se = asyncio.run(prepare())
+    if not worker._in_memory:
+        raise SystemExit("ToneColorConverter does not support the in-memory path")
+
+    print(f"end to end: requests={requests} device={device} text={len(text)} chars")
+    file = _measure(lambda: worker._synthesize_file_sync(text, target_se, "zh", 1.0), requests)
+    memory = _measure(lambda: worker._synthesize_sync(text, target_se, "zh", 1.0), requests)
+    _report("file", file)
+    _report("memory", memory, file)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="OpenVoice synthesis pipeline benchmark")
+    parser.add_argument("--requests", type=int, default=200, help="每种方式的请求数")
+    parser.add_argument("--seconds", type=float, default=5.0, help="模拟音频时长（秒）")
+    parser.add_argument("--model", action="store_true", help="加载模型做端到端对比")
+    parser.add_argument("--voice-id", default="", help="端到端对比使用的音色 ID")
+    parser.add_argument("--voices-dir", default="./voices", help="音色存储目录")
+    parser.add_argument("--device", default="cuda", help="设备 (cuda/cpu)")
+    parser.add_argument("--text", default="今天天气很好，我们一起去公园散步吧。", help="合成文本")
+    args = parser.parse_args()
+
+    if args.model:
+        bench_model(args.requests, args.voice_id, args.voices_dir, args.device, args.text)
+    else:
+        bench_io(args.requests, args.seconds)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,240 @@
+"""
+XTTS CPU 性能模式对比
+
+在 CPU 上依次用各性能模式加载 XTTS，合成同一组句子，输出速度和质量对比报告:
+- 速度: 单句平均耗时、实时率 RTF（合成耗时 / 音频时长，越小越快）
+- 质量: 用 float32 模型的说话人编码器计算输出音频与目标音色的说话人相似度（余弦），
+  以及相对 baseline 的时长比（量化误差会改变自回归采样的停止位置）
+
+线程数和 inter-op 线程数是进程级设置且只能设置一次，每个模式在独立子进程中运行。
+
+模式:
+- baseline:    float32，PyTorch 默认线程数
+- threads:     float32，按 CPU 核数 / 推理线程数设置线程
+- matmul-high: threads + float32 矩阵乘法精度 high
+- int8:        threads + GPT 线性层 int8 动态量化
+- int8-high:   int8 + 矩阵乘法精度 high
+
+用法:
+    cd voice-clone-tts
+    python -m benchmarks.bench_xtts_cpu --voice-id abc12345 [--repeat 3] [--output report.md]
+"""
+
+import os
+import sys
+import json
+import time
+import asyncio
+import argparse
+import tempfile
+import subprocess
+from pathlib import Path
+from typing import Dict, List
+
+MODES: Dict[str, Dict] = {
+    "baseline": {"compute_type": "float32", "matmul_precision": "highest", "tuned": False},
+    "threads": {"compute_type": "float32", "matmul_precision": "highest", "tuned": True},
+    "matmul-high": {"compute_type": "float32", "matmul_precision": "high", "tuned": True},
+    "int8": {"compute_type": "int8", "matmul_precision": "highest", "tuned": True},
+    "int8-high": {"compute_type": "int8", "matmul_precision": "high", "tuned": True},
+}
+
+SENTENCES = {
+    "zh": [
+        "今天天气很好，我们一起去公园散步吧。",
+        "语音合成系统需要在速度和音质之间取得平衡。",
+        "请在听到提示音后留言，我们会尽快给您回复。",
+    ],
+    "en": [
+        "The quick brown fox jumps over the lazy dog.",
+        "Please leave a message after the tone and we will call you back.",
+        "Speech synthesis has to balance speed and quality.",
+    ],
+}
+
+SAMPLE_RATE = 24000
+
+
+def _new_worker(args, mode: Dict, num_threads: int = 0):
+    from src.workers.xtts_worker import XTTSWorker
+
+    worker = XTTSWorker(
+        device="cpu",
+        voices_dir=args.voices_dir,
+        model_path=args.model_path or None,
+        compute_type=mode["compute_type"],
+        num_threads=num_threads,
+        interop_threads=args.interop_threads,
+        matmul_precision=mode["matmul_precision"],
+        auto_register=False,
+    )
+    if not mode["tuned"]:
+        worker._apply_cpu_profile = lambda: None
+    return worker
+
+
+def run_mode(args) -> Dict:
+    """子进程: 用一个模式合成所有句子，音频写入 out_dir"""
+    import torch
+    import numpy as np
+    from src.common.audio import encode_wav
+
+    mode = MODES[args.run_mode]
+    worker = _new_worker(args, mode, args.num_threads)
+
+    start = time.perf_counter()
+    if not asyncio.run(worker.load_model()):
+        raise SystemExit("Failed to load XTTS model")
+    load_seconds = time.perf_counter() - start
+
+    embedding = asyncio.run(worker._load_voice_embedding(args.voice_id))
+    if embedding is None:
+        raise SystemExit(f"Voice not found: {args.voice_id}")
+
+    sentences = SENTENCES[args.language]
+    worker._synthesize_sync(sentences[0], embedding, args.language, 1.0)  # 预热
+
+    out_dir = Path(args.out_dir)
+    results = []
+    for index, text in enumerate(sentences):
+        for repeat in range(args.repeat):
+            torch.manual_seed(repeat)
+            start = time.perf_counter()
+            with torch.inference_mode():
+                out = worker._model.inference(
+                    text=text,
+                    language=args.language,
+                    gpt_cond_latent=embedding["gpt_cond_latent"],
+                    speaker_embedding=embedding["speaker_embedding"],
+                )
+            elapsed = time.perf_counter() - start
+            audio = np.asarray(out["wav"], dtype=np.float32)
+
+            path = out_dir / f"{args.run_mode}-{index}-{repeat}.wav"
+            path.write_bytes(encode_wav(audio, SAMPLE_RATE))
+            results.append({
+                "sentence": index,
+                "seconds": elapsed,
+                "audio_seconds": len(audio) / SAMPLE_RATE,
+                "path": str(path),
+            })
+
+    return {
+        "mode": args.run_mode,
+        "threads": torch.get_num_threads(),
+        "interop_threads": torch.get_num_interop_threads(),
+        "load_seconds": load_seconds,
+        "results": results,
+    }
+
+
+def score(args) -> Dict[str, float]:
+    """子进程: 用 float32 模型计算每个输出与目标音色的说话人相似度"""
+    import torch
+
+    worker = _new_worker(args, MODES["baseline"])
+    if not asyncio.run(worker.load_model()):
+        raise SystemExit("Failed to load XTTS model")
+    embedding = asyncio.run(worker._load_voice_embedding(args.voice_id))
+    target = embedding["speaker_embedding"].flatten().float()
+
+    scores = {}
+    for path in sorted(Path(args.out_dir).glob("*.wav")):
+        speaker = worker._extract_voice_sync(str(path))["speaker_embedding"]
+        scores[str(path)] = float(torch.nn.functional.cosine_similarity(
+            speaker.flatten().float(), target, dim=0
+        ))
+    return scores
+
+
+def _child(args, *extra: str) -> Dict:
+    cmd = [
+        sys.executable, "-m", "benchmarks.bench_xtts_cpu",
+        "--voice-id", args.voice_id,
+        "--voices-dir", args.voices_dir,
+        "--language", args.language,
+        "--repeat", str(args.repeat),
+        "--num-threads", str(args.num_threads),
+        "--interop-threads", str(args.interop_threads),
+        "--out-dir", args.out_dir,
+        *extra,
+    ]
+    if args.model_path:
+        cmd += ["--model-path", args.model_path]
+    output = subprocess.run(cmd, check=True, capture_output=True, text=True).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+
+def render_report(runs: List[Dict], scores: Dict[str, float]) -> str:
+    """生成 Markdown 报告"""
+    baseline = next((run for run in runs if run["mode"] == "baseline"), runs[0])
+    baseline_audio = sum(r["audio_seconds"] for r in baseline["results"])
+    baseline_seconds = sum(r["seconds"] for r in baseline["results"])
+
+    lines = [
+        "| 模式 | 线程 | 平均耗时 (s) | RTF | 相对 baseline 加速 | 说话人相似度 | 时长比 |",
+        "|------|------|--------------|-----|--------------------|--------------|--------|",
+    ]
+    for run in runs:
+        results = run["results"]
+        seconds = sum(r["seconds"] for r in results)
+        audio = sum(r["audio_seconds"] for r in results)
+        similarity = sum(scores[r["path"]] for r in results) / len(results)
+        lines.append(
+            f"| {run['mode']} | {run['threads']}/{run['interop_threads']} "
+            f"| {seconds / len(results):.2f} | {seconds / audio:.2f} "
+            f"| {baseline_seconds / seconds:.2f}x | {similarity:.3f} | {audio / baseline_audio:.2f} |"
+        )
+    return "\n".join(lines) + "\n"
+
+
+def main():
+    parser = argparse.ArgumentParser(description="XTTS CPU performance mode comparison")
+    parser.add_argument("--voice-id", required=True, help="使用的音色 ID")
+    parser.add_argument("--voices-dir", default="./voices", help="音色存储目录")
+    parser.add_argument("--model-path", default="", help="XTTS 模型目录")
+    parser.add_argument("--language", default="zh", choices=sorted(SENTENCES), help="测试语言")
+    parser.add_argument("--modes", default=",".join(MODES), help="逗号分隔的模式列表")
+    parser.add_argument("--repeat", type=int, default=3, help="每句重复次数")
+    parser.add_argument("--num-threads", type=int, default=0, help="调优模式的 intra-op 线程数（0 表示自动）")
+    parser.add_argument("--interop-threads", type=int, default=1, help="调优模式的 inter-op 线程数")
+    parser.add_argument("--output", default="", help="报告输出文件（Markdown）")
+    parser.add_argument("--out-dir", default="", help=argparse.SUPPRESS)
+    parser.add_argument("--run-mode", default="", help=argparse.SUPPRESS)
+    parser.add_argument("--score", action="store_true", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    # 子进程
+    if args.run_mode:
+        print(json.dumps(run_mode(args)))
+        return
+    if args.score:
+        print(json.dumps(score(args)))
+        return
+
+    modes = [mode.strip() for mode in args.modes.split(",") if mode.strip()]
+    unknown = [mode for mode in modes if mode not in MODES]
+    if unknown:
+        raise SystemExit(f"Unknown modes: {', '.join(unknown)}")
+
+    with tempfile.TemporaryDirectory(prefix="xtts-cpu-") as out_dir:
+        args.out_dir = out_dir
+        runs = []
+        for mode in modes:
+            print(f"running {mode} ...", file=sys.stderr)
+            runs.append(_child(args, "--run-mode", mode))
+        print("scoring ...", file=sys.stderr)
+        scores = _child(args, "--score")
+
+    report = (
+        f"XTTS CPU 性能模式对比（{os.cpu_count()} 核，语言 {args.language}，"
+        f"{len(SENTENCES[args.language])} 句 × {args.repeat} 次）\n\n"
+        + render_report(runs, scores)
+    )
+    print(report)
+    if args.output:
+        Path(args.output).write_text(report, encoding="utf-8")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,219 @@
+"""
+音频编解码
+
+各引擎统一使用的 NumPy 音频工具:
+- 输入为浮点（取值 [-1, 1]）或 int16 数组，一维为单声道，二维为 (帧数, 声道数)
+- encode_wav 预先分配整个 WAV 缓冲区，文件头用 struct.pack_into 写入，
+  PCM 由 NumPy 直接写进缓冲区，返回 memoryview，不再经过 BytesIO 和额外拷贝；
+  HTTP 响应边界处转为 bytes（部分 Starlette 版本的 Response 只接受 bytes / str）
+- encode_pcm 输出裸 16-bit PCM，输入已是小端 int16 时零拷贝
+- wav_duration 按文件头计算 WAV 时长（容量估计使用）
+- resample / normalize_loudness 为整段向量化运算
+"""
+
+import struct
+from typing import Optional, Union
+
+import numpy as np
+
+WAV_HEADER_SIZE = 44
+PCM16_MAX = 32767
+
+# 引擎返回的音频数据（encode_wav / encode_pcm 返回 memoryview）
+AudioData = Union[bytes, memoryview]
+
+# 流式 WAV 的 RIFF / data 块长度（总长度未知）
+_UNKNOWN_SIZE = 0xFFFFFFFF
+_HEADER = struct.Struct("<4sI4s4sIHHIIHH4sI")
+
+
+def _pack_header(
+    buffer,
+    sample_rate: int,
+    channels: int,
+    sample_width: int,
+    data_size: int,
+    offset: int = 0,
+):
+    riff_size = _UNKNOWN_SIZE if data_size == _UNKNOWN_SIZE else 36 + data_size
+    _HEADER.pack_into(
+        buffer, offset,
+        b"RIFF", riff_size, b"WAVE",
+        b"fmt ", 16, 1, channels, sample_rate,
+        sample_rate * channels * sample_width, channels * sample_width, sample_width * 8,
+        b"data", data_size,
+    )
+
+
+def wav_header(
+    sample_rate: int,
+    channels: int = 1,
+    sample_width: int = 2,
+    data_size: Optional[int] = None,
+) -> bytes:
+    """
+    PCM WAV 文件头
+
+    Args:
+        sample_rate: 采样率
+        channels: 声道数
+        sample_width: 每个采样的字节数
+        data_size: PCM 数据字节数（None 表示流式输出，长度按惯例填 0xFFFFFFFF）
+
+    Returns:
+        44 字节 WAV 头
+    """
+    buffer = bytearray(WAV_HEADER_SIZE)
+    _pack_header(buffer, sample_rate, channels, sample_width,
+                 _UNKNOWN_SIZE if data_size is None else data_size)
+    return bytes(buffer)
+
+
+def wav_duration(data) -> float:
+    """
+    PCM WAV 的时长
+
+    按文件头的字节率和 data 块长度计算；流式 WAV（长度未知）按实际数据长度计算。
+
+    Args:
+        data: WAV 数据（bytes / bytearray / memoryview）
+
+    Returns:
+        时长（秒），不是标准 44 字节头的 WAV 时为 0
+    """
+    if len(data) < WAV_HEADER_SIZE:
+        return 0.0
+    riff, _, wave, _, _, _, _, _, byte_rate, _, _, tag, data_size = _HEADER.unpack_from(data, 0)
+    if riff != b"RIFF" or wave != b"WAVE" or tag != b"data" or byte_rate == 0:
+        return 0.0
+    return min(data_size, len(data) - WAV_HEADER_SIZE) / byte_rate
+
+
+def _channels(samples: np.ndarray) -> int:
+    if samples.ndim == 1:
+        return 1
+    if samples.ndim == 2:
+        return samples.shape[1]
+    raise ValueError(f"Expected 1-D or 2-D audio array, got {samples.ndim}-D")
+
+
+def _write_pcm16(samples: np.ndarray, out: np.ndarray):
+    """将采样写入 int16 输出数组（浮点截断到 [-1, 1] 后缩放）"""
+    if samples.dtype == np.int16:
+        out[:] = samples.reshape(-1)
+    else:
+        np.multiply(np.clip(samples.reshape(-1), -1.0, 1.0), PCM16_MAX, out=out, casting="unsafe")
+
+
+def encode_wav(samples, sample_rate: int) -> memoryview:
+    """
+    编码为 16-bit PCM WAV
+
+    Args:
+        samples: 浮点或 int16 数组
+        sample_rate: 采样率
+
+    Returns:
+        WAV 数据（预分配缓冲区上的 memoryview）
+    """
+    samples = np.asarray(samples)
+    channels = _channels(samples)
+    data_size = samples.size * 2
+
+    buffer = bytearray(WAV_HEADER_SIZE + data_size)
+    _pack_header(buffer, sample_rate, channels, 2, data_size)
+    _write_pcm16(samples, np.frombuffer(buffer, dtype="<i2", offset=WAV_HEADER_SIZE))
+    return memoryview(buffer)
+
+
+def encode_pcm(samples) -> memoryview:
+    """
+    编码为裸 16-bit 小端 PCM
+
+    Args:
+        samples: 浮点或 int16 数组
+
+    Returns:
+        PCM 数据（输入为连续的小端 int16 时直接引用输入内存）
+    """
+    samples = np.asarray(samples)
+    if samples.dtype == np.dtype("<i2") and samples.flags.c_contiguous:
+        return memoryview(samples).cast("B")
+
+    buffer = bytearray(samples.size * 2)
+    _write_pcm16(samples, np.frombuffer(buffer, dtype="<i2"))
+    return memoryview(buffer)
+
+
+def decode_pcm16(data) -> np.ndarray:
+    """
+    将 16-bit PCM 解码为 [-1, 1] 的 float32 数组
+
+    Args:
+        data: 裸 PCM 字节（bytes / bytearray / memoryview）
+
+    Returns:
+        float32 数组
+    """
+    return np.frombuffer(data, dtype="<i2").astype(np.float32) / PCM16_MAX
+
+
+def resample(samples, orig_sr: int, target_sr: int) -> np.ndarray:
+    """
+    重采样（频域截断/补零，带限）
+
+    对整段音频做一次 rfft/irfft，降采样时自然滤除新奈奎斯特频率以上的分量。
+
+    Args:
+        samples: 浮点或 int16 数组（沿第 0 维为时间）
+        orig_sr: 原采样率
+        target_sr: 目标采样率
+
+    Returns:
+        float32 数组（int16 输入先缩放到 [-1, 1]）
+    """
+    samples = np.asarray(samples)
+    if samples.dtype == np.int16:
+        samples = samples.astype(np.float32) / PCM16_MAX
+    if orig_sr == target_sr or samples.shape[0] == 0:
+        return samples.astype(np.float32, copy=False)
+
+    n_in = samples.shape[0]
+    n_out = max(1, int(round(n_in * target_sr / orig_sr)))
+    spectrum = np.fft.rfft(samples, axis=0)
+    bins = n_out // 2 + 1
+    if spectrum.shape[0] >= bins:
+        spectrum = spectrum[:bins]
+    else:
+        pad = [(0, bins - spectrum.shape[0])] + [(0, 0)] * (samples.ndim - 1)
+        spectrum = np.pad(spectrum, pad)
+    out = np.fft.irfft(spectrum, n=n_out, axis=0) * (n_out / n_in)
+    return out.astype(np.float32)
+
+
+def normalize_loudness(samples, target_dbfs: float = -20.0, max_peak: float = 0.99) -> np.ndarray:
+    """
+    按 RMS 响度归一化，并限制峰值不超过 max_peak
+
+    Args:
+        samples: 浮点或 int16 数组
+        target_dbfs: 目标 RMS 电平（dBFS）
+        max_peak: 归一化后允许的最大峰值
+
+    Returns:
+        float32 数组（静音输入原样返回）
+    """
+    samples = np.asarray(samples)
+    if samples.dtype == np.int16:
+        samples = samples.astype(np.float32) / PCM16_MAX
+    else:
+        samples = samples.astype(np.float32, copy=False)
+
+    rms = float(np.sqrt(np.mean(np.square(samples, dtype=np.float64)))) if samples.size else 0.0
+    if rms == 0.0:
+        return samples
+
+    gain = 10 ** (target_dbfs / 20) / rms
+    peak = float(np.max(np.abs(samples)))
+    gain = min(gain, max_peak / peak)
+    return samples * np.float32(gain)
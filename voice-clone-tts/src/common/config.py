@@ -0,0 +1,73 @@
+"""
+配置文件读取
+
+读取 config.yaml，命令行参数未指定时以配置文件中的值作为默认值。
+"""
+
+import os
+import logging
+from pathlib import Path
+from typing import Any, Dict, Optional
+
+import yaml
+
+from .exceptions import ConfigurationError
+
+logger = logging.getLogger(__name__)
+
+# 默认配置文件: 环境变量 TTS_CONFIG，否则为当前目录下的 config.yaml
+DEFAULT_CONFIG_PATH = "config.yaml"
+
+
+def load_config(path: Optional[str] = None) -> Dict[str, Any]:
+    """
+    读取配置文件
+
+    Args:
+        path: 配置文件路径（不指定则使用 TTS_CONFIG 或 ./config.yaml）
+
+    Returns:
+        配置字典，默认配置文件不存在时返回空字典
+
+    Raises:
+        ConfigurationError: 显式指定的文件不存在或格式错误
+    """
+    explicit = path is not None
+    config_path = Path(path or os.environ.get("TTS_CONFIG", DEFAULT_CONFIG_PATH))
+
+    if not config_path.exists():
+        if explicit:
+            raise ConfigurationError(f"Config file not found: {config_path}")
+        return {}
+
+    try:
+        with open(config_path, "r", encoding="utf-8") as f:
+            data = yaml.safe_load(f) or {}
+    except yaml.YAMLError as e:
+        raise ConfigurationError(f"Invalid config file {config_path}: {e}")
+
+    if not isinstance(data, dict):
+        raise ConfigurationError(f"Invalid config file {config_path}: top level must be a mapping")
+
+    logger.debug(f"Loaded config from {config_path}")
+    return data
+
+
+def get_config_value(config: Dict[str, Any], key: str, default: Any = None) -> Any:
+    """
+    按点分路径读取配置项
+
+    Args:
+        config: 配置字典
+        key: 点分路径，如 "performance.batch_size"
+        default: 配置项不存在时的默认值
+
+    Returns:
+        配置值
+    """
+    value: Any = config
+    for part in key.split("."):
+        if not isinstance(value, dict) or part not in value:
+            return default
+        value = value[part]
+    return default if value is None else value
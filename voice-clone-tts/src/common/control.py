@@ -0,0 +1,124 @@
+"""
+网关与工作节点的控制通道协议
+
+每个节点与网关保持一条 WebSocket 连接（/api/nodes/{node_id}/control），帧为 JSON 文本，
+type 字段区分:
+- hello（节点 -> 网关）: 连接后的第一帧，node 为 NodeInfo，网关据此注册节点。
+  配置了节点令牌时附带 ts（Unix 秒）和 sig（令牌对 node_id、ts 的 HMAC-SHA256）；
+  网关配置了节点令牌时只接受签名正确的 hello，未配置时不允许未签名的 hello 接管仍在活动的连接
+- hb（节点 -> 网关）: 心跳，m 为与上一帧相比有变化的 NodeMetrics 字段；full 为 true 时 m 是完整指标。
+  状态变化时节点立即发送一帧，不等下一个心跳周期
+- command（网关 -> 节点）: 控制命令（command、params），id 用于匹配结果
+- result（节点 -> 网关）: 命令结果，成功时为 result（节点 /command 接口的返回值），异常时为 error。
+  stop 命令先回复结果再断开连接
+- resync（网关 -> 节点）: 网关没有该节点（如已被注销），节点重新发送 hello 和完整指标
+
+通道不可用时节点和网关退回到 HTTP 心跳与 /command 接口。命令帧发出后才断开的连接不会触发
+HTTP 重发（节点可能已经执行了该命令），以失败结束。
+"""
+
+import hmac
+import json
+import time
+import hashlib
+from typing import Any, Dict, Optional
+
+HELLO = "hello"
+HEARTBEAT = "hb"
+COMMAND = "command"
+RESULT = "result"
+RESYNC = "resync"
+
+# 不随心跳帧发送的指标字段（网关收到后自行填写）
+LOCAL_FIELDS = frozenset({"node_id", "timestamp"})
+
+# hello 签名的有效期（秒，同时容忍节点与网关之间的时钟偏差）
+HELLO_SIGNATURE_TTL = 60.0
+
+
+class CommandNotSentError(ConnectionError):
+    """命令帧没有发出（节点未连接或发送失败），可以改用 HTTP 发送"""
+
+
+def control_url(gateway_url: str, node_id: str) -> str:
+    """
+    节点连接控制通道的地址
+
+    Args:
+        gateway_url: 网关 HTTP 地址（http:// 或 https://）
+        node_id: 节点 ID
+
+    Returns:
+        ws:// 或 wss:// 地址
+    """
+    base = gateway_url.rstrip("/")
+    if base.startswith("https://"):
+        base = "wss://" + base[len("https://"):]
+    elif base.startswith("http://"):
+        base = "ws://" + base[len("http://"):]
+    return f"{base}/api/nodes/{node_id}/control"
+
+
+def diff_metrics(current: Dict[str, Any], previous: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    心跳帧内容: current 中与 previous 不同的字段（不含 LOCAL_FIELDS）
+
+    Args:
+        current: 当前指标（NodeMetrics.model_dump(mode="json")）
+        previous: 上一帧之后网关持有的指标（为空时返回完整指标）
+
+    Returns:
+        变化的字段
+    """
+    return {
+        key: value for key, value in current.items()
+        if key not in LOCAL_FIELDS and (key not in previous or previous[key] != value)
+    }
+
+
+def sign_hello(token: str, node_id: str, timestamp: float) -> str:
+    """
+    hello 帧签名
+
+    Args:
+        token: 节点令牌（网关与节点共享）
+        node_id: 节点 ID
+        timestamp: 签名时间（Unix 秒）
+
+    Returns:
+        HMAC-SHA256 十六进制摘要
+    """
+    message = f"hello\n{node_id}\n{timestamp:.3f}".encode("utf-8")
+    return hmac.new(token.encode("utf-8"), message, hashlib.sha256).hexdigest()
+
+
+def verify_hello(token: str, frame: Dict[str, Any], node_id: str, now: Optional[float] = None) -> bool:
+    """
+    校验 hello 帧签名
+
+    Args:
+        token: 网关配置的节点令牌（为空时总是返回 False）
+        frame: hello 帧
+        node_id: 连接路径中的节点 ID
+        now: 当前时间（测试用）
+
+    Returns:
+        签名正确且未过期时为 True
+    """
+    signature = frame.get("sig")
+    if not token or not isinstance(signature, str):
+        return False
+    try:
+        timestamp = float(frame.get("ts"))
+    except (TypeError, ValueError):
+        return False
+    now = time.time() if now is None else now
+    if abs(now - timestamp) > HELLO_SIGNATURE_TTL:
+        return False
+    expected = sign_hello(token, node_id, timestamp)
+    return hmac.compare_digest(expected.encode("utf-8"), signature.encode("utf-8"))
+
+
+def encode_frame(frame: Dict[str, Any]) -> str:
+    """编码为紧凑 JSON 文本"""
+    return json.dumps(frame, separators=(",", ":"), ensure_ascii=False)
@@ -51,8 +51,9 @@ class VoiceNotFoundError(VoiceCloneError):
 
 class RateLimitExceededError(VoiceCloneError):
     """超出限流"""
-    def __init__(self, message: str = "Rate limit exceeded"):
+    def __init__(self, message: str = "Rate limit exceeded", retry_after: float = 0.0):
         super().__init__(message, code="RATE_LIMIT_EXCEEDED")
+        self.retry_after = retry_after  # 建议的重试等待时间（秒），0 表示未知
 
 
 class RequestTimeoutError(VoiceCloneError):
@@ -77,3 +78,18 @@ class ConfigurationError(VoiceCloneError):
     """配置错误"""
     def __init__(self, message: str):
         super().__init__(message, code="CONFIG_ERROR")
+
+
+class ProfilerBusyError(VoiceCloneError):
+    """已有分析会话在运行"""
+    def __init__(self, message: str = "A profiling session is already running"):
+        super().__init__(message, code="PROFILER_BUSY")
+
+
+class QueueFullError(VoiceCloneError):
+    """推理队列已满"""
+    def __init__(self, max_queue_size: int = 0, retry_after: float = 0.0):
+        message = f"Inference queue is full ({max_queue_size})" if max_queue_size else "Inference queue is full"
+        super().__init__(message, code="QUEUE_FULL")
+        self.max_queue_size = max_queue_size
+        self.retry_after = retry_after  # 按当前处理速度估算的排空时间（秒）
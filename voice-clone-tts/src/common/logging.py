@@ -19,6 +19,8 @@ from logging.handlers import RotatingFileHandler
 from typing import Optional, Dict, Any
 from contextvars import ContextVar
 
+from .tracing import start_trace, record_span
+
 # 请求追踪 ID
 request_id_var: ContextVar[str] = ContextVar("request_id", default="")
 
@@ -216,42 +218,86 @@ class LogContext:
 
 
 class RequestLogMiddleware:
-    """FastAPI 请求日志中间件"""
+    """
+    请求日志 ASGI 中间件
+
+    - 为每个请求设置请求 ID（沿用上游传入的 X-Request-ID）
+    - 为每个请求创建追踪记录，各阶段耗时通过 Server-Timing 响应头返回
+    - 在响应头中返回 X-Request-ID
+    - 记录访问日志（方法、路径、状态码、耗时、阶段耗时），按采样率写入 span 文件
+    """
 
-    def __init__(self, app):
+    REQUEST_ID_HEADER = b"x-request-id"
+    SERVER_TIMING_HEADER = b"server-timing"
+
+    def __init__(self, app, skip_paths=("/health", "/api/health"), service: str = ""):
+        """
+        初始化请求日志中间件
+
+        Args:
+            app: 下游 ASGI 应用
+            skip_paths: 不记录访问日志的路径
+            service: 服务名（写入 span 记录，如 "gateway"、"xtts"）
+        """
         self.app = app
+        self.service = service
         self.logger = get_logger("request")
+        # 健康检查等高频路径不记录访问日志
+        self._skip_paths = frozenset(skip_paths)
 
     async def __call__(self, scope, receive, send):
         if scope["type"] != "http":
             await self.app(scope, receive, send)
             return
 
-        import time
-
-        request_id = generate_request_id()
+        request_id = ""
+        for name, value in scope.get("headers", ()):
+            if name == self.REQUEST_ID_HEADER:
+                request_id = value.decode("latin-1")
+                break
+        if not request_id:
+            request_id = generate_request_id()
         set_request_id(request_id)
+        trace = start_trace(request_id)
 
-        start_time = time.time()
         method = scope.get("method", "")
         path = scope.get("path", "")
+        log_access = path not in self._skip_paths
 
         # 记录请求
-        self.logger.info(f"→ {method} {path}")
+        if log_access:
+            self.logger.info(f"→ {method} {path}")
 
         # 捕获响应状态
         status_code = 500
+        request_id_header = (self.REQUEST_ID_HEADER, request_id.encode("latin-1"))
 
         async def send_wrapper(message):
             nonlocal status_code
             if message["type"] == "http.response.start":
                 status_code = message["status"]
+                # 响应头发出时各阶段已完成（流式响应的后续阶段不计入）
+                message["headers"] = list(message.get("headers", ())) + [
+                    request_id_header,
+                    (self.SERVER_TIMING_HEADER, trace.server_timing().encode("latin-1")),
+                ]
             await send(message)
 
         try:
             await self.app(scope, receive, send_wrapper)
         finally:
-            elapsed = (time.time() - start_time) * 1000
-            self.logger.info(
-                f"← {method} {path} {status_code} ({elapsed:.2f}ms)"
-            )
+            if log_access:
+                elapsed = trace.elapsed_ms
+                stages = " ".join(f"{k}={v:.1f}" for k, v in trace.stages.items())
+                self.logger.info(
+                    f"← {method} {path} {status_code} ({elapsed:.2f}ms)"
+                    + (f" [{stages}]" if stages else ""),
+                    extra={"extra_data": {
+                        "method": method,
+                        "path": path,
+                        "status": status_code,
+                        "duration_ms": round(elapsed, 3),
+                        "stages": trace.stages,
+                    }},
+                )
+                record_span(trace, method, path, status_code, self.service)
@@ -0,0 +1,168 @@
+"""
+事件循环阻塞检测
+
+可选启用的事件循环监控:
+- 探测任务按固定周期 sleep，实际唤醒时间与预期之差即调度延迟（loop lag）
+- 看门狗线程在探测任务超时未唤醒时，通过 sys._current_frames() 抓取事件循环线程
+  当前的调用栈，定位阻塞事件循环的同步调用
+- 延迟写入直方图，阻塞次数写入计数器，阻塞栈写入 WARNING 日志
+
+未启用时不创建任何任务和线程，没有额外开销。
+"""
+
+import sys
+import time
+import asyncio
+import logging
+import threading
+import traceback
+from typing import Optional, Dict, Any
+
+from .metrics import MetricsRegistry
+
+logger = logging.getLogger(__name__)
+
+# 调度延迟桶（秒）
+LOOP_LAG_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0)
+
+
+class LoopMonitor:
+    """事件循环阻塞监控"""
+
+    def __init__(
+        self,
+        block_threshold: float = 0.1,
+        interval: float = 0.05,
+        registry: Optional[MetricsRegistry] = None,
+        metric_prefix: str = "tts",
+        max_stack_depth: int = 30,
+    ):
+        """
+        初始化监控
+
+        Args:
+            block_threshold: 判定为阻塞的调度延迟（秒）
+            interval: 探测周期（秒）
+            registry: 指标注册表（不指定则只记录日志和内部统计）
+            metric_prefix: 指标名前缀
+            max_stack_depth: 阻塞栈保留的最大帧数
+        """
+        self.block_threshold = block_threshold
+        self.interval = interval
+        self.max_stack_depth = max_stack_depth
+
+        self._lag_metric = None
+        self._blocked_metric = None
+        if registry is not None:
+            self._lag_metric = registry.histogram(
+                f"{metric_prefix}_event_loop_lag_seconds",
+                "Event loop scheduling lag",
+                buckets=LOOP_LAG_BUCKETS,
+            )
+            self._blocked_metric = registry.counter(
+                f"{metric_prefix}_event_loop_blocked_total",
+                "Times the event loop was blocked longer than the threshold",
+            )
+
+        # 统计
+        self.blocked_count = 0
+        self.max_lag_ms = 0.0
+        self.last_block: Optional[Dict[str, Any]] = None
+
+        # 探测任务写入、看门狗线程读取
+        self._expected_wake = 0.0
+        self._stall_reported = False
+
+        self._loop_thread_id: Optional[int] = None
+        self._task: Optional[asyncio.Task] = None
+        self._watchdog: Optional[threading.Thread] = None
+        self._stop_event = threading.Event()
+
+    # ===================== 生命周期 =====================
+
+    def start(self):
+        """在当前事件循环中启动监控"""
+        if self._task is not None and not self._task.done():
+            return
+
+        self._loop_thread_id = threading.get_ident()
+        self._expected_wake = time.monotonic() + self.interval
+        self._stop_event.clear()
+        self._task = asyncio.get_running_loop().create_task(self._probe())
+        self._watchdog = threading.Thread(
+            target=self._watch, name="loop-watchdog", daemon=True
+        )
+        self._watchdog.start()
+        logger.info(
+            f"Event loop monitor started (threshold {self.block_threshold * 1000:.0f}ms)"
+        )
+
+    async def stop(self):
+        """停止监控"""
+        self._stop_event.set()
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        if self._watchdog is not None:
+            self._watchdog.join(timeout=1.0)
+            self._watchdog = None
+
+    # ===================== 探测 =====================
+
+    async def _probe(self):
+        while True:
+            self._expected_wake = time.monotonic() + self.interval
+            self._stall_reported = False
+            await asyncio.sleep(self.interval)
+
+            lag = max(0.0, time.monotonic() - self._expected_wake)
+            if self._lag_metric is not None:
+                self._lag_metric.observe(lag)
+            lag_ms = lag * 1000
+            if lag_ms > self.max_lag_ms:
+                self.max_lag_ms = lag_ms
+
+            if lag >= self.block_threshold:
+                self.blocked_count += 1
+                if self._blocked_metric is not None:
+                    self._blocked_metric.inc()
+                if self.last_block is not None and self._stall_reported:
+                    self.last_block["duration_ms"] = round(lag_ms, 1)
+                logger.warning(f"Event loop blocked for {lag_ms:.0f}ms")
+
+    def _watch(self):
+        """看门狗线程: 事件循环超时未唤醒时抓取其调用栈"""
+        check_interval = max(0.005, self.block_threshold / 4)
+        while not self._stop_event.wait(check_interval):
+            overdue = time.monotonic() - self._expected_wake
+            if overdue < self.block_threshold or self._stall_reported:
+                continue
+
+            frame = sys._current_frames().get(self._loop_thread_id)
+            if frame is None:
+                continue
+            stack = "".join(traceback.format_stack(frame, limit=self.max_stack_depth))
+            self._stall_reported = True
+            self.last_block = {
+                "timestamp": time.time(),
+                "duration_ms": round(overdue * 1000, 1),
+                "stack": stack,
+            }
+            logger.warning(
+                f"Event loop blocked for over {overdue * 1000:.0f}ms, loop thread stack:\n{stack}"
+            )
+
+    # ===================== 读取 =====================
+
+    def stats(self) -> Dict[str, Any]:
+        """监控统计"""
+        return {
+            "block_threshold_ms": self.block_threshold * 1000,
+            "blocked_count": self.blocked_count,
+            "max_lag_ms": round(self.max_lag_ms, 1),
+            "last_block": self.last_block,
+        }
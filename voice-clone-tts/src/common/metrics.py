@@ -0,0 +1,402 @@
+"""
+Prometheus 指标
+
+提供 Counter / Gauge / Histogram 三种指标及文本格式（0.0.4）输出。
+
+设计要点:
+- 每组标签值对应一个子指标，首次出现时创建并缓存，之后只做字典查找
+- 直方图的桶边界在创建时固定，观测只做一次二分查找和两次加法
+- 请求路径上不加锁: 指标只在事件循环线程中更新，
+  少量来自线程池的更新在 GIL 下可能丢失个别计数，对统计用途可以接受
+
+另提供 RollingHistogram，在固定内存内统计最近 N 分钟的分位数，
+供工作节点随心跳上报。
+"""
+
+import math
+import time
+from bisect import bisect_left
+from typing import Callable, Dict, List, Optional, Sequence, Tuple
+
+# 默认延迟桶（秒），覆盖从毫秒级接口到长文本合成
+DEFAULT_LATENCY_BUCKETS = (
+    0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0,
+)
+
+
+def _format_value(value: float) -> str:
+    if value == math.inf:
+        return "+Inf"
+    if value == int(value) and abs(value) < 1e15:
+        return str(int(value))
+    return repr(float(value))
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(names: Sequence[str], values: Sequence[str], extra: str = "") -> str:
+    parts = [f'{name}="{_escape(str(value))}"' for name, value in zip(names, values)]
+    if extra:
+        parts.append(extra)
+    return "{" + ",".join(parts) + "}" if parts else ""
+
+
+class _Metric:
+    """指标基类（管理标签子指标）"""
+
+    type_name = ""
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._children: Dict[Tuple[str, ...], object] = {}
+        if not self.labelnames:
+            self._children[()] = self._new_child()
+
+    def _new_child(self):
+        raise NotImplementedError
+
+    def labels(self, *values: str):
+        """
+        获取标签值对应的子指标
+
+        Args:
+            *values: 按 labelnames 顺序给出的标签值
+
+        Returns:
+            子指标（可缓存后重复使用）
+        """
+        child = self._children.get(values)
+        if child is None:
+            if len(values) != len(self.labelnames):
+                raise ValueError(f"{self.name} expects labels {self.labelnames}")
+            child = self._children[values] = self._new_child()
+        return child
+
+    def _samples(self) -> List[str]:
+        raise NotImplementedError
+
+    def render(self) -> str:
+        """输出该指标的文本格式"""
+        lines = [
+            f"# HELP {self.name} {self.documentation}",
+            f"# TYPE {self.name} {self.type_name}",
+        ]
+        lines.extend(self._samples())
+        return "\n".join(lines)
+
+
+class _CounterChild:
+    __slots__ = ("value",)
+
+    def __init__(self):
+        self.value = 0.0
+
+    def inc(self, amount: float = 1.0):
+        self.value += amount
+
+
+class Counter(_Metric):
+    """
+    单调递增计数器
+
+    可以直接 inc()，也可以提供 collect 回调在输出时读取累计值（如节点上报的计数），
+    回调返回 {标签值元组: 数值}。
+    """
+
+    type_name = "counter"
+
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        labelnames: Sequence[str] = (),
+        collect: Optional[Callable[[], Dict[Tuple[str, ...], float]]] = None,
+    ):
+        super().__init__(name, documentation, labelnames)
+        self._collect = collect
+
+    def _new_child(self):
+        return _CounterChild()
+
+    def inc(self, amount: float = 1.0):
+        """无标签计数器加一"""
+        self._children[()].value += amount
+
+    def _samples(self) -> List[str]:
+        if self._collect is not None:
+            items = self._collect().items()
+        else:
+            items = ((values, child.value) for values, child in self._children.items())
+        return [
+            f"{self.name}{_format_labels(self.labelnames, values)} {_format_value(value)}"
+            for values, value in items
+        ]
+
+
+class _GaugeChild:
+    __slots__ = ("value",)
+
+    def __init__(self):
+        self.value = 0.0
+
+    def set(self, value: float):
+        self.value = value
+
+    def inc(self, amount: float = 1.0):
+        self.value += amount
+
+    def dec(self, amount: float = 1.0):
+        self.value -= amount
+
+
+class Gauge(_Metric):
+    """
+    瞬时值
+
+    可以直接 set()，也可以提供 collect 回调在输出时计算取值，
+    回调返回 {标签值元组: 数值}。
+    """
+
+    type_name = "gauge"
+
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        labelnames: Sequence[str] = (),
+        collect: Optional[Callable[[], Dict[Tuple[str, ...], float]]] = None,
+    ):
+        super().__init__(name, documentation, labelnames)
+        self._collect = collect
+
+    def _new_child(self):
+        return _GaugeChild()
+
+    def set(self, value: float):
+        """设置无标签瞬时值"""
+        self._children[()].value = value
+
+    def _samples(self) -> List[str]:
+        if self._collect is not None:
+            items = self._collect().items()
+        else:
+            items = ((values, child.value) for values, child in self._children.items())
+        return [
+            f"{self.name}{_format_labels(self.labelnames, values)} {_format_value(value)}"
+            for values, value in items
+        ]
+
+
+class _HistogramChild:
+    __slots__ = ("bounds", "counts", "sum")
+
+    def __init__(self, bounds: Tuple[float, ...]):
+        self.bounds = bounds
+        # 最后一个桶为 +Inf
+        self.counts = [0] * (len(bounds) + 1)
+        self.sum = 0.0
+
+    def observe(self, value: float):
+        self.counts[bisect_left(self.bounds, value)] += 1
+        self.sum += value
+
+
+class Histogram(_Metric):
+    """固定桶直方图"""
+
+    type_name = "histogram"
+
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        labelnames: Sequence[str] = (),
+        buckets: Sequence[float] = DEFAULT_LATENCY_BUCKETS,
+    ):
+        self.buckets = tuple(sorted(float(b) for b in buckets if b != math.inf))
+        super().__init__(name, documentation, labelnames)
+
+    def _new_child(self):
+        return _HistogramChild(self.buckets)
+
+    def observe(self, value: float):
+        """无标签直方图记录一次观测"""
+        self._children[()].observe(value)
+
+    def _samples(self) -> List[str]:
+        lines = []
+        bounds = self.buckets + (math.inf,)
+        for values, child in self._children.items():
+            cumulative = 0
+            for bound, count in zip(bounds, child.counts):
+                cumulative += count
+                le = f'le="{_format_value(bound)}"'
+                lines.append(
+                    f"{self.name}_bucket{_format_labels(self.labelnames, values, le)} {cumulative}"
+                )
+            labels = _format_labels(self.labelnames, values)
+            lines.append(f"{self.name}_sum{labels} {_format_value(child.sum)}")
+            lines.append(f"{self.name}_count{labels} {cumulative}")
+        return lines
+
+
+class MetricsRegistry:
+    """指标注册表"""
+
+    CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+    def __init__(self):
+        self._metrics: Dict[str, _Metric] = {}
+
+    def _register(self, metric: _Metric) -> _Metric:
+        if metric.name in self._metrics:
+            raise ValueError(f"Duplicate metric: {metric.name}")
+        self._metrics[metric.name] = metric
+        return metric
+
+    def counter(
+        self,
+        name: str,
+        documentation: str,
+        labelnames: Sequence[str] = (),
+        collect: Optional[Callable[[], Dict[Tuple[str, ...], float]]] = None,
+    ) -> Counter:
+        """创建计数器"""
+        return self._register(Counter(name, documentation, labelnames, collect))
+
+    def gauge(
+        self,
+        name: str,
+        documentation: str,
+        labelnames: Sequence[str] = (),
+        collect: Optional[Callable[[], Dict[Tuple[str, ...], float]]] = None,
+    ) -> Gauge:
+        """创建瞬时值"""
+        return self._register(Gauge(name, documentation, labelnames, collect))
+
+    def histogram(
+        self,
+        name: str,
+        documentation: str,
+        labelnames: Sequence[str] = (),
+        buckets: Sequence[float] = DEFAULT_LATENCY_BUCKETS,
+    ) -> Histogram:
+        """创建直方图"""
+        return self._register(Histogram(name, documentation, labelnames, buckets))
+
+    def render(self) -> str:
+        """输出全部指标的文本格式"""
+        return "\n".join(metric.render() for metric in self._metrics.values()) + "\n"
+
+
+class RollingHistogram:
+    """
+    滚动窗口直方图
+
+    按时间槽（默认每分钟一个）划分的对数桶直方图，只保留最近 slot_count 个槽，
+    内存固定为 slot_count × 桶数 个整数。分位数取所在桶的几何中点，
+    相对误差不超过 (growth - 1) / 2。
+    """
+
+    def __init__(
+        self,
+        window_seconds: float = 300.0,
+        slot_seconds: float = 60.0,
+        min_value: float = 1.0,
+        max_value: float = 600_000.0,
+        growth: float = 1.1,
+    ):
+        """
+        初始化滚动直方图
+
+        Args:
+            window_seconds: 统计窗口（秒）
+            slot_seconds: 每个时间槽的长度（秒）
+            min_value: 最小可区分的值（小于它的归入第一个桶）
+            max_value: 最大可区分的值（大于它的归入溢出桶）
+            growth: 相邻桶边界的比例
+        """
+        self.slot_seconds = slot_seconds
+        self.slot_count = max(1, int(math.ceil(window_seconds / slot_seconds)))
+
+        bounds = []
+        bound = min_value
+        while bound < max_value:
+            bounds.append(bound)
+            bound *= growth
+        bounds.append(max_value)
+        self._bounds = tuple(bounds)
+
+        bucket_count = len(bounds) + 1
+        self._counts = [[0] * bucket_count for _ in range(self.slot_count)]
+        self._slot_ids = [-1] * self.slot_count
+
+    def _slot(self, now: float) -> List[int]:
+        slot_id = int(now // self.slot_seconds)
+        index = slot_id % self.slot_count
+        counts = self._counts[index]
+        if self._slot_ids[index] != slot_id:
+            # 槽位已过期，原地清零复用
+            for i in range(len(counts)):
+                counts[i] = 0
+            self._slot_ids[index] = slot_id
+        return counts
+
+    def observe(self, value: float, now: Optional[float] = None):
+        """
+        记录一次观测
+
+        Args:
+            value: 观测值（如响应时间毫秒数）
+            now: 当前时间（测试用）
+        """
+        counts = self._slot(time.time() if now is None else now)
+        counts[bisect_left(self._bounds, value)] += 1
+
+    def _merged(self, now: float) -> List[int]:
+        current = int(now // self.slot_seconds)
+        merged = [0] * (len(self._bounds) + 1)
+        for slot_id, counts in zip(self._slot_ids, self._counts):
+            if current - self.slot_count < slot_id <= current:
+                for i, count in enumerate(counts):
+                    if count:
+                        merged[i] += count
+        return merged
+
+    def _bucket_value(self, index: int) -> float:
+        if index == 0:
+            return self._bounds[0]
+        if index >= len(self._bounds):
+            return self._bounds[-1]
+        return math.sqrt(self._bounds[index - 1] * self._bounds[index])
+
+    def quantiles(self, qs: Sequence[float], now: Optional[float] = None) -> Tuple[int, List[float]]:
+        """
+        计算窗口内的分位数
+
+        Args:
+            qs: 分位点（0~1）
+            now: 当前时间（测试用）
+
+        Returns:
+            (窗口内观测数, 各分位数，无数据时为 0)
+        """
+        merged = self._merged(time.time() if now is None else now)
+        total = sum(merged)
+        if total == 0:
+            return 0, [0.0] * len(qs)
+
+        results = []
+        for q in qs:
+            rank = max(1, math.ceil(q * total))
+            cumulative = 0
+            for index, count in enumerate(merged):
+                cumulative += count
+                if cumulative >= rank:
+                    results.append(self._bucket_value(index))
+                    break
+        return total, results
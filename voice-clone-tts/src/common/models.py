@@ -26,8 +26,10 @@ class WorkerStatus(str, Enum):
     """工作节点状态"""
     STANDBY = "standby"      # 待机（模型未加载）
     LOADING = "loading"      # 加载中
+    WARMING = "warming"      # 预热中（模型已加载，网关不路由）
     READY = "ready"          # 就绪（可接受请求）
     BUSY = "busy"            # 繁忙
+    DRAINING = "draining"    # 排空中（处理进行中的请求，网关不路由）
     ERROR = "error"          # 错误
     OFFLINE = "offline"      # 离线
 
@@ -59,12 +61,33 @@ class NodeInfo(BaseModel):
     memory_percent: float = 0.0
     gpu_percent: float = 0.0
     gpu_memory_percent: float = 0.0
+    process_rss_mb: float = 0.0  # 节点进程常驻内存（心跳上报）
 
     # 统计信息
     request_count: int = 0
     error_count: int = 0
     avg_response_time: float = 0.0
     current_concurrent: int = 0
+    queue_size: int = 0
+
+    # 最近窗口内的响应时间分位数（毫秒，节点心跳上报）
+    p50_response_time: float = 0.0
+    p95_response_time: float = 0.0
+    p99_response_time: float = 0.0
+
+    # 合成速度（节点心跳上报）: 语言 -> {chars_per_second, rtf}，以及节点容量（单路字符/秒 × 推理并发数）
+    capacity: Dict[str, Dict[str, float]] = Field(default_factory=dict)
+    capacity_chars_per_second: float = 0.0
+
+    # 音色嵌入缓存命中 / 未命中累计次数（节点心跳上报）
+    embedding_cache_hits: int = 0
+    embedding_cache_misses: int = 0
+
+    # 慢启动: 最近一次变为可用的时间、之后被选中的次数，
+    # 以及当前的路由权重（0~1，慢启动进度与相对容量的乘积）
+    ready_since: float = 0.0
+    ready_requests: int = 0
+    weight: float = 1.0
 
     @property
     def address(self) -> str:
@@ -89,19 +112,41 @@ class NodeMetrics(BaseModel):
     gpu_percent: float = 0.0
     gpu_memory_percent: float = 0.0
     gpu_memory_used_mb: float = 0.0
+    process_rss_mb: float = 0.0
+    loop_lag_ms: float = 0.0
+    loop_blocked_count: int = 0  # 事件循环阻塞次数（启用阻塞检测时）
 
     # 业务指标
     status: WorkerStatus = WorkerStatus.OFFLINE
+    model_loaded: Optional[bool] = None  # None 表示未上报（旧版本节点）
     current_concurrent: int = 0
     queue_size: int = 0
     request_count: int = 0
     error_count: int = 0
     avg_response_time_ms: float = 0.0
+    # 最近窗口内的响应时间分位数
+    p50_response_time_ms: float = 0.0
+    p95_response_time_ms: float = 0.0
+    p99_response_time_ms: float = 0.0
+    # 流式合成首块耗时分位数
+    p50_first_chunk_ms: float = 0.0
+    p95_first_chunk_ms: float = 0.0
+    # 音色嵌入缓存
+    embedding_cache_hits: int = 0
+    embedding_cache_misses: int = 0
+    embedding_cache_entries: int = 0
+    # 最近一次激活的预热耗时（秒，未预热为 0）
+    warmup_seconds: float = 0.0
+    # 最近一次激活（加载模型到就绪）的总耗时（秒）
+    activation_seconds: float = 0.0
+    # 合成速度: 语言 -> {chars_per_second, rtf}；节点容量（字符/秒，未估计为 0）
+    capacity: Dict[str, Dict[str, float]] = Field(default_factory=dict)
+    capacity_chars_per_second: float = 0.0
 
 
 class NodeCommand(BaseModel):
     """节点控制命令"""
-    command: str  # start, stop, load_model, unload_model, activate, standby
+    command: str  # start, stop, load_model, unload_model, activate, standby, drain, reload, profile
     params: Dict[str, Any] = {}
 
 
@@ -120,6 +165,12 @@ class SynthesizeRequest(BaseModel):
     pitch: float = Field(default=1.0, ge=0.5, le=2.0)
 
 
+class SynthesizeStreamRequest(SynthesizeRequest):
+    """流式语音合成请求"""
+    output_format: str = Field(default="wav", pattern="^(wav|pcm)$")  # pcm: 16-bit 单声道小端
+    chunk_size: int = Field(default=20, ge=1, le=400)  # 每块生成的 token 数，越小首块越快
+
+
 class SynthesizeResponse(BaseModel):
     """语音合成响应"""
     success: bool
@@ -202,12 +253,33 @@ class SystemConfig(BaseModel):
     ip_rpm: int = 100  # 单 IP 每分钟请求数
     concurrent_limit: int = 50  # 并发限制
 
+    # 成本配额（按合成字符数和估算音频秒数，0 表示不限制）
+    ip_chars_per_minute: int = 20000  # 单 IP 每分钟字符数
+    ip_audio_seconds_per_minute: float = 3600.0  # 单 IP 每分钟音频秒数
+    key_chars_per_minute: int = 100000  # 单 API Key 每分钟字符数
+    key_audio_seconds_per_minute: float = 18000.0  # 单 API Key 每分钟音频秒数
+    # 允许按 Key 计算配额的 API Key（X-API-Key 请求头），为空则只按 IP 计算
+    api_keys: List[str] = []
+
+    # 限流计数后端: memory（单进程）, shared（同主机多网关进程共享）
+    rate_limit_backend: str = "memory"
+    rate_limit_shared_path: str = ""  # 共享计数文件，留空使用系统临时目录
+
     # 默认设置
     default_engine: EngineType = EngineType.XTTS
 
     # 日志级别
     log_level: str = "INFO"
 
+    # 事件循环阻塞检测阈值（毫秒，0 表示不启用）
+    loop_block_threshold_ms: float = 0.0
+
+    # 管理令牌（X-Admin-Token，为空则禁用性能分析等管理接口）
+    admin_token: str = ""
+
+    # 节点令牌（网关与节点共享，控制通道 hello 帧须用它签名，为空则不校验）
+    node_token: str = ""
+
     # 心跳配置
     heartbeat_interval: int = 10  # 秒
     dead_threshold: int = 30  # 超时阈值
@@ -215,6 +287,27 @@ class SystemConfig(BaseModel):
     # WebSocket 配置
     ws_broadcast_interval: float = 2.0  # 状态广播间隔（秒）
 
+    # 自动扩缩: 按负载激活待机节点、让空闲节点待机
+    autoscale_enabled: bool = False
+    autoscale_interval: float = 10.0            # 决策周期（秒）
+    autoscale_min_ready: int = 1                # 每个引擎至少保持就绪的节点数
+    autoscale_scale_up_load: float = 2.0        # 就绪节点平均负载（进行中 + 排队）超过该值时激活一个节点
+    autoscale_scale_down_load: float = 0.5      # 平均负载低于该值持续 scale_down_delay 后待机一个节点
+    autoscale_latency_p95_ms: float = 0.0       # 就绪节点 p95 超过该值时激活（0 表示不按延迟）
+    autoscale_scale_up_cooldown: float = 60.0   # 同一引擎两次扩缩动作后再次激活的最短间隔（秒）
+    autoscale_scale_down_cooldown: float = 300.0  # 同一引擎两次扩缩动作后再次待机的最短间隔（秒）
+    autoscale_scale_down_delay: float = 300.0   # 低负载持续多久才待机（秒）
+    autoscale_host_memory_mb: float = 0.0       # 每台主机可用于常驻模型的内存（MB，0 表示不限制）
+    # 各引擎模型常驻内存估计（MB，已有就绪节点上报 RSS 时以实测值为准）
+    autoscale_model_memory_mb: Dict[str, float] = {"xtts": 4096.0, "openvoice": 2048.0, "gpt-sovits": 256.0}
+
+    # 慢启动: 节点注册或重新变为可用后，路由权重从 slow_start_min_weight 逐步升到 1
+    slow_start_seconds: float = 30.0   # 按时间爬升的时长（0 表示不按时间）
+    slow_start_requests: int = 0       # 按请求数爬升的请求数（0 表示不按请求数）
+    slow_start_min_weight: float = 0.1 # 初始权重
+    # 按节点上报的容量（字符/秒）分配请求: 权重 = 节点容量 / 同引擎可用节点的最大容量
+    capacity_routing: bool = True
+
     # 超时配置（秒）
     request_timeout: float = 60.0      # API 请求超时
     batch_timeout: float = 120.0       # 批量请求超时
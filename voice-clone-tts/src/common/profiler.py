@@ -0,0 +1,406 @@
+"""
+按需采样分析
+
+在运行中的网关或工作节点上启动限时的采样分析，无需重启进程:
+- 采样线程按固定周期读取 sys._current_frames()，覆盖事件循环线程、
+  run_in_executor 的线程池线程和推理线程
+- 墙钟（wall）: 每个样本计 1 次，反映各线程时间花在哪里（包括等待）
+- CPU（cpu）: 按线程 CPU 时钟（pthread_getcpuclockid）在两次采样间的增量加权，
+  只反映真正占用 CPU 的调用栈
+- 输出 collapsed 格式（可直接用 flamegraph.pl / speedscope 生成火焰图）
+  或 pstats 格式（可用 pstats / snakeviz 查看）
+
+开销控制:
+- 时长上限 MAX_DURATION，采样周期下限 MIN_INTERVAL，栈深度上限 max_stack_depth
+- 单次采样耗时超过周期的 max_overhead 时自动拉长周期
+- 同一进程同时只允许一个分析会话
+"""
+
+import sys
+import hmac
+import time
+import hashlib
+import base64
+import marshal
+import asyncio
+import logging
+import threading
+from collections import defaultdict
+from dataclasses import dataclass
+from typing import Any, Dict, Optional, Tuple
+
+from .exceptions import InvalidRequestError, ProfilerBusyError
+
+logger = logging.getLogger(__name__)
+
+PROFILE_MODES = ("wall", "cpu")
+PROFILE_FORMATS = ("collapsed", "pstats")
+
+# 单次会话时长上限（秒）
+MAX_DURATION = 300.0
+# 采样周期下限（秒）
+MIN_INTERVAL = 0.001
+
+# (文件名, 函数首行号, 函数名)，与 pstats 的函数键一致
+FrameKey = Tuple[str, int, str]
+
+
+def verify_admin_token(expected: str, provided: Optional[str]) -> bool:
+    """
+    校验管理令牌
+
+    Args:
+        expected: 配置的令牌（为空表示未启用管理接口）
+        provided: 请求携带的令牌
+
+    Returns:
+        是否通过
+    """
+    if not expected or not provided:
+        return False
+    return hmac.compare_digest(expected.encode("utf-8"), provided.encode("utf-8"))
+
+
+# 节点命令签名的有效期（秒，同时容忍网关与节点之间的时钟偏差）
+COMMAND_SIGNATURE_TTL = 60.0
+
+
+def sign_command(token: str, node_id: str, command: str, timestamp: float) -> str:
+    """
+    用管理令牌为节点命令签名（令牌本身不随命令发送）
+
+    Args:
+        token: 管理令牌
+        node_id: 目标节点 ID
+        command: 命令名
+        timestamp: 签名时间（Unix 秒）
+
+    Returns:
+        HMAC-SHA256 十六进制摘要
+    """
+    message = f"{node_id}\n{command}\n{timestamp:.3f}".encode("utf-8")
+    return hmac.new(token.encode("utf-8"), message, hashlib.sha256).hexdigest()
+
+
+def verify_command_signature(
+    token: str,
+    node_id: str,
+    command: str,
+    timestamp: Any,
+    signature: Optional[str],
+    now: Optional[float] = None,
+) -> bool:
+    """
+    校验节点命令签名
+
+    Args:
+        token: 本节点配置的管理令牌（为空表示未启用管理命令）
+        node_id: 本节点 ID
+        command: 命令名
+        timestamp: 命令携带的签名时间
+        signature: 命令携带的签名
+        now: 当前时间（测试用）
+
+    Returns:
+        签名正确且未过期时为 True
+    """
+    if not token or not signature:
+        return False
+    try:
+        timestamp = float(timestamp)
+    except (TypeError, ValueError):
+        return False
+    now = time.time() if now is None else now
+    if abs(now - timestamp) > COMMAND_SIGNATURE_TTL:
+        return False
+    expected = sign_command(token, node_id, command, timestamp)
+    return hmac.compare_digest(expected.encode("utf-8"), signature.encode("utf-8"))
+
+
+def _thread_cpu_time(ident: int) -> Optional[float]:
+    """读取指定线程的 CPU 时间（秒），平台不支持时返回 None"""
+    try:
+        return time.clock_gettime(time.pthread_getcpuclockid(ident))
+    except (AttributeError, OSError, OverflowError):
+        return None
+
+
+class SamplingProfiler:
+    """多线程采样分析器"""
+
+    def __init__(
+        self,
+        interval: float = 0.01,
+        max_stack_depth: int = 64,
+        max_overhead: float = 0.05,
+    ):
+        """
+        初始化分析器
+
+        Args:
+            interval: 采样周期（秒）
+            max_stack_depth: 每个样本保留的最大帧数（保留靠近栈顶的帧）
+            max_overhead: 采样耗时占周期的最大比例，超出时拉长周期
+        """
+        self.interval = max(MIN_INTERVAL, interval)
+        self.max_stack_depth = max_stack_depth
+        self.max_overhead = max_overhead
+
+        # (线程名, 帧...) -> 样本数 / CPU 秒
+        self._wall: Dict[tuple, int] = defaultdict(int)
+        self._cpu: Dict[tuple, float] = defaultdict(float)
+        self._last_cpu: Dict[int, float] = {}
+
+        self.sample_count = 0
+        self.sampling_time = 0.0
+        self.started_at = 0.0
+        self.elapsed = 0.0
+
+        self._thread: Optional[threading.Thread] = None
+        self._stop_event = threading.Event()
+
+    # ===================== 生命周期 =====================
+
+    def start(self):
+        """启动采样线程"""
+        self._stop_event.clear()
+        self.started_at = time.perf_counter()
+        self._thread = threading.Thread(target=self._run, name="sampling-profiler", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        """停止采样"""
+        self._stop_event.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+        self.elapsed = time.perf_counter() - self.started_at
+
+    # ===================== 采样 =====================
+
+    def _stack(self, frame) -> Tuple[FrameKey, ...]:
+        """从栈底到栈顶的帧序列"""
+        frames = []
+        while frame is not None and len(frames) < self.max_stack_depth:
+            code = frame.f_code
+            frames.append((code.co_filename, code.co_firstlineno, code.co_name))
+            frame = frame.f_back
+        frames.reverse()
+        return tuple(frames)
+
+    def sample(self):
+        """采集一次所有线程的调用栈"""
+        own = threading.get_ident()
+        names = {thread.ident: thread.name for thread in threading.enumerate()}
+        frames = sys._current_frames()
+        try:
+            for ident, frame in frames.items():
+                if ident == own:
+                    continue
+                key = (names.get(ident, f"thread-{ident}"),) + self._stack(frame)
+                self._wall[key] += 1
+
+                cpu = _thread_cpu_time(ident)
+                if cpu is None:
+                    continue
+                prev = self._last_cpu.get(ident)
+                self._last_cpu[ident] = cpu
+                if prev is not None and cpu > prev:
+                    self._cpu[key] += cpu - prev
+        finally:
+            # 不持有其他线程的帧引用
+            del frames
+        self.sample_count += 1
+
+    def _run(self):
+        wait = self.interval
+        while not self._stop_event.wait(wait):
+            start = time.perf_counter()
+            try:
+                self.sample()
+            except Exception as e:
+                logger.debug(f"Profiler sample failed: {e}")
+            cost = time.perf_counter() - start
+            self.sampling_time += cost
+            # 采样越慢周期越长，开销比例不超过 max_overhead
+            wait = max(self.interval, cost / self.max_overhead - cost)
+
+    # ===================== 输出 =====================
+
+    def _weights(self, mode: str) -> Dict[tuple, float]:
+        if mode == "cpu":
+            return self._cpu
+        # 墙钟: 样本数 × 平均采样周期
+        period = self.elapsed / self.sample_count if self.sample_count else self.interval
+        return {key: count * period for key, count in self._wall.items()}
+
+    def collapsed(self, mode: str = "wall") -> str:
+        """
+        collapsed 格式: 每行 "线程;帧;帧... 数值"
+
+        wall 模式数值为样本数，cpu 模式为 CPU 微秒数。
+        """
+        if mode == "cpu":
+            items = ((key, int(round(value * 1_000_000))) for key, value in self._cpu.items())
+        else:
+            items = self._wall.items()
+
+        lines = []
+        for key, value in items:
+            if value <= 0:
+                continue
+            frames = [key[0]] + [f"{name} ({filename}:{lineno})" for filename, lineno, name in key[1:]]
+            lines.append(f"{';'.join(frames)} {value}")
+        lines.sort()
+        return "\n".join(lines) + ("\n" if lines else "")
+
+    def pstats(self, mode: str = "wall") -> bytes:
+        """
+        pstats 格式（marshal 序列化，可用 pstats.Stats(文件路径) 加载）
+
+        调用次数记为包含该函数的样本栈数，自身/累计时间按样本权重折算为秒。
+        """
+        # func -> [cc, nc, tt, ct, {caller: [nc, cc, tt, ct]}]
+        stats: Dict[FrameKey, list] = {}
+        for key, weight in self._weights(mode).items():
+            frames = key[1:]
+            if not frames or weight <= 0:
+                continue
+            seen = set()
+            for index, func in enumerate(frames):
+                entry = stats.get(func)
+                if entry is None:
+                    entry = stats[func] = [0, 0, 0.0, 0.0, {}]
+                is_leaf = index == len(frames) - 1
+                if is_leaf:
+                    entry[2] += weight
+                # 递归时累计时间只计一次
+                if func not in seen:
+                    seen.add(func)
+                    entry[0] += 1
+                    entry[1] += 1
+                    entry[3] += weight
+                if index > 0:
+                    caller = entry[4].setdefault(frames[index - 1], [0, 0, 0.0, 0.0])
+                    caller[0] += 1
+                    caller[1] += 1
+                    caller[2] += weight if is_leaf else 0.0
+                    caller[3] += weight
+
+        return marshal.dumps({
+            func: (cc, nc, tt, ct, {caller: tuple(values) for caller, values in callers.items()})
+            for func, (cc, nc, tt, ct, callers) in stats.items()
+        })
+
+
+@dataclass
+class ProfileResult:
+    """分析结果"""
+    mode: str
+    format: str
+    data: bytes
+    duration: float
+    interval: float
+    samples: int
+    overhead: float  # 采样耗时 / 会话时长
+
+    @property
+    def media_type(self) -> str:
+        return "text/plain; charset=utf-8" if self.format == "collapsed" else "application/octet-stream"
+
+    @property
+    def filename(self) -> str:
+        return f"profile-{self.mode}.{'txt' if self.format == 'collapsed' else 'pstats'}"
+
+    def to_dict(self) -> Dict:
+        """转换为可 JSON 序列化的字典（data 以 base64 编码）"""
+        return {
+            "mode": self.mode,
+            "format": self.format,
+            "data": base64.b64encode(self.data).decode("ascii"),
+            "duration": round(self.duration, 3),
+            "interval": self.interval,
+            "samples": self.samples,
+            "overhead": round(self.overhead, 4),
+        }
+
+    @classmethod
+    def from_dict(cls, data: Dict) -> "ProfileResult":
+        """从 to_dict() 的输出还原"""
+        return cls(
+            mode=data["mode"],
+            format=data["format"],
+            data=base64.b64decode(data["data"]),
+            duration=data["duration"],
+            interval=data["interval"],
+            samples=data["samples"],
+            overhead=data["overhead"],
+        )
+
+
+# 进程内同时只允许一个会话
+_session_lock = threading.Lock()
+
+
+def profiling_active() -> bool:
+    """当前是否有分析会话在运行"""
+    return _session_lock.locked()
+
+
+async def run_profile(
+    duration: float = 10.0,
+    mode: str = "wall",
+    format: str = "collapsed",
+    interval: float = 0.01,
+) -> ProfileResult:
+    """
+    运行一次限时采样分析
+
+    Args:
+        duration: 分析时长（秒，不超过 MAX_DURATION）
+        mode: wall（墙钟）或 cpu
+        format: collapsed 或 pstats
+        interval: 采样周期（秒，不小于 MIN_INTERVAL）
+
+    Returns:
+        分析结果
+
+    Raises:
+        InvalidRequestError: 参数无效
+        ProfilerBusyError: 已有会话在运行
+    """
+    if mode not in PROFILE_MODES:
+        raise InvalidRequestError(f"Unknown profile mode: {mode}")
+    if format not in PROFILE_FORMATS:
+        raise InvalidRequestError(f"Unknown profile format: {format}")
+    if not 0 < duration <= MAX_DURATION:
+        raise InvalidRequestError(f"Profile duration must be in (0, {MAX_DURATION:.0f}] seconds")
+
+    if not _session_lock.acquire(blocking=False):
+        raise ProfilerBusyError()
+
+    profiler = SamplingProfiler(interval=interval)
+    try:
+        logger.info(f"Profiling started: mode={mode}, duration={duration}s, interval={profiler.interval}s")
+        profiler.start()
+        try:
+            await asyncio.sleep(duration)
+        finally:
+            profiler.stop()
+
+        data = profiler.collapsed(mode).encode("utf-8") if format == "collapsed" else profiler.pstats(mode)
+        result = ProfileResult(
+            mode=mode,
+            format=format,
+            data=data,
+            duration=profiler.elapsed,
+            interval=profiler.interval,
+            samples=profiler.sample_count,
+            overhead=profiler.sampling_time / profiler.elapsed if profiler.elapsed else 0.0,
+        )
+        logger.info(
+            f"Profiling finished: {result.samples} samples, overhead {result.overhead * 100:.2f}%"
+        )
+        return result
+    finally:
+        _session_lock.release()
@@ -0,0 +1,233 @@
+"""
+请求链路追踪
+
+为每个请求记录各阶段耗时（单调时钟），支持:
+- 通过 Server-Timing 响应头返回阶段耗时
+- 网关合并工作节点返回的阶段（加 "worker-" 前缀）
+- 按采样率将完整链路写入本地 JSONL 文件，供离线分析
+
+阶段通过 trace_stage() 记录；当前请求没有追踪上下文时为空操作，
+因此引擎代码可以无条件调用。
+"""
+
+import json
+import time
+import queue
+import random
+import asyncio
+import logging
+import threading
+import functools
+import contextvars
+from pathlib import Path
+from contextlib import contextmanager
+from typing import Optional, Dict, Any, Callable
+
+logger = logging.getLogger(__name__)
+
+# 当前请求的追踪上下文
+trace_var: contextvars.ContextVar[Optional["RequestTrace"]] = contextvars.ContextVar(
+    "request_trace", default=None
+)
+
+
+class RequestTrace:
+    """单个请求的追踪记录"""
+
+    __slots__ = ("request_id", "start_time", "start_wall", "stages")
+
+    def __init__(self, request_id: str):
+        """
+        初始化追踪记录
+
+        Args:
+            request_id: 请求 ID
+        """
+        self.request_id = request_id
+        self.start_time = time.perf_counter()
+        self.start_wall = time.time()
+        # 阶段名 -> 耗时（毫秒），同名阶段累加
+        self.stages: Dict[str, float] = {}
+
+    def add(self, name: str, duration_ms: float):
+        """记录阶段耗时（毫秒）"""
+        self.stages[name] = self.stages.get(name, 0.0) + duration_ms
+
+    def merge(self, stages: Dict[str, float], prefix: str = ""):
+        """合并下游返回的阶段耗时"""
+        for name, duration_ms in stages.items():
+            self.add(prefix + name, duration_ms)
+
+    @property
+    def elapsed_ms(self) -> float:
+        """从请求开始到现在的耗时（毫秒）"""
+        return (time.perf_counter() - self.start_time) * 1000
+
+    def server_timing(self) -> str:
+        """生成 Server-Timing 响应头的值（末尾附加 total）"""
+        parts = [f"{name};dur={duration:.2f}" for name, duration in self.stages.items()]
+        parts.append(f"total;dur={self.elapsed_ms:.2f}")
+        return ", ".join(parts)
+
+
+def start_trace(request_id: str) -> RequestTrace:
+    """为当前上下文创建追踪记录"""
+    trace = RequestTrace(request_id)
+    trace_var.set(trace)
+    return trace
+
+
+def current_trace() -> Optional[RequestTrace]:
+    """获取当前上下文的追踪记录"""
+    return trace_var.get()
+
+
+@contextmanager
+def trace_stage(name: str):
+    """
+    记录一个阶段的耗时
+
+    Args:
+        name: 阶段名（Server-Timing 指标名，不含空格和逗号）
+    """
+    trace = trace_var.get()
+    if trace is None:
+        yield
+        return
+
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        trace.add(name, (time.perf_counter() - start) * 1000)
+
+
+async def run_in_executor(func: Callable, *args) -> Any:
+    """
+    在默认线程池中执行同步函数，并携带当前上下文
+
+    loop.run_in_executor 不会复制 contextvars，线程内的 trace_stage
+    和日志请求 ID 都会丢失；这里显式复制上下文后再执行。
+    """
+    loop = asyncio.get_running_loop()
+    ctx = contextvars.copy_context()
+    return await loop.run_in_executor(None, functools.partial(ctx.run, func, *args))
+
+
+def parse_server_timing(header: str) -> Dict[str, float]:
+    """
+    解析 Server-Timing 响应头
+
+    Args:
+        header: 形如 "inference;dur=812.40, encode;dur=3.10" 的字符串
+
+    Returns:
+        阶段名 -> 耗时（毫秒），无 dur 的指标被忽略
+    """
+    stages = {}
+    for metric in header.split(","):
+        name, _, params = metric.strip().partition(";")
+        if not name:
+            continue
+        for param in params.split(";"):
+            key, _, value = param.strip().partition("=")
+            if key == "dur":
+                try:
+                    stages[name] = float(value)
+                except ValueError:
+                    pass
+                break
+    return stages
+
+
+class SpanWriter:
+    """
+    采样链路写入器
+
+    链路记录先放入有界队列，由后台线程写入 JSONL 文件，
+    请求路径上不做文件 IO；队列满时直接丢弃。
+    """
+
+    def __init__(self, path: str, sample_rate: float = 0.01, max_queue: int = 10000):
+        """
+        初始化写入器
+
+        Args:
+            path: JSONL 文件路径
+            sample_rate: 采样率（0~1，错误请求始终记录）
+            max_queue: 待写队列上限
+        """
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.sample_rate = sample_rate
+        self.dropped = 0
+
+        self._queue: "queue.Queue[Optional[Dict[str, Any]]]" = queue.Queue(maxsize=max_queue)
+        self._thread = threading.Thread(target=self._run, name="span-writer", daemon=True)
+        self._thread.start()
+
+    def should_sample(self, status_code: int) -> bool:
+        """是否记录该请求"""
+        return status_code >= 500 or random.random() < self.sample_rate
+
+    def submit(self, span: Dict[str, Any]):
+        """提交一条链路记录（非阻塞）"""
+        try:
+            self._queue.put_nowait(span)
+        except queue.Full:
+            self.dropped += 1
+
+    def _run(self):
+        with open(self.path, "a", encoding="utf-8") as f:
+            while True:
+                span = self._queue.get()
+                if span is None:
+                    break
+                f.write(json.dumps(span, ensure_ascii=False) + "\n")
+                # 队列空闲时再刷盘，突发流量下合并写入
+                if self._queue.empty():
+                    f.flush()
+
+    def close(self, timeout: float = 5.0):
+        """写完剩余记录并停止后台线程"""
+        self._queue.put(None)
+        self._thread.join(timeout)
+
+
+_span_writer: Optional[SpanWriter] = None
+
+
+def setup_tracing(span_file: Optional[str] = None, sample_rate: float = 0.01) -> None:
+    """
+    配置链路采样输出
+
+    Args:
+        span_file: JSONL 文件路径（None 表示不写文件，仅返回响应头和日志）
+        sample_rate: 采样率（0~1）
+    """
+    global _span_writer
+    if _span_writer is not None:
+        _span_writer.close()
+        _span_writer = None
+
+    if span_file:
+        _span_writer = SpanWriter(span_file, sample_rate)
+        logger.info(f"Trace spans: {span_file} (sample rate {sample_rate})")
+
+
+def record_span(trace: RequestTrace, method: str, path: str, status_code: int, service: str = ""):
+    """按采样率将请求链路提交到 span 文件"""
+    writer = _span_writer
+    if writer is None or not writer.should_sample(status_code):
+        return
+
+    writer.submit({
+        "request_id": trace.request_id,
+        "service": service,
+        "method": method,
+        "path": path,
+        "status": status_code,
+        "start": trace.start_wall,
+        "duration_ms": round(trace.elapsed_ms, 3),
+        "stages": {name: round(duration, 3) for name, duration in trace.stages.items()},
+    })
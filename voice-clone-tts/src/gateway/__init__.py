@@ -1,6 +1,8 @@
 """网关模块"""
 from .registry import ServiceRegistry
 from .limiter import RateLimiter
+from .autoscaler import Autoscaler, ScalingDecision
+from .control import ControlChannelManager
 from .websocket import (
     ConnectionManager,
     StatusBroadcaster,
@@ -12,6 +14,9 @@ from .websocket import (
 __all__ = [
     "ServiceRegistry",
     "RateLimiter",
+    "Autoscaler",
+    "ScalingDecision",
+    "ControlChannelManager",
     "ConnectionManager",
     "StatusBroadcaster",
     "WebSocketEvent",
@@ -8,7 +8,7 @@ import os
 import time
 import logging
 import asyncio
-from typing import Optional, List
+from typing import Optional, List, Dict, Tuple
 from contextlib import asynccontextmanager
 
 from fastapi import FastAPI, Request, Response, HTTPException, UploadFile, File, Form, WebSocket
@@ -24,6 +24,7 @@ from ..common.models import (
     WorkerStatus,
     EngineType,
     SynthesizeRequest,
+    SynthesizeStreamRequest,
     SynthesizeResponse,
     ExtractVoiceRequest,
     ExtractVoiceResponse,
@@ -41,9 +42,19 @@ from ..common.exceptions import (
     NoAvailableNodeError,
     NodeNotFoundError,
     RateLimitExceededError,
+    ProfilerBusyError,
 )
+from ..common.logging import RequestLogMiddleware, get_request_id
+from ..common.tracing import trace_stage, current_trace, parse_server_timing
+from ..common.loop_monitor import LoopMonitor
+from ..common.profiler import ProfileResult, run_profile, sign_command, verify_admin_token
 from .registry import ServiceRegistry
-from .limiter import RateLimiter
+from .autoscaler import Autoscaler
+from .control import ControlChannelManager
+from .limiter import RateLimiter, estimate_audio_seconds
+from .shared_counter import SharedCounterStore
+from .middleware import RateLimitMiddleware, rate_limit_response
+from .metrics import GatewayMetrics, MetricsMiddleware
 from .websocket import ConnectionManager, StatusBroadcaster, websocket_endpoint
 
 logger = logging.getLogger(__name__)
@@ -53,6 +64,85 @@ TEMPLATE_DIR = os.path.join(os.path.dirname(__file__), "..", "web", "templates")
 STATIC_DIR = os.path.join(os.path.dirname(__file__), "..", "web", "static")
 
 
+def _client_ip(request: Request) -> str:
+    """获取客户端 IP"""
+    return request.client.host if request.client else "unknown"
+
+
+def _quota_headers(quota: dict) -> dict:
+    """将剩余成本配额转换为响应头"""
+    headers = {}
+    if "chars" in quota:
+        headers["X-RateLimit-Remaining-Chars"] = str(int(quota["chars"]))
+    if "audio_seconds" in quota:
+        headers["X-RateLimit-Remaining-Audio-Seconds"] = f"{quota['audio_seconds']:.1f}"
+    return headers
+
+
+def _request_cost(request: Request, text_length: int, language: str, speed: float = 1.0) -> dict:
+    """consume_cost / refund_cost 的参数（同一请求扣减和退还时必须一致）"""
+    return {
+        "client_ip": _client_ip(request),
+        "text_length": text_length,
+        "audio_seconds": estimate_audio_seconds(text_length, language, speed),
+        "api_key": request.headers.get("X-API-Key"),
+    }
+
+
+def _upstream_headers() -> dict:
+    """转发到工作节点时携带的请求头（传递请求 ID）"""
+    request_id = get_request_id()
+    return {"X-Request-ID": request_id} if request_id else {}
+
+
+def _profile_response(result: ProfileResult) -> Response:
+    """分析结果以原始格式返回（collapsed 文本或 pstats 文件）"""
+    return Response(
+        content=result.data,
+        media_type=result.media_type,
+        headers={
+            "Content-Disposition": f'attachment; filename="{result.filename}"',
+            "X-Profile-Samples": str(result.samples),
+            "X-Profile-Overhead": f"{result.overhead:.4f}",
+        },
+    )
+
+
+def _node_busy_response(resp: httpx.Response) -> JSONResponse:
+    """节点队列已满且无法换节点时返回 429，透传节点估算的 Retry-After"""
+    headers = {}
+    if "Retry-After" in resp.headers:
+        headers["Retry-After"] = resp.headers["Retry-After"]
+    return JSONResponse(
+        status_code=429,
+        content={"error": "All nodes are busy", "code": "QUEUE_FULL"},
+        headers=headers,
+    )
+
+
+# 节点返回的错误码 -> 网关响应状态码
+_PROFILE_ERROR_STATUS = {"AUTH_ERROR": 403, "PROFILER_BUSY": 409}
+
+
+def _merge_worker_timing(resp: httpx.Response) -> Dict[str, float]:
+    """
+    将工作节点返回的 Server-Timing 合并到当前链路（加 worker- 前缀）
+
+    Returns:
+        工作节点的阶段耗时（毫秒）
+    """
+    header = resp.headers.get("Server-Timing")
+    if not header:
+        return {}
+    stages = parse_server_timing(header)
+    trace = current_trace()
+    if trace is not None:
+        # 工作节点总耗时单独记录，upstream 与其差值即网络和排队开销
+        for name, duration in stages.items():
+            trace.add(f"worker-{name}", duration)
+    return stages
+
+
 class GatewayApp:
     """网关应用"""
 
@@ -78,15 +168,57 @@ class GatewayApp:
         self.registry = ServiceRegistry(
             heartbeat_interval=self.config.heartbeat_interval,
             dead_threshold=self.config.dead_threshold,
+            slow_start_seconds=self.config.slow_start_seconds,
+            slow_start_requests=self.config.slow_start_requests,
+            slow_start_min_weight=self.config.slow_start_min_weight,
+            capacity_routing=self.config.capacity_routing,
         )
 
         # 限流器
+        shared_store = None
+        if self.config.rate_limit_backend == "shared":
+            shared_store = SharedCounterStore(self.config.rate_limit_shared_path or None)
+
         self.limiter = RateLimiter(
             global_rpm=self.config.global_rpm,
             ip_rpm=self.config.ip_rpm,
             concurrent_limit=self.config.concurrent_limit,
+            ip_chars_per_minute=self.config.ip_chars_per_minute,
+            ip_audio_seconds_per_minute=self.config.ip_audio_seconds_per_minute,
+            key_chars_per_minute=self.config.key_chars_per_minute,
+            key_audio_seconds_per_minute=self.config.key_audio_seconds_per_minute,
+            api_keys=self.config.api_keys,
+            shared_store=shared_store,
         )
 
+        # Prometheus 指标
+        self.metrics = GatewayMetrics(self.registry, self.limiter)
+
+        # 事件循环阻塞检测（可选）
+        self.loop_monitor: Optional[LoopMonitor] = None
+        if self.config.loop_block_threshold_ms > 0:
+            self.loop_monitor = LoopMonitor(
+                block_threshold=self.config.loop_block_threshold_ms / 1000,
+                registry=self.metrics.registry,
+                metric_prefix="tts_gateway",
+            )
+
+        # 节点控制通道（心跳、状态变更和命令走同一条 WebSocket，未连接的节点使用 HTTP）
+        self.control = ControlChannelManager(
+            self.registry,
+            node_token=self.config.node_token,
+            takeover_after=self.config.dead_threshold,
+        )
+        self.registry.control = self.control
+        self.metrics.registry.gauge(
+            "tts_gateway_control_channels",
+            "Worker nodes connected over the control channel",
+            collect=lambda: {(): self.control.connection_count},
+        )
+
+        # 自动扩缩（按负载激活 / 待机节点）
+        self.autoscaler = Autoscaler(self.registry, self.config, self.metrics)
+
         # WebSocket 连接管理
         self.ws_manager = ConnectionManager()
         self.ws_broadcaster = StatusBroadcaster(
@@ -109,12 +241,22 @@ class GatewayApp:
 
         @asynccontextmanager
         async def lifespan(app: FastAPI):
+            if self.loop_monitor:
+                self.loop_monitor.start()
             await self.registry.start_health_check()
+            await self.limiter.start_cleanup()
             await self.ws_broadcaster.start()
+            if self.config.autoscale_enabled:
+                await self.autoscaler.start()
             logger.info(f"Gateway started on {self.host}:{self.port}")
             yield
+            await self.autoscaler.stop()
+            await self.control.close_all()
             await self.ws_broadcaster.stop()
+            await self.limiter.stop_cleanup()
             await self.registry.stop_health_check()
+            if self.loop_monitor:
+                await self.loop_monitor.stop()
             logger.info("Gateway stopped")
 
         app = FastAPI(
@@ -128,33 +270,14 @@ class GatewayApp:
         if os.path.exists(STATIC_DIR):
             app.mount("/static", StaticFiles(directory=STATIC_DIR), name="static")
 
-        # 中间件
-        @app.middleware("http")
-        async def rate_limit_middleware(request: Request, call_next):
-            # 跳过静态文件和页面请求
-            if request.url.path.startswith(("/static", "/status", "/admin", "/playground")):
-                return await call_next(request)
-
-            # 跳过健康检查
-            if request.url.path in ("/health", "/", "/api/health"):
-                return await call_next(request)
-
-            client_ip = request.client.host if request.client else "unknown"
-            endpoint = request.url.path
-
-            try:
-                await self.limiter.check(client_ip, endpoint)
-                await self.limiter.acquire_concurrent()
-                try:
-                    response = await call_next(request)
-                    return response
-                finally:
-                    await self.limiter.release_concurrent()
-            except RateLimitExceededError as e:
-                return JSONResponse(
-                    status_code=429,
-                    content={"error": str(e), "code": "RATE_LIMIT_EXCEEDED"},
-                )
+        # 中间件（原生 ASGI，后添加的在外层: 请求日志 -> 指标 -> 限流 -> 路由）
+        app.add_middleware(RateLimitMiddleware, limiter=self.limiter, metrics=self.metrics)
+        app.add_middleware(MetricsMiddleware, metrics=self.metrics)
+        app.add_middleware(
+            RequestLogMiddleware,
+            skip_paths=("/health", "/api/health", "/metrics"),
+            service="gateway",
+        )
 
         # 异常处理
         @app.exception_handler(VoiceCloneError)
@@ -200,18 +323,31 @@ class GatewayApp:
             if stats["ready_nodes"] == 0:
                 status = "degraded" if stats["online_nodes"] > 0 else "unhealthy"
 
+            components = {
+                "registry": {
+                    "total_nodes": stats["total_nodes"],
+                    "online_nodes": stats["online_nodes"],
+                    "ready_nodes": stats["ready_nodes"],
+                },
+                "limiter": self.limiter.get_stats(),
+            }
+            if self.loop_monitor:
+                components["event_loop"] = self.loop_monitor.stats()
+
             return HealthCheck(
                 status=status,
                 version=app.version,  # 从 FastAPI app 读取版本，保持一致
                 uptime_seconds=time.time() - self._start_time,
-                components={
-                    "registry": {
-                        "total_nodes": stats["total_nodes"],
-                        "online_nodes": stats["online_nodes"],
-                        "ready_nodes": stats["ready_nodes"],
-                    },
-                    "limiter": self.limiter.get_stats(),
-                },
+                components=components,
+            )
+
+        # Prometheus 指标
+        @app.get("/metrics")
+        async def metrics():
+            """Prometheus 文本格式指标"""
+            return Response(
+                content=self.metrics.render(),
+                media_type=self.metrics.registry.CONTENT_TYPE,
             )
 
         # 系统状态
@@ -292,22 +428,111 @@ class GatewayApp:
             except NodeNotFoundError:
                 raise HTTPException(status_code=404, detail="Node not found")
 
+        @app.websocket("/api/nodes/{node_id}/control")
+        async def node_control(websocket: WebSocket, node_id: str):
+            """节点控制通道（心跳、状态变更、命令）"""
+            await self.control.handle(websocket, node_id)
+
+        @app.get("/api/control")
+        async def get_control_channels():
+            """控制通道状态"""
+            return self.control.stats()
+
+        @app.get("/api/autoscaler")
+        async def get_autoscaler():
+            """自动扩缩状态和最近的决策"""
+            return self.autoscaler.stats()
+
+        # ==================== 管理 API ====================
+
+        @app.post("/api/admin/profile")
+        async def profile_gateway(
+            http_request: Request,
+            duration: float = 10.0,
+            mode: str = "wall",
+            format: str = "collapsed",
+            interval: float = 0.01,
+        ):
+            """对网关进程做限时采样分析（需要 X-Admin-Token）"""
+            self._require_admin(http_request)
+            try:
+                result = await run_profile(duration, mode, format, interval)
+            except ProfilerBusyError as e:
+                raise HTTPException(status_code=409, detail=e.message)
+            return _profile_response(result)
+
+        @app.post("/api/admin/nodes/{node_id}/profile")
+        async def profile_node(
+            node_id: str,
+            http_request: Request,
+            duration: float = 10.0,
+            mode: str = "wall",
+            format: str = "collapsed",
+            interval: float = 0.01,
+        ):
+            """对工作节点做限时采样分析（需要 X-Admin-Token，节点需配置相同令牌）"""
+            self._require_admin(http_request)
+            # 节点注册不经认证，令牌本身不下发，只发送短时有效的签名
+            timestamp = round(time.time(), 3)
+            command = NodeCommand(
+                command="profile",
+                params={
+                    "timestamp": timestamp,
+                    "signature": sign_command(self.config.admin_token, node_id, "profile", timestamp),
+                    "duration": duration,
+                    "mode": mode,
+                    "format": format,
+                    "interval": interval,
+                },
+            )
+            try:
+                data = await self.registry.execute_command(
+                    node_id, command, timeout=duration + self.config.request_timeout
+                )
+            except NodeNotFoundError:
+                raise HTTPException(status_code=404, detail="Node not found")
+            except httpx.HTTPError as e:
+                raise HTTPException(status_code=502, detail=f"Node request failed: {e}")
+
+            if not data.get("success"):
+                status = _PROFILE_ERROR_STATUS.get(data.get("code"), 400)
+                raise HTTPException(status_code=status, detail=data.get("error", "Profiling failed"))
+            return _profile_response(ProfileResult.from_dict(data["profile"]))
+
         # ==================== 业务 API ====================
 
         @app.post("/api/synthesize")
-        async def synthesize(request: SynthesizeRequest):
+        async def synthesize(request: SynthesizeRequest, http_request: Request):
             """语音合成"""
+            # 已扣减的成本，没有产出音频时退还
+            charged = None
             try:
                 # 选择节点
                 engine = request.engine or self.config.default_engine
-                node = self.registry.select_node(engine)
+                http_request.state.engine = engine.value
+                with trace_stage("select"):
+                    node = self.registry.select_node(engine)
+
+                # 按成本扣减配额（节点可用时才扣减）
+                cost = _request_cost(http_request, len(request.text), request.language, request.speed)
+                with trace_stage("quota"):
+                    quota = self.limiter.consume_cost(**cost)
+                charged = cost
 
                 # 转发请求
                 async with httpx.AsyncClient(timeout=60.0) as client:
-                    resp = await client.post(
-                        f"http://{node.address}/synthesize",
-                        json=request.model_dump(),
+                    node, resp = await self._post_to_node(
+                        client, engine, node, "/synthesize", json=request.model_dump(),
                     )
+                    http_request.state.node_id = node.node_id
+
+                    if resp.status_code != 200:
+                        self.limiter.refund_cost(**charged)
+                        charged = None
+
+                    if resp.status_code == 429 and resp.headers.get("X-Queue-Full"):
+                        self.metrics.rejections.labels("node_busy").inc()
+                        return _node_busy_response(resp)
 
                     if resp.status_code != 200:
                         return SynthesizeResponse(
@@ -322,16 +547,111 @@ class GatewayApp:
                         headers={
                             "X-Node-Id": node.node_id,
                             "X-Engine": engine.value,
+                            **_quota_headers(quota),
                         },
                     )
 
+            except RateLimitExceededError as e:
+                self.metrics.rejections.labels("quota").inc()
+                return rate_limit_response(e)
             except NoAvailableNodeError as e:
+                self.metrics.rejections.labels("no_node").inc()
                 return SynthesizeResponse(
                     success=False,
                     message=str(e),
                 )
             except Exception as e:
                 logger.error(f"Synthesize error: {e}")
+                if charged is not None:
+                    self.limiter.refund_cost(**charged)
+                return SynthesizeResponse(
+                    success=False,
+                    message=str(e),
+                )
+
+        @app.post("/api/synthesize_stream")
+        async def synthesize_stream(request: SynthesizeStreamRequest, http_request: Request):
+            """流式语音合成（边生成边返回音频块）"""
+            start = time.perf_counter()
+            charged = None
+            try:
+                engine = request.engine or self.config.default_engine
+                http_request.state.engine = engine.value
+                with trace_stage("select"):
+                    node = self.registry.select_node(engine)
+
+                cost = _request_cost(http_request, len(request.text), request.language, request.speed)
+                with trace_stage("quota"):
+                    quota = self.limiter.consume_cost(**cost)
+                charged = cost
+
+                # 客户端和响应在流结束后关闭
+                client = httpx.AsyncClient(timeout=self.config.request_timeout)
+                try:
+                    node, resp = await self._post_to_node(
+                        client, engine, node, "/synthesize_stream",
+                        stream=True, json=request.model_dump(),
+                    )
+                except Exception:
+                    await client.aclose()
+                    raise
+                http_request.state.node_id = node.node_id
+
+                if resp.status_code != 200:
+                    await resp.aread()
+                    await resp.aclose()
+                    await client.aclose()
+                    self.limiter.refund_cost(**charged)
+                    charged = None
+                    if resp.status_code == 429 and resp.headers.get("X-Queue-Full"):
+                        self.metrics.rejections.labels("node_busy").inc()
+                        return _node_busy_response(resp)
+                    return SynthesizeResponse(
+                        success=False,
+                        message=f"Node error: {resp.text}",
+                    )
+
+                first_chunk = self.metrics.first_chunk.labels(engine.value, node.node_id)
+
+                async def relay():
+                    first = True
+                    try:
+                        async for chunk in resp.aiter_raw():
+                            if first:
+                                first_chunk.observe(time.perf_counter() - start)
+                                first = False
+                            yield chunk
+                    finally:
+                        await resp.aclose()
+                        await client.aclose()
+
+                headers = {
+                    "X-Node-Id": node.node_id,
+                    "X-Engine": engine.value,
+                    **_quota_headers(quota),
+                }
+                for name in ("X-Sample-Rate", "X-First-Chunk-Time"):
+                    if name in resp.headers:
+                        headers[name] = resp.headers[name]
+                return StreamingResponse(
+                    relay(),
+                    media_type=resp.headers.get("content-type", "audio/wav"),
+                    headers=headers,
+                )
+
+            except RateLimitExceededError as e:
+                self.metrics.rejections.labels("quota").inc()
+                return rate_limit_response(e)
+            except NoAvailableNodeError as e:
+                self.metrics.rejections.labels("no_node").inc()
+                return SynthesizeResponse(
+                    success=False,
+                    message=str(e),
+                )
+            except Exception as e:
+                logger.error(f"Synthesize stream error: {e}")
+                if charged is not None:
+                    self.limiter.refund_cost(**charged)
                 return SynthesizeResponse(
                     success=False,
                     message=str(e),
@@ -358,11 +678,14 @@ class GatewayApp:
                     files = {"audio": (audio.filename, audio_data, audio.content_type)}
                     data = {"voice_id": voice_id or "", "voice_name": voice_name}
 
-                    resp = await client.post(
-                        f"http://{node.address}/extract_voice",
-                        files=files,
-                        data=data,
-                    )
+                    with trace_stage("upstream"):
+                        resp = await client.post(
+                            f"http://{node.address}/extract_voice",
+                            files=files,
+                            data=data,
+                            headers=_upstream_headers(),
+                        )
+                    _merge_worker_timing(resp)
 
                     if resp.status_code != 200:
                         return ExtractVoiceResponse(
@@ -386,20 +709,38 @@ class GatewayApp:
                 )
 
         @app.post("/api/batch_synthesize")
-        async def batch_synthesize(request: BatchSynthesizeRequest):
+        async def batch_synthesize(
+            request: BatchSynthesizeRequest,
+            http_request: Request,
+            response: Response,
+        ):
             """批量合成"""
             results = []
             succeeded = 0
             failed = 0
 
+            # 整批一次性扣减成本配额，失败条目的份额在最后退还
+            try:
+                total_chars = sum(len(t) for t in request.texts)
+                quota = self.limiter.consume_cost(**_request_cost(http_request, total_chars, request.language))
+            except RateLimitExceededError as e:
+                self.metrics.rejections.labels("quota").inc()
+                return rate_limit_response(e)
+            failed_chars = 0
+
+            engine = request.engine or self.config.default_engine
+            http_request.state.engine = engine.value
+
             for i, text in enumerate(request.texts):
                 try:
-                    engine = request.engine or self.config.default_engine
                     node = self.registry.select_node(engine)
 
                     async with httpx.AsyncClient(timeout=60.0) as client:
-                        resp = await client.post(
-                            f"http://{node.address}/synthesize",
+                        node, resp = await self._post_to_node(
+                            client,
+                            engine,
+                            node,
+                            "/synthesize",
                             json={
                                 "text": text,
                                 "voice_id": request.voice_id,
@@ -421,6 +762,7 @@ class GatewayApp:
                                 "error": resp.text,
                             })
                             failed += 1
+                            failed_chars += len(text)
 
                 except Exception as e:
                     results.append({
@@ -429,6 +771,11 @@ class GatewayApp:
                         "error": str(e),
                     })
                     failed += 1
+                    failed_chars += len(text)
+
+            if failed_chars:
+                quota = self.limiter.refund_cost(**_request_cost(http_request, failed_chars, request.language))
+            response.headers.update(_quota_headers(quota))
 
             return BatchSynthesizeResponse(
                 success=failed == 0,
@@ -473,6 +820,108 @@ class GatewayApp:
 
     # ==================== 页面渲染 ====================
 
+    def _require_admin(self, request: Request) -> str:
+        """
+        校验管理令牌
+
+        Returns:
+            请求携带的令牌
+
+        Raises:
+            HTTPException: 未配置令牌或令牌不匹配（403）
+        """
+        if not self.config.admin_token:
+            raise HTTPException(status_code=403, detail="Admin API disabled (no admin token configured)")
+        token = request.headers.get("X-Admin-Token", "")
+        if not verify_admin_token(self.config.admin_token, token):
+            raise HTTPException(status_code=403, detail="Invalid admin token")
+        return token
+
+    async def _post_to_node(
+        self,
+        client: httpx.AsyncClient,
+        engine: EngineType,
+        node: NodeInfo,
+        path: str,
+        stream: bool = False,
+        **kwargs,
+    ) -> Tuple[NodeInfo, httpx.Response]:
+        """
+        向节点转发请求并记录上游指标
+
+        连接失败时请求尚未到达节点，节点推理队列已满（429 + X-Queue-Full）时请求未进入推理，
+        这两种情况都可以安全地换一个节点重试一次。
+
+        Args:
+            client: HTTP 客户端
+            engine: 引擎类型
+            node: 首选节点
+            path: 节点接口路径
+            stream: 是否以流式读取响应体（由调用方负责关闭响应）
+            **kwargs: 传给 client.build_request 的参数
+
+        Returns:
+            (实际处理请求的节点, 响应)
+
+        Raises:
+            httpx.ConnectError / httpx.ConnectTimeout: 重试后仍无法连接
+        """
+        try:
+            resp = await self._post_once(client, engine, node, path, stream, **kwargs)
+        except (httpx.ConnectError, httpx.ConnectTimeout) as e:
+            fallback = self._fallback_node(engine, node)
+            if fallback is None:
+                raise
+            logger.warning(
+                f"Node {node.node_id} unreachable ({type(e).__name__}), retrying on {fallback.node_id}"
+            )
+            self.metrics.retries.labels(engine.value, "connect_error").inc()
+            return fallback, await self._post_once(client, engine, fallback, path, stream, **kwargs)
+
+        if resp.status_code == 429 and resp.headers.get("X-Queue-Full"):
+            fallback = self._fallback_node(engine, node)
+            if fallback is not None:
+                logger.warning(f"Node {node.node_id} queue full, retrying on {fallback.node_id}")
+                self.metrics.retries.labels(engine.value, "queue_full").inc()
+                await resp.aclose()
+                return fallback, await self._post_once(client, engine, fallback, path, stream, **kwargs)
+        return node, resp
+
+    def _fallback_node(self, engine: EngineType, node: NodeInfo) -> Optional[NodeInfo]:
+        """选择重试用的另一个节点，没有则返回 None"""
+        try:
+            return self.registry.select_node(engine, exclude=(node.node_id,))
+        except NoAvailableNodeError:
+            return None
+
+    async def _post_once(
+        self,
+        client: httpx.AsyncClient,
+        engine: EngineType,
+        node: NodeInfo,
+        path: str,
+        stream: bool = False,
+        **kwargs,
+    ) -> httpx.Response:
+        """向单个节点转发一次请求（流式请求只等待到响应头）"""
+        start = time.perf_counter()
+        with trace_stage("upstream"):
+            request = client.build_request(
+                "POST",
+                f"http://{node.address}{path}",
+                headers=_upstream_headers(),
+                **kwargs,
+            )
+            resp = await client.send(request, stream=stream)
+        self.metrics.upstream_duration.labels(engine.value, node.node_id).observe(
+            time.perf_counter() - start
+        )
+
+        stages = _merge_worker_timing(resp)
+        if "queue" in stages:
+            self.metrics.queue_wait.labels(engine.value).observe(stages["queue"] / 1000)
+        return resp
+
     def _render_status_page(self) -> str:
         """渲染状态页面"""
         return """<!DOCTYPE html>
@@ -595,6 +1044,8 @@ class GatewayApp:
                             <th class="px-4 py-3 text-left text-xs font-medium text-gray-500 uppercase">内存</th>
                             <th class="px-4 py-3 text-left text-xs font-medium text-gray-500 uppercase">请求数</th>
                             <th class="px-4 py-3 text-left text-xs font-medium text-gray-500 uppercase">并发</th>
+                            <th class="px-4 py-3 text-left text-xs font-medium text-gray-500 uppercase">排队</th>
+                            <th class="px-4 py-3 text-left text-xs font-medium text-gray-500 uppercase">P95</th>
                         </tr>
                     </thead>
                     <tbody class="bg-white divide-y divide-gray-200">
@@ -606,7 +1057,7 @@ class GatewayApp:
                                 <td class="px-4 py-3">
                                     <span :class="{
                                         'bg-green-100 text-green-800': node.status === 'ready',
-                                        'bg-yellow-100 text-yellow-800': node.status === 'loading' || node.status === 'standby',
+                                        'bg-yellow-100 text-yellow-800': node.status === 'loading' || node.status === 'warming' || node.status === 'draining' || node.status === 'standby',
                                         'bg-red-100 text-red-800': node.status === 'error' || node.status === 'offline',
                                         'bg-blue-100 text-blue-800': node.status === 'busy'
                                     }" class="px-2 py-1 rounded text-xs" x-text="node.status"></span>
@@ -615,11 +1066,13 @@ class GatewayApp:
                                 <td class="px-4 py-3 text-sm" x-text="node.memory_percent.toFixed(1) + '%'"></td>
                                 <td class="px-4 py-3 text-sm" x-text="node.request_count"></td>
                                 <td class="px-4 py-3 text-sm" x-text="node.current_concurrent"></td>
+                                <td class="px-4 py-3 text-sm" x-text="node.queue_size"></td>
+                                <td class="px-4 py-3 text-sm" x-text="node.p95_response_time ? node.p95_response_time.toFixed(0) + 'ms' : '-'"></td>
                             </tr>
                         </template>
                         <template x-if="nodes.length === 0">
                             <tr>
-                                <td colspan="8" class="px-4 py-8 text-center text-gray-500">暂无节点</td>
+                                <td colspan="10" class="px-4 py-8 text-center text-gray-500">暂无节点</td>
                             </tr>
                         </template>
                     </tbody>
@@ -788,7 +1241,7 @@ class GatewayApp:
                                     <span :class="{
                                         'bg-green-100 text-green-800': node.status === 'ready',
                                         'bg-yellow-100 text-yellow-800': node.status === 'standby',
-                                        'bg-blue-100 text-blue-800': node.status === 'loading',
+                                        'bg-blue-100 text-blue-800': node.status === 'loading' || node.status === 'warming' || node.status === 'draining',
                                         'bg-red-100 text-red-800': node.status === 'error' || node.status === 'offline'
                                     }" class="px-2 py-1 rounded text-xs" x-text="node.status"></span>
                                 </td>
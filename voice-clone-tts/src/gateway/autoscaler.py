@@ -0,0 +1,370 @@
+"""
+模型常驻自动扩缩
+
+网关按周期读取注册中心中各引擎的需求（选节点次数）、排队深度和延迟，
+激活待机节点或让空闲节点待机:
+- 就绪节点平均负载（进行中 + 排队）或 p95 超过阈值，或有请求但没有就绪节点时激活一个节点
+- 平均负载持续低于阈值（滞后）时待机一个节点，就绪节点不少于最小保温数
+- 同一引擎的动作之间有冷却时间，每个周期每个引擎最多一个动作
+- 激活前检查目标主机的内存预算（已加载模型的 RSS + 新模型的估计内存）
+
+每个决策连同原因写入日志，并保留最近的决策记录供 /api/autoscaler 查询。
+"""
+
+import time
+import asyncio
+import logging
+from collections import deque
+from dataclasses import dataclass, asdict
+from typing import Any, Deque, Dict, List, Optional, Set
+
+from ..common.models import EngineType, NodeCommand, NodeInfo, SystemConfig, WorkerStatus
+from .registry import ServiceRegistry
+
+logger = logging.getLogger(__name__)
+
+# 保留的决策记录条数
+DECISION_HISTORY = 100
+
+# 已在加载模型、稍后会就绪的状态
+_PENDING_STATUSES = (WorkerStatus.LOADING, WorkerStatus.WARMING)
+
+
+@dataclass
+class ScalingDecision:
+    """一次扩缩决策"""
+    engine: str
+    action: str  # activate / standby / blocked
+    reason: str
+    node_id: str = ""
+    host: str = ""
+    timestamp: float = 0.0
+
+    def to_dict(self) -> Dict[str, Any]:
+        return asdict(self)
+
+
+@dataclass
+class EngineLoad:
+    """一个引擎在本周期的负载快照"""
+    ready: List[NodeInfo]
+    pending: List[NodeInfo]
+    standby: List[NodeInfo]
+    load: float          # 就绪节点平均负载（进行中 + 排队）
+    p95_ms: float        # 就绪节点中最高的 p95
+    demand_rate: float   # 每秒选节点次数
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "ready": len(self.ready),
+            "pending": len(self.pending),
+            "standby": len(self.standby),
+            "load": round(self.load, 2),
+            "p95_ms": round(self.p95_ms, 1),
+            "demand_rate": round(self.demand_rate, 2),
+        }
+
+
+class Autoscaler:
+    """按负载激活 / 待机工作节点"""
+
+    def __init__(self, registry: ServiceRegistry, config: SystemConfig, metrics: Any = None):
+        """
+        初始化自动扩缩
+
+        Args:
+            registry: 服务注册中心
+            config: 系统配置（autoscale_* 项）
+            metrics: 网关指标（记录扩缩动作次数，可选）
+        """
+        self.registry = registry
+        self.config = config
+        self.metrics = metrics
+
+        self._task: Optional[asyncio.Task] = None
+        self._commands: Set[asyncio.Task] = set()
+        # 已发出命令、尚未完成的节点（不会被再次选中）
+        self._busy_nodes: Set[str] = set()
+
+        self._last_action: Dict[EngineType, float] = {}
+        self._low_since: Dict[EngineType, float] = {}
+        self._last_blocked: Dict[EngineType, str] = {}
+        self._last_demand: Dict[EngineType, int] = {}
+        self._last_tick: Optional[float] = None
+        self._snapshot: Dict[str, Dict[str, Any]] = {}
+        self.decisions: Deque[ScalingDecision] = deque(maxlen=DECISION_HISTORY)
+
+    # ===================== 生命周期 =====================
+
+    async def start(self):
+        """启动决策循环"""
+        if self._task is not None:
+            return
+        self._task = asyncio.create_task(self._loop())
+        logger.info(f"Autoscaler started (interval={self.config.autoscale_interval}s)")
+
+    async def stop(self):
+        """停止决策循环（已发出的命令继续在节点上执行）"""
+        if self._task is None:
+            return
+        self._task.cancel()
+        try:
+            await self._task
+        except asyncio.CancelledError:
+            pass
+        self._task = None
+        for task in list(self._commands):
+            task.cancel()
+        logger.info("Autoscaler stopped")
+
+    async def _loop(self):
+        while True:
+            await asyncio.sleep(self.config.autoscale_interval)
+            try:
+                self.tick()
+            except Exception as e:
+                logger.error(f"Autoscaler error: {e}")
+
+    def tick(self, now: Optional[float] = None) -> List[ScalingDecision]:
+        """
+        执行一个决策周期，并在后台向节点发出命令
+
+        Args:
+            now: 当前时间（默认 time.monotonic()）
+
+        Returns:
+            本周期的决策
+        """
+        decisions = self.evaluate(now)
+        for decision in decisions:
+            if decision.action in ("activate", "standby"):
+                self._dispatch(decision)
+        return decisions
+
+    # ===================== 决策 =====================
+
+    def evaluate(self, now: Optional[float] = None) -> List[ScalingDecision]:
+        """
+        根据注册中心的当前状态做出扩缩决策（不发出命令）
+
+        Args:
+            now: 当前时间（默认 time.monotonic()）
+
+        Returns:
+            本周期的决策（每个引擎最多一个）
+        """
+        now = time.monotonic() if now is None else now
+        elapsed = now - self._last_tick if self._last_tick is not None else 0.0
+        self._last_tick = now
+
+        engines = sorted({node.engine_type for node in self.registry.get_nodes()}, key=lambda e: e.value)
+        decisions = []
+        snapshot = {}
+        for engine in engines:
+            load = self._engine_load(engine, elapsed)
+            snapshot[engine.value] = load.to_dict()
+            decision = self._decide(engine, load, now)
+            if decision is not None:
+                decisions.append(decision)
+        self._snapshot = snapshot
+        return decisions
+
+    def _engine_load(self, engine: EngineType, elapsed: float) -> EngineLoad:
+        nodes = self.registry.get_nodes(engine=engine)
+        ready = [n for n in nodes if n.is_available]
+        pending = [n for n in nodes if n.status in _PENDING_STATUSES]
+        # 已发出命令的节点不再作为候选
+        standby = [
+            n for n in nodes
+            if n.status == WorkerStatus.STANDBY and not n.model_loaded and n.node_id not in self._busy_nodes
+        ]
+
+        in_flight = sum(n.current_concurrent + n.queue_size for n in ready)
+        demand = self.registry.get_demand(engine)
+        previous = self._last_demand.get(engine, demand)
+        self._last_demand[engine] = demand
+
+        return EngineLoad(
+            ready=ready,
+            pending=pending,
+            standby=standby,
+            load=in_flight / len(ready) if ready else 0.0,
+            p95_ms=max((n.p95_response_time for n in ready), default=0.0),
+            demand_rate=(demand - previous) / elapsed if elapsed > 0 else 0.0,
+        )
+
+    def _decide(self, engine: EngineType, load: EngineLoad, now: float) -> Optional[ScalingDecision]:
+        config = self.config
+        warm = len(load.ready) + len(load.pending)
+
+        reason = self._scale_up_reason(load, warm)
+        if not reason:
+            self._last_blocked.pop(engine, None)
+        else:
+            self._low_since.pop(engine, None)
+            if load.pending and warm >= config.autoscale_min_ready:
+                # 已有节点在加载，等它就绪后再评估
+                return None
+            if not self._cooled_down(engine, now, config.autoscale_scale_up_cooldown):
+                return None
+            return self._activate(engine, load, reason, now)
+
+        if len(load.ready) <= config.autoscale_min_ready or load.pending:
+            self._low_since.pop(engine, None)
+            return None
+        if load.load >= config.autoscale_scale_down_load:
+            self._low_since.pop(engine, None)
+            return None
+
+        # 滞后: 低负载持续 scale_down_delay 才待机
+        since = self._low_since.setdefault(engine, now)
+        if now - since < config.autoscale_scale_down_delay:
+            return None
+        if not self._cooled_down(engine, now, config.autoscale_scale_down_cooldown):
+            return None
+
+        candidates = [n for n in load.ready if n.node_id not in self._busy_nodes]
+        if not candidates:
+            return None
+        node = min(candidates, key=lambda n: (n.current_concurrent + n.queue_size, n.node_id))
+        self._low_since.pop(engine, None)
+        return self._record(now, ScalingDecision(
+            engine=engine.value,
+            action="standby",
+            node_id=node.node_id,
+            host=node.host,
+            reason=(
+                f"load {load.load:.2f} < {config.autoscale_scale_down_load} "
+                f"for {config.autoscale_scale_down_delay:.0f}s, ready={len(load.ready)}"
+            ),
+        ))
+
+    def _scale_up_reason(self, load: EngineLoad, warm: int) -> str:
+        """需要激活节点的原因（不需要时为空字符串）"""
+        config = self.config
+        if warm < config.autoscale_min_ready:
+            return f"warm pool {warm} < min_ready {config.autoscale_min_ready}"
+        if not load.ready:
+            if load.demand_rate > 0:
+                return f"no ready node, demand {load.demand_rate:.2f} req/s"
+            return ""
+        if load.load > config.autoscale_scale_up_load:
+            return f"load {load.load:.2f} > {config.autoscale_scale_up_load} on {len(load.ready)} ready nodes"
+        if config.autoscale_latency_p95_ms > 0 and load.p95_ms > config.autoscale_latency_p95_ms:
+            return f"p95 {load.p95_ms:.0f}ms > {config.autoscale_latency_p95_ms:.0f}ms"
+        return ""
+
+    def _activate(self, engine: EngineType, load: EngineLoad, reason: str, now: float) -> Optional[ScalingDecision]:
+        """选择内存预算内的待机节点激活，没有可选节点时记录一次 blocked 决策"""
+        if not load.standby:
+            return self._blocked(engine, reason, "no standby node")
+
+        required = self._model_memory(engine)
+        candidates = []
+        for node in load.standby:
+            free = self._host_free_memory(node.host)
+            if free is None or free >= required:
+                candidates.append((-(free or 0.0), node.node_id, node))
+        if not candidates:
+            return self._blocked(engine, reason, f"host memory budget exceeded (needs {required:.0f}MB)")
+
+        # 优先剩余内存最多的主机
+        node = min(candidates)[2]
+        self._last_blocked.pop(engine, None)
+        return self._record(now, ScalingDecision(
+            engine=engine.value,
+            action="activate",
+            node_id=node.node_id,
+            host=node.host,
+            reason=reason,
+        ))
+
+    def _blocked(self, engine: EngineType, reason: str, cause: str) -> Optional[ScalingDecision]:
+        """需要扩容但无法执行；无法执行的原因不变时不重复记录"""
+        if self._last_blocked.get(engine) == cause:
+            return None
+        self._last_blocked[engine] = cause
+        reason = f"{reason}; {cause}"
+        decision = ScalingDecision(engine=engine.value, action="blocked", reason=reason, timestamp=time.time())
+        logger.warning(f"Autoscale {engine.value}: cannot scale up ({reason})")
+        self.decisions.append(decision)
+        return decision
+
+    def _record(self, now: float, decision: ScalingDecision) -> ScalingDecision:
+        self._last_action[EngineType(decision.engine)] = now
+        decision.timestamp = time.time()
+        logger.info(
+            f"Autoscale {decision.engine}: {decision.action} {decision.node_id} "
+            f"on {decision.host} ({decision.reason})"
+        )
+        self.decisions.append(decision)
+        if self.metrics is not None:
+            self.metrics.autoscale_actions.labels(decision.engine, decision.action).inc()
+        return decision
+
+    def _cooled_down(self, engine: EngineType, now: float, cooldown: float) -> bool:
+        last = self._last_action.get(engine)
+        return last is None or now - last >= cooldown
+
+    # ===================== 内存预算 =====================
+
+    def _model_memory(self, engine: EngineType) -> float:
+        """引擎模型常驻内存（已加载节点上报的最大 RSS，没有时使用配置的估计值）"""
+        observed = [
+            n.process_rss_mb for n in self.registry.get_nodes(engine=engine)
+            if n.model_loaded and n.process_rss_mb > 0
+        ]
+        return max(observed, default=self.config.autoscale_model_memory_mb.get(engine.value, 0.0))
+
+    def _host_free_memory(self, host: str) -> Optional[float]:
+        """主机剩余的模型内存预算（MB，未设置预算时为 None）"""
+        budget = self.config.autoscale_host_memory_mb
+        if budget <= 0:
+            return None
+        used = 0.0
+        for node in self.registry.get_nodes():
+            if node.host != host or node.status == WorkerStatus.OFFLINE:
+                continue
+            if node.model_loaded:
+                used += node.process_rss_mb or self._model_memory(node.engine_type)
+            elif node.status in _PENDING_STATUSES or node.node_id in self._busy_nodes:
+                used += self._model_memory(node.engine_type)
+        return budget - used
+
+    # ===================== 执行 =====================
+
+    def _dispatch(self, decision: ScalingDecision):
+        """在后台向节点发出命令（激活可能持续数分钟，不阻塞决策循环）"""
+        if decision.action == "activate":
+            # 先在本地标记为加载中，下个周期计入待就绪节点
+            self.registry.update_status(decision.node_id, WorkerStatus.LOADING)
+        self._busy_nodes.add(decision.node_id)
+        task = asyncio.create_task(self._send(decision))
+        self._commands.add(task)
+        task.add_done_callback(self._commands.discard)
+
+    async def _send(self, decision: ScalingDecision):
+        try:
+            success = await self.registry.send_command(
+                decision.node_id, NodeCommand(command=decision.action)
+            )
+            if not success:
+                logger.warning(f"Autoscale {decision.engine}: {decision.action} {decision.node_id} failed")
+        except Exception as e:
+            logger.warning(f"Autoscale {decision.engine}: {decision.action} {decision.node_id} failed: {e}")
+        finally:
+            self._busy_nodes.discard(decision.node_id)
+
+    # ===================== 统计 =====================
+
+    def stats(self) -> Dict[str, Any]:
+        """当前配置、各引擎负载快照和最近的决策"""
+        return {
+            "enabled": self._task is not None,
+            "interval": self.config.autoscale_interval,
+            "min_ready": self.config.autoscale_min_ready,
+            "host_memory_mb": self.config.autoscale_host_memory_mb,
+            "engines": self._snapshot,
+            "pending_commands": sorted(self._busy_nodes),
+            "decisions": [d.to_dict() for d in reversed(self.decisions)],
+        }
@@ -0,0 +1,224 @@
+"""
+节点控制通道（网关侧）
+
+接受节点的 WebSocket 长连接（/api/nodes/{node_id}/control）:
+- hello 帧注册节点，之后的心跳帧按字段合并为完整指标再交给注册中心
+- 注册中心向已连接的节点发命令时经通道下发，按 id 等待结果，不再逐条新建 HTTP 连接
+- 命令帧没能发出时以 CommandNotSentError 结束，网关改用 HTTP 发送；已发出的命令在结果返回前
+  连接断开则以 ConnectionError 结束，不再重发（节点可能已经执行过），节点退回 HTTP 心跳
+- 配置了节点令牌时只接受签名正确的 hello；未签名的 hello 不能接管仍在活动的连接
+  （否则任何人都能冒用 node_id 截走之后下发的命令）
+
+协议见 common/control.py。
+"""
+
+import json
+import time
+import uuid
+import asyncio
+import logging
+from typing import Any, Dict, Tuple
+
+from fastapi import WebSocket, WebSocketDisconnect
+
+from ..common.control import (
+    HELLO, HEARTBEAT, COMMAND, RESULT, RESYNC, CommandNotSentError, encode_frame, verify_hello,
+)
+from ..common.models import NodeInfo, NodeMetrics, NodeCommand
+
+logger = logging.getLogger(__name__)
+
+
+class ControlChannelManager:
+    """管理所有节点的控制通道"""
+
+    def __init__(self, registry: Any, node_token: str = "", takeover_after: float = 30.0):
+        """
+        初始化
+
+        Args:
+            registry: 服务注册中心
+            node_token: 节点令牌（为空则不校验 hello 签名）
+            takeover_after: 未签名的 hello 只能接管超过该时长（秒）没有收到帧的旧连接
+        """
+        self.registry = registry
+        self.node_token = node_token
+        self.takeover_after = takeover_after
+        # node_id -> 连接
+        self._connections: Dict[str, WebSocket] = {}
+        # node_id -> 合并后的指标（心跳帧只带变化的字段）
+        self._metrics: Dict[str, Dict[str, Any]] = {}
+        # node_id -> 最近一次收到帧的时间（monotonic）
+        self._last_seen: Dict[str, float] = {}
+        # 命令 id -> (node_id, 等待结果的 Future)
+        self._pending: Dict[str, Tuple[str, asyncio.Future]] = {}
+
+        # 统计
+        self.frames_received = 0
+        self.bytes_received = 0
+        self.commands_sent = 0
+        self.rejected = 0
+
+    def is_connected(self, node_id: str) -> bool:
+        """节点是否通过控制通道连接"""
+        return node_id in self._connections
+
+    @property
+    def connection_count(self) -> int:
+        """已连接的节点数"""
+        return len(self._connections)
+
+    async def handle(self, websocket: WebSocket, node_id: str):
+        """
+        处理一个节点连接，直到连接断开
+
+        Args:
+            websocket: 连接
+            node_id: 节点 ID（路径参数，须与 hello 帧中的一致）
+        """
+        await websocket.accept()
+        try:
+            hello = json.loads(await websocket.receive_text())
+            node = NodeInfo(**hello.get("node", {})) if hello.get("type") == HELLO else None
+            if node is None or node.node_id != node_id:
+                await self._reject(websocket, node_id, "expected hello frame")
+                return
+
+            authenticated = verify_hello(self.node_token, hello, node_id)
+            if self.node_token and not authenticated:
+                await self._reject(websocket, node_id, "invalid hello signature")
+                return
+
+            previous = self._connections.get(node_id)
+            if previous is not None:
+                idle = time.monotonic() - self._last_seen.get(node_id, 0.0)
+                if not authenticated and idle < self.takeover_after:
+                    await self._reject(websocket, node_id, "node already connected")
+                    return
+                # 节点重连时旧连接可能还未检测到断开；旧连接上的命令不会再有结果
+                self._fail_pending(node_id)
+                await self._close_quietly(previous)
+            self._connections[node_id] = websocket
+            self._metrics[node_id] = {}
+            self._last_seen[node_id] = time.monotonic()
+            self.registry.register(node)
+            logger.info(f"Control channel opened for node {node_id}")
+
+            while True:
+                text = await websocket.receive_text()
+                self.frames_received += 1
+                self.bytes_received += len(text)
+                self._last_seen[node_id] = time.monotonic()
+                await self._handle_frame(websocket, node_id, json.loads(text))
+
+        except WebSocketDisconnect:
+            pass
+        except Exception as e:
+            logger.warning(f"Control channel error for node {node_id}: {e}")
+        finally:
+            if self._connections.get(node_id) is websocket:
+                del self._connections[node_id]
+                self._metrics.pop(node_id, None)
+                self._last_seen.pop(node_id, None)
+                self._fail_pending(node_id)
+                logger.info(f"Control channel closed for node {node_id}")
+
+    async def _handle_frame(self, websocket: WebSocket, node_id: str, frame: Dict[str, Any]):
+        kind = frame.get("type")
+        if kind == HEARTBEAT:
+            state = self._metrics.setdefault(node_id, {})
+            if frame.get("full"):
+                state.clear()
+            state.update(frame.get("m", {}))
+            if not self.registry.heartbeat(node_id, NodeMetrics(**state, node_id=node_id)):
+                # 节点已被注销: 让节点重新发送 hello
+                self._metrics[node_id] = {}
+                await websocket.send_text(encode_frame({"type": RESYNC}))
+
+        elif kind == HELLO:
+            node = NodeInfo(**frame.get("node", {}))
+            if node.node_id != node_id:
+                logger.warning(f"Ignored hello for {node.node_id} on control channel of {node_id}")
+                return
+            self._metrics[node_id] = {}
+            self.registry.register(node)
+
+        elif kind == RESULT:
+            entry = self._pending.pop(frame.get("id"), None)
+            if entry is not None and not entry[1].done():
+                entry[1].set_result(frame)
+
+    async def request(self, node_id: str, command: NodeCommand, timeout: float) -> Dict[str, Any]:
+        """
+        经控制通道发送命令并等待结果
+
+        Args:
+            node_id: 节点 ID
+            command: 控制命令
+            timeout: 等待结果的最长时间（秒）
+
+        Returns:
+            result 帧（成功时含 result，节点执行异常时含 error）
+
+        Raises:
+            CommandNotSentError: 节点未连接，或命令帧发送失败
+            ConnectionError: 命令已发出，结果返回前连接断开
+            asyncio.TimeoutError: 超时
+        """
+        websocket = self._connections.get(node_id)
+        if websocket is None:
+            raise CommandNotSentError(f"Node {node_id} has no control channel")
+
+        command_id = uuid.uuid4().hex[:12]
+        future = asyncio.get_running_loop().create_future()
+        self._pending[command_id] = (node_id, future)
+        try:
+            try:
+                await websocket.send_text(encode_frame({
+                    "type": COMMAND,
+                    "id": command_id,
+                    "command": command.command,
+                    "params": command.params,
+                }))
+            except (WebSocketDisconnect, RuntimeError) as e:
+                raise CommandNotSentError(f"Control channel to {node_id} failed: {e}") from e
+            self.commands_sent += 1
+            return await asyncio.wait_for(future, timeout)
+        finally:
+            self._pending.pop(command_id, None)
+
+    async def close_all(self):
+        """关闭所有连接（网关停止时）"""
+        for websocket in list(self._connections.values()):
+            await self._close_quietly(websocket)
+
+    def stats(self) -> Dict[str, Any]:
+        """通道统计"""
+        return {
+            "connected_nodes": sorted(self._connections),
+            "pending_commands": len(self._pending),
+            "frames_received": self.frames_received,
+            "bytes_received": self.bytes_received,
+            "commands_sent": self.commands_sent,
+            "rejected": self.rejected,
+            "authenticated": bool(self.node_token),
+        }
+
+    async def _reject(self, websocket: WebSocket, node_id: str, reason: str):
+        self.rejected += 1
+        logger.warning(f"Rejected control channel for {node_id}: {reason}")
+        await websocket.close(code=1008)
+
+    def _fail_pending(self, node_id: str):
+        for command_id, (owner, future) in list(self._pending.items()):
+            if owner == node_id:
+                del self._pending[command_id]
+                if not future.done():
+                    future.set_exception(ConnectionError(f"Control channel to {node_id} closed"))
+
+    @staticmethod
+    async def _close_quietly(websocket: WebSocket):
+        try:
+            await websocket.close()
+        except Exception:
+            pass
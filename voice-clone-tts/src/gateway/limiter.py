@@ -2,23 +2,53 @@
 限流器
 
 提供多层次的请求限流功能。
+
+所有检查均为同步操作，不在中间持有锁或让出事件循环:
+asyncio 单线程执行，一次同步调用内的“检查 + 扣减”天然是原子的。
 """
 
 import time
 import asyncio
-from typing import Dict, Optional
-from collections import defaultdict
+from typing import Dict, Iterable, Iterator, Optional, List, Tuple, Union
+from collections import deque
 import logging
 
 from ..common.exceptions import RateLimitExceededError
+from .shared_counter import SharedCounterStore, SharedWindowCounter
 
 logger = logging.getLogger(__name__)
 
+# 各语言正常语速（每秒字符数），用于从文本长度估算音频时长
+SPEECH_CHARS_PER_SECOND: Dict[str, float] = {
+    "zh": 4.5,
+    "yue": 4.5,
+    "ja": 7.0,
+    "ko": 5.0,
+}
+DEFAULT_CHARS_PER_SECOND = 14.0  # 拉丁字母语言
+
+
+def estimate_audio_seconds(text_length: int, language: str = "zh", speed: float = 1.0) -> float:
+    """
+    估算合成音频时长
+
+    Args:
+        text_length: 文本字符数
+        language: 语言代码
+        speed: 语速倍率
+
+    Returns:
+        估算的音频秒数
+    """
+    base = language.lower().split("-")[0]
+    chars_per_second = SPEECH_CHARS_PER_SECOND.get(base, DEFAULT_CHARS_PER_SECOND)
+    return text_length / (chars_per_second * max(speed, 0.1))
+
 
 class TokenBucket:
     """令牌桶算法实现"""
 
-    def __init__(self, capacity: int, refill_rate: float):
+    def __init__(self, capacity: float, refill_rate: float):
         """
         初始化令牌桶
 
@@ -29,10 +59,9 @@ class TokenBucket:
         self.capacity = capacity
         self.refill_rate = refill_rate
         self.tokens = capacity
-        self.last_refill = time.time()
-        self._lock = asyncio.Lock()
+        self.last_refill = time.monotonic()
 
-    async def acquire(self, tokens: int = 1) -> bool:
+    def try_acquire(self, tokens: float = 1) -> bool:
         """
         尝试获取令牌
 
@@ -42,17 +71,29 @@ class TokenBucket:
         Returns:
             是否获取成功
         """
-        async with self._lock:
-            self._refill()
+        self._refill()
 
-            if self.tokens >= tokens:
-                self.tokens -= tokens
-                return True
-            return False
+        if self.tokens >= tokens:
+            self.tokens -= tokens
+            return True
+        return False
+
+    def refund(self, tokens: float):
+        """归还令牌（用于回滚部分扣减或退还未使用的配额）"""
+        self.tokens = min(self.capacity, self.tokens + tokens)
+
+    def time_until(self, tokens: float) -> float:
+        """距离可获取指定令牌数还需等待的秒数"""
+        if tokens > self.capacity:
+            return float("inf")
+        missing = tokens - self.tokens
+        if missing <= 0 or self.refill_rate <= 0:
+            return 0.0
+        return missing / self.refill_rate
 
     def _refill(self):
         """填充令牌"""
-        now = time.time()
+        now = time.monotonic()
         elapsed = now - self.last_refill
         refill_amount = elapsed * self.refill_rate
 
@@ -61,7 +102,12 @@ class TokenBucket:
 
 
 class SlidingWindowCounter:
-    """滑动窗口计数器"""
+    """
+    滑动窗口计数器
+
+    按时间顺序记录窗口内每个请求的时间戳，过期记录从队头弹出，
+    检查和扣减均摊 O(1)。
+    """
 
     def __init__(self, window_size: int = 60, limit: int = 100):
         """
@@ -73,45 +119,43 @@ class SlidingWindowCounter:
         """
         self.window_size = window_size
         self.limit = limit
-        self.requests: Dict[float, int] = defaultdict(int)
-        self._lock = asyncio.Lock()
+        self.requests: deque = deque()
 
-    async def is_allowed(self) -> bool:
+    def _expire(self, now: float):
+        """清理过期记录"""
+        window_start = now - self.window_size
+        requests = self.requests
+        while requests and requests[0] < window_start:
+            requests.popleft()
+
+    def try_acquire(self) -> bool:
         """
-        检查请求是否被允许
+        检查请求是否被允许，允许时记录本次请求
 
         Returns:
             是否允许
         """
-        async with self._lock:
-            now = time.time()
-            window_start = now - self.window_size
-
-            # 清理过期记录
-            expired_keys = [k for k in self.requests if k < window_start]
-            for k in expired_keys:
-                del self.requests[k]
+        now = time.monotonic()
+        self._expire(now)
 
-            # 计算当前窗口内的请求数
-            current_count = sum(self.requests.values())
+        if len(self.requests) >= self.limit:
+            return False
 
-            if current_count >= self.limit:
-                return False
+        self.requests.append(now)
+        return True
 
-            # 记录本次请求
-            self.requests[now] = self.requests.get(now, 0) + 1
-            return True
+    def rollback(self):
+        """撤销最近一次成功的 try_acquire"""
+        if self.requests:
+            self.requests.pop()
 
-    async def get_remaining(self) -> int:
+    def remaining(self) -> int:
         """获取剩余配额"""
-        async with self._lock:
-            now = time.time()
-            window_start = now - self.window_size
+        self._expire(time.monotonic())
+        return max(0, self.limit - len(self.requests))
 
-            current_count = sum(
-                v for k, v in self.requests.items() if k >= window_start
-            )
-            return max(0, self.limit - current_count)
+
+WindowCounter = Union[SlidingWindowCounter, SharedWindowCounter]
 
 
 class RateLimiter:
@@ -123,6 +167,12 @@ class RateLimiter:
         ip_rpm: int = 100,
         endpoint_rpm: Optional[Dict[str, int]] = None,
         concurrent_limit: int = 50,
+        ip_chars_per_minute: int = 0,
+        ip_audio_seconds_per_minute: float = 0,
+        key_chars_per_minute: int = 0,
+        key_audio_seconds_per_minute: float = 0,
+        api_keys: Optional[Iterable[str]] = None,
+        shared_store: Optional[SharedCounterStore] = None,
     ):
         """
         初始化限流器
@@ -132,36 +182,140 @@ class RateLimiter:
             ip_rpm: 单 IP 每分钟请求数
             endpoint_rpm: 各接口每分钟请求数
             concurrent_limit: 并发请求限制
+            ip_chars_per_minute: 单 IP 每分钟合成字符数（0 表示不限制）
+            ip_audio_seconds_per_minute: 单 IP 每分钟估算音频秒数（0 表示不限制）
+            key_chars_per_minute: 单 API Key 每分钟合成字符数（0 表示不限制）
+            key_audio_seconds_per_minute: 单 API Key 每分钟估算音频秒数（0 表示不限制）
+            api_keys: 允许的 API Key 列表（只有列表中的 Key 按 Key 计算配额，为空则不启用 Key 配额）
+            shared_store: 跨进程共享计数存储（不指定则仅在本进程内计数）
         """
         self.global_rpm = global_rpm
         self.ip_rpm = ip_rpm
         self.endpoint_rpm = endpoint_rpm or {}
         self.concurrent_limit = concurrent_limit
 
+        # 成本配额: scope -> (每分钟字符数, 每分钟音频秒数)
+        self.cost_limits: Dict[str, Tuple[float, float]] = {
+            "ip": (ip_chars_per_minute, ip_audio_seconds_per_minute),
+            "key": (key_chars_per_minute, key_audio_seconds_per_minute),
+        }
+        # 请求头中的 Key 未经认证，不在列表中的 Key 只按 IP 计算配额，
+        # 避免冒用他人 Key 消耗其配额，或用随机 Key 无限创建令牌桶
+        self.api_keys = frozenset(api_keys or ())
+
+        # 请求数计数后端（本进程 / 跨进程共享）
+        self.shared_store = shared_store
+
         # 全局限流
-        self._global_limiter = SlidingWindowCounter(60, global_rpm)
+        self._global_limiter = self._new_counter("global", global_rpm)
 
         # IP 限流
-        self._ip_limiters: Dict[str, SlidingWindowCounter] = {}
+        self._ip_limiters: Dict[str, WindowCounter] = {}
 
         # 接口限流
-        self._endpoint_limiters: Dict[str, SlidingWindowCounter] = {}
+        self._endpoint_limiters: Dict[str, WindowCounter] = {}
+
+        # 成本令牌桶: (scope, 标识, 维度) -> TokenBucket
+        self._cost_buckets: Dict[Tuple[str, str, str], TokenBucket] = {}
 
         # 并发计数
         self._current_concurrent = 0
-        self._concurrent_lock = asyncio.Lock()
+
+        # 定期清理任务
+        self._cleanup_task: Optional[asyncio.Task] = None
 
         # 统计
         self._total_requests = 0
         self._rejected_requests = 0
 
+    def _new_counter(self, key: str, limit: int) -> WindowCounter:
+        """创建滑动窗口计数器（配置了共享存储时跨进程共享）"""
+        if self.shared_store is not None:
+            return SharedWindowCounter(self.shared_store, key, 60, limit)
+        return SlidingWindowCounter(60, limit)
+
+    def _get_ip_limiter(self, client_ip: str) -> WindowCounter:
+        limiter = self._ip_limiters.get(client_ip)
+        if limiter is None:
+            limiter = self._new_counter(f"ip:{client_ip}", self.ip_rpm)
+            self._ip_limiters[client_ip] = limiter
+        return limiter
+
+    def _get_endpoint_limiter(self, endpoint: str) -> Optional[WindowCounter]:
+        limiter = self._endpoint_limiters.get(endpoint)
+        if limiter is None and endpoint and endpoint in self.endpoint_rpm:
+            limiter = self._new_counter(f"endpoint:{endpoint}", self.endpoint_rpm[endpoint])
+            self._endpoint_limiters[endpoint] = limiter
+        return limiter
+
+    def _debit_counters(self, client_ip: str, endpoint: str):
+        """
+        依次扣减全局、IP、接口计数，任一超限时回滚已扣减的计数
+
+        Raises:
+            RateLimitExceededError: 超出限流
+        """
+        global_limiter = self._global_limiter
+        if not global_limiter.try_acquire():
+            self._rejected_requests += 1
+            logger.warning("Global rate limit exceeded")
+            raise RateLimitExceededError("Global rate limit exceeded")
+
+        ip_limiter = self._get_ip_limiter(client_ip)
+        if not ip_limiter.try_acquire():
+            global_limiter.rollback()
+            self._rejected_requests += 1
+            logger.warning(f"IP rate limit exceeded: {client_ip}")
+            raise RateLimitExceededError(f"Rate limit exceeded for IP: {client_ip}")
+
+        endpoint_limiter = self._get_endpoint_limiter(endpoint)
+        if endpoint_limiter is not None and not endpoint_limiter.try_acquire():
+            ip_limiter.rollback()
+            global_limiter.rollback()
+            self._rejected_requests += 1
+            logger.warning(f"Endpoint rate limit exceeded: {endpoint}")
+            raise RateLimitExceededError(
+                f"Rate limit exceeded for endpoint: {endpoint}"
+            )
+
+    def admit(self, client_ip: str, endpoint: str = ""):
+        """
+        请求准入（单次检查所有限制并占用并发槽位）
+
+        一次同步调用内完成并发、全局、IP、接口四层检查，不让出事件循环，
+        因此无需加锁。被拒绝时不会留下任何部分扣减。成功后必须调用 release()。
+
+        Args:
+            client_ip: 客户端 IP
+            endpoint: 请求接口
+
+        Raises:
+            RateLimitExceededError: 超出限流
+        """
+        self._total_requests += 1
+
+        # 并发检查最廉价且不涉及扣减，放在最前
+        if self._current_concurrent >= self.concurrent_limit:
+            self._rejected_requests += 1
+            raise RateLimitExceededError(
+                f"Concurrent limit exceeded: {self.concurrent_limit}"
+            )
+
+        self._debit_counters(client_ip, endpoint)
+        self._current_concurrent += 1
+
+    def release(self):
+        """释放 admit() 占用的并发槽位"""
+        if self._current_concurrent > 0:
+            self._current_concurrent -= 1
+
     async def check(
         self,
         client_ip: str,
         endpoint: str = "",
     ) -> bool:
         """
-        检查请求是否被允许
+        检查请求是否被允许（不占用并发槽位，请求路径请使用 admit()）
 
         Args:
             client_ip: 客户端 IP
@@ -174,36 +328,7 @@ class RateLimiter:
             RateLimitExceededError: 超出限流
         """
         self._total_requests += 1
-
-        # 检查全局限流
-        if not await self._global_limiter.is_allowed():
-            self._rejected_requests += 1
-            logger.warning(f"Global rate limit exceeded")
-            raise RateLimitExceededError("Global rate limit exceeded")
-
-        # 检查 IP 限流
-        if client_ip not in self._ip_limiters:
-            self._ip_limiters[client_ip] = SlidingWindowCounter(60, self.ip_rpm)
-
-        if not await self._ip_limiters[client_ip].is_allowed():
-            self._rejected_requests += 1
-            logger.warning(f"IP rate limit exceeded: {client_ip}")
-            raise RateLimitExceededError(f"Rate limit exceeded for IP: {client_ip}")
-
-        # 检查接口限流
-        if endpoint and endpoint in self.endpoint_rpm:
-            if endpoint not in self._endpoint_limiters:
-                self._endpoint_limiters[endpoint] = SlidingWindowCounter(
-                    60, self.endpoint_rpm[endpoint]
-                )
-
-            if not await self._endpoint_limiters[endpoint].is_allowed():
-                self._rejected_requests += 1
-                logger.warning(f"Endpoint rate limit exceeded: {endpoint}")
-                raise RateLimitExceededError(
-                    f"Rate limit exceeded for endpoint: {endpoint}"
-                )
-
+        self._debit_counters(client_ip, endpoint)
         return True
 
     async def acquire_concurrent(self) -> bool:
@@ -216,19 +341,126 @@ class RateLimiter:
         Raises:
             RateLimitExceededError: 并发超限
         """
-        async with self._concurrent_lock:
-            if self._current_concurrent >= self.concurrent_limit:
+        if self._current_concurrent >= self.concurrent_limit:
+            self._rejected_requests += 1
+            raise RateLimitExceededError(
+                f"Concurrent limit exceeded: {self.concurrent_limit}"
+            )
+        self._current_concurrent += 1
+        return True
+
+    async def release_concurrent(self):
+        """释放并发槽位"""
+        self.release()
+
+    def _get_cost_bucket(self, scope: str, ident: str, dimension: str) -> Optional[TokenBucket]:
+        """获取（或创建）成本令牌桶，配额为 0 时返回 None"""
+        chars_limit, audio_limit = self.cost_limits[scope]
+        per_minute = chars_limit if dimension == "chars" else audio_limit
+        if per_minute <= 0:
+            return None
+
+        key = (scope, ident, dimension)
+        bucket = self._cost_buckets.get(key)
+        if bucket is None:
+            bucket = TokenBucket(capacity=per_minute, refill_rate=per_minute / 60.0)
+            self._cost_buckets[key] = bucket
+        return bucket
+
+    def _iter_cost_buckets(
+        self,
+        client_ip: str,
+        text_length: int,
+        audio_seconds: float,
+        api_key: Optional[str],
+    ) -> Iterator[Tuple[str, str, TokenBucket, float]]:
+        """请求涉及的成本令牌桶: (级别, 维度, 令牌桶, 成本)，跳过未启用的维度"""
+        scopes = [("ip", client_ip)]
+        if api_key and api_key in self.api_keys:
+            scopes.append(("key", api_key))
+        for scope, ident in scopes:
+            for dimension, cost in (("chars", text_length), ("audio_seconds", audio_seconds)):
+                bucket = self._get_cost_bucket(scope, ident, dimension)
+                if bucket is not None:
+                    yield scope, dimension, bucket, cost
+
+    def consume_cost(
+        self,
+        client_ip: str,
+        text_length: int,
+        audio_seconds: float,
+        api_key: Optional[str] = None,
+    ) -> Dict[str, float]:
+        """
+        按请求成本扣减配额
+
+        在请求转发到节点前调用，按文本字符数和估算音频秒数扣减
+        IP 和 API Key 两级令牌桶。任一维度不足时回滚已扣减的令牌。
+
+        Args:
+            client_ip: 客户端 IP
+            text_length: 文本字符数
+            audio_seconds: 估算音频秒数
+            api_key: API Key（可选，不在 api_keys 中时忽略）
+
+        Returns:
+            剩余配额 {"chars": ..., "audio_seconds": ...}，未启用的维度不返回
+
+        Raises:
+            RateLimitExceededError: 配额不足
+        """
+        acquired: List[Tuple[TokenBucket, float]] = []
+        remaining: Dict[str, float] = {}
+
+        for scope, dimension, bucket, cost in self._iter_cost_buckets(client_ip, text_length, audio_seconds, api_key):
+            if not bucket.try_acquire(cost):
+                for taken_bucket, taken in acquired:
+                    taken_bucket.refund(taken)
                 self._rejected_requests += 1
+                retry_after = bucket.time_until(cost)
+                logger.warning(f"Cost quota exceeded: {scope} {dimension} ({cost:.1f})")
+                if retry_after == float("inf"):
+                    raise RateLimitExceededError(
+                        f"Request cost exceeds {scope} {dimension} quota per minute"
+                    )
                 raise RateLimitExceededError(
-                    f"Concurrent limit exceeded: {self.concurrent_limit}"
+                    f"Rate limit exceeded for {scope} {dimension} quota",
+                    retry_after=retry_after,
                 )
-            self._current_concurrent += 1
-            return True
 
-    async def release_concurrent(self):
-        """释放并发槽位"""
-        async with self._concurrent_lock:
-            self._current_concurrent = max(0, self._current_concurrent - 1)
+            acquired.append((bucket, cost))
+            left = bucket.tokens
+            remaining[dimension] = min(remaining.get(dimension, left), left)
+
+        return remaining
+
+    def refund_cost(
+        self,
+        client_ip: str,
+        text_length: int,
+        audio_seconds: float,
+        api_key: Optional[str] = None,
+    ) -> Dict[str, float]:
+        """
+        归还 consume_cost 扣减的配额
+
+        请求没有产出音频（节点繁忙、节点报错、转发失败）时调用，参数与扣减时相同。
+
+        Args:
+            client_ip: 客户端 IP
+            text_length: 文本字符数
+            audio_seconds: 估算音频秒数
+            api_key: API Key（可选，不在 api_keys 中时忽略）
+
+        Returns:
+            归还后的剩余配额 {"chars": ..., "audio_seconds": ...}，未启用的维度不返回
+        """
+        remaining: Dict[str, float] = {}
+        for _, dimension, bucket, cost in self._iter_cost_buckets(client_ip, text_length, audio_seconds, api_key):
+            bucket.refund(cost)
+            left = bucket.tokens
+            remaining[dimension] = min(remaining.get(dimension, left), left)
+        return remaining
 
     def get_stats(self) -> Dict:
         """获取限流统计"""
@@ -244,6 +476,13 @@ class RateLimiter:
             "concurrent_limit": self.concurrent_limit,
             "global_rpm": self.global_rpm,
             "ip_rpm": self.ip_rpm,
+            "backend": "shared" if self.shared_store is not None else "memory",
+            "ip_chars_per_minute": self.cost_limits["ip"][0],
+            "ip_audio_seconds_per_minute": self.cost_limits["ip"][1],
+            "key_chars_per_minute": self.cost_limits["key"][0],
+            "key_audio_seconds_per_minute": self.cost_limits["key"][1],
+            "api_keys": len(self.api_keys),
+            "cost_buckets": len(self._cost_buckets),
         }
 
     async def get_remaining(self, client_ip: str) -> Dict:
@@ -256,11 +495,11 @@ class RateLimiter:
         Returns:
             剩余配额信息
         """
-        global_remaining = await self._global_limiter.get_remaining()
+        global_remaining = self._global_limiter.remaining()
 
         ip_remaining = self.ip_rpm
         if client_ip in self._ip_limiters:
-            ip_remaining = await self._ip_limiters[client_ip].get_remaining()
+            ip_remaining = self._ip_limiters[client_ip].remaining()
 
         return {
             "global_remaining": global_remaining,
@@ -272,13 +511,53 @@ class RateLimiter:
 
     def cleanup_expired(self):
         """
-        清理过期的 IP 限流器
+        清理过期的限流状态
 
-        定期调用此方法可释放不活跃 IP 的内存。
-        当前实现: 清空所有 IP 限流器（适用于低流量场景）。
-        TODO: 实现基于 LRU 或最后访问时间的清理策略。
+        由 start_cleanup() 启动的任务定期调用:
+        - IP 限流器数量超过阈值时全部清空（适用于低流量场景）
+        - 已回满的成本令牌桶与新建桶等价，直接丢弃
         """
         if len(self._ip_limiters) > 1000:
             # 当 IP 限流器数量超过阈值时清理
             logger.info(f"Cleaning up {len(self._ip_limiters)} IP rate limiters")
             self._ip_limiters.clear()
+
+        now = time.monotonic()
+        full = [
+            k for k, b in self._cost_buckets.items()
+            if b.tokens + (now - b.last_refill) * b.refill_rate >= b.capacity
+        ]
+        for k in full:
+            del self._cost_buckets[k]
+        if full:
+            logger.debug(f"Cleaned up {len(full)} idle cost buckets")
+
+    async def start_cleanup(self, interval: float = 60.0):
+        """
+        启动定期清理任务
+
+        Args:
+            interval: 清理间隔（秒）
+        """
+        if self._cleanup_task is not None:
+            return
+        self._cleanup_task = asyncio.create_task(self._cleanup_loop(interval))
+
+    async def stop_cleanup(self):
+        """停止定期清理任务"""
+        if self._cleanup_task is None:
+            return
+        self._cleanup_task.cancel()
+        try:
+            await self._cleanup_task
+        except asyncio.CancelledError:
+            pass
+        self._cleanup_task = None
+
+    async def _cleanup_loop(self, interval: float):
+        while True:
+            await asyncio.sleep(interval)
+            try:
+                self.cleanup_expired()
+            except Exception as e:
+                logger.warning(f"Rate limiter cleanup failed: {e}")
@@ -0,0 +1,191 @@
+"""
+网关指标
+
+定义网关暴露在 /metrics 上的全部指标，并提供 ASGI 中间件记录请求延迟。
+"""
+
+import time
+from typing import Dict, Tuple
+
+from starlette.types import ASGIApp, Receive, Scope, Send
+
+from ..common.metrics import MetricsRegistry
+from .limiter import RateLimiter
+from .registry import ServiceRegistry
+
+# 限流检查在微秒级，单独定义桶
+LIMITER_BUCKETS = (0.00001, 0.00005, 0.0001, 0.0005, 0.001, 0.005, 0.01, 0.05)
+
+
+class GatewayMetrics:
+    """网关指标集合"""
+
+    def __init__(self, registry: ServiceRegistry, limiter: RateLimiter):
+        """
+        初始化网关指标
+
+        Args:
+            registry: 服务注册中心（输出节点状态）
+            limiter: 限流器（输出当前并发）
+        """
+        self.registry = MetricsRegistry()
+        self._service_registry = registry
+        self._limiter = limiter
+
+        self.request_duration = self.registry.histogram(
+            "tts_gateway_request_duration_seconds",
+            "Gateway request latency",
+            ("route", "engine", "node"),
+        )
+        self.responses = self.registry.counter(
+            "tts_gateway_responses_total",
+            "Gateway responses by status code",
+            ("route", "status"),
+        )
+        self.upstream_duration = self.registry.histogram(
+            "tts_gateway_upstream_duration_seconds",
+            "Gateway to worker round-trip latency",
+            ("engine", "node"),
+        )
+        self.first_chunk = self.registry.histogram(
+            "tts_gateway_stream_first_chunk_seconds",
+            "Time from request arrival to the first streamed audio chunk",
+            ("engine", "node"),
+        )
+        self.limiter_wait = self.registry.histogram(
+            "tts_gateway_limiter_wait_seconds",
+            "Time spent in rate limiter admission",
+            buckets=LIMITER_BUCKETS,
+        )
+        self.queue_wait = self.registry.histogram(
+            "tts_gateway_queue_wait_seconds",
+            "Time requests waited in worker queues (reported by workers)",
+            ("engine",),
+        )
+        self.rejections = self.registry.counter(
+            "tts_gateway_rejections_total",
+            "Requests rejected by the gateway",
+            ("reason",),
+        )
+        self.retries = self.registry.counter(
+            "tts_gateway_retries_total",
+            "Upstream requests retried on another node",
+            ("engine", "reason"),
+        )
+        self.autoscale_actions = self.registry.counter(
+            "tts_gateway_autoscale_actions_total",
+            "Nodes activated or put on standby by the autoscaler",
+            ("engine", "action"),
+        )
+        self.registry.gauge(
+            "tts_gateway_concurrent_requests",
+            "Requests currently admitted by the rate limiter",
+            collect=lambda: {(): limiter._current_concurrent},
+        )
+        self.registry.gauge(
+            "tts_gateway_nodes",
+            "Registered worker nodes by engine and status",
+            ("engine", "status"),
+            collect=self._collect_nodes,
+        )
+        self.registry.gauge(
+            "tts_gateway_node_capacity_chars_per_second",
+            "Synthesis capacity reported by each node (single-stream chars/s x inference concurrency)",
+            ("engine", "node"),
+            collect=self._collect_capacity,
+        )
+        self.registry.gauge(
+            "tts_gateway_node_rtf",
+            "Real-time factor reported by each node per language",
+            ("engine", "node", "language"),
+            collect=self._collect_rtf,
+        )
+        self.registry.counter(
+            "tts_gateway_node_embedding_cache_hits_total",
+            "Voice embedding cache hits reported by each node",
+            ("engine", "node"),
+            collect=lambda: self._collect_node_counter("embedding_cache_hits"),
+        )
+        self.registry.counter(
+            "tts_gateway_node_embedding_cache_misses_total",
+            "Voice embedding cache misses reported by each node",
+            ("engine", "node"),
+            collect=lambda: self._collect_node_counter("embedding_cache_misses"),
+        )
+
+    def _collect_nodes(self) -> Dict[Tuple[str, ...], float]:
+        counts: Dict[Tuple[str, ...], float] = {}
+        for node in self._service_registry.get_nodes():
+            key = (node.engine_type.value, node.status.value)
+            counts[key] = counts.get(key, 0) + 1
+        return counts
+
+    def _collect_capacity(self) -> Dict[Tuple[str, ...], float]:
+        return {
+            (node.engine_type.value, node.node_id): node.capacity_chars_per_second
+            for node in self._service_registry.get_nodes()
+            if node.capacity_chars_per_second > 0
+        }
+
+    def _collect_rtf(self) -> Dict[Tuple[str, ...], float]:
+        values: Dict[Tuple[str, ...], float] = {}
+        for node in self._service_registry.get_nodes():
+            for language, entry in node.capacity.items():
+                if entry.get("rtf", 0) > 0:
+                    values[(node.engine_type.value, node.node_id, language)] = entry["rtf"]
+        return values
+
+    def _collect_node_counter(self, field: str) -> Dict[Tuple[str, ...], float]:
+        return {
+            (node.engine_type.value, node.node_id): getattr(node, field)
+            for node in self._service_registry.get_nodes()
+        }
+
+    def render(self) -> str:
+        """输出 Prometheus 文本格式"""
+        return self.registry.render()
+
+
+class MetricsMiddleware:
+    """
+    请求延迟指标中间件
+
+    路由标签取匹配到的路由模板（如 /api/nodes/{node_id}），避免路径参数导致标签膨胀；
+    引擎和节点标签由路由处理函数写入 request.state.engine / request.state.node_id。
+    """
+
+    def __init__(self, app: ASGIApp, metrics: GatewayMetrics):
+        """
+        初始化指标中间件
+
+        Args:
+            app: 下游 ASGI 应用
+            metrics: 网关指标
+        """
+        self.app = app
+        self.metrics = metrics
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        start = time.perf_counter()
+        status_code = 500
+
+        async def send_wrapper(message):
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            route = scope.get("route")
+            route_path = getattr(route, "path", None) or "unmatched"
+            state = scope.get("state") or {}
+            self.metrics.request_duration.labels(
+                route_path, state.get("engine", ""), state.get("node_id", "")
+            ).observe(time.perf_counter() - start)
+            self.metrics.responses.labels(route_path, str(status_code)).inc()
@@ -0,0 +1,105 @@
+"""
+网关 ASGI 中间件
+
+以原生 ASGI 形式实现，避免 BaseHTTPMiddleware 对每个请求和流式响应
+额外包装带来的开销。
+"""
+
+import time
+import logging
+from typing import Iterable, Optional
+
+from starlette.responses import JSONResponse
+from starlette.types import ASGIApp, Receive, Scope, Send
+
+from ..common.exceptions import RateLimitExceededError
+from ..common.tracing import current_trace
+from .limiter import RateLimiter
+from .metrics import GatewayMetrics
+
+logger = logging.getLogger(__name__)
+
+# 不参与限流的路径
+DEFAULT_SKIP_PREFIXES = ("/static", "/status", "/admin", "/playground")
+DEFAULT_SKIP_PATHS = ("/health", "/", "/api/health", "/metrics")
+
+
+def rate_limit_response(exc: RateLimitExceededError) -> JSONResponse:
+    """构造 429 限流响应"""
+    headers = {}
+    if exc.retry_after > 0:
+        headers["Retry-After"] = str(max(1, int(exc.retry_after + 0.999)))
+    return JSONResponse(
+        status_code=429,
+        content={"error": str(exc), "code": exc.code},
+        headers=headers,
+    )
+
+
+class RateLimitMiddleware:
+    """请求限流中间件"""
+
+    def __init__(
+        self,
+        app: ASGIApp,
+        limiter: RateLimiter,
+        skip_prefixes: Iterable[str] = DEFAULT_SKIP_PREFIXES,
+        skip_paths: Iterable[str] = DEFAULT_SKIP_PATHS,
+        metrics: Optional[GatewayMetrics] = None,
+    ):
+        """
+        初始化限流中间件
+
+        Args:
+            app: 下游 ASGI 应用
+            limiter: 限流器
+            skip_prefixes: 跳过限流的路径前缀
+            skip_paths: 跳过限流的完整路径
+            metrics: 网关指标（记录准入耗时和拒绝次数）
+        """
+        self.app = app
+        self.limiter = limiter
+        # 预先取出子指标，请求路径上不做标签查找
+        self._wait_metric = metrics.limiter_wait if metrics else None
+        self._reject_metric = metrics.rejections.labels("rate_limit") if metrics else None
+        # 构造时预计算，请求路径上只做一次集合查找和一次前缀匹配
+        self._skip_prefixes = tuple(skip_prefixes)
+        self._skip_paths = frozenset(skip_paths)
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        path = scope["path"]
+        if path in self._skip_paths or path.startswith(self._skip_prefixes):
+            await self.app(scope, receive, send)
+            return
+
+        client = scope.get("client")
+        client_ip = client[0] if client else "unknown"
+
+        start = time.perf_counter()
+        rejected = None
+        try:
+            self.limiter.admit(client_ip, path)
+        except RateLimitExceededError as e:
+            rejected = e
+
+        waited = time.perf_counter() - start
+        trace = current_trace()
+        if trace is not None:
+            trace.add("limiter", waited * 1000)
+        if self._wait_metric is not None:
+            self._wait_metric.observe(waited)
+
+        if rejected is not None:
+            if self._reject_metric is not None:
+                self._reject_metric.inc()
+            await rate_limit_response(rejected)(scope, receive, send)
+            return
+
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            self.limiter.release()
@@ -7,7 +7,7 @@
 import asyncio
 import time
 import logging
-from typing import Dict, List, Optional, Callable
+from typing import Dict, List, Optional, Callable, Collection
 from collections import defaultdict
 import httpx
 
@@ -18,6 +18,7 @@ from ..common.models import (
     EngineType,
     NodeCommand,
 )
+from ..common.control import CommandNotSentError
 from ..common.exceptions import (
     NodeNotFoundError,
     NoAvailableNodeError,
@@ -25,6 +26,17 @@ from ..common.exceptions import (
 
 logger = logging.getLogger(__name__)
 
+# 节点收到后会先排空的命令: 发送前即标记为 DRAINING，不必等下一次心跳才停止路由
+DRAINING_COMMANDS = frozenset({"drain", "standby", "unload_model", "stop"})
+
+# 控制命令的超时（秒）；加载类命令要在节点上加载完整模型
+COMMAND_TIMEOUT = 30.0
+LOAD_COMMAND_TIMEOUT = 600.0
+LOAD_COMMANDS = frozenset({"activate", "load_model", "reload"})
+
+# 按容量分配时的最低相对权重，避免慢节点完全收不到请求而无法更新速度估计
+MIN_CAPACITY_WEIGHT = 0.05
+
 
 class ServiceRegistry:
     """服务注册中心"""
@@ -33,6 +45,10 @@ class ServiceRegistry:
         self,
         heartbeat_interval: int = 10,
         dead_threshold: int = 30,
+        slow_start_seconds: float = 0.0,
+        slow_start_requests: int = 0,
+        slow_start_min_weight: float = 0.1,
+        capacity_routing: bool = False,
     ):
         """
         初始化服务注册中心
@@ -40,9 +56,19 @@ class ServiceRegistry:
         Args:
             heartbeat_interval: 心跳间隔（秒）
             dead_threshold: 节点死亡阈值（秒）
+            slow_start_seconds: 节点注册或重新变为可用后，路由权重按时间爬升到 1 的时长（0 表示不按时间）
+            slow_start_requests: 路由权重按被选中次数爬升到 1 的请求数（0 表示不按请求数）
+            slow_start_min_weight: 慢启动的初始权重
+            capacity_routing: 是否按节点上报的容量分配请求（与慢启动权重相乘）
         """
         self.heartbeat_interval = heartbeat_interval
         self.dead_threshold = dead_threshold
+        self.slow_start_seconds = slow_start_seconds
+        self.slow_start_requests = slow_start_requests
+        self.slow_start_min_weight = min(1.0, max(0.01, slow_start_min_weight))
+        self.capacity_routing = capacity_routing
+        # 节点控制通道（由网关设置）；节点已连接时命令经通道下发，否则使用 HTTP
+        self.control = None
 
         # 节点存储: node_id -> NodeInfo
         self._nodes: Dict[str, NodeInfo] = {}
@@ -52,6 +78,11 @@ class ServiceRegistry:
 
         # 负载均衡计数器（轮询）
         self._round_robin_counters: Dict[EngineType, int] = defaultdict(int)
+        # 加权轮询的当前值（慢启动期间使用）: node_id -> current weight
+        self._weighted_counters: Dict[str, float] = defaultdict(float)
+
+        # 各引擎的选节点次数（累计，不含重试），自动扩缩据此计算需求
+        self._demand: Dict[EngineType, int] = defaultdict(int)
 
         # 事件回调
         self._on_node_online: Optional[Callable] = None
@@ -75,10 +106,17 @@ class ServiceRegistry:
         """
         node_id = node.node_id
         is_new = node_id not in self._nodes
+        previous = self._nodes.get(node_id)
 
         # 更新节点信息
         node.registered_at = time.time()
         node.last_heartbeat = time.time()
+        if previous is not None and previous.is_available and node.is_available:
+            # 重新注册的可用节点保持慢启动进度
+            node.ready_since = previous.ready_since
+            node.ready_requests = previous.ready_requests
+        else:
+            self._mark_ready(node, was_available=False)
         self._nodes[node_id] = node
 
         # 更新引擎索引
@@ -109,6 +147,7 @@ class ServiceRegistry:
             return False
 
         node = self._nodes.pop(node_id)
+        self._weighted_counters.pop(node_id, None)
 
         # 从引擎索引中移除
         engine = node.engine_type
@@ -139,9 +178,12 @@ class ServiceRegistry:
 
         node = self._nodes[node_id]
         node.last_heartbeat = time.time()
+        was_available = node.is_available
 
         # 更新指标
         if metrics:
+            if metrics.model_loaded is not None:
+                node.model_loaded = metrics.model_loaded
             node.cpu_percent = metrics.cpu_percent
             node.memory_percent = metrics.memory_percent
             node.gpu_percent = metrics.gpu_percent
@@ -150,6 +192,15 @@ class ServiceRegistry:
             node.request_count = metrics.request_count
             node.error_count = metrics.error_count
             node.avg_response_time = metrics.avg_response_time_ms
+            node.queue_size = metrics.queue_size
+            node.p50_response_time = metrics.p50_response_time_ms
+            node.p95_response_time = metrics.p95_response_time_ms
+            node.p99_response_time = metrics.p99_response_time_ms
+            node.process_rss_mb = metrics.process_rss_mb
+            node.capacity = metrics.capacity
+            node.capacity_chars_per_second = metrics.capacity_chars_per_second
+            node.embedding_cache_hits = metrics.embedding_cache_hits
+            node.embedding_cache_misses = metrics.embedding_cache_misses
 
             # 同步状态
             if metrics.status != node.status:
@@ -158,6 +209,7 @@ class ServiceRegistry:
                 if self._on_node_status_change:
                     self._on_node_status_change(node, old_status, metrics.status)
 
+        self._mark_ready(node, was_available)
         return True
 
     def update_status(self, node_id: str, status: WorkerStatus) -> bool:
@@ -176,8 +228,10 @@ class ServiceRegistry:
 
         node = self._nodes[node_id]
         old_status = node.status
+        was_available = node.is_available
         node.status = status
         node.last_heartbeat = time.time()
+        self._mark_ready(node, was_available)
 
         if old_status != status:
             logger.info(f"Node {node_id} status: {old_status.value} -> {status.value}")
@@ -300,12 +354,16 @@ class ServiceRegistry:
         if available_only:
             nodes = [n for n in nodes if n.is_available]
 
+        if self.slow_start_enabled or self.capacity_routing:
+            self._refresh_weights(nodes)
+
         return nodes
 
     def select_node(
         self,
         engine: EngineType,
         strategy: str = "round_robin",
+        exclude: Optional[Collection[str]] = None,
     ) -> NodeInfo:
         """
         选择一个可用节点（负载均衡）
@@ -313,6 +371,7 @@ class ServiceRegistry:
         Args:
             engine: 引擎类型
             strategy: 负载均衡策略 (round_robin, least_load, random)
+            exclude: 排除的节点 ID（重试时跳过已失败的节点）
 
         Returns:
             选中的节点
@@ -320,11 +379,32 @@ class ServiceRegistry:
         Raises:
             NoAvailableNodeError: 无可用节点
         """
+        if not exclude:
+            self._demand[engine] += 1
         available = self.get_nodes(engine=engine, available_only=True)
+        if exclude:
+            available = [n for n in available if n.node_id not in exclude]
 
         if not available:
             raise NoAvailableNodeError(engine.value)
 
+        node = self._choose(engine, available, strategy)
+        node.ready_requests += 1
+        return node
+
+    def _choose(self, engine: EngineType, available: List[NodeInfo], strategy: str) -> NodeInfo:
+        """按策略从可用节点中选一个；有节点处于慢启动时按权重分配"""
+        weighted = any(n.weight < 1.0 for n in available)
+
+        if strategy == "round_robin" and weighted:
+            # 平滑加权轮询: 每轮各节点累加自身权重，选累计值最大的节点并减去总权重
+            total = sum(n.weight for n in available)
+            for n in available:
+                self._weighted_counters[n.node_id] += n.weight
+            node = max(available, key=lambda n: self._weighted_counters[n.node_id])
+            self._weighted_counters[node.node_id] -= total
+            return node
+
         if strategy == "round_robin":
             # 轮询
             counter = self._round_robin_counters[engine]
@@ -333,24 +413,104 @@ class ServiceRegistry:
             return node
 
         elif strategy == "least_load":
-            # 最小负载（按当前并发数）
-            return min(available, key=lambda n: n.current_concurrent)
+            # 最小负载（按当前并发数，相同时选近期 p95 更低的节点；慢启动节点的并发按权重放大）
+            if weighted:
+                return min(available, key=lambda n: ((n.current_concurrent + 1) / n.weight, n.p95_response_time))
+            return min(available, key=lambda n: (n.current_concurrent, n.p95_response_time))
 
         elif strategy == "random":
-            # 随机
+            # 随机（按权重）
             import random
+            if weighted:
+                return random.choices(available, weights=[n.weight for n in available])[0]
             return random.choice(available)
 
         else:
             # 默认轮询
             return available[0]
 
+    # ===================== 慢启动 =====================
+
+    @property
+    def slow_start_enabled(self) -> bool:
+        """是否启用慢启动"""
+        return self.slow_start_seconds > 0 or self.slow_start_requests > 0
+
+    def _refresh_weights(self, nodes: List[NodeInfo]):
+        """
+        更新节点的路由权重: 慢启动进度 × 相对容量
+
+        相对容量为节点容量除以同引擎可用节点中的最大容量（不低于 MIN_CAPACITY_WEIGHT）；
+        未上报容量的节点按 1 计算，不因缺少估计被冷落。
+        """
+        now = time.time()
+        peak: Dict[EngineType, float] = {}
+        if self.capacity_routing:
+            for n in self._nodes.values():
+                if n.is_available and n.capacity_chars_per_second > 0:
+                    peak[n.engine_type] = max(peak.get(n.engine_type, 0.0), n.capacity_chars_per_second)
+
+        for node in nodes:
+            weight = self._slow_start_weight(node, now) if self.slow_start_enabled else 1.0
+            top = peak.get(node.engine_type, 0.0)
+            if top > 0 and node.capacity_chars_per_second > 0:
+                weight *= max(MIN_CAPACITY_WEIGHT, min(1.0, node.capacity_chars_per_second / top))
+            node.weight = weight
+
+    def _mark_ready(self, node: NodeInfo, was_available: bool):
+        """节点由不可用变为可用时重新开始慢启动"""
+        if node.is_available and not was_available:
+            node.ready_since = time.time()
+            node.ready_requests = 0
+            self._weighted_counters.pop(node.node_id, None)
+            if self.slow_start_enabled:
+                node.weight = self.slow_start_min_weight
+                logger.info(f"Node {node.node_id} ready, slow start from weight {node.weight:.2f}")
+
+    def _slow_start_weight(self, node: NodeInfo, now: float) -> float:
+        """
+        节点当前的路由权重
+
+        按时间和按请求数的进度都配置时取较小者，两者都完成后权重为 1。
+
+        Args:
+            node: 节点
+            now: 当前时间
+
+        Returns:
+            权重（slow_start_min_weight ~ 1）
+        """
+        if not node.is_available:
+            return 1.0
+        progress = 1.0
+        if self.slow_start_seconds > 0:
+            progress = min(progress, (now - node.ready_since) / self.slow_start_seconds)
+        if self.slow_start_requests > 0:
+            progress = min(progress, node.ready_requests / self.slow_start_requests)
+        progress = max(0.0, progress)
+        return self.slow_start_min_weight + (1.0 - self.slow_start_min_weight) * progress
+
+    def get_demand(self, engine: EngineType) -> int:
+        """
+        引擎的累计选节点次数（包括没有可用节点的请求，不含重试）
+
+        Args:
+            engine: 引擎类型
+
+        Returns:
+            累计次数
+        """
+        return self._demand[engine]
+
     # ===================== 节点控制 =====================
 
     async def send_command(self, node_id: str, command: NodeCommand) -> bool:
         """
         向节点发送控制命令
 
+        排空类命令（drain / standby / stop）发送前先把节点标记为 DRAINING，
+        之后的请求不再路由到该节点；节点的下一次心跳会同步实际状态。
+
         Args:
             node_id: 节点 ID
             command: 控制命令
@@ -362,9 +522,15 @@ class ServiceRegistry:
             raise NodeNotFoundError(node_id)
 
         node = self._nodes[node_id]
+        cmd = command.command.lower()
+        if cmd in DRAINING_COMMANDS and node.status != WorkerStatus.OFFLINE:
+            self.update_status(node_id, WorkerStatus.DRAINING)
+        timeout = LOAD_COMMAND_TIMEOUT if cmd in LOAD_COMMANDS else COMMAND_TIMEOUT
 
         try:
-            async with httpx.AsyncClient(timeout=30.0) as client:
+            if await self._command_via_channel(node_id, command, timeout) is not None:
+                return True
+            async with httpx.AsyncClient(timeout=timeout) as client:
                 resp = await client.post(
                     f"http://{node.address}/command",
                     json=command.model_dump(),
@@ -374,6 +540,70 @@ class ServiceRegistry:
             logger.error(f"Failed to send command to {node_id}: {e}")
             return False
 
+    async def execute_command(self, node_id: str, command: NodeCommand, timeout: float = 30.0) -> Dict:
+        """
+        向节点发送控制命令并返回节点的响应内容
+
+        Args:
+            node_id: 节点 ID
+            command: 控制命令
+            timeout: 超时时间（秒）
+
+        Returns:
+            节点返回的 JSON
+
+        Raises:
+            NodeNotFoundError: 节点不存在
+            httpx.HTTPError: 请求失败
+        """
+        if node_id not in self._nodes:
+            raise NodeNotFoundError(node_id)
+
+        result = await self._command_via_channel(node_id, command, timeout)
+        if result is not None:
+            return result
+
+        node = self._nodes[node_id]
+        async with httpx.AsyncClient(timeout=timeout) as client:
+            resp = await client.post(
+                f"http://{node.address}/command",
+                json=command.model_dump(),
+            )
+            resp.raise_for_status()
+            return resp.json()
+
+    async def _command_via_channel(self, node_id: str, command: NodeCommand, timeout: float) -> Optional[Dict]:
+        """
+        经控制通道发送命令
+
+        Args:
+            node_id: 节点 ID
+            command: 控制命令
+            timeout: 超时时间（秒）
+
+        Returns:
+            节点的返回值；节点未连接控制通道或命令帧没有发出时为 None（调用方改用 HTTP）
+
+        Raises:
+            httpx.TimeoutException: 超时（命令可能仍在执行，不再经 HTTP 重发）
+            httpx.ReadError: 命令已发出，结果返回前连接断开（同样不再重发）
+            httpx.HTTPError: 节点执行命令时出现异常
+        """
+        if self.control is None or not self.control.is_connected(node_id):
+            return None
+        try:
+            reply = await self.control.request(node_id, command, timeout)
+        except CommandNotSentError as e:
+            logger.warning(f"{e}, sending {command.command} over HTTP")
+            return None
+        except ConnectionError as e:
+            raise httpx.ReadError(f"Command {command.command} to {node_id} lost its result: {e}")
+        except asyncio.TimeoutError:
+            raise httpx.ReadTimeout(f"Command {command.command} to {node_id} timed out after {timeout}s")
+        if "error" in reply:
+            raise httpx.HTTPError(f"Command {command.command} failed on {node_id}: {reply['error']}")
+        return reply.get("result", {})
+
     # ===================== 统计与状态 =====================
 
     def get_stats(self) -> Dict:
@@ -0,0 +1,307 @@
+"""
+跨进程共享限流计数器
+
+同一主机上的多个网关进程通过一个 mmap 文件共享限流计数，
+使 global_rpm / ip_rpm 在所有副本之间只生效一次。
+
+设计要点:
+- 文件按固定大小的槽位划分，键通过稳定哈希映射到首选槽位，槽位内记录键的指纹；
+  首选槽位被其他键占用时向后探测，已过期（两个窗口内无计数）的槽位可被接管，
+  探测范围内都被占用时退回本进程计数，不同键之间不会共用计数
+- 每个槽位使用字节区间锁（fcntl / msvcrt），不同键之间互不阻塞
+- 进程一次从共享槽位租借一批配额，在本地扣减，
+  只有租约用完时才访问共享文件，避免请求路径上的锁竞争
+"""
+
+import os
+import mmap
+import time
+import struct
+import zlib
+import hashlib
+import logging
+import tempfile
+from typing import Dict, List, Optional
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+    import msvcrt
+
+logger = logging.getLogger(__name__)
+
+_MAGIC = b"VCRLSHM2"
+_HEADER = struct.Struct("<8sq")  # magic, slot_count
+_SLOT = struct.Struct("<Qqqq")  # fingerprint, window_id, count, prev_count
+_SLOT_SIZE = 32  # 按 32 字节对齐
+
+GLOBAL_SLOT = 0
+
+# 首选槽位被占用时最多向后探测的槽位数
+MAX_PROBE = 8
+
+DEFAULT_SHARED_PATH = os.path.join(tempfile.gettempdir(), "voice_clone_ratelimit.bin")
+
+
+def key_fingerprint(key: str) -> int:
+    """键的 64 位指纹（0 表示空槽位，不会作为指纹）"""
+    digest = hashlib.blake2b(key.encode("utf-8"), digest_size=8).digest()
+    return int.from_bytes(digest, "little") or 1
+
+
+class SharedCounterStore:
+    """基于 mmap 文件的共享计数存储"""
+
+    def __init__(self, path: Optional[str] = None, slot_count: int = 4096):
+        """
+        初始化共享存储
+
+        Args:
+            path: 共享文件路径（不指定则使用系统临时目录）
+            slot_count: 槽位数量（已存在的文件以文件内记录为准）
+        """
+        self.path = path or DEFAULT_SHARED_PATH
+        self._fd = os.open(self.path, os.O_RDWR | os.O_CREAT, 0o600)
+
+        # 在头部锁内完成初始化，防止多个进程同时创建
+        self._lock_range(0, _HEADER.size)
+        try:
+            size = os.fstat(self._fd).st_size
+            if size < _HEADER.size:
+                total = _HEADER.size + (slot_count + 1) * _SLOT_SIZE
+                os.ftruncate(self._fd, total)
+                os.lseek(self._fd, 0, os.SEEK_SET)
+                os.write(self._fd, _HEADER.pack(_MAGIC, slot_count))
+            else:
+                magic, existing = self._read_header()
+                if magic != _MAGIC:
+                    raise ValueError(f"Invalid rate limit file: {self.path}")
+                slot_count = existing
+        finally:
+            self._unlock_range(0, _HEADER.size)
+
+        self.slot_count = slot_count
+        self._mm = mmap.mmap(self._fd, _HEADER.size + (slot_count + 1) * _SLOT_SIZE)
+        # 键 -> 上次所在的槽位（只作为探测起点，每次访问都在锁内核对指纹）
+        self._slots: Dict[str, int] = {}
+        logger.info(f"Shared rate limit store: {self.path} ({slot_count} slots)")
+
+    def _read_header(self):
+        os.lseek(self._fd, 0, os.SEEK_SET)
+        return _HEADER.unpack(os.read(self._fd, _HEADER.size))
+
+    # ===================== 锁 =====================
+
+    def _lock_range(self, offset: int, length: int):
+        if fcntl is not None:
+            fcntl.lockf(self._fd, fcntl.LOCK_EX, length, offset, os.SEEK_SET)
+        else:
+            os.lseek(self._fd, offset, os.SEEK_SET)
+            msvcrt.locking(self._fd, msvcrt.LK_LOCK, length)
+
+    def _unlock_range(self, offset: int, length: int):
+        if fcntl is not None:
+            fcntl.lockf(self._fd, fcntl.LOCK_UN, length, offset, os.SEEK_SET)
+        else:
+            os.lseek(self._fd, offset, os.SEEK_SET)
+            msvcrt.locking(self._fd, msvcrt.LK_UNLCK, length)
+
+    # ===================== 槽位操作 =====================
+
+    def slot_for(self, key: str) -> int:
+        """键的首选槽位（全局计数固定占用 0 号槽位）"""
+        if key == "global":
+            return GLOBAL_SLOT
+        return 1 + zlib.crc32(key.encode("utf-8")) % self.slot_count
+
+    def _candidates(self, key: str, fingerprint: int) -> List[int]:
+        """探测顺序: 已记录该键指纹的槽位优先，其次从首选槽位向后"""
+        home = self.slot_for(key)
+        if home == GLOBAL_SLOT:
+            return [GLOBAL_SLOT]
+        probe = [1 + (home - 1 + i) % self.slot_count for i in range(min(MAX_PROBE, self.slot_count))]
+        hint = self._slots.get(key)
+        if hint is None or hint not in probe:
+            # 不加锁读取，只用于排序，是否属于该键在 claim 的锁内确认
+            hint = next(
+                (slot for slot in probe if _SLOT.unpack_from(self._mm, self._offset(slot))[0] == fingerprint),
+                None,
+            )
+        if hint is not None:
+            probe.remove(hint)
+            probe.insert(0, hint)
+        return probe
+
+    @staticmethod
+    def _offset(slot: int) -> int:
+        return _HEADER.size + slot * _SLOT_SIZE
+
+    def claim(
+        self,
+        key: str,
+        window_size: int,
+        limit: int,
+        want: int,
+        now: Optional[float] = None,
+    ) -> Optional[int]:
+        """
+        从键的槽位租借配额
+
+        使用滑动窗口近似: 上一窗口的计数按剩余比例加权计入当前窗口。
+
+        Args:
+            key: 计数键
+            window_size: 窗口大小（秒）
+            limit: 窗口内最大请求数
+            want: 期望租借的数量
+            now: 当前时间（测试用）
+
+        Returns:
+            实际租借到的数量（0 表示已超限），探测范围内的槽位都被其他键占用时返回 None
+        """
+        now = time.time() if now is None else now
+        window_id = int(now // window_size)
+        elapsed_frac = (now % window_size) / window_size
+        fingerprint = key_fingerprint(key)
+
+        for slot in self._candidates(key, fingerprint):
+            offset = self._offset(slot)
+            self._lock_range(offset, _SLOT_SIZE)
+            try:
+                owner, stored_window, count, prev_count = _SLOT.unpack_from(self._mm, offset)
+                if owner != fingerprint:
+                    if owner != 0 and stored_window >= window_id - 1:
+                        # 其他键仍在使用
+                        continue
+                    # 空槽位或已过期的槽位: 接管
+                    stored_window, count, prev_count = window_id, 0, 0
+
+                if stored_window != window_id:
+                    prev_count = count if stored_window == window_id - 1 else 0
+                    count = 0
+
+                used = prev_count * (1.0 - elapsed_frac) + count
+                granted = max(0, min(want, int(limit - used)))
+                _SLOT.pack_into(self._mm, offset, fingerprint, window_id, count + granted, prev_count)
+                self._slots[key] = slot
+                return granted
+            finally:
+                self._unlock_range(offset, _SLOT_SIZE)
+
+        self._slots.pop(key, None)
+        return None
+
+    def used(self, key: str, window_size: int, now: Optional[float] = None) -> float:
+        """读取键在当前窗口内的已用配额（近似值，没有槽位时为 0）"""
+        now = time.time() if now is None else now
+        window_id = int(now // window_size)
+        elapsed_frac = (now % window_size) / window_size
+        fingerprint = key_fingerprint(key)
+
+        for slot in self._candidates(key, fingerprint):
+            owner, stored_window, count, prev_count = _SLOT.unpack_from(self._mm, self._offset(slot))
+            if owner != fingerprint:
+                continue
+            if stored_window == window_id:
+                return prev_count * (1.0 - elapsed_frac) + count
+            if stored_window == window_id - 1:
+                return count * (1.0 - elapsed_frac)
+            return 0.0
+        return 0.0
+
+    def close(self):
+        """关闭共享存储"""
+        try:
+            self._mm.close()
+        finally:
+            os.close(self._fd)
+
+
+class SharedWindowCounter:
+    """
+    共享滑动窗口计数器
+
+    与 SlidingWindowCounter 接口一致。进程在本地持有一小批租约配额，
+    只有租约用完时才加锁访问共享文件。已租借但未使用的配额在窗口切换时作废，
+    因此整体限流略偏严格，误差上限为 副本数 × 租约大小。
+    共享文件中没有可用槽位时退回本进程的滑动窗口计数。
+    """
+
+    MAX_LEASE = 20
+
+    def __init__(
+        self,
+        store: SharedCounterStore,
+        key: str,
+        window_size: int = 60,
+        limit: int = 100,
+    ):
+        """
+        初始化共享计数器
+
+        Args:
+            store: 共享存储
+            key: 计数键（如 "global"、"ip:1.2.3.4"）
+            window_size: 窗口大小（秒）
+            limit: 窗口内最大请求数
+        """
+        self.store = store
+        self.key = key
+        self.window_size = window_size
+        self.limit = limit
+        self._lease_size = max(1, min(self.MAX_LEASE, limit // 50))
+        self._lease_window = -1
+        self._lease_left = 0
+
+        from .limiter import SlidingWindowCounter
+
+        # 槽位被其他键占满时使用的本进程计数
+        self._local = SlidingWindowCounter(window_size, limit)
+        self._using_local = False
+
+    def try_acquire(self) -> bool:
+        """
+        检查请求是否被允许，允许时记录本次请求
+
+        Returns:
+            是否允许
+        """
+        now = time.time()
+        window_id = int(now // self.window_size)
+        if self._lease_window == window_id and self._lease_left > 0:
+            self._lease_left -= 1
+            return True
+
+        granted = self.store.claim(
+            self.key, self.window_size, self.limit, self._lease_size, now
+        )
+        if granted is None:
+            if not self._using_local:
+                logger.warning(f"No free shared rate limit slot for {self.key}, counting in this process")
+            self._using_local = True
+            return self._local.try_acquire()
+
+        self._using_local = False
+        if granted <= 0:
+            return False
+
+        self._lease_window = window_id
+        self._lease_left = granted - 1
+        return True
+
+    def rollback(self):
+        """撤销最近一次成功的 try_acquire（归还到本地租约）"""
+        if self._using_local:
+            self._local.rollback()
+        elif self._lease_window == int(time.time() // self.window_size):
+            self._lease_left += 1
+
+    def remaining(self) -> int:
+        """获取剩余配额"""
+        if self._using_local:
+            return self._local.remaining()
+        now = time.time()
+        used = self.store.used(self.key, self.window_size, now)
+        lease_left = self._lease_left if self._lease_window == int(now // self.window_size) else 0
+        return max(0, int(self.limit - used)) + lease_left
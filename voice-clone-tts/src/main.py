@@ -21,6 +21,7 @@ import atexit
 from typing import List, Any
 
 from .common.logging import setup_logging, get_logger
+from .common.tracing import setup_tracing
 
 
 # 全局资源跟踪器，用于优雅关闭
@@ -111,10 +112,18 @@ def main():
 
     subparsers = parser.add_subparsers(dest="command", help="可用命令")
 
+    # 全局参数
+    parser.add_argument("--config", default=None, help="配置文件路径（默认读取 TTS_CONFIG 或 ./config.yaml）")
+
     # 全局日志参数
     parser.add_argument("--log-level", default="INFO", choices=["DEBUG", "INFO", "WARNING", "ERROR"], help="日志级别")
     parser.add_argument("--log-dir", default=None, help="日志目录（不指定则不写文件）")
     parser.add_argument("--json-logs", action="store_true", help="使用 JSON 格式日志")
+    parser.add_argument("--trace-file", default=None, help="请求链路采样输出文件（JSONL，默认取 logging.tracing.span_file，为空则不写文件）")
+    parser.add_argument("--trace-sample-rate", type=float, default=None, help="链路采样率 (0~1，5xx 请求始终记录，默认取 logging.tracing.sample_rate)")
+    parser.add_argument("--loop-block-ms", type=float, default=0.0, help="事件循环阻塞检测阈值（毫秒，0 表示不启用）")
+    parser.add_argument("--admin-token", default=os.environ.get("TTS_ADMIN_TOKEN", ""), help="管理令牌（性能分析等管理接口，默认读取 TTS_ADMIN_TOKEN，为空则禁用）")
+    parser.add_argument("--node-token", default=os.environ.get("TTS_NODE_TOKEN", ""), help="节点令牌（网关与节点共享，控制通道 hello 签名，默认读取 TTS_NODE_TOKEN，为空则不校验）")
 
     # 网关命令
     gateway_parser = subparsers.add_parser("gateway", help="启动网关服务")
@@ -122,6 +131,13 @@ def main():
     gateway_parser.add_argument("--port", type=int, default=8080, help="监听端口")
     gateway_parser.add_argument("--global-rpm", type=int, default=1000, help="全局每分钟请求数")
     gateway_parser.add_argument("--ip-rpm", type=int, default=100, help="单IP每分钟请求数")
+    gateway_parser.add_argument("--rate-limit-backend", default=None, choices=["memory", "shared"], help="限流计数后端（shared: 同主机多网关进程共享，默认取 security.rate_limit.backend）")
+    gateway_parser.add_argument("--rate-limit-file", default=None, help="共享限流计数文件路径（默认取 security.rate_limit.shared_path）")
+    gateway_parser.add_argument("--slow-start-seconds", type=float, default=None, help="节点就绪后路由权重爬升到 1 的时长（秒，0 表示不按时间，默认取 gateway.slow_start_seconds）")
+    gateway_parser.add_argument("--slow-start-requests", type=int, default=None, help="节点就绪后路由权重爬升到 1 的请求数（0 表示不按请求数，默认取 gateway.slow_start_requests）")
+    gateway_parser.add_argument("--autoscale", action="store_true", default=None, help="按负载自动激活 / 待机节点（默认取 gateway.autoscale.enabled）")
+    gateway_parser.add_argument("--autoscale-min-ready", type=int, default=None, help="每个引擎至少保持就绪的节点数（默认取 gateway.autoscale.min_ready）")
+    gateway_parser.add_argument("--autoscale-host-memory-mb", type=float, default=None, help="每台主机可用于常驻模型的内存，0 表示不限制（默认取 gateway.autoscale.host_memory_mb）")
 
     # 工作节点命令
     worker_parser = subparsers.add_parser("worker", help="启动工作节点")
@@ -132,6 +148,24 @@ def main():
     worker_parser.add_argument("--device", default="cuda", help="设备 (cuda/cpu)")
     worker_parser.add_argument("--voices-dir", default="./voices", help="音色存储目录")
     worker_parser.add_argument("--auto-load", action="store_true", help="启动时自动加载模型")
+    worker_parser.add_argument("--inference-threads", type=int, default=1, help="推理线程数（XTTS/OpenVoice）")
+    worker_parser.add_argument("--inference-processes", type=int, default=None, help="推理子进程数，CPU 上每个子进程共享一份 fork 的模型并绑定一组 CPU，0 表示不启用（默认取 performance.inference_processes）")
+    worker_parser.add_argument("--telemetry-interval", type=float, default=5.0, help="资源遥测采样周期（秒）")
+    worker_parser.add_argument("--batch-size", type=int, default=None, help="每批合成的最大请求数（默认取 performance.batch_size）")
+    worker_parser.add_argument("--batch-delay-ms", type=float, default=None, help="凑批最长等待时间（毫秒，默认取 performance.batch_delay_ms）")
+    worker_parser.add_argument("--max-queue", type=int, default=None, help="合成请求队列容量（默认取 performance.max_queue_size）")
+    worker_parser.add_argument("--embedding-cache-size", type=int, default=None, help="音色嵌入缓存的最大音色数，0 表示不缓存（默认取 performance.embedding_cache_size）")
+    worker_parser.add_argument("--embedding-cache-mb", type=float, default=None, help="音色嵌入缓存大小上限（MB，默认取 performance.embedding_cache_mb）")
+    worker_parser.add_argument("--warmup-languages", default=None, help="激活时预热的语言，逗号分隔，如 zh,en（默认取 performance.warmup_languages，为空不预热）")
+    worker_parser.add_argument("--warmup-runs", type=int, default=None, help="每种语言的预热合成轮数（默认取 performance.warmup_runs）")
+    worker_parser.add_argument("--warmup-voice", default=None, help="预热使用的音色 ID，为空使用音色目录中的第一个音色（默认取 performance.warmup_voice）")
+    worker_parser.add_argument("--no-control-channel", dest="control_channel", action="store_false", default=None, help="不建立 WebSocket 控制通道，心跳和命令只走 HTTP（默认取 gateway.control_channel）")
+    worker_parser.add_argument("--calibrate-languages", default=None, help="激活后测量合成速度的语言，逗号分隔（默认取 performance.calibration_languages，为空只按线上请求估计）")
+    worker_parser.add_argument("--weight-cache", action="store_true", default=None, help="在模型目录下缓存 safetensors 格式的权重，加快之后的激活（默认取 performance.weight_cache）")
+    worker_parser.add_argument("--compute-type", default=None, choices=["float32", "float16", "int8"], help="XTTS 计算精度，CPU 上 int8 启用动态量化（默认取 workers.xtts.compute_type）")
+    worker_parser.add_argument("--num-threads", type=int, default=None, help="XTTS CPU intra-op 线程数，0 表示自动（默认取 performance.num_threads）")
+    worker_parser.add_argument("--interop-threads", type=int, default=None, help="XTTS CPU inter-op 线程数，0 表示 PyTorch 默认（默认取 performance.interop_threads）")
+    worker_parser.add_argument("--matmul-precision", default=None, choices=["highest", "high", "medium"], help="XTTS CPU float32 矩阵乘法精度（默认取 performance.matmul_precision）")
 
     # 单机模式命令
     standalone_parser = subparsers.add_parser("standalone", help="单机测试模式")
@@ -147,6 +181,13 @@ def main():
         log_dir=args.log_dir,
         json_logs=args.json_logs,
     )
+    from .common.config import load_config
+
+    file_config = load_config(args.config)
+    setup_tracing(
+        span_file=_option(args.trace_file, file_config, "logging.tracing.span_file", "") or None,
+        sample_rate=float(_option(args.trace_sample_rate, file_config, "logging.tracing.sample_rate", 0.01)),
+    )
 
     logger = get_logger("main")
 
@@ -169,11 +210,61 @@ def main():
 def run_gateway(args):
     """启动网关"""
     from .gateway.app import create_gateway
+    from .common.config import load_config
     from .common.models import SystemConfig
 
+    file_config = load_config(args.config)
+    defaults = SystemConfig()
+
+    def autoscale(key, value=None):
+        return _option(value, file_config, f"gateway.autoscale.{key}", getattr(defaults, f"autoscale_{key}"))
+
+    def rate_limit(key, value=None):
+        return _option(value, file_config, f"security.rate_limit.{key}", getattr(defaults, key))
+
     config = SystemConfig(
         global_rpm=args.global_rpm,
         ip_rpm=args.ip_rpm,
+        ip_chars_per_minute=int(rate_limit("ip_chars_per_minute")),
+        ip_audio_seconds_per_minute=float(rate_limit("ip_audio_seconds_per_minute")),
+        key_chars_per_minute=int(rate_limit("key_chars_per_minute")),
+        key_audio_seconds_per_minute=float(rate_limit("key_audio_seconds_per_minute")),
+        api_keys=_split_list(rate_limit("api_keys")),
+        rate_limit_backend=_option(
+            args.rate_limit_backend, file_config, "security.rate_limit.backend", defaults.rate_limit_backend
+        ),
+        rate_limit_shared_path=_option(
+            args.rate_limit_file, file_config, "security.rate_limit.shared_path", defaults.rate_limit_shared_path
+        ) or "",
+        loop_block_threshold_ms=args.loop_block_ms,
+        admin_token=args.admin_token,
+        node_token=args.node_token,
+        slow_start_seconds=float(_option(
+            args.slow_start_seconds, file_config, "gateway.slow_start_seconds", defaults.slow_start_seconds
+        )),
+        slow_start_requests=int(_option(
+            args.slow_start_requests, file_config, "gateway.slow_start_requests", defaults.slow_start_requests
+        )),
+        slow_start_min_weight=float(_option(
+            None, file_config, "gateway.slow_start_min_weight", defaults.slow_start_min_weight
+        )),
+        capacity_routing=bool(_option(
+            None, file_config, "gateway.capacity_routing", defaults.capacity_routing
+        )),
+        autoscale_enabled=bool(autoscale("enabled", args.autoscale)),
+        autoscale_interval=float(autoscale("interval")),
+        autoscale_min_ready=int(autoscale("min_ready", args.autoscale_min_ready)),
+        autoscale_scale_up_load=float(autoscale("scale_up_load")),
+        autoscale_scale_down_load=float(autoscale("scale_down_load")),
+        autoscale_latency_p95_ms=float(autoscale("latency_p95_ms")),
+        autoscale_scale_up_cooldown=float(autoscale("scale_up_cooldown")),
+        autoscale_scale_down_cooldown=float(autoscale("scale_down_cooldown")),
+        autoscale_scale_down_delay=float(autoscale("scale_down_delay")),
+        autoscale_host_memory_mb=float(autoscale("host_memory_mb", args.autoscale_host_memory_mb)),
+        autoscale_model_memory_mb={
+            **defaults.autoscale_model_memory_mb,
+            **(autoscale("model_memory_mb") or {}),
+        },
     )
 
     gateway = create_gateway(
@@ -196,8 +287,53 @@ def run_gateway(args):
     gateway.run()
 
 
+def _option(value, config: dict, key: str, default):
+    """命令行参数优先，其次配置文件，最后默认值"""
+    from .common.config import get_config_value
+
+    return value if value is not None else get_config_value(config, key, default)
+
+
+def _split_list(value) -> list:
+    """逗号分隔的字符串或 YAML 列表转为字符串列表"""
+    if isinstance(value, str):
+        value = value.split(",")
+    return [str(item).strip() for item in value or [] if str(item).strip()]
+
+
 def run_worker(args):
     """启动工作节点"""
+    from .common.config import load_config
+
+    config = load_config(args.config)
+
+    # 各引擎通用的 BaseWorker 参数
+    worker_options = dict(
+        inference_threads=args.inference_threads,
+        inference_processes=int(_option(args.inference_processes, config, "performance.inference_processes", 0)),
+        telemetry_interval=args.telemetry_interval,
+        loop_block_threshold_ms=args.loop_block_ms,
+        admin_token=args.admin_token,
+        max_batch_size=int(_option(args.batch_size, config, "performance.batch_size", 1)),
+        max_batch_delay_ms=float(_option(args.batch_delay_ms, config, "performance.batch_delay_ms", 10.0)),
+        max_queue_size=int(_option(args.max_queue, config, "performance.max_queue_size", 64)),
+        embedding_cache_size=int(_option(args.embedding_cache_size, config, "performance.embedding_cache_size", 128)),
+        embedding_cache_mb=float(_option(args.embedding_cache_mb, config, "performance.embedding_cache_mb", 256.0)),
+        warmup_languages=_split_list(_option(args.warmup_languages, config, "performance.warmup_languages", [])),
+        warmup_runs=int(_option(args.warmup_runs, config, "performance.warmup_runs", 1)),
+        warmup_voice=_option(args.warmup_voice, config, "performance.warmup_voice", ""),
+        weight_cache=bool(_option(args.weight_cache, config, "performance.weight_cache", False)),
+        calibration_languages=_split_list(
+            _option(args.calibrate_languages, config, "performance.calibration_languages", [])
+        ),
+        capacity_alpha=float(_option(None, config, "performance.capacity_alpha", 0.1)),
+        control_channel=bool(_option(args.control_channel, config, "gateway.control_channel", True)),
+        control_heartbeat_interval=float(_option(
+            None, config, "gateway.control_heartbeat_interval", 2.0
+        )),
+        node_token=args.node_token,
+    )
+
     if args.engine == "xtts":
         from .workers.xtts_worker import XTTSWorker
 
@@ -207,6 +343,11 @@ def run_worker(args):
             gateway_url=args.gateway,
             device=args.device,
             voices_dir=args.voices_dir,
+            compute_type=_option(args.compute_type, config, "workers.xtts.compute_type", "float32"),
+            num_threads=int(_option(args.num_threads, config, "performance.num_threads", 0)),
+            interop_threads=int(_option(args.interop_threads, config, "performance.interop_threads", 0)),
+            matmul_precision=_option(args.matmul_precision, config, "performance.matmul_precision", "highest"),
+            **worker_options,
         )
 
     elif args.engine == "openvoice":
@@ -218,6 +359,7 @@ def run_worker(args):
             gateway_url=args.gateway,
             device=args.device,
             voices_dir=args.voices_dir,
+            **worker_options,
         )
 
     elif args.engine == "gpt-sovits":
@@ -232,6 +374,7 @@ def run_worker(args):
             gateway_url=args.gateway,
             api_url=api_url,
             voices_dir=args.voices_dir,
+            **worker_options,
         )
 
     print(f"""
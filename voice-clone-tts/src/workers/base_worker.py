@@ -4,15 +4,23 @@
 定义工作节点的通用接口和生命周期管理。
 """
 
+import sys
+import copy
+import json
+import math
 import asyncio
 import time
 import uuid
 import logging
 import signal
-import psutil
+import threading
+import contextvars
+import functools
 from abc import ABC, abstractmethod
-from typing import Optional, Dict, Any
-from contextlib import asynccontextmanager
+from pathlib import Path
+from concurrent.futures import ThreadPoolExecutor
+from typing import Optional, Dict, Any, AsyncIterator, Callable, Hashable, Iterator, List, Tuple
+from contextlib import asynccontextmanager, contextmanager
 
 import httpx
 from fastapi import FastAPI, Request, Response, HTTPException
@@ -25,20 +33,82 @@ from ..common.models import (
     WorkerStatus,
     EngineType,
     SynthesizeRequest,
+    SynthesizeStreamRequest,
     SynthesizeResponse,
     ExtractVoiceRequest,
     ExtractVoiceResponse,
     VoiceInfo,
     HealthCheck,
 )
-from ..common.exceptions import ModelNotLoadedError
+from ..common.audio import AudioData, wav_header, wav_duration
+from ..common.exceptions import ModelNotLoadedError, VoiceCloneError, AuthenticationError, QueueFullError
+from ..common.logging import RequestLogMiddleware
+from ..common.metrics import RollingHistogram
+from ..common.loop_monitor import LoopMonitor
+from ..common.profiler import run_profile, verify_command_signature
+from ..common.tracing import trace_stage, current_trace, run_in_executor
+from .telemetry import TelemetrySampler
+from .scheduler import InferenceScheduler
+from .embedding_cache import EmbeddingCache
+from .process_pool import InferenceProcessPool
+from .capacity import CapacityEstimator
+from .control_channel import ControlChannel, control_channel_available
+from ..common.control import control_url
 
 logger = logging.getLogger(__name__)
 
+# 待机、重新加载前等待进行中请求结束的默认时间（秒）
+DRAIN_TIMEOUT = 15.0
+
+# 预热合成使用的各语言文本（长度接近常见请求，其他语言使用英文文本）
+WARMUP_TEXTS = {
+    "zh": "您好，欢迎使用语音合成服务，这是一段用于预热模型的示例文本。",
+    "en": "Hello, welcome to the speech synthesis service. This is a sample sentence used to warm up the model.",
+    "ja": "こんにちは、音声合成サービスへようこそ。これはモデルを準備するためのサンプル文です。",
+    "ko": "안녕하세요, 음성 합성 서비스에 오신 것을 환영합니다. 모델 예열을 위한 예시 문장입니다.",
+    "fr": "Bonjour, bienvenue sur le service de synthèse vocale. Ceci est une phrase d'exemple pour préparer le modèle.",
+    "de": "Hallo, willkommen beim Sprachsynthesedienst. Dies ist ein Beispielsatz zum Aufwärmen des Modells.",
+}
+
+
+def write_temp_file(data: bytes, suffix: str = ".wav") -> str:
+    """
+    写入临时文件（同步，应在线程池中调用）
+
+    Returns:
+        临时文件路径（由调用方负责删除）
+    """
+    import tempfile
+    with tempfile.NamedTemporaryFile(suffix=suffix, delete=False) as f:
+        f.write(data)
+        return f.name
+
+
+def write_json(path, data: Dict) -> None:
+    """写入 JSON 文件（同步，应在线程池中调用）"""
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(data, f, ensure_ascii=False, indent=2)
+
 
 class BaseWorker(ABC):
     """工作节点基类"""
 
+    # 引擎实现了 _synthesize_batch_sync 时置为 True
+    supports_batch_synthesis = False
+
+    # 引擎实现了 synthesize_stream 时置为 True，流式输出为 16-bit 单声道 PCM
+    supports_streaming = False
+    stream_sample_rate = 24000
+
+    # 引擎的推理都经 _schedule_synthesis / _run_inference / _stream_inference 执行本类的同步方法，
+    # 可在 fork 出的推理子进程中运行时置为 True
+    supports_inference_processes = False
+
+    # 持有已加载模型的实例属性；声明后支持不停服重新加载（新模型在副本上加载完成后整体替换）
+    model_attributes: Tuple[str, ...] = ()
+    # reload 命令可修改的选项（如模型目录）
+    reload_options: Tuple[str, ...] = ()
+
     def __init__(
         self,
         engine_type: EngineType,
@@ -48,6 +118,26 @@ class BaseWorker(ABC):
         node_id: Optional[str] = None,
         auto_register: bool = True,
         heartbeat_interval: int = 10,
+        inference_threads: int = 1,
+        inference_processes: int = 0,
+        latency_window: int = 300,
+        telemetry_interval: float = 5.0,
+        loop_block_threshold_ms: float = 0.0,
+        admin_token: str = "",
+        max_batch_size: int = 1,
+        max_batch_delay_ms: float = 10.0,
+        max_queue_size: int = 64,
+        embedding_cache_size: int = 128,
+        embedding_cache_mb: float = 256.0,
+        warmup_languages: Optional[List[str]] = None,
+        warmup_runs: int = 1,
+        warmup_voice: str = "",
+        weight_cache: bool = False,
+        calibration_languages: Optional[List[str]] = None,
+        capacity_alpha: float = 0.1,
+        control_channel: bool = True,
+        control_heartbeat_interval: float = 2.0,
+        node_token: str = "",
     ):
         """
         初始化工作节点
@@ -60,6 +150,28 @@ class BaseWorker(ABC):
             node_id: 节点 ID（不指定则自动生成）
             auto_register: 是否自动向网关注册
             heartbeat_interval: 心跳间隔（秒）
+            inference_threads: 推理线程数（同一模型实例上同时推理的请求数上限）
+            inference_processes: 推理子进程数（0 表示在本进程的推理线程中执行；
+                大于 0 时模型加载后 fork 出多个推理子进程，各自绑定一组 CPU，仅 CPU 推理）
+            latency_window: 响应时间分位数的统计窗口（秒）
+            telemetry_interval: 资源遥测采样周期（秒）
+            loop_block_threshold_ms: 事件循环阻塞检测阈值（毫秒，0 表示不启用）
+            admin_token: 管理令牌（profile 等管理命令需要，为空则禁用）
+            max_batch_size: 每批合成的最大请求数（引擎不支持批量时按 1 处理）
+            max_batch_delay_ms: 凑批的最长等待时间（毫秒）
+            max_queue_size: 合成请求队列容量，队列满时返回 429
+            embedding_cache_size: 音色嵌入缓存的最大音色数（0 表示不缓存）
+            embedding_cache_mb: 音色嵌入缓存的张量总大小上限（MB）
+            warmup_languages: 激活时预热的语言（为空则不预热），预热完成前状态为 WARMING
+            warmup_runs: 每种语言的预热合成轮数
+            warmup_voice: 预热使用的音色 ID（为空则使用音色目录中的第一个音色）
+            weight_cache: 是否在模型目录下缓存 safetensors 格式的权重，加快之后的激活
+            calibration_languages: 激活后测量合成速度的语言（为空则不校准，只按线上请求估计）
+            capacity_alpha: 线上请求修正速度估计的平滑系数
+            control_channel: 是否与网关保持 WebSocket 控制通道（心跳、状态变更和命令），
+                连接期间暂停 HTTP 心跳；需要 websockets 库
+            control_heartbeat_interval: 控制通道上的心跳间隔（秒）
+            node_token: 节点令牌（与网关共享，用于签名控制通道的 hello 帧）
         """
         self.engine_type = engine_type
         self.host = host
@@ -68,6 +180,7 @@ class BaseWorker(ABC):
         self.node_id = node_id or f"{engine_type.value}-{str(uuid.uuid4())[:8]}"
         self.auto_register = auto_register
         self.heartbeat_interval = heartbeat_interval
+        self.admin_token = admin_token
 
         # 状态
         self._status = WorkerStatus.STANDBY
@@ -78,11 +191,87 @@ class BaseWorker(ABC):
         self._request_count = 0
         self._error_count = 0
         self._current_concurrent = 0
+        # 等待进行中请求全部结束的 Future（排空时创建，请求数归零时完成）
+        self._idle_waiters: List[asyncio.Future] = []
         self._total_response_time = 0.0
+        # 最近 latency_window 秒的响应时间分布（毫秒）
+        self._latency = RollingHistogram(window_seconds=latency_window)
+        # 流式合成首块耗时分布（毫秒）
+        self._first_chunk_latency = RollingHistogram(window_seconds=latency_window)
+
+        # 推理子进程池（模型加载后创建）；进程池模式下推理线程只负责把请求转发给子进程
+        if inference_processes > 0 and not self.supports_inference_processes:
+            logger.warning(f"{engine_type.value} does not support inference processes, using inference threads")
+            inference_processes = 0
+        self.inference_processes = inference_processes
+        self._process_pool: Optional[InferenceProcessPool] = None
+        concurrency = inference_processes if inference_processes > 0 else max(1, inference_threads)
+
+        # 推理线程池: 独立于默认线程池，排队深度可观测
+        self._inference_executor = ThreadPoolExecutor(
+            max_workers=concurrency,
+            thread_name_prefix=f"{engine_type.value}-inference",
+        )
+        self._queued = 0
+        # 同时受理的合成请求上限: 推理中 + 排队中
+        self._max_admitted = concurrency + max(1, max_queue_size)
+
+        # 合成调度: 有界队列 + 动态微批，在推理线程池上执行
+        self._scheduler = InferenceScheduler(
+            executor=self._inference_executor,
+            concurrency=concurrency,
+            run_batch=self._run_batch if self.supports_batch_synthesis else None,
+            max_batch_size=max_batch_size,
+            max_batch_delay=max_batch_delay_ms / 1000,
+            max_queue_size=max_queue_size,
+        )
+
+        # 音色嵌入缓存（张量常驻推理设备）
+        self._embedding_cache = EmbeddingCache(
+            max_entries=embedding_cache_size,
+            max_bytes=int(embedding_cache_mb * 1024 * 1024),
+        )
+
+        # 预热
+        self.warmup_languages = list(warmup_languages or [])
+        self.warmup_runs = max(1, warmup_runs)
+        self.warmup_voice = warmup_voice
+        # disabled / pending / running / done / skipped / failed
+        self._warmup_state = "pending" if self.warmup_languages else "disabled"
+        self._warmup_seconds = 0.0
+
+        # 容量估计: 各语言的字符/秒和实时率，激活后校准、之后由线上请求修正，随心跳上报
+        self.calibration_languages = list(calibration_languages or [])
+        self._capacity = CapacityEstimator(alpha=capacity_alpha)
+
+        # 激活耗时: 总耗时和各阶段耗时（秒，并行加载的阶段相互重叠）
+        self.weight_cache = weight_cache
+        self._activation_seconds = 0.0
+        self._activation_phases: Dict[str, float] = {}
 
         # 任务
         self._heartbeat_task: Optional[asyncio.Task] = None
 
+        # 网关控制通道（启动时连接）
+        self.control_channel = control_channel
+        self.control_heartbeat_interval = control_heartbeat_interval
+        self.node_token = node_token
+        self._control: Optional[ControlChannel] = None
+        # 经控制通道收到的 stop（回复发出后在后台执行）
+        self._stop_task: Optional[asyncio.Task] = None
+
+        # 资源遥测（后台采样，心跳读取最新样本）
+        self._telemetry = TelemetrySampler(interval=telemetry_interval)
+
+        # 事件循环阻塞检测（可选）
+        self._loop_monitor: Optional[LoopMonitor] = None
+        if loop_block_threshold_ms > 0:
+            self._loop_monitor = LoopMonitor(block_threshold=loop_block_threshold_ms / 1000)
+
+        # 与网关通信的长连接客户端（绑定创建时的事件循环）
+        self._http_client: Optional[httpx.AsyncClient] = None
+        self._http_client_loop: Optional[asyncio.AbstractEventLoop] = None
+
         # FastAPI 应用
         self.app = self._create_app()
 
@@ -115,7 +304,7 @@ class BaseWorker(ABC):
         voice_id: str,
         language: str = "zh",
         **kwargs,
-    ) -> bytes:
+    ) -> AudioData:
         """
         合成语音
 
@@ -126,7 +315,7 @@ class BaseWorker(ABC):
             **kwargs: 其他参数
 
         Returns:
-            音频数据
+            WAV 音频数据（bytes 或 memoryview）
         """
         pass
 
@@ -158,6 +347,11 @@ class BaseWorker(ABC):
         """启动节点"""
         logger.info(f"Starting worker {self.node_id} ({self.engine_type.value})")
 
+        # 启动资源遥测
+        self._telemetry.start()
+        if self._loop_monitor:
+            self._loop_monitor.start()
+
         # 注册到网关
         if self.auto_register and self.gateway_url:
             await self._register_to_gateway()
@@ -165,6 +359,8 @@ class BaseWorker(ABC):
         # 启动心跳
         if self.gateway_url:
             self._heartbeat_task = asyncio.create_task(self._heartbeat_loop())
+            if self.control_channel:
+                self._start_control_channel()
 
         # 如果模型已加载，保持 READY 状态；否则设为 STANDBY
         if self._model_loaded:
@@ -192,28 +388,35 @@ class BaseWorker(ABC):
                     pass
                 self._heartbeat_task = None
 
-            # 等待当前请求完成（最多等待一半的超时时间）
-            wait_start = time.time()
-            while self._current_concurrent > 0 and (time.time() - wait_start) < (timeout / 2):
-                logger.info(f"Waiting for {self._current_concurrent} ongoing requests to complete...")
-                await asyncio.sleep(0.5)
-
-            if self._current_concurrent > 0:
+            # 通知网关停止路由，等待当前请求完成（最多等待一半的超时时间）
+            if not await self.drain(timeout / 2):
                 logger.warning(f"Force stopping with {self._current_concurrent} requests still in progress")
 
             # 卸载模型
             if self._model_loaded:
+                await self._stop_process_pool()
                 await self.unload_model()
+                self._embedding_cache.clear()
 
-            # 从网关注销
+            # 先断开控制通道（之后的心跳帧会让网关重新注册本节点），再从网关注销
+            if self._control is not None:
+                await self._control.stop()
+                self._control = None
             if self.gateway_url:
                 await self._unregister_from_gateway()
 
+            await self._scheduler.stop()
+            await self._telemetry.stop()
+            if self._loop_monitor:
+                await self._loop_monitor.stop()
+            await self._close_http_client()
+
         try:
             await asyncio.wait_for(_do_stop(), timeout=timeout)
         except asyncio.TimeoutError:
             logger.warning(f"Worker stop timed out after {timeout}s")
 
+        self._inference_executor.shutdown(wait=False)
         self._status = WorkerStatus.OFFLINE
         logger.info(f"Worker {self.node_id} stopped")
 
@@ -225,17 +428,36 @@ class BaseWorker(ABC):
             是否成功
         """
         if self._model_loaded:
-            # 模型已加载，确保状态是 READY
-            self._status = WorkerStatus.READY
+            # 模型已加载（如排空后恢复），确保状态是 READY
+            if self._status != WorkerStatus.READY:
+                self._status = WorkerStatus.READY
+                await self._send_heartbeat()
             return True
 
         self._status = WorkerStatus.LOADING
+        self._activation_phases = {}
+        start = time.perf_counter()
         try:
-            success = await self.load_model()
+            with self._load_phase("load_model"):
+                success = await self.load_model()
             if success:
                 self._model_loaded = True
+                with self._load_phase("process_pool"):
+                    await self._start_process_pool()
+                if self.warmup_languages:
+                    # 预热完成前网关不路由到本节点
+                    self._status = WorkerStatus.WARMING
+                    with self._load_phase("warmup"):
+                        await self.warmup()
+                if self.calibration_languages:
+                    self._status = WorkerStatus.WARMING
+                    with self._load_phase("calibration"):
+                        await self.calibrate()
                 self._status = WorkerStatus.READY
-                logger.info(f"Worker {self.node_id} activated")
+                self._activation_seconds = time.perf_counter() - start
+                phases = ", ".join(f"{name}={seconds:.2f}s" for name, seconds in self._activation_phases.items())
+                logger.info(f"Worker {self.node_id} activated in {self._activation_seconds:.2f}s ({phases})")
+                await self._send_heartbeat()
                 return True
             else:
                 self._status = WorkerStatus.ERROR
@@ -245,30 +467,526 @@ class BaseWorker(ABC):
             self._status = WorkerStatus.ERROR
             return False
 
-    async def standby(self) -> bool:
+    async def standby(self, drain_timeout: float = DRAIN_TIMEOUT) -> bool:
         """
         进入待机（卸载模型）
 
+        先排空（网关停止路由，等待进行中的请求结束），超时后照常卸载。
+
+        Args:
+            drain_timeout: 等待进行中请求结束的最长时间（秒）
+
         Returns:
             是否成功
         """
         if not self._model_loaded:
             return True
 
+        previous = self._status
+        if not await self.drain(drain_timeout):
+            logger.warning(f"Unloading with {self._current_concurrent} requests still in progress")
+
         try:
+            await self._stop_process_pool()
             success = await self.unload_model()
             if success:
+                self._embedding_cache.clear()
                 self._model_loaded = False
                 self._status = WorkerStatus.STANDBY
                 logger.info(f"Worker {self.node_id} on standby")
+                await self._send_heartbeat()
                 return True
-            return False
         except Exception as e:
             logger.error(f"Failed to standby worker: {e}")
+        # 卸载失败时模型仍可用，恢复排空前的状态
+        self._status = previous
+        await self._send_heartbeat()
+        return False
+
+    async def drain(self, timeout: float = DRAIN_TIMEOUT) -> bool:
+        """
+        排空节点
+
+        状态置为 DRAINING 并立即发送心跳，网关不再把新请求路由到本节点；
+        排空期间仍会处理已到达的请求。对 DRAINING 状态的节点执行 activate 恢复为 READY。
+
+        Args:
+            timeout: 等待进行中请求结束的最长时间（秒）
+
+        Returns:
+            超时前进行中的请求是否已全部结束
+        """
+        if self._model_loaded:
+            self._status = WorkerStatus.DRAINING
+            await self._send_heartbeat()
+        if self._current_concurrent > 0:
+            logger.info(f"Draining {self._current_concurrent} ongoing requests (timeout={timeout}s)")
+        return await self._wait_idle(timeout)
+
+    async def _wait_idle(self, timeout: float) -> bool:
+        """
+        等待进行中的请求全部结束（请求结束时唤醒，不轮询）
+
+        Args:
+            timeout: 最长等待时间（秒）
+
+        Returns:
+            是否在超时前结束
+        """
+        if self._current_concurrent == 0:
+            return True
+        waiter = asyncio.get_running_loop().create_future()
+        self._idle_waiters.append(waiter)
+        try:
+            await asyncio.wait_for(waiter, timeout)
+            return True
+        except asyncio.TimeoutError:
+            return False
+        finally:
+            if waiter in self._idle_waiters:
+                self._idle_waiters.remove(waiter)
+
+    def _request_started(self):
+        """请求开始（计入进行中的请求）"""
+        self._current_concurrent += 1
+
+    def _request_finished(self):
+        """请求结束；进行中的请求归零时唤醒排空等待"""
+        self._current_concurrent -= 1
+        if self._current_concurrent == 0 and self._idle_waiters:
+            waiters, self._idle_waiters = self._idle_waiters, []
+            for waiter in waiters:
+                if not waiter.done():
+                    waiter.set_result(None)
+
+    async def reload(self, options: Optional[Dict[str, Any]] = None, drain_timeout: float = DRAIN_TIMEOUT) -> bool:
+        """
+        重新加载模型（如切换到新版本的模型目录）
+
+        引擎声明了 model_attributes 时不停服: 新模型在节点的浅拷贝上加载（包括推理子进程和预热），
+        旧模型继续处理请求，完成后一次性替换模型属性，之后开始推理的请求使用新模型；
+        旧推理子进程在进行中的请求结束后（最多 drain_timeout 秒）退出。加载期间新旧模型同时占用内存。
+        新模型加载失败时保留旧模型。
+
+        未声明 model_attributes 的引擎退回为排空、卸载、加载，期间节点不可用。
+
+        Args:
+            options: 要修改的加载选项（键须在 reload_options 中）
+            drain_timeout: 等待进行中请求结束的最长时间（秒）
+
+        Returns:
+            是否成功
+
+        Raises:
+            ValueError: 选项不在 reload_options 中
+        """
+        options = dict(options or {})
+        unknown = sorted(set(options) - set(self.reload_options))
+        if unknown:
+            raise ValueError(
+                f"Unsupported reload options: {', '.join(unknown)} "
+                f"(supported: {', '.join(self.reload_options) or 'none'})"
+            )
+
+        if not self._model_loaded or not self.model_attributes:
+            if self._model_loaded:
+                logger.warning(f"{self.engine_type.value} cannot reload in place, unloading first")
+                if not await self.standby(drain_timeout):
+                    return False
+            for name, value in options.items():
+                setattr(self, name, value)
+            return await self.activate()
+
+        logger.info(f"Reloading model on worker {self.node_id} ({options or 'same options'})")
+        shadow = copy.copy(self)
+        for name, value in options.items():
+            setattr(shadow, name, value)
+        # 副本的模型属性仍指向旧模型，清空后由 load_model 重新赋值
+        for name in self.model_attributes:
+            setattr(shadow, name, None)
+        shadow._model_loaded = False
+        shadow._process_pool = None
+        shadow._activation_phases = {}
+        # 新模型的速度重新估计
+        shadow._capacity = CapacityEstimator(alpha=self._capacity.alpha)
+        if not await shadow.activate():
+            logger.error("Reload failed, keeping the current model")
+            await shadow._stop_process_pool()
+            await shadow.unload_model()
             return False
 
+        # 保留旧模型的引用，替换后由 unload_model 释放
+        retired = copy.copy(self)
+        swapped = {name: getattr(shadow, name) for name in self.model_attributes}
+        swapped.update(options)
+        swapped.update(
+            _process_pool=shadow._process_pool,
+            _activation_seconds=shadow._activation_seconds,
+            _activation_phases=shadow._activation_phases,
+            _warmup_state=shadow._warmup_state,
+            _warmup_seconds=shadow._warmup_seconds,
+            _capacity=shadow._capacity,
+        )
+        # 一次 dict.update 完成替换，推理线程不会看到新旧混合的模型属性
+        self.__dict__.update(swapped)
+        self._embedding_cache.clear()
+        self._status = WorkerStatus.READY
+        await self._send_heartbeat()
+
+        old_pool = retired._process_pool
+        if old_pool is not None:
+            await run_in_executor(functools.partial(old_pool.stop, wait=drain_timeout))
+        await retired.unload_model()
+        logger.info(f"Model reloaded on worker {self.node_id} in {self._activation_seconds:.2f}s")
+        return True
+
+    @contextmanager
+    def _load_phase(self, name: str):
+        """
+        记录一个激活阶段的耗时（可在加载线程中使用）
+
+        Args:
+            name: 阶段名（引擎的子阶段如 checkpoint、converter，同名阶段覆盖）
+        """
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self._activation_phases[name] = round(time.perf_counter() - start, 3)
+
+    # ===================== 预热 =====================
+
+    async def warmup(self) -> float:
+        """
+        预热模型
+
+        按 warmup_languages 用代表性文本合成 warmup_runs 轮，每轮并发数等于推理线程（子进程）数，
+        使每个推理线程都完成 CUDA/cuDNN 初始化、分词器加载和内存分配器扩容；
+        支持流式合成的引擎另外每种语言流式合成一次。预热失败只记录警告，不影响激活。
+
+        Returns:
+            预热耗时（秒），未执行时为 0
+        """
+        if not self.warmup_languages:
+            return 0.0
+        voice_id = self.warmup_voice or await run_in_executor(self._find_warmup_voice)
+        if not voice_id:
+            logger.warning("No voice available for warm-up, skipping")
+            self._warmup_state = "skipped"
+            self._warmup_seconds = 0.0
+            return 0.0
+
+        self._warmup_state = "running"
+        # 同时提交的请求不超过队列容量
+        width = min(self._scheduler.concurrency, self._scheduler.max_queue_size)
+        start = time.perf_counter()
+        try:
+            for language in self.warmup_languages:
+                text = WARMUP_TEXTS.get(language, WARMUP_TEXTS["en"])
+                for _ in range(self.warmup_runs):
+                    await asyncio.gather(*(
+                        self.synthesize(text, voice_id, language) for _ in range(width)
+                    ))
+                if self.supports_streaming:
+                    async for _ in self.synthesize_stream(text, voice_id, language):
+                        pass
+        except Exception as e:
+            logger.warning(f"Warm-up failed with voice {voice_id}: {e}")
+            self._warmup_state = "failed"
+        else:
+            self._warmup_state = "done"
+
+        self._warmup_seconds = time.perf_counter() - start
+        logger.info(
+            f"Warm-up {self._warmup_state} in {self._warmup_seconds:.2f}s "
+            f"(languages={','.join(self.warmup_languages)}, runs={self.warmup_runs}, voice={voice_id})"
+        )
+        return self._warmup_seconds
+
+    # ===================== 容量校准 =====================
+
+    async def calibrate(self) -> Dict[str, Dict[str, float]]:
+        """
+        测量合成速度
+
+        按 calibration_languages 用标准文本（与预热相同）各合成一次，逐条执行不并发，
+        记录单路合成的字符/秒和实时率。应在模型就绪、尚未接收请求时调用（激活流程在预热之后调用），
+        否则耗时包含排队时间。校准失败只记录警告，之后由线上请求估计。
+
+        Returns:
+            语言 -> 速度估计
+        """
+        if not self.calibration_languages:
+            return self._capacity.snapshot()
+        voice_id = self.warmup_voice or await run_in_executor(self._find_warmup_voice)
+        if not voice_id:
+            logger.warning("No voice available for calibration, skipping")
+            return self._capacity.snapshot()
+
+        try:
+            for language in self.calibration_languages:
+                text = WARMUP_TEXTS.get(language, WARMUP_TEXTS["en"])
+                start = time.perf_counter()
+                audio = await self.synthesize(text, voice_id, language)
+                self._capacity.calibrate(language, len(text), time.perf_counter() - start, wav_duration(audio))
+        except Exception as e:
+            logger.warning(f"Calibration failed with voice {voice_id}: {e}")
+
+        summary = ", ".join(
+            f"{language}={e['chars_per_second']:.1f} chars/s rtf={e['rtf']:.3f}"
+            for language, e in self._capacity.snapshot().items()
+        )
+        logger.info(f"Calibrated worker {self.node_id}: {summary or 'no result'}")
+        return self._capacity.snapshot()
+
+    def _find_warmup_voice(self) -> Optional[str]:
+        """预热使用的音色: 音色目录中按 ID 排序的第一个音色（同步，应在线程池中调用）"""
+        voices_dir = getattr(self, "voices_dir", None)
+        if voices_dir is None or not Path(voices_dir).is_dir():
+            return None
+        for path in sorted(Path(voices_dir).iterdir()):
+            if (path / "voice.json").is_file():
+                return path.name
+        return None
+
+    # ===================== 推理子进程 =====================
+
+    async def _start_process_pool(self):
+        """模型加载后 fork 推理子进程（未启用进程池或模型不在 CPU 上时不创建）"""
+        if self.inference_processes <= 0 or self._process_pool is not None:
+            return
+        device = getattr(self, "device", "cpu")
+        if device != "cpu":
+            logger.warning(
+                f"Inference processes require the model on cpu (device={device}), "
+                f"using {self.inference_processes} inference threads"
+            )
+            return
+
+        pool = InferenceProcessPool(
+            self,
+            processes=self.inference_processes,
+            initializer=self._init_inference_process,
+        )
+        await run_in_executor(pool.start)
+        self._process_pool = pool
+
+    async def _stop_process_pool(self):
+        """停止推理子进程（卸载模型前调用）"""
+        pool, self._process_pool = self._process_pool, None
+        if pool is not None:
+            await run_in_executor(pool.stop)
+
+    def _init_inference_process(self, cpus: List[int]):
+        """
+        推理子进程启动时调用（在子进程中执行）
+
+        默认将 PyTorch intra-op 线程数设为分到的 CPU 数，引擎可覆盖以应用自己的线程配置。
+
+        Args:
+            cpus: 子进程绑定的 CPU 编号
+        """
+        torch = sys.modules.get("torch")
+        if torch is not None and cpus:
+            torch.set_num_threads(len(cpus))
+
+    def _offload(self, func: Callable, stream: bool = False) -> Callable:
+        """
+        进程池模式下，将本节点的同步推理方法换成在空闲推理子进程中调用
+
+        Args:
+            func: 同步推理方法（不是本节点方法的函数原样返回）
+            stream: func 是否为生成器方法
+        """
+        if not self.supports_inference_processes or getattr(func, "__self__", None) is not self:
+            return func
+
+        def dispatch(*args):
+            # 执行时才取进程池: 排队期间模型重新加载的请求交给新的子进程
+            pool = self._process_pool
+            if pool is None:
+                return func(*args)
+            return (pool.stream if stream else pool.call)(func.__name__, *args)
+
+        return dispatch
+
+    def _run_batch(self, batch: List[tuple]) -> List[bytes]:
+        """调度器的批量推理入口"""
+        return self._offload(self._synthesize_batch_sync)(batch)
+
+    # ===================== 推理执行 =====================
+
+    def _synthesize_batch_sync(self, batch: List[tuple]) -> List[bytes]:
+        """
+        批量合成（同步，在推理线程中执行）
+
+        支持批量推理的引擎覆盖此方法并将 supports_batch_synthesis 置为 True。
+
+        Args:
+            batch: 各请求传给 _schedule_synthesis 的参数元组
+
+        Returns:
+            与 batch 顺序一致的音频数据
+        """
+        raise NotImplementedError
+
+    async def synthesize_stream(
+        self,
+        text: str,
+        voice_id: str,
+        language: str = "zh",
+        chunk_size: int = 20,
+        **kwargs,
+    ) -> AsyncIterator[bytes]:
+        """
+        流式合成语音（supports_streaming 为 True 的引擎实现）
+
+        Args:
+            text: 文本
+            voice_id: 音色 ID
+            language: 语言
+            chunk_size: 每块生成的 token 数
+            **kwargs: 其他参数
+
+        Returns:
+            逐块产出 16-bit 单声道 PCM（采样率为 stream_sample_rate）的异步迭代器
+        """
+        raise NotImplementedError
+
+    async def _stream_inference(self, func: Callable[..., Iterator[Any]], *args) -> AsyncIterator[Any]:
+        """
+        通过调度器在推理线程中运行同步生成器，逐块异步返回
+
+        生成器占用一个推理线程直到结束，与普通合成共享队列容量和并发上限。
+        调用方提前关闭迭代（如客户端断开）时，推理线程在产出下一块后停止。
+
+        Args:
+            func: 返回同步迭代器的函数（在推理线程中调用和迭代）
+            *args: 函数参数
+
+        Raises:
+            QueueFullError: 队列已满
+        """
+        loop = asyncio.get_running_loop()
+        chunks: asyncio.Queue = asyncio.Queue()
+        done = object()
+        stopped = threading.Event()
+
+        source = self._offload(func, stream=True)
+
+        def produce():
+            iterator = source(*args)
+            try:
+                for chunk in iterator:
+                    if stopped.is_set():
+                        break
+                    loop.call_soon_threadsafe(chunks.put_nowait, chunk)
+            finally:
+                # 提前停止时立即结束生成器（进程池模式下通知子进程停止）
+                close = getattr(iterator, "close", None)
+                if close is not None:
+                    close()
+
+        task = asyncio.ensure_future(self._scheduler.submit(produce))
+        # 推理线程中的 put 先于任务完成回调执行，结束标记一定排在所有块之后
+        task.add_done_callback(lambda _: chunks.put_nowait(done))
+        try:
+            while True:
+                chunk = await chunks.get()
+                if chunk is done:
+                    # 队列已满、调度器停止或生成器中的异常由此抛出
+                    task.result()
+                    return
+                yield chunk
+        finally:
+            stopped.set()
+            if not task.done():
+                task.cancel()
+
+    async def _schedule_synthesis(
+        self,
+        func: Callable,
+        *args,
+        batch_key: Optional[Hashable] = None,
+    ) -> AudioData:
+        """
+        通过调度器执行合成
+
+        Args:
+            func: 单条合成函数（同步）
+            *args: 函数参数
+            batch_key: 凑批分组键（如语言、语速等必须一致的参数）
+
+        Returns:
+            音频数据
+
+        Raises:
+            QueueFullError: 队列已满
+        """
+        return await self._scheduler.submit(self._offload(func), *args, batch_key=batch_key)
+
+    async def _run_inference(self, func: Callable, *args) -> Any:
+        """
+        在推理线程池中执行同步推理函数（音色提取等不经过合成调度队列的推理）
+
+        统计等待推理线程的请求数（queue_size），并将排队耗时记为 queue 阶段。
+        当前上下文（请求 ID、链路追踪）会带入推理线程。
+
+        Args:
+            func: 同步函数
+            *args: 函数参数
+
+        Returns:
+            函数返回值
+        """
+        loop = asyncio.get_running_loop()
+        ctx = contextvars.copy_context()
+        func = self._offload(func)
+        submitted = time.perf_counter()
+        # 出队标记只在事件循环线程中修改，避免与推理线程竞争
+        state = {"queued": True}
+        self._queued += 1
+
+        def leave_queue():
+            if state["queued"]:
+                state["queued"] = False
+                self._queued -= 1
+
+        def run():
+            loop.call_soon_threadsafe(leave_queue)
+            trace = current_trace()
+            if trace is not None:
+                trace.add("queue", (time.perf_counter() - submitted) * 1000)
+            return func(*args)
+
+        try:
+            return await loop.run_in_executor(self._inference_executor, ctx.run, run)
+        finally:
+            # 请求在排队时被取消则不会执行 run()
+            leave_queue()
+
     # ===================== 网关通信 =====================
 
+    def _get_http_client(self) -> httpx.AsyncClient:
+        """
+        获取与网关通信的客户端
+
+        复用连接，避免每次心跳重新建连；事件循环变化时（如单机模式先后在两个循环中启动）
+        重新创建，因为客户端的连接池不能跨事件循环使用。
+        """
+        loop = asyncio.get_running_loop()
+        if self._http_client is None or self._http_client_loop is not loop:
+            self._http_client = httpx.AsyncClient(timeout=10.0)
+            self._http_client_loop = loop
+        return self._http_client
+
+    async def _close_http_client(self):
+        """关闭网关客户端"""
+        client, self._http_client = self._http_client, None
+        if client is not None and self._http_client_loop is asyncio.get_running_loop():
+            await client.aclose()
+        self._http_client_loop = None
+
     async def _register_to_gateway(self):
         """向网关注册"""
         if not self.gateway_url:
@@ -276,15 +994,14 @@ class BaseWorker(ABC):
 
         node_info = self._get_node_info()
         try:
-            async with httpx.AsyncClient(timeout=10.0) as client:
-                resp = await client.post(
-                    f"{self.gateway_url}/api/nodes/register",
-                    json=node_info.model_dump(),
-                )
-                if resp.status_code == 200:
-                    logger.info(f"Registered to gateway: {self.gateway_url}")
-                else:
-                    logger.warning(f"Failed to register: {resp.status_code}")
+            resp = await self._get_http_client().post(
+                f"{self.gateway_url}/api/nodes/register",
+                json=node_info.model_dump(),
+            )
+            if resp.status_code == 200:
+                logger.info(f"Registered to gateway: {self.gateway_url}")
+            else:
+                logger.warning(f"Failed to register: {resp.status_code}")
         except Exception as e:
             logger.error(f"Failed to register to gateway: {e}")
 
@@ -294,40 +1011,81 @@ class BaseWorker(ABC):
             return
 
         try:
-            async with httpx.AsyncClient(timeout=10.0) as client:
-                resp = await client.delete(
-                    f"{self.gateway_url}/api/nodes/{self.node_id}"
-                )
-                if resp.status_code == 200:
-                    logger.info("Unregistered from gateway")
+            resp = await self._get_http_client().delete(
+                f"{self.gateway_url}/api/nodes/{self.node_id}"
+            )
+            if resp.status_code == 200:
+                logger.info("Unregistered from gateway")
         except Exception as e:
             logger.error(f"Failed to unregister: {e}")
 
     async def _heartbeat_loop(self):
-        """心跳循环"""
+        """HTTP 心跳循环（控制通道连接期间由通道发送心跳）"""
         while True:
             await asyncio.sleep(self.heartbeat_interval)
+            if self._control is not None and self._control.connected:
+                continue
             await self._send_heartbeat()
 
     async def _send_heartbeat(self):
-        """发送心跳"""
+        """发送心跳（控制通道已连接时经通道发送，否则 HTTP POST）"""
         if not self.gateway_url:
             return
 
         metrics = self._get_metrics()
+        if self._control is not None and await self._control.send_metrics(metrics.model_dump(mode="json")):
+            return
         try:
-            async with httpx.AsyncClient(timeout=5.0) as client:
-                await client.post(
-                    f"{self.gateway_url}/api/nodes/{self.node_id}/heartbeat",
-                    json=metrics.model_dump(),
-                )
+            await self._get_http_client().post(
+                f"{self.gateway_url}/api/nodes/{self.node_id}/heartbeat",
+                json=metrics.model_dump(),
+                timeout=5.0,
+            )
         except Exception as e:
             logger.debug(f"Heartbeat failed: {e}")
 
+    def _start_control_channel(self):
+        """连接网关控制通道（未安装 websockets 时只使用 HTTP）"""
+        if not control_channel_available():
+            logger.warning("websockets is not installed, using HTTP heartbeats and commands")
+            return
+        self._control = ControlChannel(
+            control_url(self.gateway_url, self.node_id),
+            hello=lambda: self._get_node_info().model_dump(mode="json"),
+            metrics=lambda: self._get_metrics().model_dump(mode="json"),
+            on_command=self._handle_channel_command,
+            interval=self.control_heartbeat_interval,
+            token=self.node_token,
+        )
+        self._control.start()
+
+    async def _handle_channel_command(self, command: str, params: Dict[str, Any]) -> Dict:
+        """
+        执行经控制通道收到的命令（与 /command 接口相同）
+
+        stop 会断开控制通道，因此先回复结果：等本命令的回复发出后再在后台停止节点。
+        """
+        if command.lower() == "stop":
+            replying = asyncio.current_task()
+
+            async def _stop_after_reply():
+                if replying is not None:
+                    await asyncio.wait([replying])
+                await self.stop()
+
+            self._stop_task = asyncio.create_task(_stop_after_reply())
+            return {"success": True, "status": self._status.value}
+        return await self._handle_command(NodeCommand(command=command, params=params))
+
     # ===================== 信息获取 =====================
 
+    def _latest_telemetry(self):
+        """最新遥测样本（采样器尚未产出样本时同步采集一次）"""
+        return self._telemetry.latest() or self._telemetry.collect()
+
     def _get_node_info(self) -> NodeInfo:
         """获取节点信息"""
+        sample = self._latest_telemetry()
         return NodeInfo(
             node_id=self.node_id,
             engine_type=self.engine_type,
@@ -335,54 +1093,65 @@ class BaseWorker(ABC):
             port=self.port,
             status=self._status,
             model_loaded=self._model_loaded,
-            cpu_percent=psutil.cpu_percent(),
-            memory_percent=psutil.virtual_memory().percent,
+            cpu_percent=sample.cpu_percent,
+            memory_percent=sample.memory_percent,
+            gpu_percent=sample.gpu_percent,
+            gpu_memory_percent=sample.gpu_memory_percent,
             request_count=self._request_count,
             error_count=self._error_count,
             current_concurrent=self._current_concurrent,
+            queue_size=self._scheduler.queue_size + self._queued,
+            capacity=self._capacity.snapshot(),
+            capacity_chars_per_second=self._capacity_chars_per_second(),
         )
 
     def _get_metrics(self) -> NodeMetrics:
         """获取节点指标"""
-        cpu = psutil.cpu_percent()
-        mem = psutil.virtual_memory()
-
-        # GPU 指标（如果可用）
-        gpu_percent = 0.0
-        gpu_mem_percent = 0.0
-        try:
-            import pynvml
-            pynvml.nvmlInit()
-            handle = pynvml.nvmlDeviceGetHandleByIndex(0)
-            util = pynvml.nvmlDeviceGetUtilizationRates(handle)
-            mem_info = pynvml.nvmlDeviceGetMemoryInfo(handle)
-            gpu_percent = util.gpu
-            gpu_mem_percent = (mem_info.used / mem_info.total) * 100
-            pynvml.nvmlShutdown()
-        except ImportError:
-            # pynvml not installed, GPU metrics unavailable
-            pass
-        except Exception as e:
-            logger.debug(f"Failed to get GPU metrics: {e}")
+        sample = self._latest_telemetry()
 
         avg_response_time = 0.0
         if self._request_count > 0:
             avg_response_time = self._total_response_time / self._request_count
 
+        _, (p50, p95, p99) = self._latency.quantiles((0.5, 0.95, 0.99))
+        _, (first_p50, first_p95) = self._first_chunk_latency.quantiles((0.5, 0.95))
+
         return NodeMetrics(
             node_id=self.node_id,
             status=self._status,
-            cpu_percent=cpu,
-            memory_percent=mem.percent,
-            memory_used_mb=mem.used / (1024 * 1024),
-            gpu_percent=gpu_percent,
-            gpu_memory_percent=gpu_mem_percent,
+            model_loaded=self._model_loaded,
+            cpu_percent=sample.cpu_percent,
+            memory_percent=sample.memory_percent,
+            memory_used_mb=sample.memory_used_mb,
+            process_rss_mb=sample.process_rss_mb,
+            gpu_percent=sample.gpu_percent,
+            gpu_memory_percent=sample.gpu_memory_percent,
+            gpu_memory_used_mb=sample.gpu_memory_used_mb,
+            loop_lag_ms=sample.loop_lag_ms,
+            loop_blocked_count=self._loop_monitor.blocked_count if self._loop_monitor else 0,
             current_concurrent=self._current_concurrent,
+            queue_size=self._scheduler.queue_size + self._queued,
             request_count=self._request_count,
             error_count=self._error_count,
             avg_response_time_ms=avg_response_time,
+            p50_response_time_ms=p50,
+            p95_response_time_ms=p95,
+            p99_response_time_ms=p99,
+            p50_first_chunk_ms=first_p50,
+            p95_first_chunk_ms=first_p95,
+            embedding_cache_hits=self._embedding_cache.hits,
+            embedding_cache_misses=self._embedding_cache.misses,
+            embedding_cache_entries=len(self._embedding_cache),
+            warmup_seconds=self._warmup_seconds,
+            activation_seconds=self._activation_seconds,
+            capacity=self._capacity.snapshot(),
+            capacity_chars_per_second=self._capacity_chars_per_second(),
         )
 
+    def _capacity_chars_per_second(self) -> float:
+        """节点容量: 单路字符/秒 × 推理并发数（没有估计时为 0）"""
+        return round(self._capacity.chars_per_second() * self._scheduler.concurrency, 2)
+
     # ===================== FastAPI 应用 =====================
 
     def _create_app(self) -> FastAPI:
@@ -400,28 +1169,56 @@ class BaseWorker(ABC):
             lifespan=lifespan,
         )
 
+        # 请求 ID 与阶段耗时（Server-Timing）
+        app.add_middleware(RequestLogMiddleware, service=self.engine_type.value)
+
         # 路由
         app.add_api_route("/health", self._handle_health, methods=["GET"])
         app.add_api_route("/info", self._handle_info, methods=["GET"])
         app.add_api_route("/metrics", self._handle_metrics, methods=["GET"])
         app.add_api_route("/command", self._handle_command, methods=["POST"])
         app.add_api_route("/synthesize", self._handle_synthesize, methods=["POST"])
+        app.add_api_route("/synthesize_stream", self._handle_synthesize_stream, methods=["POST"])
         app.add_api_route("/extract_voice", self._handle_extract_voice, methods=["POST"])
 
         return app
 
     async def _handle_health(self) -> Dict:
         """健康检查"""
+        components = {
+            "model": {
+                "status": "loaded" if self._model_loaded else "not_loaded",
+                "engine": self.engine_type.value,
+            }
+        }
+        if self._loop_monitor:
+            components["event_loop"] = self._loop_monitor.stats()
+        components["scheduler"] = self._scheduler.stats()
+        components["embedding_cache"] = self._embedding_cache.stats()
+        if self._process_pool is not None:
+            components["process_pool"] = self._process_pool.stats()
+        components["activation"] = {
+            "seconds": round(self._activation_seconds, 3),
+            "phases": dict(self._activation_phases),
+        }
+        components["warmup"] = {
+            "status": self._warmup_state,
+            "languages": self.warmup_languages,
+            "seconds": round(self._warmup_seconds, 3),
+        }
+        if self._control is not None:
+            components["control_channel"] = self._control.stats()
+        components["capacity"] = dict(
+            self._capacity.stats(),
+            concurrency=self._scheduler.concurrency,
+            node_chars_per_second=self._capacity_chars_per_second(),
+        )
+
         return HealthCheck(
             status="healthy" if self._status == WorkerStatus.READY else "degraded",
             version="3.0.0",
             uptime_seconds=time.time() - self._start_time,
-            components={
-                "model": {
-                    "status": "loaded" if self._model_loaded else "not_loaded",
-                    "engine": self.engine_type.value,
-                }
-            },
+            components=components,
         ).model_dump()
 
     async def _handle_info(self) -> Dict:
@@ -438,30 +1235,97 @@ class BaseWorker(ABC):
 
         if cmd == "activate" or cmd == "load_model":
             success = await self.activate()
-            return {"success": success, "status": self._status.value}
+            return {
+                "success": success,
+                "status": self._status.value,
+                "activation_seconds": round(self._activation_seconds, 3),
+                "phases": dict(self._activation_phases),
+            }
 
         elif cmd == "standby" or cmd == "unload_model":
-            success = await self.standby()
+            success = await self.standby(command.params.get("drain_timeout", DRAIN_TIMEOUT))
             return {"success": success, "status": self._status.value}
 
+        elif cmd == "drain":
+            drained = await self.drain(command.params.get("timeout", DRAIN_TIMEOUT))
+            return {
+                "success": drained,
+                "status": self._status.value,
+                "current_concurrent": self._current_concurrent,
+            }
+
+        elif cmd == "reload":
+            params = dict(command.params)
+            drain_timeout = params.pop("drain_timeout", DRAIN_TIMEOUT)
+            try:
+                success = await self.reload(params, drain_timeout)
+            except ValueError as e:
+                return {"success": False, "error": str(e)}
+            return {
+                "success": success,
+                "status": self._status.value,
+                "activation_seconds": round(self._activation_seconds, 3),
+                "phases": dict(self._activation_phases),
+            }
+
         elif cmd == "stop":
             await self.stop()
             return {"success": True, "status": self._status.value}
 
+        elif cmd == "profile":
+            return await self._handle_profile(command.params)
+
         else:
             return {"success": False, "error": f"Unknown command: {cmd}"}
 
+    async def _handle_profile(self, params: Dict[str, Any]) -> Dict:
+        """
+        运行限时采样分析（管理命令）
+
+        Args:
+            params: timestamp, signature（网关用管理令牌对 节点 ID、命令名、时间 的签名）,
+                duration, mode, format, interval
+
+        Returns:
+            {"success": True, "profile": ProfileResult.to_dict()} 或错误信息
+        """
+        try:
+            if not verify_command_signature(
+                self.admin_token, self.node_id, "profile", params.get("timestamp"), params.get("signature")
+            ):
+                raise AuthenticationError("Invalid or missing admin token")
+            result = await run_profile(
+                duration=float(params.get("duration", 10.0)),
+                mode=params.get("mode", "wall"),
+                format=params.get("format", "collapsed"),
+                interval=float(params.get("interval", 0.01)),
+            )
+        except (TypeError, ValueError) as e:
+            return {"success": False, "error": str(e), "code": "INVALID_REQUEST"}
+        except VoiceCloneError as e:
+            return {"success": False, "error": e.message, "code": e.code}
+
+        return {"success": True, "profile": result.to_dict()}
+
     async def _handle_synthesize(self, request: Request) -> Response:
         """处理合成请求"""
         if not self._model_loaded:
             raise HTTPException(status_code=503, detail="Model not loaded")
 
-        self._current_concurrent += 1
-        start_time = time.time()
+        # 准入控制: 已受理的请求达到上限时直接拒绝，不再解析请求体
+        if self._current_concurrent >= self._max_admitted:
+            self._scheduler.rejected_count += 1
+            return self._busy_response(
+                QueueFullError(self._scheduler.max_queue_size, self._scheduler.estimate_wait())
+            )
+
+        self._request_started()
+        start_time = time.perf_counter()
 
         try:
-            data = await request.json()
-            req = SynthesizeRequest(**data)
+            with trace_stage("parse"):
+                data = await request.json()
+                req = SynthesizeRequest(**data)
 
             audio_data = await self.synthesize(
                 text=req.text,
@@ -472,11 +1336,16 @@ class BaseWorker(ABC):
             )
 
             self._request_count += 1
-            elapsed = (time.time() - start_time) * 1000
+            elapsed = (time.perf_counter() - start_time) * 1000
             self._total_response_time += elapsed
+            self._latency.observe(elapsed)
+            # 扣除排队时间，按推理耗时修正速度估计
+            trace = current_trace()
+            queued = trace.stages.get("queue", 0.0) if trace is not None else 0.0
+            self._capacity.observe(req.language, len(req.text), (elapsed - queued) / 1000, wav_duration(audio_data))
 
             return Response(
-                content=audio_data,
+                content=bytes(audio_data),
                 media_type="audio/wav",
                 headers={
                     "X-Response-Time": f"{elapsed:.2f}ms",
@@ -484,20 +1353,126 @@ class BaseWorker(ABC):
                 },
             )
 
+        except QueueFullError as e:
+            return self._busy_response(e)
+
         except Exception as e:
             self._error_count += 1
             logger.error(f"Synthesize error: {e}")
             raise HTTPException(status_code=500, detail=str(e))
 
         finally:
-            self._current_concurrent -= 1
+            self._request_finished()
+
+    async def _handle_synthesize_stream(self, request: Request) -> Response:
+        """
+        处理流式合成请求
+
+        先取到第一块再返回响应，音色不存在、队列已满等错误仍能以对应状态码返回；
+        首块耗时记入 first_chunk 阶段和首块耗时分位数。
+        """
+        if not self.supports_streaming:
+            raise HTTPException(status_code=501, detail=f"Streaming not supported by {self.engine_type.value}")
+        if not self._model_loaded:
+            raise HTTPException(status_code=503, detail="Model not loaded")
+
+        if self._current_concurrent >= self._max_admitted:
+            self._scheduler.rejected_count += 1
+            return self._busy_response(
+                QueueFullError(self._scheduler.max_queue_size, self._scheduler.estimate_wait())
+            )
+
+        self._request_started()
+        start_time = time.perf_counter()
+
+        try:
+            with trace_stage("parse"):
+                data = await request.json()
+                req = SynthesizeStreamRequest(**data)
+
+            chunks = self.synthesize_stream(
+                text=req.text,
+                voice_id=req.voice_id,
+                language=req.language,
+                chunk_size=req.chunk_size,
+                speed=req.speed,
+                pitch=req.pitch,
+            )
+            first = await chunks.__anext__()
+        except StopAsyncIteration:
+            first = b""
+        except QueueFullError as e:
+            self._request_finished()
+            return self._busy_response(e)
+        except Exception as e:
+            self._request_finished()
+            self._error_count += 1
+            logger.error(f"Synthesize stream error: {e}")
+            raise HTTPException(status_code=500, detail=str(e))
+
+        first_chunk_ms = (time.perf_counter() - start_time) * 1000
+        self._first_chunk_latency.observe(first_chunk_ms)
+        trace = current_trace()
+        if trace is not None:
+            trace.add("first_chunk", first_chunk_ms)
+
+        async def body():
+            try:
+                if req.output_format == "wav":
+                    yield wav_header(self.stream_sample_rate)
+                if first:
+                    yield bytes(first)
+                    async for chunk in chunks:
+                        yield bytes(chunk)
+                self._request_count += 1
+                elapsed = (time.perf_counter() - start_time) * 1000
+                self._total_response_time += elapsed
+                self._latency.observe(elapsed)
+            except Exception as e:
+                # 响应头已发出，只能中断流
+                self._error_count += 1
+                logger.error(f"Synthesize stream error: {e}")
+                raise
+            finally:
+                await chunks.aclose()
+                self._request_finished()
+
+        media_type = (
+            "audio/wav" if req.output_format == "wav"
+            else f"audio/L16; rate={self.stream_sample_rate}; channels=1"
+        )
+        return StreamingResponse(
+            body(),
+            media_type=media_type,
+            headers={
+                "X-First-Chunk-Time": f"{first_chunk_ms:.2f}ms",
+                "X-Sample-Rate": str(self.stream_sample_rate),
+                "X-Node-Id": self.node_id,
+            },
+        )
+
+    def _busy_response(self, exc: QueueFullError) -> JSONResponse:
+        """
+        队列已满的 429 响应
+
+        请求未进入推理，X-Queue-Full 告知网关可以安全地换节点重试；
+        Retry-After 为按当前处理速度估算的排空时间。
+        """
+        return JSONResponse(
+            status_code=429,
+            content={"detail": exc.message, "code": exc.code},
+            headers={
+                "Retry-After": str(max(1, int(math.ceil(exc.retry_after)))),
+                "X-Queue-Full": "1",
+            },
+        )
 
     async def _handle_extract_voice(self, request: Request) -> Dict:
         """处理音色提取请求"""
         if not self._model_loaded:
             raise HTTPException(status_code=503, detail="Model not loaded")
 
-        self._current_concurrent += 1
+        self._request_started()
 
         try:
             # 解析 multipart 表单
@@ -531,7 +1506,7 @@ class BaseWorker(ABC):
             raise HTTPException(status_code=500, detail=str(e))
 
         finally:
-            self._current_concurrent -= 1
+            self._request_finished()
 
     def run(self, **kwargs):
         """运行节点"""
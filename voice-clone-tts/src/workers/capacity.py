@@ -0,0 +1,133 @@
+"""
+节点容量估计
+
+节点之间差异很大（CPU/GPU、引擎、核数），网关需要知道每个节点实际能承担多少合成量:
+- 校准: 激活后按语言用标准文本各合成一次（单路，不并发），得到字符/秒和实时率
+  （RTF = 合成耗时 / 音频时长，小于 1 表示快于实时）
+- 在线修正: 之后每个成功的合成请求按指数滑动平均更新对应语言的估计，
+  跟踪负载、热度和真实文本分布的变化；校准没覆盖的语言在首个请求后出现
+- 节点容量 = 各语言单路字符/秒的平均值 × 推理并发数，随心跳上报
+
+合成耗时不含排队时间，估计反映的是推理速度而不是当前负载。
+"""
+
+import time
+from dataclasses import dataclass
+from typing import Dict, Optional
+
+# 耗时过短的样本（如缓存命中、异常返回）误差太大，不计入
+MIN_SAMPLE_SECONDS = 0.05
+
+
+@dataclass
+class LanguageCapacity:
+    """单个语言的合成速度估计"""
+    chars_per_second: float = 0.0
+    # 实时率: 合成耗时 / 音频时长（音频时长未知时为 0）
+    rtf: float = 0.0
+    samples: int = 0
+    # calibration: 最近一次由校准得到；live: 已被线上请求修正
+    source: str = "calibration"
+    updated_at: float = 0.0
+
+    def to_dict(self) -> Dict:
+        return {
+            "chars_per_second": round(self.chars_per_second, 2),
+            "rtf": round(self.rtf, 4),
+            "samples": self.samples,
+            "source": self.source,
+            "updated_at": self.updated_at,
+        }
+
+
+class CapacityEstimator:
+    """按语言维护合成速度估计"""
+
+    def __init__(self, alpha: float = 0.1):
+        """
+        初始化容量估计
+
+        Args:
+            alpha: 线上请求的平滑系数（0~1，越大越跟随最近的请求）
+        """
+        self.alpha = min(1.0, max(0.0, alpha))
+        self._languages: Dict[str, LanguageCapacity] = {}
+        # 最近一次校准完成的时间（未校准为 0）
+        self.calibrated_at = 0.0
+
+    def reset(self):
+        """清空估计（模型卸载或切换后重新校准）"""
+        self._languages.clear()
+        self.calibrated_at = 0.0
+
+    def calibrate(self, language: str, chars: int, seconds: float, audio_seconds: float = 0.0):
+        """
+        记录一次校准合成，覆盖该语言原有的估计
+
+        Args:
+            language: 语言
+            chars: 文本字符数
+            seconds: 合成耗时（秒）
+            audio_seconds: 生成音频的时长（秒，未知为 0）
+        """
+        if chars <= 0 or seconds <= 0:
+            return
+        now = time.time()
+        self._languages[language] = LanguageCapacity(
+            chars_per_second=chars / seconds,
+            rtf=seconds / audio_seconds if audio_seconds > 0 else 0.0,
+            samples=1,
+            source="calibration",
+            updated_at=now,
+        )
+        self.calibrated_at = now
+
+    def observe(self, language: str, chars: int, seconds: float, audio_seconds: float = 0.0):
+        """
+        用一个线上请求修正估计
+
+        Args:
+            language: 语言
+            chars: 文本字符数
+            seconds: 合成耗时（秒，不含排队）
+            audio_seconds: 生成音频的时长（秒，未知为 0）
+        """
+        if chars <= 0 or seconds < MIN_SAMPLE_SECONDS:
+            return
+        cps = chars / seconds
+        rtf = seconds / audio_seconds if audio_seconds > 0 else 0.0
+        entry = self._languages.get(language)
+        if entry is None:
+            entry = self._languages[language] = LanguageCapacity(chars_per_second=cps, rtf=rtf, source="live")
+        else:
+            entry.chars_per_second += self.alpha * (cps - entry.chars_per_second)
+            if rtf > 0:
+                entry.rtf = rtf if entry.rtf <= 0 else entry.rtf + self.alpha * (rtf - entry.rtf)
+            entry.source = "live"
+        entry.samples += 1
+        entry.updated_at = time.time()
+
+    def get(self, language: str) -> Optional[LanguageCapacity]:
+        """某个语言的估计（没有时为 None）"""
+        return self._languages.get(language)
+
+    def chars_per_second(self) -> float:
+        """各语言单路字符/秒的平均值（没有估计时为 0）"""
+        if not self._languages:
+            return 0.0
+        return sum(e.chars_per_second for e in self._languages.values()) / len(self._languages)
+
+    def snapshot(self) -> Dict[str, Dict[str, float]]:
+        """语言 -> 速度估计，按语言排序"""
+        return {
+            language: {"chars_per_second": round(e.chars_per_second, 2), "rtf": round(e.rtf, 4)}
+            for language, e in sorted(self._languages.items())
+        }
+
+    def stats(self) -> Dict:
+        """完整状态（健康检查使用）"""
+        return {
+            "calibrated_at": self.calibrated_at,
+            "chars_per_second": round(self.chars_per_second(), 2),
+            "languages": {language: e.to_dict() for language, e in sorted(self._languages.items())},
+        }
@@ -0,0 +1,273 @@
+"""
+网关控制通道（工作节点侧）
+
+节点与网关之间保持一条 WebSocket 长连接，代替每次心跳的 HTTP POST 和网关逐条发起的命令请求:
+- 心跳: 周期比 HTTP 心跳短（默认 2 秒），只发送变化的字段，每 full_every 帧发送一次完整指标
+- 状态变更: 节点调用 send_metrics 立即发送
+- 命令: 网关下发的命令在后台任务中执行，结果沿同一连接返回；长时间的命令（如 activate）不阻塞心跳
+
+连接失败或断开后按指数退避（带抖动）重连。协议见 common/control.py。
+需要 websockets 库，未安装时节点只使用 HTTP。
+"""
+
+import json
+import time
+import random
+import asyncio
+import logging
+from typing import Any, Awaitable, Callable, Dict, Optional, Set
+
+from ..common.control import (
+    HELLO,
+    HEARTBEAT,
+    COMMAND,
+    RESULT,
+    RESYNC,
+    diff_metrics,
+    encode_frame,
+    sign_hello,
+)
+
+logger = logging.getLogger(__name__)
+
+
+def control_channel_available() -> bool:
+    """是否安装了 websockets"""
+    try:
+        import websockets  # noqa: F401
+    except ImportError:
+        return False
+    return True
+
+
+async def _connect_websocket(url: str):
+    import websockets
+
+    return await websockets.connect(url, max_size=2 ** 22)
+
+
+class ControlChannel:
+    """与网关的控制通道"""
+
+    def __init__(
+        self,
+        url: str,
+        hello: Callable[[], Dict[str, Any]],
+        metrics: Callable[[], Dict[str, Any]],
+        on_command: Callable[[str, Dict[str, Any]], Awaitable[Dict[str, Any]]],
+        interval: float = 2.0,
+        full_every: int = 30,
+        backoff_initial: float = 1.0,
+        backoff_max: float = 30.0,
+        connect: Optional[Callable[[str], Awaitable[Any]]] = None,
+        token: str = "",
+    ):
+        """
+        初始化控制通道
+
+        Args:
+            url: 控制通道地址（ws:// 或 wss://）
+            hello: 返回节点信息（NodeInfo 的 JSON 字典）
+            metrics: 返回当前指标（NodeMetrics 的 JSON 字典）
+            on_command: 执行命令 (command, params) -> 结果
+            interval: 心跳间隔（秒）
+            full_every: 每隔多少帧发送一次完整指标
+            backoff_initial: 首次重连前的等待时间（秒）
+            backoff_max: 重连等待时间上限（秒）
+            connect: 建立连接的函数（默认使用 websockets）
+            token: 节点令牌（与网关共享，用于签名 hello 帧，为空则不签名）
+        """
+        self.url = url
+        self.interval = interval
+        self.full_every = max(1, full_every)
+        self.backoff_initial = backoff_initial
+        self.backoff_max = backoff_max
+        self._hello = hello
+        self._metrics = metrics
+        self._on_command = on_command
+        self._connect = connect or _connect_websocket
+        self._token = token
+
+        self._ws = None
+        self._task: Optional[asyncio.Task] = None
+        self._commands: Set[asyncio.Task] = set()
+        # 网关持有的指标（上一帧之后），心跳只发送与之不同的字段
+        self._sent: Dict[str, Any] = {}
+        self._frames = 0
+        # 心跳循环与状态变更可能同时发送，逐帧计算差异需要串行
+        self._lock = asyncio.Lock()
+
+        # 统计
+        self.connects = 0
+        self.failures = 0
+        self.frames_sent = 0
+        self.bytes_sent = 0
+        self.commands_handled = 0
+
+    @property
+    def connected(self) -> bool:
+        """是否已连接"""
+        return self._ws is not None
+
+    def start(self):
+        """在后台连接并保持连接"""
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        """断开连接并停止重连（不取消调用方所在的命令任务，如 stop 命令本身）"""
+        task, self._task = self._task, None
+        if task is not None:
+            task.cancel()
+            try:
+                await task
+            except asyncio.CancelledError:
+                pass
+        current = asyncio.current_task()
+        for command in list(self._commands):
+            if command is not current:
+                command.cancel()
+        await self._close()
+
+    async def send_metrics(self, metrics: Optional[Dict[str, Any]] = None) -> bool:
+        """
+        发送一帧心跳（状态变化时由节点直接调用）
+
+        Args:
+            metrics: 当前指标（为空时调用 metrics 回调获取）
+
+        Returns:
+            是否已发送（未连接或发送失败时为 False，调用方改用 HTTP）
+        """
+        if self._ws is None:
+            return False
+        async with self._lock:
+            metrics = metrics if metrics is not None else self._metrics()
+            full = self._frames % self.full_every == 0
+            changes = diff_metrics(metrics, {} if full else self._sent)
+            frame: Dict[str, Any] = {"type": HEARTBEAT, "m": changes}
+            if full:
+                frame["full"] = True
+                self._sent = {}
+            if not await self._send(frame):
+                return False
+            self._sent.update(changes)
+            self._frames += 1
+            return True
+
+    def stats(self) -> Dict[str, Any]:
+        """通道统计"""
+        return {
+            "url": self.url,
+            "connected": self.connected,
+            "connects": self.connects,
+            "failures": self.failures,
+            "frames_sent": self.frames_sent,
+            "bytes_sent": self.bytes_sent,
+            "commands_handled": self.commands_handled,
+        }
+
+    # ===================== 连接 =====================
+
+    async def _run(self):
+        delay = self.backoff_initial
+        while True:
+            try:
+                ws = await self._connect(self.url)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                self.failures += 1
+                logger.debug(f"Control channel connect failed: {e}")
+            else:
+                self._ws = ws
+                self.connects += 1
+                delay = self.backoff_initial
+                logger.info(f"Control channel connected: {self.url}")
+                await self._serve(ws)
+                logger.warning("Control channel closed, falling back to HTTP until reconnected")
+            # 抖动避免网关重启后所有节点同时重连
+            await asyncio.sleep(delay * random.uniform(0.8, 1.2))
+            delay = min(delay * 2, self.backoff_max)
+
+    async def _serve(self, ws):
+        """连接建立后: 发送 hello 和完整指标，然后并行收帧和发送心跳，直到连接断开"""
+        heartbeat = None
+        try:
+            await self._handshake()
+            heartbeat = asyncio.create_task(self._heartbeat_loop())
+            while self._ws is ws:
+                await self._handle(json.loads(await ws.recv()))
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            logger.debug(f"Control channel error: {e}")
+        finally:
+            if heartbeat is not None:
+                heartbeat.cancel()
+            if self._ws is ws:
+                await self._close()
+
+    async def _handshake(self):
+        self._frames = 0
+        self._sent = {}
+        node = self._hello()
+        hello: Dict[str, Any] = {"type": HELLO, "node": node}
+        if self._token:
+            hello["ts"] = round(time.time(), 3)
+            hello["sig"] = sign_hello(self._token, node.get("node_id", ""), hello["ts"])
+        if not await self._send(hello) or not await self.send_metrics():
+            raise ConnectionError("handshake failed")
+
+    async def _heartbeat_loop(self):
+        while True:
+            await asyncio.sleep(self.interval)
+            await self.send_metrics()
+
+    async def _send(self, frame: Dict[str, Any]) -> bool:
+        ws = self._ws
+        if ws is None:
+            return False
+        text = encode_frame(frame)
+        try:
+            await ws.send(text)
+        except Exception as e:
+            logger.debug(f"Control channel send failed: {e}")
+            if self._ws is ws:
+                await self._close()
+            return False
+        self.frames_sent += 1
+        self.bytes_sent += len(text)
+        return True
+
+    async def _close(self):
+        ws, self._ws = self._ws, None
+        if ws is not None:
+            try:
+                await ws.close()
+            except Exception:
+                pass
+
+    # ===================== 收帧 =====================
+
+    async def _handle(self, frame: Dict[str, Any]):
+        kind = frame.get("type")
+        if kind == COMMAND:
+            task = asyncio.create_task(self._execute(frame))
+            self._commands.add(task)
+            task.add_done_callback(self._commands.discard)
+        elif kind == RESYNC:
+            logger.info("Gateway requested resync, re-sending node info")
+            await self._handshake()
+
+    async def _execute(self, frame: Dict[str, Any]):
+        reply: Dict[str, Any] = {"type": RESULT, "id": frame.get("id")}
+        try:
+            reply["result"] = await self._on_command(frame.get("command", ""), frame.get("params") or {})
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            logger.error(f"Command {frame.get('command')} failed: {e}")
+            reply["error"] = str(e)
+        self.commands_handled += 1
+        await self._send(reply)
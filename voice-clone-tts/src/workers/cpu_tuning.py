@@ -0,0 +1,131 @@
+"""
+PyTorch CPU 推理调优
+
+CPU 节点的性能模式:
+- 线程: intra-op 线程数（torch.set_num_threads）和 inter-op 线程数，
+  未指定 intra-op 线程数时按 CPU 核数 / 推理线程数分配，多个推理线程不互相争抢核心
+- int8 动态量化: 线性层权重量化为 int8，激活在运行时按批量化；
+  GPT-2 的注意力和 MLP 用 transformers 的 Conv1D 实现，先转换为等价的 nn.Linear 再量化
+- 矩阵乘法精度: torch.set_float32_matmul_precision，high / medium 允许 oneDNN 使用
+  bf16 等降低精度的内核（取决于 CPU 指令集）
+
+torch 只在函数内导入，未安装 torch 时模块仍可导入。
+"""
+
+import os
+import logging
+from dataclasses import dataclass, asdict
+from typing import Any, Dict
+
+from ..common.exceptions import ConfigurationError
+
+logger = logging.getLogger(__name__)
+
+COMPUTE_TYPES = ("float32", "float16", "int8")
+MATMUL_PRECISIONS = ("highest", "high", "medium")
+
+
+@dataclass
+class CPUProfile:
+    """CPU 性能模式"""
+    num_threads: int = 0          # intra-op 线程数（0 表示自动）
+    interop_threads: int = 0      # inter-op 线程数（0 表示 PyTorch 默认）
+    quantize: bool = False        # 线性层 int8 动态量化
+    matmul_precision: str = "highest"
+
+    def validate(self):
+        """
+        校验参数
+
+        Raises:
+            ConfigurationError: 参数无效
+        """
+        if self.num_threads < 0 or self.interop_threads < 0:
+            raise ConfigurationError("Thread counts must be >= 0")
+        if self.matmul_precision not in MATMUL_PRECISIONS:
+            raise ConfigurationError(
+                f"Unknown matmul precision: {self.matmul_precision} (expected one of {', '.join(MATMUL_PRECISIONS)})"
+            )
+
+    def to_dict(self) -> Dict[str, Any]:
+        return asdict(self)
+
+
+def resolve_threads(num_threads: int, inference_threads: int = 1) -> int:
+    """
+    计算 intra-op 线程数
+
+    Args:
+        num_threads: 配置的线程数（0 表示自动）
+        inference_threads: 同时推理的线程数
+
+    Returns:
+        线程数（自动时为 CPU 核数 / 推理线程数，至少 1）
+    """
+    if num_threads > 0:
+        return num_threads
+    return max(1, (os.cpu_count() or 1) // max(1, inference_threads))
+
+
+def apply_cpu_profile(profile: CPUProfile):
+    """
+    应用线程数和矩阵乘法精度（进程级设置）
+
+    inter-op 线程数只能在进程第一次并行计算前设置一次，之后设置失败时只记录警告。
+    """
+    import torch
+
+    if profile.num_threads > 0:
+        torch.set_num_threads(profile.num_threads)
+    if profile.interop_threads > 0:
+        try:
+            torch.set_num_interop_threads(profile.interop_threads)
+        except RuntimeError as e:
+            logger.warning(f"Cannot change inter-op threads after parallel work has started: {e}")
+    torch.set_float32_matmul_precision(profile.matmul_precision)
+
+
+def linearize_conv1d(module) -> int:
+    """
+    将 transformers 的 Conv1D（权重形状为 (in, out)）替换为等价的 nn.Linear
+
+    Args:
+        module: 根模块（原地修改，共享的子模块只转换一次）
+
+    Returns:
+        替换的模块数
+    """
+    import torch
+
+    count = 0
+    for name, child in list(module.named_children()):
+        if type(child).__name__ == "Conv1D" and hasattr(child, "nf") and child.weight.dim() == 2:
+            in_features, out_features = child.weight.shape
+            linear = torch.nn.Linear(in_features, out_features, bias=child.bias is not None)
+            with torch.no_grad():
+                linear.weight.copy_(child.weight.t())
+                if child.bias is not None:
+                    linear.bias.copy_(child.bias)
+            setattr(module, name, linear.to(child.weight.device))
+            count += 1
+        else:
+            count += linearize_conv1d(child)
+    return count
+
+
+def quantize_linear_int8(module) -> int:
+    """
+    线性层 int8 动态量化（原地）
+
+    Args:
+        module: 要量化的模块（CPU 上）
+
+    Returns:
+        量化的线性层数
+    """
+    import torch
+
+    linearize_conv1d(module)
+    count = sum(1 for m in module.modules() if isinstance(m, torch.nn.Linear))
+    torch.ao.quantization.quantize_dynamic(module, {torch.nn.Linear}, dtype=torch.qint8, inplace=True)
+    return count
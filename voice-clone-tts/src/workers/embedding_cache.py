@@ -0,0 +1,227 @@
+"""
+音色嵌入缓存
+
+合成时按 voice_id 读取音色嵌入，避免每个请求都从磁盘 torch.load 并拷贝到设备:
+- LRU 淘汰: 条目数和字节数双重上限，超出时淘汰最久未使用的条目
+- 常驻设备: 缓存加载函数的返回值本身（引擎用 map_location 加载到推理设备），
+  命中时直接复用设备上的张量，不再做主机到显存的拷贝
+- 失效: 每次读取比较文件的 mtime 和大小，文件被重写或删除后自动重新加载；
+  音色提取完成后也可显式 invalidate
+- 并发去重: 同一 voice_id 同时未命中时只加载一次，其他请求等待同一次加载
+
+缓存的张量在多个推理线程间只读共享。
+"""
+
+import os
+import asyncio
+import logging
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any, Callable, Dict, Hashable, Optional, Tuple
+
+from ..common.tracing import run_in_executor
+
+logger = logging.getLogger(__name__)
+
+
+def embedding_nbytes(value: Any) -> Dict[str, int]:
+    """
+    统计嵌入中张量占用的字节数
+
+    支持张量（element_size/nelement）、numpy 数组（nbytes）及其字典/列表嵌套。
+
+    Args:
+        value: 加载得到的嵌入
+
+    Returns:
+        设备类型（cuda/cpu）-> 字节数
+    """
+    sizes: Dict[str, int] = {}
+
+    def visit(item: Any):
+        if hasattr(item, "element_size") and hasattr(item, "nelement"):
+            device = getattr(getattr(item, "device", None), "type", "cpu")
+            sizes[device] = sizes.get(device, 0) + item.element_size() * item.nelement()
+        elif hasattr(item, "nbytes") and not isinstance(item, (bytes, bytearray)):
+            sizes["cpu"] = sizes.get("cpu", 0) + int(item.nbytes)
+        elif isinstance(item, (bytes, bytearray)):
+            sizes["cpu"] = sizes.get("cpu", 0) + len(item)
+        elif isinstance(item, dict):
+            for child in item.values():
+                visit(child)
+        elif isinstance(item, (list, tuple)):
+            for child in item:
+                visit(child)
+
+    visit(value)
+    return sizes
+
+
+@dataclass
+class _Entry:
+    """缓存条目"""
+    value: Any
+    mtime_ns: int
+    file_size: int
+    sizes: Dict[str, int] = field(default_factory=dict)
+
+    @property
+    def nbytes(self) -> int:
+        return sum(self.sizes.values())
+
+
+class EmbeddingCache:
+    """按条目数和字节数限制的 LRU 音色嵌入缓存"""
+
+    def __init__(self, max_entries: int = 128, max_bytes: int = 256 * 1024 * 1024):
+        """
+        初始化缓存
+
+        Args:
+            max_entries: 最多缓存的音色数（0 表示不缓存）
+            max_bytes: 缓存张量的总字节数上限（各设备合计）
+        """
+        self.max_entries = max(0, max_entries)
+        self.max_bytes = max(0, max_bytes)
+
+        self._entries: "OrderedDict[Hashable, _Entry]" = OrderedDict()
+        # voice_id -> (文件版本, 加载任务)
+        self._loading: Dict[Hashable, Tuple[Tuple[int, int], asyncio.Task]] = {}
+        self._bytes = 0
+
+        # 统计
+        self.hits = 0
+        self.misses = 0
+        self.coalesced = 0
+        self.evictions = 0
+
+    @property
+    def enabled(self) -> bool:
+        return self.max_entries > 0 and self.max_bytes > 0
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    # ===================== 读取 =====================
+
+    async def get(self, key: Hashable, path: Path, load: Callable[[Path], Any]) -> Optional[Any]:
+        """
+        读取嵌入，未命中或文件已变化时调用 load 加载
+
+        Args:
+            key: 缓存键（voice_id）
+            path: 嵌入文件路径
+            load: 同步加载函数，接收 path（在线程池中执行）
+
+        Returns:
+            嵌入，文件不存在时返回 None
+        """
+        # stat 只读元数据，开销在微秒级，不必放到线程池
+        try:
+            stat = os.stat(path)
+        except FileNotFoundError:
+            self.invalidate(key)
+            return None
+        version = (stat.st_mtime_ns, stat.st_size)
+
+        entry = self._entries.get(key)
+        if entry is not None:
+            if (entry.mtime_ns, entry.file_size) == version:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return entry.value
+            # 文件已被重写
+            self._remove(key)
+
+        if not self.enabled:
+            self.misses += 1
+            return await run_in_executor(load, path)
+
+        pending = self._loading.get(key)
+        if pending is not None and pending[0] == version:
+            self.coalesced += 1
+            task = pending[1]
+        else:
+            self.misses += 1
+            task = asyncio.ensure_future(self._load(key, path, load, version))
+            # 等待方都被取消时加载异常无人读取，这里读取以免告警
+            task.add_done_callback(lambda t: t.cancelled() or t.exception())
+            self._loading[key] = (version, task)
+        # 单个等待方被取消不影响其他请求共享的加载
+        return await asyncio.shield(task)
+
+    async def _load(self, key: Hashable, path: Path, load: Callable[[Path], Any], version: Tuple[int, int]) -> Any:
+        try:
+            value = await run_in_executor(load, path)
+        finally:
+            pending = self._loading.get(key)
+            current = pending is not None and pending[1] is asyncio.current_task()
+            if current:
+                del self._loading[key]
+
+        if not current:
+            # 加载期间被 invalidate/clear，结果只返回给已在等待的请求
+            return value
+
+        entry = _Entry(value=value, mtime_ns=version[0], file_size=version[1], sizes=embedding_nbytes(value))
+        if entry.nbytes > self.max_bytes:
+            logger.warning(
+                f"Voice embedding {key} ({entry.nbytes} bytes) exceeds cache limit, not cached"
+            )
+            return value
+
+        self._remove(key)
+        self._entries[key] = entry
+        self._bytes += entry.nbytes
+        while len(self._entries) > self.max_entries or self._bytes > self.max_bytes:
+            evicted, old = self._entries.popitem(last=False)
+            self._bytes -= old.nbytes
+            self.evictions += 1
+            logger.debug(f"Evicted voice embedding {evicted}")
+        return value
+
+    # ===================== 失效 =====================
+
+    def _remove(self, key: Hashable):
+        entry = self._entries.pop(key, None)
+        if entry is not None:
+            self._bytes -= entry.nbytes
+
+    def invalidate(self, key: Hashable):
+        """
+        使指定音色失效（音色重新提取或删除后调用）
+
+        正在进行的旧版本加载不再被新请求复用。
+        """
+        self._remove(key)
+        self._loading.pop(key, None)
+
+    def clear(self):
+        """清空缓存（卸载模型时释放设备上的张量）"""
+        self._entries.clear()
+        self._loading.clear()
+        self._bytes = 0
+
+    # ===================== 统计 =====================
+
+    def stats(self) -> Dict[str, Any]:
+        """缓存统计"""
+        by_device: Dict[str, int] = {}
+        for entry in self._entries.values():
+            for device, size in entry.sizes.items():
+                by_device[device] = by_device.get(device, 0) + size
+
+        lookups = self.hits + self.misses + self.coalesced
+        return {
+            "entries": len(self._entries),
+            "max_entries": self.max_entries,
+            "bytes": self._bytes,
+            "max_bytes": self.max_bytes,
+            "bytes_by_device": by_device,
+            "hits": self.hits,
+            "misses": self.misses,
+            "coalesced": self.coalesced,
+            "evictions": self.evictions,
+            "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+        }
@@ -17,7 +17,8 @@ from typing import Optional, Dict, Any
 import httpx
 
 from ..common.models import EngineType, VoiceInfo
-from .base_worker import BaseWorker
+from ..common.tracing import trace_stage, run_in_executor
+from .base_worker import BaseWorker, write_json
 
 logger = logging.getLogger(__name__)
 
@@ -33,6 +34,7 @@ class GPTSoVITSWorker(BaseWorker):
         node_id: Optional[str] = None,
         api_url: str = "http://127.0.0.1:9880",
         voices_dir: str = "./voices",
+        **kwargs,
     ):
         """
         初始化 GPT-SoVITS Worker
@@ -44,6 +46,7 @@ class GPTSoVITSWorker(BaseWorker):
             node_id: 节点 ID
             api_url: GPT-SoVITS API 服务地址
             voices_dir: 音色存储目录
+            **kwargs: 其他 BaseWorker 参数（遥测周期等）
         """
         super().__init__(
             engine_type=EngineType.GPT_SOVITS,
@@ -51,6 +54,7 @@ class GPTSoVITSWorker(BaseWorker):
             port=port,
             gateway_url=gateway_url,
             node_id=node_id,
+            **kwargs,
         )
 
         self.api_url = api_url.rstrip("/")
@@ -128,7 +132,8 @@ class GPTSoVITSWorker(BaseWorker):
             raise RuntimeError("API not connected")
 
         # 加载音色配置
-        voice_config = await self._load_voice_config(voice_id)
+        with trace_stage("embedding"):
+            voice_config = await self._load_voice_config(voice_id)
         if voice_config is None:
             raise ValueError(f"Voice not found: {voice_id}")
 
@@ -150,10 +155,11 @@ class GPTSoVITSWorker(BaseWorker):
 
         try:
             # 调用 GPT-SoVITS API
-            resp = await self._client.post(
-                f"{self.api_url}/tts",
-                json=params,
-            )
+            with trace_stage("inference"):
+                resp = await self._client.post(
+                    f"{self.api_url}/tts",
+                    json=params,
+                )
 
             if resp.status_code != 200:
                 error_msg = resp.text
@@ -192,12 +198,7 @@ class GPTSoVITSWorker(BaseWorker):
         import time
 
         voice_dir = self.voices_dir / voice_id
-        voice_dir.mkdir(parents=True, exist_ok=True)
-
-        # 保存参考音频
         ref_audio_path = voice_dir / "reference.wav"
-        with open(ref_audio_path, "wb") as f:
-            f.write(audio_data)
 
         # 保存配置
         config = {
@@ -216,8 +217,8 @@ class GPTSoVITSWorker(BaseWorker):
         if "sovits_model_path" in kwargs:
             config["sovits_model_path"] = kwargs["sovits_model_path"]
 
-        with open(voice_dir / "voice.json", "w", encoding="utf-8") as f:
-            json.dump(config, f, ensure_ascii=False, indent=2)
+        # 参考音频和配置的写入放到线程池，避免阻塞事件循环
+        await run_in_executor(self._save_voice_sync, voice_dir, audio_data, config)
 
         return VoiceInfo(
             voice_id=voice_id,
@@ -226,10 +227,20 @@ class GPTSoVITSWorker(BaseWorker):
             created_at=config["created_at"],
         )
 
+    def _save_voice_sync(self, voice_dir: Path, audio_data: bytes, config: Dict):
+        """同步保存参考音频和音色配置"""
+        voice_dir.mkdir(parents=True, exist_ok=True)
+        with open(voice_dir / "reference.wav", "wb") as f:
+            f.write(audio_data)
+        write_json(voice_dir / "voice.json", config)
+
     async def _load_voice_config(self, voice_id: str) -> Optional[Dict]:
-        """加载音色配置"""
-        voice_dir = self.voices_dir / voice_id
-        config_path = voice_dir / "voice.json"
+        """加载音色配置（文件读取在线程池中执行）"""
+        return await run_in_executor(self._read_voice_config_sync, voice_id)
+
+    def _read_voice_config_sync(self, voice_id: str) -> Optional[Dict]:
+        """同步读取音色配置"""
+        config_path = self.voices_dir / voice_id / "voice.json"
 
         if not config_path.exists():
             return None
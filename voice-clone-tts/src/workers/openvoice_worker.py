@@ -21,16 +21,19 @@ if os.path.exists(_ffmpeg_dir):
 # ===========================================================================
 
 import io
-import json
 import uuid
 import logging
 import asyncio
 from pathlib import Path
 from typing import Optional, Dict, Any
 
+from ..common.audio import AudioData, encode_wav
 from ..common.models import EngineType, VoiceInfo
 from ..common.paths import OPENVOICE_MODEL_PATH, VOICES_DIR, FFMPEG_PATH, FFPROBE_PATH
-from .base_worker import BaseWorker
+from ..common.tracing import trace_stage
+from ..common.tracing import run_in_executor
+from .base_worker import BaseWorker, write_temp_file, write_json
+from .weight_cache import weight_cache_path, load_weight_cache, save_weight_cache
 
 logger = logging.getLogger(__name__)
 
@@ -53,6 +56,13 @@ def _configure_ffmpeg():
 class OpenVoiceWorker(BaseWorker):
     """OpenVoice 工作节点"""
 
+    # CPU 上可 fork 多个推理子进程
+    supports_inference_processes = True
+
+    # 不停服重新加载: 替换基础 TTS、音色转换器和源说话人嵌入，可切换检查点目录
+    model_attributes = ("_base_speaker_tts", "_tone_color_converter", "_source_se", "_in_memory")
+    reload_options = ("checkpoint_path",)
+
     def __init__(
         self,
         host: str = "0.0.0.0",
@@ -62,6 +72,7 @@ class OpenVoiceWorker(BaseWorker):
         checkpoint_path: Optional[str] = None,
         device: str = "cuda",
         voices_dir: str = "./voices",
+        **kwargs,
     ):
         """
         初始化 OpenVoice Worker
@@ -74,6 +85,7 @@ class OpenVoiceWorker(BaseWorker):
             checkpoint_path: 模型检查点路径
             device: 设备 (cuda/cpu)
             voices_dir: 音色存储目录
+            **kwargs: 其他 BaseWorker 参数（推理线程数、遥测周期等）
         """
         super().__init__(
             engine_type=EngineType.OPENVOICE,
@@ -81,6 +93,7 @@ class OpenVoiceWorker(BaseWorker):
             port=port,
             gateway_url=gateway_url,
             node_id=node_id,
+            **kwargs,
         )
 
         self.checkpoint_path = checkpoint_path
@@ -92,6 +105,8 @@ class OpenVoiceWorker(BaseWorker):
         self._base_speaker_tts = None
         self._tone_color_converter = None
         self._source_se = None
+        # 音色转换器是否支持直接传入波形（不支持时退回临时文件路径）
+        self._in_memory = False
 
     async def load_model(self) -> bool:
         """加载 OpenVoice 模型"""
@@ -109,8 +124,14 @@ class OpenVoiceWorker(BaseWorker):
             return False
 
     def _load_model_sync(self):
-        """同步加载模型"""
-        import torch
+        """
+        同步加载模型
+
+        MeloTTS 基础模型、音色转换器和预提取的源说话人嵌入互不依赖，在线程中并行加载
+        （反序列化和权重拷贝大部分时间不持有 GIL）；源说话人嵌入需要从音频提取时
+        依赖转换器，在转换器加载后执行。各阶段耗时记入激活耗时。
+        """
+        from concurrent.futures import ThreadPoolExecutor
 
         # 配置 FFmpeg (在导入 OpenVoice 之前)
         _configure_ffmpeg()
@@ -124,38 +145,98 @@ class OpenVoiceWorker(BaseWorker):
 
         ckpt_converter = ckpt_base / "converter"
 
-        # 导入 OpenVoice
-        from openvoice import se_extractor
-        from openvoice.api import ToneColorConverter
-        from melo.api import TTS
-
-        # 加载 TTS 基础模型
-        self._base_speaker_tts = TTS(language="ZH", device=self.device)
-
-        # 加载音色转换器
-        self._tone_color_converter = ToneColorConverter(
-            str(ckpt_converter / "config.json"),
-            device=self.device,
-        )
-        self._tone_color_converter.load_ckpt(str(ckpt_converter / "checkpoint.pth"))
+        # 导入 OpenVoice（并行加载前完成导入，避免多个线程同时导入同一批模块）
+        with self._load_phase("import"):
+            import torch
+            from openvoice import se_extractor
+            from openvoice.api import ToneColorConverter
+            from melo.api import TTS
 
-        # 提取源说话人嵌入
-        # 优先从 .pth 文件加载（如果存在），否则从 .wav 提取
+        # 源说话人嵌入: 优先从 .pth 文件加载（如果存在），否则从 .wav 提取
         source_se_pth = ckpt_base / "base_speakers" / "ses" / "zh.pth"
         source_audio = ckpt_base / "base_speakers" / "ses" / "zh.wav"
 
-        if source_se_pth.exists():
-            # 直接加载预提取的 speaker embedding
-            self._source_se = torch.load(str(source_se_pth), map_location=self.device)
-            logger.info(f"Loaded source speaker embedding from {source_se_pth}")
-        elif source_audio.exists():
-            self._source_se = se_extractor.get_se(
-                str(source_audio),
-                self._tone_color_converter,
-                vad=False,
-            )[0]
+        def load_base_tts():
+            with self._load_phase("base_tts"):
+                return TTS(language="ZH", device=self.device)
+
+        def load_converter():
+            with self._load_phase("converter"):
+                converter = ToneColorConverter(str(ckpt_converter / "config.json"), device=self.device)
+                self._load_converter_weights(converter, ckpt_converter / "checkpoint.pth")
+                return converter
+
+        def load_source_se():
+            with self._load_phase("source_se"):
+                return torch.load(str(source_se_pth), map_location=self.device)
+
+        with ThreadPoolExecutor(max_workers=3, thread_name_prefix="openvoice-load") as pool:
+            base_tts = pool.submit(load_base_tts)
+            converter = pool.submit(load_converter)
+            source_se = pool.submit(load_source_se) if source_se_pth.exists() else None
+
+            self._base_speaker_tts = base_tts.result()
+            self._tone_color_converter = converter.result()
+            if source_se is not None:
+                # 直接加载预提取的 speaker embedding
+                self._source_se = source_se.result()
+                logger.info(f"Loaded source speaker embedding from {source_se_pth}")
+
+        if self._source_se is None and source_audio.exists():
+            with self._load_phase("source_se"):
+                self._source_se = se_extractor.get_se(
+                    str(source_audio),
+                    self._tone_color_converter,
+                    vad=False,
+                )[0]
             logger.info(f"Extracted source speaker embedding from {source_audio}")
 
+        self._in_memory = self._supports_in_memory()
+        if not self._in_memory:
+            logger.warning("ToneColorConverter internals not available, synthesis falls back to temp files")
+
+    def _load_converter_weights(self, converter, checkpoint: Path):
+        """
+        加载音色转换器权重
+
+        与 ToneColorConverter.load_ckpt 相同（state dict 的 "model" 项，非严格匹配），
+        启用权重缓存时改为从 safetensors 缓存读取，首次加载后写入缓存。
+        """
+        import torch
+
+        cache = weight_cache_path(checkpoint, "converter") if self.weight_cache else None
+        if cache is not None and cache.exists():
+            try:
+                state = load_weight_cache(cache)
+            except Exception as e:
+                logger.warning(f"Ignoring unreadable weight cache {cache}: {e}")
+            else:
+                converter.model.load_state_dict(state, strict=False)
+                logger.info(f"Loaded converter weights from cache {cache}")
+                return
+
+        if cache is None:
+            converter.load_ckpt(str(checkpoint))
+            return
+
+        state = torch.load(str(checkpoint), map_location="cpu")["model"]
+        converter.model.load_state_dict(state, strict=False)
+        save_weight_cache(state, cache)
+
+    def _supports_in_memory(self) -> bool:
+        """检查能否绕过 convert() 的文件接口，直接对波形做音色转换"""
+        try:
+            import librosa  # noqa: F401
+            from openvoice.mel_processing import spectrogram_torch  # noqa: F401
+        except ImportError:
+            return False
+        converter = self._tone_color_converter
+        return (
+            hasattr(converter, "hps")
+            and hasattr(converter, "add_watermark")
+            and hasattr(getattr(converter, "model", None), "voice_conversion")
+        )
+
     async def unload_model(self) -> bool:
         """卸载模型"""
         try:
@@ -168,6 +249,7 @@ class OpenVoiceWorker(BaseWorker):
                 self._tone_color_converter = None
 
             self._source_se = None
+            self._in_memory = False
 
             import torch
             if torch.cuda.is_available():
@@ -186,7 +268,7 @@ class OpenVoiceWorker(BaseWorker):
         voice_id: str,
         language: str = "zh",
         **kwargs,
-    ) -> bytes:
+    ) -> AudioData:
         """
         合成语音
 
@@ -203,13 +285,13 @@ class OpenVoiceWorker(BaseWorker):
             raise RuntimeError("Model not loaded")
 
         # 加载目标音色
-        target_se = await self._load_voice_embedding(voice_id)
+        with trace_stage("embedding"):
+            target_se = await self._load_voice_embedding(voice_id)
         if target_se is None:
             raise ValueError(f"Voice not found: {voice_id}")
 
-        loop = asyncio.get_event_loop()
-        audio_data = await loop.run_in_executor(
-            None,
+        # 经调度队列在推理线程池中运行合成（引擎未实现批量推理，逐条执行）
+        audio_data = await self._schedule_synthesis(
             self._synthesize_sync,
             text,
             target_se,
@@ -225,12 +307,81 @@ class OpenVoiceWorker(BaseWorker):
         target_se,
         language: str,
         speed: float,
-    ) -> bytes:
-        """同步合成"""
+    ) -> AudioData:
+        """同步合成（波形在内存中传给音色转换器，只在最后编码一次 WAV）"""
+        if not self._in_memory:
+            return self._synthesize_file_sync(text, target_se, language, speed)
+
+        # 1. 基础 TTS: 不指定 output_path 时直接返回波形
+        speaker_ids = self._base_speaker_tts.hps.data.spk2id
+        speaker_key = list(speaker_ids.keys())[0]
+
+        with trace_stage("inference"):
+            audio = self._base_speaker_tts.tts_to_file(
+                text=text,
+                speaker_id=speaker_ids[speaker_key],
+                output_path=None,
+                speed=speed,
+            )
+
+        # 2. 音色转换
+        with trace_stage("convert"):
+            audio, sample_rate = self._convert_waveform(
+                audio, self._base_speaker_tts.hps.data.sampling_rate, target_se
+            )
+
+        with trace_stage("encode"):
+            return encode_wav(audio, sample_rate)
+
+    def _convert_waveform(self, audio, sample_rate: int, target_se):
+        """
+        对波形做音色转换
+
+        与 ToneColorConverter.convert() 的处理相同（重采样、线性谱、voice_conversion、水印），
+        只是输入输出都是内存中的数组。
+
+        Returns:
+            (转换后的波形, 采样率)
+        """
+        import numpy as np
         import torch
-        import torchaudio
+        import librosa
+        from openvoice.mel_processing import spectrogram_torch
+
+        converter = self._tone_color_converter
+        hps = converter.hps
+        target_rate = hps.data.sampling_rate
+
+        audio = np.asarray(audio, dtype=np.float32)
+        if sample_rate != target_rate:
+            audio = librosa.resample(audio, orig_sr=sample_rate, target_sr=target_rate)
+
+        with torch.no_grad():
+            y = torch.from_numpy(np.ascontiguousarray(audio)).to(converter.device).unsqueeze(0)
+            spec = spectrogram_torch(
+                y,
+                hps.data.filter_length,
+                hps.data.sampling_rate,
+                hps.data.hop_length,
+                hps.data.win_length,
+                center=False,
+            ).to(converter.device)
+            spec_lengths = torch.LongTensor([spec.size(-1)]).to(converter.device)
+            converted = converter.model.voice_conversion(
+                spec, spec_lengths, sid_src=self._source_se, sid_tgt=target_se, tau=0.3
+            )[0][0, 0].data.cpu().float().numpy()
+
+        return converter.add_watermark(converted, "@OpenVoice"), target_rate
+
+    def _synthesize_file_sync(
+        self,
+        text: str,
+        target_se,
+        language: str,
+        speed: float,
+    ) -> bytes:
+        """同步合成（临时文件路径: 基础 TTS 写文件，转换器读文件再写文件）"""
         import tempfile
-        import io
 
         # 使用临时文件
         with tempfile.NamedTemporaryFile(suffix=".wav", delete=False) as src_file:
@@ -244,25 +395,28 @@ class OpenVoiceWorker(BaseWorker):
             speaker_ids = self._base_speaker_tts.hps.data.spk2id
             speaker_key = list(speaker_ids.keys())[0]
 
-            self._base_speaker_tts.tts_to_file(
-                text=text,
-                speaker_id=speaker_ids[speaker_key],
-                output_path=src_path,
-                speed=speed,
-            )
+            with trace_stage("inference"):
+                self._base_speaker_tts.tts_to_file(
+                    text=text,
+                    speaker_id=speaker_ids[speaker_key],
+                    output_path=src_path,
+                    speed=speed,
+                )
 
             # 2. 音色转换
-            self._tone_color_converter.convert(
-                audio_src_path=src_path,
-                src_se=self._source_se,
-                tgt_se=target_se,
-                output_path=out_path,
-                message="@OpenVoice",
-            )
+            with trace_stage("convert"):
+                self._tone_color_converter.convert(
+                    audio_src_path=src_path,
+                    src_se=self._source_se,
+                    tgt_se=target_se,
+                    output_path=out_path,
+                    message="@OpenVoice",
+                )
 
             # 读取输出
-            with open(out_path, "rb") as f:
-                return f.read()
+            with trace_stage("encode"):
+                with open(out_path, "rb") as f:
+                    return f.read()
 
         finally:
             if os.path.exists(src_path):
@@ -292,34 +446,26 @@ class OpenVoiceWorker(BaseWorker):
         if self._tone_color_converter is None:
             raise RuntimeError("Model not loaded")
 
-        import tempfile
-        with tempfile.NamedTemporaryFile(suffix=".wav", delete=False) as f:
-            f.write(audio_data)
-            temp_path = f.name
+        temp_path = await run_in_executor(write_temp_file, audio_data)
 
         try:
-            loop = asyncio.get_event_loop()
-            target_se = await loop.run_in_executor(
-                None,
+            target_se = await self._run_inference(
                 self._extract_voice_sync,
                 temp_path,
             )
 
-            # 保存音色
-            voice_dir = self.voices_dir / voice_id
-            voice_dir.mkdir(parents=True, exist_ok=True)
-
-            import torch
-            torch.save(target_se, voice_dir / "speaker_embedding.pt")
-
+            # 保存音色（嵌入和元数据），文件写入放到线程池
             metadata = {
                 "voice_id": voice_id,
                 "name": voice_name or voice_id,
                 "engine": "openvoice",
                 "created_at": __import__("time").time(),
             }
-            with open(voice_dir / "voice.json", "w", encoding="utf-8") as f:
-                json.dump(metadata, f, ensure_ascii=False, indent=2)
+            await run_in_executor(
+                self._save_voice_sync, self.voices_dir / voice_id, target_se, metadata
+            )
+            # 同一 voice_id 重新提取时丢弃旧嵌入
+            self._embedding_cache.invalidate(voice_id)
 
             return VoiceInfo(
                 voice_id=voice_id,
@@ -331,6 +477,14 @@ class OpenVoiceWorker(BaseWorker):
         finally:
             os.unlink(temp_path)
 
+    def _save_voice_sync(self, voice_dir: Path, target_se, metadata: Dict):
+        """同步保存音色嵌入和元数据"""
+        import torch
+
+        voice_dir.mkdir(parents=True, exist_ok=True)
+        torch.save(target_se, voice_dir / "speaker_embedding.pt")
+        write_json(voice_dir / "voice.json", metadata)
+
     def _extract_voice_sync(self, audio_path: str):
         """同步提取音色"""
         from openvoice import se_extractor
@@ -343,22 +497,18 @@ class OpenVoiceWorker(BaseWorker):
         return target_se
 
     async def _load_voice_embedding(self, voice_id: str):
-        """加载音色嵌入"""
-        import torch
-
-        voice_dir = self.voices_dir / voice_id
-        embedding_path = voice_dir / "speaker_embedding.pt"
-
-        if not embedding_path.exists():
-            return None
-
-        loop = asyncio.get_event_loop()
-        embedding = await loop.run_in_executor(
-            None,
-            lambda: torch.load(str(embedding_path), map_location=self.device),
+        """加载音色嵌入（经嵌入缓存，命中时直接复用设备上的张量）"""
+        return await self._embedding_cache.get(
+            voice_id,
+            self.voices_dir / voice_id / "speaker_embedding.pt",
+            self._load_embedding_sync,
         )
 
-        return embedding
+    def _load_embedding_sync(self, embedding_path: Path):
+        """同步加载音色嵌入到推理设备"""
+        import torch
+
+        return torch.load(str(embedding_path), map_location=self.device)
 
 
 def main():
@@ -0,0 +1,471 @@
+"""
+推理子进程池
+
+CPU 节点上单进程推理受 GIL 和 PyTorch 线程争用限制，核数多时大部分核心空闲。
+进程池模式下，模型在节点进程中加载一次，然后 fork 出 N 个推理子进程:
+- 权重共享: fork 后子进程与父进程共享模型权重的物理内存页（写时复制，推理只读权重），
+  fork 前 gc.freeze() 避免子进程的垃圾回收改写对象头导致页面被复制
+- 请求分发: 每个子进程一条管道，调度器的分发线程取一个空闲子进程，发送方法名和参数，
+  阻塞等待结果（等待管道时释放 GIL）；参数和结果中的 CPU 张量经 torch.multiprocessing
+  注册的 reduction 以共享内存传递
+- 结果缓冲区: 子进程返回的 bytes / memoryview（编码好的音频）不经 pickle，
+  直接用 send_bytes 写入管道
+- CPU 亲和性与线程预算: 可用 CPU 按子进程数切分为连续的组，每个子进程绑定到自己的组，
+  引擎在子进程中按组大小设置推理线程数
+
+子进程只在节点进程中执行引擎的同步推理方法（_synthesize_sync 等），
+不运行事件循环，也不处理 HTTP 请求。依赖 fork，仅支持 Linux 等提供 fork 的平台，
+且模型必须在 CPU 上（CUDA 上下文不能跨 fork 使用）。
+"""
+
+import gc
+import os
+import queue
+import pickle
+import signal
+import time
+import logging
+import multiprocessing
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, Iterator, List, Optional
+
+from ..common.exceptions import ConfigurationError
+from ..common.tracing import current_trace, start_trace
+
+logger = logging.getLogger(__name__)
+
+# 管道消息类型（子进程 -> 父进程）
+_READY = "ready"
+_RESULT = "result"
+_CHUNK = "chunk"
+_END = "end"
+_ERROR = "error"
+
+# 管道消息类型（父进程 -> 子进程）
+_CALL = "call"
+_STREAM = "stream"
+_STOP = "stop"
+
+# 子进程启动（加载完成、初始化线程数）的等待时间（秒）
+START_TIMEOUT = 60.0
+
+
+def available_cpus() -> List[int]:
+    """当前进程可用的 CPU 编号"""
+    if hasattr(os, "sched_getaffinity"):
+        return sorted(os.sched_getaffinity(0))
+    return list(range(os.cpu_count() or 1))
+
+
+def partition_cpus(cpus: List[int], parts: int) -> List[List[int]]:
+    """
+    将 CPU 按编号切分为 parts 个连续的组
+
+    Args:
+        cpus: CPU 编号
+        parts: 组数
+
+    Returns:
+        各组的 CPU 编号（CPU 数少于组数时每组一个 CPU，轮流分配）
+    """
+    parts = max(1, parts)
+    if not cpus:
+        return [[] for _ in range(parts)]
+    if len(cpus) < parts:
+        return [[cpus[i % len(cpus)]] for i in range(parts)]
+
+    size, extra = divmod(len(cpus), parts)
+    groups = []
+    start = 0
+    for i in range(parts):
+        end = start + size + (1 if i < extra else 0)
+        groups.append(cpus[start:end])
+        start = end
+    return groups
+
+
+def _send(conn, kind: str, value: Any = None, stages: Optional[Dict[str, float]] = None):
+    """发送一条消息，缓冲区类型的值不经 pickle 直接写入管道"""
+    if isinstance(value, (bytes, bytearray, memoryview)):
+        conn.send((kind, True, None, stages))
+        conn.send_bytes(value)
+    else:
+        conn.send((kind, False, value, stages))
+
+
+def _recv(conn) -> tuple:
+    """接收一条消息，返回 (类型, 值, 阶段耗时)"""
+    kind, raw, value, stages = conn.recv()
+    if raw:
+        value = conn.recv_bytes()
+    return kind, value, stages
+
+
+def _portable_error(e: BaseException) -> BaseException:
+    """父进程能还原的异常（无法 pickle 往返的异常转为 RuntimeError）"""
+    try:
+        pickle.loads(pickle.dumps(e))
+        return e
+    except Exception:
+        return RuntimeError(f"{type(e).__name__}: {e}")
+
+
+def _serve(conn, target: Any, cpus: List[int], initializer: Optional[Callable], inherited: List):
+    """子进程主循环"""
+    # 关停由父进程统一处理
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    signal.signal(signal.SIGTERM, signal.SIG_DFL)
+    # 关闭 fork 继承的其他子进程管道端，父进程退出时各子进程都能读到 EOF
+    for other in inherited:
+        other.close()
+
+    try:
+        if cpus and hasattr(os, "sched_setaffinity"):
+            os.sched_setaffinity(0, cpus)
+        if initializer is not None:
+            initializer(cpus)
+    except Exception as e:
+        _send(conn, _ERROR, _portable_error(e))
+        return
+    _send(conn, _READY, os.getpid())
+
+    while True:
+        try:
+            message = conn.recv()
+        except (EOFError, OSError):
+            return
+        if message is None:
+            return
+        if message[0] == _STOP:
+            # 流已自然结束后才到达的停止请求
+            continue
+
+        kind, name, args = message
+        trace = start_trace("")
+        try:
+            func = getattr(target, name)
+            if kind == _CALL:
+                _send(conn, _RESULT, func(*args), trace.stages)
+                continue
+
+            for chunk in func(*args):
+                _send(conn, _CHUNK, chunk)
+                if conn.poll():
+                    conn.recv()  # 父进程要求停止
+                    break
+            _send(conn, _END, None, trace.stages)
+        except Exception as e:
+            logger.exception(f"Inference process call {name} failed")
+            _send(conn, _ERROR, _portable_error(e), trace.stages)
+
+
+@dataclass
+class _Replica:
+    """一个推理子进程"""
+    index: int
+    cpus: List[int]
+    process: Any = None
+    conn: Any = None
+    requests: int = 0
+    restarts: int = 0
+    # 通信中断或协议状态未知，下次使用前重启
+    broken: bool = False
+
+    @property
+    def pid(self) -> Optional[int]:
+        return self.process.pid if self.process is not None else None
+
+
+class InferenceProcessPool:
+    """fork 模型副本的推理子进程池"""
+
+    def __init__(
+        self,
+        target: Any,
+        processes: int,
+        initializer: Optional[Callable[[List[int]], None]] = None,
+        cpus: Optional[List[int]] = None,
+    ):
+        """
+        初始化进程池
+
+        Args:
+            target: 在子进程中执行推理方法的对象（已加载模型的工作节点）
+            processes: 子进程数
+            initializer: 子进程启动后调用（参数为分到的 CPU 编号），用于设置推理线程数等
+            cpus: 参与切分的 CPU 编号（默认为当前进程可用的 CPU）
+
+        Raises:
+            ConfigurationError: 平台不支持 fork
+        """
+        if "fork" not in multiprocessing.get_all_start_methods():
+            raise ConfigurationError("Inference process pool requires the fork start method")
+
+        self.target = target
+        self.processes = max(1, processes)
+        self.initializer = initializer
+        self._context = multiprocessing.get_context("fork")
+        groups = partition_cpus(cpus if cpus is not None else available_cpus(), self.processes)
+        self._replicas = [_Replica(index=i, cpus=group) for i, group in enumerate(groups)]
+        self._idle: "queue.Queue[_Replica]" = queue.Queue()
+        self._started = False
+
+    # ===================== 生命周期 =====================
+
+    def start(self):
+        """
+        fork 所有子进程并等待就绪（同步，会阻塞直到子进程初始化完成）
+
+        Raises:
+            RuntimeError: 子进程启动失败
+        """
+        try:
+            gc.collect()
+            gc.freeze()
+            try:
+                for replica in self._replicas:
+                    self._fork(replica)
+            finally:
+                gc.unfreeze()
+            for replica in self._replicas:
+                self._wait_ready(replica)
+        except Exception:
+            self.stop()
+            raise
+
+        for replica in self._replicas:
+            self._idle.put(replica)
+        self._started = True
+        logger.info(
+            "Inference process pool started: "
+            + ", ".join(f"pid={r.pid} cpus={_format_cpus(r.cpus)}" for r in self._replicas)
+        )
+
+    def stop(self, timeout: float = 5.0, wait: float = 0.0):
+        """
+        通知子进程退出，超时未退出的强制终止
+
+        Args:
+            timeout: 等待每个子进程退出的时间（秒）
+            wait: 先等待进行中的调用结束的最长时间（秒，0 表示不等待）
+        """
+        self._started = False
+        if wait > 0:
+            self._wait_idle(wait)
+        for replica in self._replicas:
+            if replica.conn is not None:
+                try:
+                    replica.conn.send(None)
+                except (OSError, ValueError):
+                    pass
+        for replica in self._replicas:
+            self._terminate(replica, timeout)
+        while not self._idle.empty():
+            self._idle.get_nowait()
+
+    def _wait_idle(self, timeout: float):
+        """等待所有子进程回到空闲（停止后不再分发新调用）"""
+        deadline = time.monotonic() + timeout
+        idle = []
+        try:
+            while len(idle) < len(self._replicas):
+                idle.append(self._idle.get(timeout=max(0.0, deadline - time.monotonic())))
+        except queue.Empty:
+            logger.warning(f"{len(self._replicas) - len(idle)} inference processes still busy after {timeout}s")
+        for replica in idle:
+            self._idle.put(replica)
+
+    def _fork(self, replica: _Replica):
+        parent_conn, child_conn = self._context.Pipe()
+        inherited = [r.conn for r in self._replicas if r.conn is not None and r is not replica]
+        inherited.append(parent_conn)
+        process = self._context.Process(
+            target=_serve,
+            args=(child_conn, self.target, replica.cpus, self.initializer, inherited),
+            name=f"inference-{replica.index}",
+            daemon=True,
+        )
+        process.start()
+        child_conn.close()
+        replica.process = process
+        replica.conn = parent_conn
+        replica.broken = False
+
+    def _wait_ready(self, replica: _Replica):
+        if not replica.conn.poll(START_TIMEOUT):
+            raise RuntimeError(f"Inference process {replica.pid} did not start in {START_TIMEOUT}s")
+        try:
+            kind, value, _ = _recv(replica.conn)
+        except (EOFError, OSError) as e:
+            raise RuntimeError(f"Inference process {replica.pid} exited during startup") from e
+        if kind == _ERROR:
+            raise RuntimeError(f"Inference process {replica.pid} failed to start: {value}") from value
+
+    def _terminate(self, replica: _Replica, timeout: float):
+        process, replica.process = replica.process, None
+        if replica.conn is not None:
+            replica.conn.close()
+            replica.conn = None
+        if process is None:
+            return
+        process.join(timeout)
+        if process.is_alive():
+            logger.warning(f"Inference process {process.pid} did not exit, terminating")
+            process.terminate()
+            process.join(timeout)
+
+    def _restart(self, replica: _Replica):
+        """重启中断的子进程（在分发线程中调用）"""
+        logger.warning(f"Restarting inference process {replica.index} (pid={replica.pid})")
+        self._terminate(replica, timeout=1.0)
+        gc.freeze()
+        try:
+            self._fork(replica)
+        finally:
+            gc.unfreeze()
+        self._wait_ready(replica)
+        replica.restarts += 1
+
+    # ===================== 调用 =====================
+
+    def _acquire(self) -> _Replica:
+        if not self._started:
+            raise RuntimeError("Inference process pool is not running")
+        replica = self._idle.get()
+        if not self._started:
+            # 等待期间进程池已停止
+            self._idle.put(replica)
+            raise RuntimeError("Inference process pool is not running")
+        if replica.broken or replica.process is None or not replica.process.is_alive():
+            try:
+                self._restart(replica)
+            except Exception:
+                replica.broken = True
+                self._idle.put(replica)
+                raise
+        replica.requests += 1
+        return replica
+
+    def _release(self, replica: _Replica):
+        self._idle.put(replica)
+
+    def call(self, name: str, *args) -> Any:
+        """
+        在空闲子进程中调用目标对象的方法（同步，阻塞到结果返回）
+
+        子进程中记录的阶段耗时（trace_stage）合并到当前请求的追踪记录。
+
+        Args:
+            name: 方法名
+            *args: 方法参数
+
+        Returns:
+            方法返回值（bytes / memoryview 结果以 bytes 返回）
+
+        Raises:
+            RuntimeError: 子进程在调用过程中退出
+        """
+        replica = self._acquire()
+        try:
+            replica.conn.send((_CALL, name, args))
+            kind, value, stages = _recv(replica.conn)
+        except (EOFError, OSError) as e:
+            replica.broken = True
+            raise RuntimeError(f"Inference process {replica.pid} exited during {name}") from e
+        except BaseException:
+            replica.broken = True
+            raise
+        finally:
+            self._release(replica)
+
+        _merge_stages(stages)
+        if kind == _ERROR:
+            raise value
+        return value
+
+    def stream(self, name: str, *args) -> Iterator[Any]:
+        """
+        在空闲子进程中迭代目标对象的生成器方法
+
+        迭代提前结束（关闭生成器）时通知子进程在产出下一块后停止，
+        并丢弃已在管道中的块，子进程回到空闲状态。
+
+        Args:
+            name: 生成器方法名
+            *args: 方法参数
+
+        Yields:
+            生成器产出的块
+
+        Raises:
+            RuntimeError: 子进程在迭代过程中退出
+        """
+        replica = self._acquire()
+        finished = False
+        try:
+            replica.conn.send((_STREAM, name, args))
+            while True:
+                kind, value, stages = _recv(replica.conn)
+                if kind == _CHUNK:
+                    yield value
+                    continue
+                finished = True
+                _merge_stages(stages)
+                if kind == _ERROR:
+                    raise value
+                return
+        except (EOFError, OSError) as e:
+            finished = True
+            replica.broken = True
+            raise RuntimeError(f"Inference process {replica.pid} exited during {name}") from e
+        finally:
+            if not finished:
+                self._drain(replica)
+            self._release(replica)
+
+    def _drain(self, replica: _Replica):
+        """提前结束的流: 通知子进程停止并读到结束消息"""
+        try:
+            replica.conn.send((_STOP,))
+            while True:
+                kind, _, _ = _recv(replica.conn)
+                if kind != _CHUNK:
+                    return
+        except (EOFError, OSError):
+            replica.broken = True
+
+    # ===================== 统计 =====================
+
+    def stats(self) -> Dict[str, Any]:
+        """进程池统计"""
+        return {
+            "processes": self.processes,
+            "idle": self._idle.qsize(),
+            "replicas": [
+                {
+                    "pid": replica.pid,
+                    "cpus": _format_cpus(replica.cpus),
+                    "alive": replica.process is not None and replica.process.is_alive(),
+                    "requests": replica.requests,
+                    "restarts": replica.restarts,
+                }
+                for replica in self._replicas
+            ],
+        }
+
+
+def _merge_stages(stages: Optional[Dict[str, float]]):
+    trace = current_trace()
+    if trace is not None and stages:
+        trace.merge(stages)
+
+
+def _format_cpus(cpus: List[int]) -> str:
+    """CPU 编号格式化为区间（如 0-7,16-23）"""
+    ranges = []
+    for cpu in cpus:
+        if ranges and cpu == ranges[-1][1] + 1:
+            ranges[-1][1] = cpu
+        else:
+            ranges.append([cpu, cpu])
+    return ",".join(str(a) if a == b else f"{a}-{b}" for a, b in ranges)
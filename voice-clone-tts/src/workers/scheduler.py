@@ -0,0 +1,310 @@
+"""
+推理调度器
+
+工作节点的合成请求先进入有界队列，再由调度协程分发到推理线程池:
+- 队列有界: 队列满时立即拒绝（QueueFullError），附带按当前处理速度估算的 Retry-After，
+  由网关换节点或返回 429，而不是在节点内无限堆积
+- 动态微批: 引擎提供批量推理函数且 max_batch_size > 1 时，调度协程取到第一个请求后
+  在 max_batch_delay 内继续收集同一 batch_key 的请求，凑成一批一次推理；
+  推理线程全部繁忙时请求自然在队列中累积，下一批会更大
+- 不支持批量的引擎（或批中只有一个请求）走单条推理路径
+
+调度协程数等于推理线程数，每个协程同一时刻只执行一批，推理线程不会超额订阅。
+"""
+
+import math
+import time
+import asyncio
+import logging
+import contextvars
+from collections import deque
+from concurrent.futures import Executor
+from dataclasses import dataclass
+from typing import Any, Callable, Deque, Dict, Hashable, List, Optional
+
+from ..common.exceptions import QueueFullError
+from ..common.tracing import RequestTrace, current_trace
+
+logger = logging.getLogger(__name__)
+
+# 单请求处理耗时的指数滑动平均系数
+SERVICE_TIME_ALPHA = 0.2
+
+# 放入队列的唤醒哨兵: 让阻塞在 queue.get() 的空闲调度协程去处理 _deferred 中的请求
+_WAKEUP = None
+
+
+@dataclass
+class _Item:
+    """排队中的推理请求"""
+    func: Callable
+    args: tuple
+    batch_key: Optional[Hashable]
+    future: asyncio.Future
+    context: contextvars.Context
+    trace: Optional[RequestTrace]
+    submitted: float
+
+
+class InferenceScheduler:
+    """有界队列 + 动态微批推理调度器"""
+
+    def __init__(
+        self,
+        executor: Executor,
+        concurrency: int = 1,
+        run_batch: Optional[Callable[[List[tuple]], List[Any]]] = None,
+        max_batch_size: int = 1,
+        max_batch_delay: float = 0.01,
+        max_queue_size: int = 64,
+    ):
+        """
+        初始化调度器
+
+        Args:
+            executor: 推理线程池
+            concurrency: 同时执行的批数（与推理线程数一致）
+            run_batch: 批量推理函数，接收各请求的参数元组列表，按顺序返回结果（None 表示不支持批量）
+            max_batch_size: 每批最多请求数
+            max_batch_delay: 凑批的最长等待时间（秒）
+            max_queue_size: 队列容量
+        """
+        self.executor = executor
+        self.concurrency = max(1, concurrency)
+        self.run_batch = run_batch
+        self.max_batch_size = max(1, max_batch_size)
+        self.max_batch_delay = max(0.0, max_batch_delay)
+        self.max_queue_size = max(1, max_queue_size)
+
+        self._queue: Optional[asyncio.Queue] = None
+        # 凑批时取出但 batch_key 不同的请求，优先于队列中的请求处理
+        self._deferred: Deque[_Item] = deque()
+        # 队列中尚未被取走的唤醒哨兵数（不计入 queue_size）
+        self._wakeups = 0
+        self._dispatchers: List[asyncio.Task] = []
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+
+        # 统计
+        self.batch_count = 0
+        self.item_count = 0
+        self.rejected_count = 0
+        self.max_batch_seen = 0
+        # 单请求平均处理耗时（秒，按批耗时 / 批大小的滑动平均），0 表示尚无数据
+        self.service_time = 0.0
+
+    @property
+    def batching(self) -> bool:
+        """是否启用批量推理"""
+        return self.run_batch is not None and self.max_batch_size > 1
+
+    @property
+    def queue_size(self) -> int:
+        """排队中（尚未分发到推理线程）的请求数"""
+        queued = self._queue.qsize() - self._wakeups if self._queue is not None else 0
+        return queued + len(self._deferred)
+
+    # ===================== 提交 =====================
+
+    async def submit(self, func: Callable, *args, batch_key: Optional[Hashable] = None) -> Any:
+        """
+        提交一个推理请求并等待结果
+
+        Args:
+            func: 单条推理函数（同步，在推理线程中执行）
+            *args: 函数参数，批量推理时作为一个元组传给 run_batch
+            batch_key: 凑批分组键，只有相同键的请求会合并为一批
+
+        Returns:
+            推理结果
+
+        Raises:
+            QueueFullError: 队列已满
+        """
+        self._ensure_started()
+        if self.queue_size >= self.max_queue_size:
+            self.rejected_count += 1
+            raise QueueFullError(self.max_queue_size, retry_after=self.estimate_wait())
+
+        item = _Item(
+            func=func,
+            args=args,
+            batch_key=batch_key,
+            future=self._loop.create_future(),
+            context=contextvars.copy_context(),
+            trace=current_trace(),
+            submitted=time.perf_counter(),
+        )
+        self._queue.put_nowait(item)
+        # 调用方被取消时 future 随之取消，调度协程会跳过它
+        return await item.future
+
+    # ===================== 生命周期 =====================
+
+    def _ensure_started(self):
+        """在当前事件循环中启动调度协程（事件循环变化时重建）"""
+        loop = asyncio.get_running_loop()
+        if self._loop is loop and self._dispatchers:
+            return
+        self._loop = loop
+        self._queue = asyncio.Queue()
+        self._deferred.clear()
+        self._wakeups = 0
+        self._dispatchers = [
+            loop.create_task(self._dispatch()) for _ in range(self.concurrency)
+        ]
+
+    async def stop(self):
+        """停止调度协程并取消未分发的请求"""
+        dispatchers, self._dispatchers = self._dispatchers, []
+        for task in dispatchers:
+            task.cancel()
+        for task in dispatchers:
+            try:
+                await task
+            except (asyncio.CancelledError, RuntimeError):
+                # RuntimeError: 任务属于已关闭的事件循环
+                pass
+
+        while self._deferred:
+            self._deferred.popleft().future.cancel()
+        while self._queue is not None and not self._queue.empty():
+            item = self._queue.get_nowait()
+            if item is not _WAKEUP:
+                item.future.cancel()
+        self._wakeups = 0
+
+    # ===================== 分发 =====================
+
+    async def _next_item(self, timeout: Optional[float] = None) -> Optional[_Item]:
+        """取下一个未取消的请求，超时返回 None"""
+        while True:
+            if self._deferred:
+                item = self._deferred.popleft()
+            elif timeout is None:
+                item = await self._queue.get()
+            else:
+                try:
+                    item = self._queue.get_nowait()
+                except asyncio.QueueEmpty:
+                    if timeout <= 0:
+                        return None
+                    try:
+                        item = await asyncio.wait_for(self._queue.get(), timeout)
+                    except asyncio.TimeoutError:
+                        return None
+            if item is _WAKEUP:
+                # 回到循环开头，先处理 _deferred
+                self._wakeups -= 1
+                continue
+            if not item.future.cancelled():
+                return item
+
+    async def _collect(self, first: _Item) -> List[_Item]:
+        """以 first 为首凑一批请求"""
+        batch = [first]
+        if not self.batching:
+            return batch
+
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + self.max_batch_delay
+        while len(batch) < self.max_batch_size:
+            item = await self._next_item(timeout=deadline - loop.time())
+            if item is None:
+                break
+            if item.batch_key != first.batch_key:
+                # 不能合并: 留给下一批，保持先到先服务；
+                # 唤醒一个阻塞在队列上的空闲调度协程处理它，不必等本批推理完成
+                self._deferred.appendleft(item)
+                self._wakeups += 1
+                self._queue.put_nowait(_WAKEUP)
+                break
+            batch.append(item)
+        return batch
+
+    async def _dispatch(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            batch = await self._collect(await self._next_item())
+
+            dispatched = time.perf_counter()
+            for item in batch:
+                if item.trace is not None:
+                    item.trace.add("queue", (dispatched - item.submitted) * 1000)
+
+            try:
+                if len(batch) == 1:
+                    item = batch[0]
+                    results = [await loop.run_in_executor(
+                        self.executor, item.context.run, item.func, *item.args
+                    )]
+                else:
+                    results = await loop.run_in_executor(
+                        self.executor, self.run_batch, [item.args for item in batch]
+                    )
+                    if len(results) != len(batch):
+                        raise RuntimeError(
+                            f"Batch inference returned {len(results)} results for {len(batch)} requests"
+                        )
+                    elapsed = (time.perf_counter() - dispatched) * 1000
+                    for item in batch:
+                        if item.trace is not None:
+                            item.trace.add("inference", elapsed)
+            except asyncio.CancelledError:
+                # 调度器停止: 不让等待中的调用方永远挂起
+                for item in batch:
+                    item.future.cancel()
+                raise
+            except Exception as e:
+                for item in batch:
+                    if not item.future.done():
+                        item.future.set_exception(e)
+                continue
+
+            per_item = (time.perf_counter() - dispatched) / len(batch)
+            if self.service_time == 0.0:
+                self.service_time = per_item
+            else:
+                self.service_time += SERVICE_TIME_ALPHA * (per_item - self.service_time)
+
+            self.batch_count += 1
+            self.item_count += len(batch)
+            self.max_batch_seen = max(self.max_batch_seen, len(batch))
+            if len(batch) > 1:
+                logger.debug(f"Batched inference: {len(batch)} requests")
+
+            for item, result in zip(batch, results):
+                if not item.future.done():
+                    item.future.set_result(result)
+
+    # ===================== 统计 =====================
+
+    def estimate_wait(self, extra: int = 1) -> float:
+        """
+        估算排在队尾的请求开始处理前需要等待的时间
+
+        Args:
+            extra: 除队列中请求外还要计入的请求数
+
+        Returns:
+            等待时间（秒，至少 1 秒；尚无处理耗时数据时为 1 秒）
+        """
+        if self.service_time <= 0:
+            return 1.0
+        wait = (self.queue_size + extra) * self.service_time / self.concurrency
+        return max(1.0, math.ceil(wait))
+
+    def stats(self) -> Dict[str, Any]:
+        """调度统计"""
+        return {
+            "queue_size": self.queue_size,
+            "max_queue_size": self.max_queue_size,
+            "batching": self.batching,
+            "max_batch_size": self.max_batch_size,
+            "max_batch_delay_ms": self.max_batch_delay * 1000,
+            "batches": self.batch_count,
+            "requests": self.item_count,
+            "rejected": self.rejected_count,
+            "avg_batch_size": round(self.item_count / self.batch_count, 2) if self.batch_count else 0.0,
+            "max_batch_seen": self.max_batch_seen,
+            "service_time_ms": round(self.service_time * 1000, 1),
+        }
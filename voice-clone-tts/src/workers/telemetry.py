@@ -0,0 +1,167 @@
+"""
+工作节点遥测采样
+
+后台按固定周期采集 CPU、内存、进程 RSS、GPU 和事件循环延迟，
+结果保存在环形缓冲区中，心跳直接读取最新样本，不在请求或心跳路径上做系统调用。
+
+GPU 指标通过 pynvml 获取，只在启动时初始化一次并缓存设备句柄；
+未安装 pynvml 或没有 GPU 时自动跳过 GPU 指标。
+"""
+
+import os
+import time
+import asyncio
+import logging
+from collections import deque
+from dataclasses import dataclass
+from typing import Optional, List
+
+import psutil
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class TelemetrySample:
+    """单次遥测样本"""
+    timestamp: float
+    cpu_percent: float = 0.0
+    memory_percent: float = 0.0
+    memory_used_mb: float = 0.0
+    process_rss_mb: float = 0.0
+    gpu_percent: float = 0.0
+    gpu_memory_percent: float = 0.0
+    gpu_memory_used_mb: float = 0.0
+    loop_lag_ms: float = 0.0
+
+
+class TelemetrySampler:
+    """遥测采样器"""
+
+    def __init__(self, interval: float = 5.0, history: int = 120, gpu_index: int = 0):
+        """
+        初始化采样器
+
+        Args:
+            interval: 采样周期（秒）
+            history: 环形缓冲区保留的样本数
+            gpu_index: 采集的 GPU 编号
+        """
+        self.interval = interval
+        self.gpu_index = gpu_index
+        self._samples: deque = deque(maxlen=history)
+        self._process = psutil.Process(os.getpid())
+        self._task: Optional[asyncio.Task] = None
+
+        # NVML 状态: None 表示尚未初始化，False 表示不可用
+        self._nvml = None
+        self._gpu_handle = None
+
+    # ===================== 数据源 =====================
+
+    def _init_gpu(self):
+        """初始化 NVML（只执行一次）"""
+        if self._nvml is not None:
+            return
+        try:
+            import pynvml
+            pynvml.nvmlInit()
+            self._gpu_handle = pynvml.nvmlDeviceGetHandleByIndex(self.gpu_index)
+            self._nvml = pynvml
+            logger.info(f"GPU telemetry enabled (device {self.gpu_index})")
+        except ImportError:
+            self._nvml = False
+        except Exception as e:
+            logger.info(f"GPU telemetry unavailable: {e}")
+            self._nvml = False
+
+    def _shutdown_gpu(self):
+        if self._nvml:
+            try:
+                self._nvml.nvmlShutdown()
+            except Exception as e:
+                logger.debug(f"NVML shutdown failed: {e}")
+        self._nvml = None
+        self._gpu_handle = None
+
+    def collect(self, loop_lag_ms: float = 0.0) -> TelemetrySample:
+        """
+        同步采集一次样本
+
+        Args:
+            loop_lag_ms: 本周期测得的事件循环延迟
+
+        Returns:
+            遥测样本
+        """
+        self._init_gpu()
+
+        mem = psutil.virtual_memory()
+        sample = TelemetrySample(
+            timestamp=time.time(),
+            # interval=None: 返回距上次调用以来的使用率，不阻塞
+            cpu_percent=psutil.cpu_percent(interval=None),
+            memory_percent=mem.percent,
+            memory_used_mb=mem.used / (1024 * 1024),
+            process_rss_mb=self._process.memory_info().rss / (1024 * 1024),
+            loop_lag_ms=loop_lag_ms,
+        )
+
+        if self._nvml:
+            try:
+                util = self._nvml.nvmlDeviceGetUtilizationRates(self._gpu_handle)
+                mem_info = self._nvml.nvmlDeviceGetMemoryInfo(self._gpu_handle)
+                sample.gpu_percent = float(util.gpu)
+                sample.gpu_memory_used_mb = mem_info.used / (1024 * 1024)
+                sample.gpu_memory_percent = (mem_info.used / mem_info.total) * 100
+            except Exception as e:
+                logger.debug(f"Failed to get GPU metrics: {e}")
+
+        self._samples.append(sample)
+        return sample
+
+    # ===================== 生命周期 =====================
+
+    def start(self):
+        """在当前事件循环中启动后台采样（重复调用无副作用）"""
+        loop = asyncio.get_running_loop()
+        if self._task is not None and not self._task.done() and self._task.get_loop() is loop:
+            return
+        self._task = loop.create_task(self._run())
+
+    async def stop(self):
+        """停止采样并释放 NVML"""
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except (asyncio.CancelledError, RuntimeError):
+                # RuntimeError: 任务属于已关闭的事件循环
+                pass
+            self._task = None
+        self._shutdown_gpu()
+
+    async def _run(self):
+        loop = asyncio.get_running_loop()
+        lag_ms = 0.0
+        while True:
+            try:
+                # psutil / NVML 调用放到线程池，避免偶发的慢调用阻塞事件循环
+                await loop.run_in_executor(None, self.collect, lag_ms)
+            except Exception as e:
+                logger.debug(f"Telemetry sample failed: {e}")
+
+            # 事件循环延迟 = 实际唤醒时间 - 预期唤醒时间
+            expected = loop.time() + self.interval
+            await asyncio.sleep(self.interval)
+            lag_ms = max(0.0, (loop.time() - expected) * 1000)
+
+    # ===================== 读取 =====================
+
+    def latest(self) -> Optional[TelemetrySample]:
+        """最新样本（尚未采样时为 None）"""
+        return self._samples[-1] if self._samples else None
+
+    def history(self) -> List[TelemetrySample]:
+        """环形缓冲区中的全部样本（从旧到新）"""
+        return list(self._samples)
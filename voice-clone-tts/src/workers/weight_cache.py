@@ -0,0 +1,104 @@
+"""
+模型权重缓存
+
+.pth 检查点是 pickle + zip，每次激活都要完整反序列化。权重缓存在第一次加载后把
+检查点中的 state dict 另存为 safetensors 文件，之后的激活直接 mmap 读取，
+省去 pickle 解析，重复激活时数据来自页缓存。
+
+缓存文件放在模型目录下的 .weight_cache/，文件名包含源检查点的大小和修改时间，
+检查点被替换后自动使用新的缓存文件。safetensors 未安装或模型目录不可写时只记录警告，
+按原方式加载。
+"""
+
+import os
+import logging
+from pathlib import Path
+from typing import Any, Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+CACHE_DIR_NAME = ".weight_cache"
+
+
+def weight_cache_path(checkpoint: Path, name: str) -> Optional[Path]:
+    """
+    检查点对应的缓存文件路径
+
+    Args:
+        checkpoint: 源检查点文件
+        name: 缓存名（区分同一目录下的多个检查点）
+
+    Returns:
+        缓存文件路径（源检查点不存在或未安装 safetensors 时为 None）
+    """
+    try:
+        import safetensors  # noqa: F401
+    except ImportError:
+        logger.warning("safetensors is not installed, weight cache disabled")
+        return None
+    try:
+        st = checkpoint.stat()
+    except OSError:
+        return None
+    return checkpoint.parent / CACHE_DIR_NAME / f"{name}-{st.st_size}-{st.st_mtime_ns}.safetensors"
+
+
+def load_weight_cache(path: Path) -> Dict[str, Any]:
+    """
+    读取缓存的 state dict（张量 mmap 自缓存文件，位于 CPU）
+
+    Args:
+        path: 缓存文件
+
+    Returns:
+        state dict
+    """
+    from safetensors.torch import load_file
+
+    return load_file(str(path), device="cpu")
+
+
+def save_weight_cache(state_dict: Dict[str, Any], path: Path) -> bool:
+    """
+    将 state dict 写入缓存（先写临时文件再改名，并发激活不会读到不完整的文件）
+
+    非张量项被忽略；共享存储的张量（如绑定权重）各自保存一份。
+
+    Args:
+        state_dict: 源检查点的 state dict
+        path: 缓存文件
+
+    Returns:
+        是否写入成功
+    """
+    import torch
+    from safetensors.torch import save_file
+
+    tensors = {}
+    seen = set()
+    for key, value in state_dict.items():
+        if not isinstance(value, torch.Tensor):
+            continue
+        storage = value.untyped_storage().data_ptr()
+        tensor = value.detach().cpu()
+        # safetensors 不允许张量共享存储，共享的张量复制一份
+        tensors[key] = tensor.clone().contiguous() if storage in seen else tensor.contiguous()
+        seen.add(storage)
+
+    tmp = path.with_name(f"{path.name}.{os.getpid()}.tmp")
+    try:
+        path.parent.mkdir(parents=True, exist_ok=True)
+        save_file(tensors, str(tmp))
+        os.replace(tmp, path)
+    except OSError as e:
+        logger.warning(f"Cannot write weight cache {path}: {e}")
+        tmp.unlink(missing_ok=True)
+        return False
+
+    # 清理同一检查点的旧缓存
+    prefix = path.name.split("-", 1)[0] + "-"
+    for old in path.parent.glob(f"{prefix}*.safetensors"):
+        if old != path:
+            old.unlink(missing_ok=True)
+    logger.info(f"Wrote weight cache {path} ({len(tensors)} tensors)")
+    return True
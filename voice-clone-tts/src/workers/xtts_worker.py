@@ -5,17 +5,22 @@ XTTS 工作节点
 """
 
 import os
-import io
-import json
 import uuid
 import logging
 import asyncio
+from dataclasses import replace
 from pathlib import Path
-from typing import Optional, Dict, Any
+from typing import Optional, Dict, Any, AsyncIterator, Iterator, List
 
+from ..common.audio import AudioData, encode_pcm, encode_wav
+from ..common.exceptions import ConfigurationError
 from ..common.models import EngineType, VoiceInfo
 from ..common.paths import XTTS_MODEL_PATH, VOICES_DIR
-from .base_worker import BaseWorker
+from ..common.tracing import trace_stage
+from ..common.tracing import run_in_executor
+from .base_worker import BaseWorker, write_temp_file, write_json
+from .weight_cache import weight_cache_path, load_weight_cache, save_weight_cache
+from .cpu_tuning import COMPUTE_TYPES, CPUProfile, apply_cpu_profile, quantize_linear_int8, resolve_threads
 
 logger = logging.getLogger(__name__)
 
@@ -23,6 +28,17 @@ logger = logging.getLogger(__name__)
 class XTTSWorker(BaseWorker):
     """XTTS-v2 工作节点"""
 
+    # XTTS 支持增量生成（inference_stream），输出 24kHz
+    supports_streaming = True
+    stream_sample_rate = 24000
+
+    # CPU 上可 fork 多个推理子进程
+    supports_inference_processes = True
+
+    # 不停服重新加载: 替换模型和配置，可切换模型目录
+    model_attributes = ("_model", "_config")
+    reload_options = ("model_path",)
+
     def __init__(
         self,
         host: str = "0.0.0.0",
@@ -32,6 +48,11 @@ class XTTSWorker(BaseWorker):
         model_path: Optional[str] = None,
         device: str = "cuda",
         voices_dir: str = "./voices",
+        compute_type: str = "float32",
+        num_threads: int = 0,
+        interop_threads: int = 0,
+        matmul_precision: str = "highest",
+        **kwargs,
     ):
         """
         初始化 XTTS Worker
@@ -44,6 +65,11 @@ class XTTSWorker(BaseWorker):
             model_path: 模型路径
             device: 设备 (cuda/cpu)
             voices_dir: 音色存储目录
+            compute_type: 计算精度（CPU 上 int8 启用线性层动态量化，其余按 float32 运行）
+            num_threads: CPU intra-op 线程数（0 表示 CPU 核数 / 推理线程数）
+            interop_threads: CPU inter-op 线程数（0 表示 PyTorch 默认）
+            matmul_precision: float32 矩阵乘法精度 highest/high/medium（CPU）
+            **kwargs: 其他 BaseWorker 参数（推理线程数、遥测周期等）
         """
         super().__init__(
             engine_type=EngineType.XTTS,
@@ -51,6 +77,7 @@ class XTTSWorker(BaseWorker):
             port=port,
             gateway_url=gateway_url,
             node_id=node_id,
+            **kwargs,
         )
 
         self.model_path = model_path
@@ -58,6 +85,20 @@ class XTTSWorker(BaseWorker):
         self.voices_dir = Path(voices_dir)
         self.voices_dir.mkdir(parents=True, exist_ok=True)
 
+        if compute_type not in COMPUTE_TYPES:
+            raise ConfigurationError(
+                f"Unknown compute type: {compute_type} (expected one of {', '.join(COMPUTE_TYPES)})"
+            )
+        self.compute_type = compute_type
+        # CPU 性能模式（设备为 CPU 时在加载模型时应用）
+        self.cpu_profile = CPUProfile(
+            num_threads=num_threads,
+            interop_threads=interop_threads,
+            quantize=compute_type == "int8",
+            matmul_precision=matmul_precision,
+        )
+        self.cpu_profile.validate()
+
         # XTTS 模型实例
         self._model = None
         self._config = None
@@ -79,10 +120,11 @@ class XTTSWorker(BaseWorker):
             return False
 
     def _load_model_sync(self):
-        """同步加载模型"""
-        import torch
-        from TTS.tts.configs.xtts_config import XttsConfig
-        from TTS.tts.models.xtts import Xtts
+        """同步加载模型（各阶段耗时记入激活耗时）"""
+        with self._load_phase("import"):
+            import torch
+            from TTS.tts.configs.xtts_config import XttsConfig
+            from TTS.tts.models.xtts import Xtts
 
         # PyTorch 2.6+ 安全加载策略：允许 TTS 相关类
         try:
@@ -107,20 +149,93 @@ class XTTSWorker(BaseWorker):
             raise FileNotFoundError(f"Config not found: {config_path}")
 
         # 加载配置和模型
-        self._config = XttsConfig()
-        self._config.load_json(str(config_path))
-
-        self._model = Xtts.init_from_config(self._config)
-        self._model.load_checkpoint(
-            self._config,
-            checkpoint_dir=str(checkpoint_dir),
-            eval=True,
+        with self._load_phase("init"):
+            self._config = XttsConfig()
+            self._config.load_json(str(config_path))
+            self._model = Xtts.init_from_config(self._config)
+
+        with self._load_phase("checkpoint"):
+            cache = weight_cache_path(checkpoint_dir / "model.pth", "xtts") if self.weight_cache else None
+            captured = self._hook_checkpoint_state(cache)
+            self._model.load_checkpoint(
+                self._config,
+                checkpoint_dir=str(checkpoint_dir),
+                eval=True,
+            )
+
+        if captured:
+            with self._load_phase("weight_cache_write"):
+                save_weight_cache(captured["state"], cache)
+
+        with self._load_phase("device"):
+            if self.device == "cuda" and torch.cuda.is_available():
+                self._model.cuda()
+                if self.compute_type == "int8":
+                    logger.warning("int8 dynamic quantization is CPU-only, running float32 on cuda")
+            else:
+                self.device = "cpu"
+                self._apply_cpu_profile()
+
+    def _hook_checkpoint_state(self, cache: Optional[Path]) -> Dict:
+        """
+        接管 load_checkpoint 读取检查点 state dict 的步骤
+
+        load_checkpoint 通过 get_compatible_checkpoint_state_dict 反序列化 model.pth；
+        缓存存在时改为 mmap 读取缓存，否则记下读到的 state dict 供写入缓存。
+
+        Args:
+            cache: 缓存文件（None 表示不使用缓存）
+
+        Returns:
+            需要写入缓存时，load_checkpoint 之后包含 "state" 的字典；否则为空字典
+        """
+        captured: Dict = {}
+        if cache is None:
+            return captured
+
+        if cache.exists():
+            try:
+                state = load_weight_cache(cache)
+            except Exception as e:
+                logger.warning(f"Ignoring unreadable weight cache {cache}: {e}")
+            else:
+                logger.info(f"Loading XTTS weights from cache {cache}")
+                self._model.get_compatible_checkpoint_state_dict = lambda model_path: state
+                return captured
+
+        original = self._model.get_compatible_checkpoint_state_dict
+
+        def capture(model_path):
+            captured["state"] = original(model_path)
+            return captured["state"]
+
+        self._model.get_compatible_checkpoint_state_dict = capture
+        return captured
+
+    def _apply_cpu_profile(self):
+        """应用 CPU 性能模式: 线程数、矩阵乘法精度，以及可选的 GPT 部分 int8 量化"""
+        profile = replace(
+            self.cpu_profile,
+            num_threads=resolve_threads(self.cpu_profile.num_threads, self._scheduler.concurrency),
+        )
+        apply_cpu_profile(profile)
+
+        # 只量化自回归 GPT（CPU 耗时的主要部分），HiFi-GAN 解码器保持 float32；
+        # 进程池模式下量化在 fork 前完成，子进程共享量化后的权重
+        quantized = quantize_linear_int8(self._model.gpt) if profile.quantize else 0
+        logger.info(
+            f"CPU profile: threads={profile.num_threads}, interop={profile.interop_threads or 'default'}, "
+            f"matmul={profile.matmul_precision}, int8_linear_layers={quantized}"
         )
 
-        if self.device == "cuda" and torch.cuda.is_available():
-            self._model.cuda()
-        else:
-            self.device = "cpu"
+    def _init_inference_process(self, cpus: List[int]):
+        """推理子进程: 未指定线程数时按绑定的 CPU 数设置（inter-op 线程数继承自父进程）"""
+        profile = replace(
+            self.cpu_profile,
+            num_threads=self.cpu_profile.num_threads or max(1, len(cpus)),
+            interop_threads=0,
+        )
+        apply_cpu_profile(profile)
 
     async def unload_model(self) -> bool:
         """卸载模型"""
@@ -148,7 +263,7 @@ class XTTSWorker(BaseWorker):
         voice_id: str,
         language: str = "zh",
         **kwargs,
-    ) -> bytes:
+    ) -> AudioData:
         """
         合成语音
 
@@ -165,14 +280,13 @@ class XTTSWorker(BaseWorker):
             raise RuntimeError("Model not loaded")
 
         # 加载音色
-        voice_embedding = await self._load_voice_embedding(voice_id)
+        with trace_stage("embedding"):
+            voice_embedding = await self._load_voice_embedding(voice_id)
         if voice_embedding is None:
             raise ValueError(f"Voice not found: {voice_id}")
 
-        # 在线程池中运行合成
-        loop = asyncio.get_event_loop()
-        audio_data = await loop.run_in_executor(
-            None,
+        # 经调度队列在推理线程池中运行合成（引擎未实现批量推理，逐条执行）
+        audio_data = await self._schedule_synthesis(
             self._synthesize_sync,
             text,
             voice_embedding,
@@ -182,37 +296,97 @@ class XTTSWorker(BaseWorker):
 
         return audio_data
 
+    async def synthesize_stream(
+        self,
+        text: str,
+        voice_id: str,
+        language: str = "zh",
+        chunk_size: int = 20,
+        **kwargs,
+    ) -> AsyncIterator[bytes]:
+        """
+        流式合成语音
+
+        Args:
+            text: 文本
+            voice_id: 音色 ID
+            language: 语言
+            chunk_size: 每块生成的 GPT token 数（越小首块越快，块间开销越大）
+            **kwargs: 其他参数（speed 等）
+
+        Returns:
+            逐块产出 24kHz 16-bit 单声道 PCM 的异步迭代器
+        """
+        if self._model is None:
+            raise RuntimeError("Model not loaded")
+
+        with trace_stage("embedding"):
+            voice_embedding = await self._load_voice_embedding(voice_id)
+        if voice_embedding is None:
+            raise ValueError(f"Voice not found: {voice_id}")
+
+        async for chunk in self._stream_inference(
+            self._synthesize_stream_sync,
+            text,
+            voice_embedding,
+            language,
+            kwargs.get("speed", 1.0),
+            chunk_size,
+        ):
+            yield chunk
+
+    def _synthesize_stream_sync(
+        self,
+        text: str,
+        voice_embedding: Dict,
+        language: str,
+        speed: float,
+        chunk_size: int,
+    ) -> Iterator[memoryview]:
+        """同步增量合成（在推理线程中迭代）"""
+        import torch
+
+        # 生成器在同一个推理线程中迭代完，推理模式（线程局部）覆盖整个过程
+        with torch.inference_mode():
+            chunks = self._model.inference_stream(
+                text=text,
+                language=language,
+                gpt_cond_latent=voice_embedding["gpt_cond_latent"],
+                speaker_embedding=voice_embedding["speaker_embedding"],
+                stream_chunk_size=chunk_size,
+                speed=speed,
+                enable_text_splitting=True,
+            )
+            for chunk in chunks:
+                # float [-1, 1] -> 16-bit PCM
+                yield encode_pcm(chunk.cpu().numpy())
+
     def _synthesize_sync(
         self,
         text: str,
         voice_embedding: Dict,
         language: str,
         speed: float,
-    ) -> bytes:
+    ) -> memoryview:
         """同步合成"""
         import torch
-        import torchaudio
-        import io
 
         gpt_cond_latent = voice_embedding["gpt_cond_latent"]
         speaker_embedding = voice_embedding["speaker_embedding"]
 
         # 合成
-        out = self._model.inference(
-            text=text,
-            language=language,
-            gpt_cond_latent=gpt_cond_latent,
-            speaker_embedding=speaker_embedding,
-            speed=speed,
-        )
-
-        # 转换为 WAV
-        audio_tensor = torch.tensor(out["wav"]).unsqueeze(0)
-        buffer = io.BytesIO()
-        torchaudio.save(buffer, audio_tensor, 24000, format="wav")
-        buffer.seek(0)
+        with trace_stage("inference"), torch.inference_mode():
+            out = self._model.inference(
+                text=text,
+                language=language,
+                gpt_cond_latent=gpt_cond_latent,
+                speaker_embedding=speaker_embedding,
+                speed=speed,
+            )
 
-        return buffer.read()
+        # 转换为 16-bit PCM WAV
+        with trace_stage("encode"):
+            return encode_wav(out["wav"], 24000)
 
     async def extract_voice(
         self,
@@ -237,37 +411,27 @@ class XTTSWorker(BaseWorker):
             raise RuntimeError("Model not loaded")
 
         # 保存临时音频文件
-        import tempfile
-        with tempfile.NamedTemporaryFile(suffix=".wav", delete=False) as f:
-            f.write(audio_data)
-            temp_path = f.name
+        temp_path = await run_in_executor(write_temp_file, audio_data)
 
         try:
             # 在线程池中提取
-            loop = asyncio.get_event_loop()
-            voice_embedding = await loop.run_in_executor(
-                None,
+            voice_embedding = await self._run_inference(
                 self._extract_voice_sync,
                 temp_path,
             )
 
-            # 保存音色
-            voice_dir = self.voices_dir / voice_id
-            voice_dir.mkdir(parents=True, exist_ok=True)
-
-            # 保存嵌入
-            import torch
-            torch.save(voice_embedding, voice_dir / "embedding.pt")
-
-            # 保存元数据
+            # 保存音色（嵌入和元数据），文件写入放到线程池
             metadata = {
                 "voice_id": voice_id,
                 "name": voice_name or voice_id,
                 "engine": "xtts",
                 "created_at": __import__("time").time(),
             }
-            with open(voice_dir / "voice.json", "w", encoding="utf-8") as f:
-                json.dump(metadata, f, ensure_ascii=False, indent=2)
+            await run_in_executor(
+                self._save_voice_sync, self.voices_dir / voice_id, voice_embedding, metadata
+            )
+            # 同一 voice_id 重新提取时丢弃旧嵌入
+            self._embedding_cache.invalidate(voice_id)
 
             return VoiceInfo(
                 voice_id=voice_id,
@@ -279,11 +443,22 @@ class XTTSWorker(BaseWorker):
         finally:
             os.unlink(temp_path)
 
+    def _save_voice_sync(self, voice_dir: Path, voice_embedding: Dict, metadata: Dict):
+        """同步保存音色嵌入和元数据"""
+        import torch
+
+        voice_dir.mkdir(parents=True, exist_ok=True)
+        torch.save(voice_embedding, voice_dir / "embedding.pt")
+        write_json(voice_dir / "voice.json", metadata)
+
     def _extract_voice_sync(self, audio_path: str) -> Dict:
         """同步提取音色"""
-        gpt_cond_latent, speaker_embedding = self._model.get_conditioning_latents(
-            audio_path=[audio_path]
-        )
+        import torch
+
+        with torch.inference_mode():
+            gpt_cond_latent, speaker_embedding = self._model.get_conditioning_latents(
+                audio_path=[audio_path]
+            )
 
         return {
             "gpt_cond_latent": gpt_cond_latent,
@@ -291,24 +466,18 @@ class XTTSWorker(BaseWorker):
         }
 
     async def _load_voice_embedding(self, voice_id: str) -> Optional[Dict]:
-        """加载音色嵌入"""
-        import torch
-
-        voice_dir = self.voices_dir / voice_id
-        embedding_path = voice_dir / "embedding.pt"
-
-        if not embedding_path.exists():
-            # 尝试从参考音频提取
-            # 这里可以添加默认音色逻辑
-            return None
-
-        loop = asyncio.get_event_loop()
-        embedding = await loop.run_in_executor(
-            None,
-            lambda: torch.load(str(embedding_path), map_location=self.device),
+        """加载音色嵌入（经嵌入缓存，命中时直接复用设备上的张量）"""
+        return await self._embedding_cache.get(
+            voice_id,
+            self.voices_dir / voice_id / "embedding.pt",
+            self._load_embedding_sync,
         )
 
-        return embedding
+    def _load_embedding_sync(self, embedding_path: Path) -> Dict:
+        """同步加载音色嵌入到推理设备"""
+        import torch
+
+        return torch.load(str(embedding_path), map_location=self.device)
 
 
 def main():